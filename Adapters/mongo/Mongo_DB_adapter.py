@@ -1,24 +1,95 @@
 import json
-from pymongo import MongoClient
-from typing import List, Dict, Optional
+import logging
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, PyMongoError
+from typing import Iterable, List, Dict, Optional
+
+# Indexes of the queries below, per collection: (keys, options).
+# The id fields are unique but sparse, so documents of the older schema
+# without them (e.g. users with only `username`) do not collide on null.
+INDEXES = {
+    "users": [
+        ([("user_id", ASCENDING)], {"unique": True, "sparse": True}),
+    ],
+    "greenhouses": [
+        ([("greenhouse_id", ASCENDING)], {"unique": True, "sparse": True}),
+        ([("tenant_id", ASCENDING), ("name", ASCENDING)], {}),
+    ],
+    "devices": [
+        ([("device_id", ASCENDING)], {"unique": True, "sparse": True}),
+        ([("greenhouse_id", ASCENDING), ("name", ASCENDING)], {}),
+    ],
+    "greenhouse_effects": [
+        ([("greenhouse_id", ASCENDING)], {}),
+    ],
+    "telemetry": [
+        ([("device_id", ASCENDING)], {}),
+    ],
+}
+
+
+def _projection(fields: Optional[Iterable[str]]) -> Optional[Dict]:
+    """Projection on the given fields (plus _id, so a match is never an empty dict)."""
+    if fields is None:
+        return None
+    return {field: 1 for field in fields}
+
 
 class MongoAdapter:
     def __init__(self, db_uri: str, db_name: str):
         self.client = MongoClient(db_uri)
         self.db = self.client[db_name]
 
+    # === INDEXES ===
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create the indexes in INDEXES, if missing. Safe to call at every
+        start: an index that already exists with the same spec is left as is.
+        Returns the indexes in place as collection.name; failures (duplicates
+        under a unique key, an existing index with other options) are logged
+        and skipped, an unreachable server stops the step.
+        """
+        names = []
+        for collection, indexes in INDEXES.items():
+            for keys, options in indexes:
+                try:
+                    names.append(f"{collection}.{self.db[collection].create_index(keys, **options)}")
+                except ConnectionFailure as e:
+                    # no server: do not wait the selection timeout once per index
+                    logging.warning("[mongo] could not create indexes: %s", e)
+                    return names
+                except PyMongoError as e:
+                    logging.warning("[mongo] could not create index %s on %s: %s", keys, collection, e)
+        logging.info("[mongo] %d indexes in place", len(names))
+        return names
+
+    @staticmethod
+    def _find_one(collection, query: Dict, fields: Optional[Iterable[str]] = None) -> Dict:
+        projection = _projection(fields)
+        if projection is None:
+            doc = collection.find_one(query)
+        else:
+            doc = collection.find_one(query, projection)
+        return doc if doc else {}
+
+    @staticmethod
+    def _insert_new(collection, key: str, data: Dict) -> bool:
+        if collection.count_documents({key: data[key]}, limit=1):
+            return False  # Already exists
+        try:
+            collection.insert_one(data)
+        except DuplicateKeyError:
+            return False  # Created meanwhile (unique index)
+        return True
+
     # === USERS ===
-    def retrieve_user(self, username: str) -> Dict:
-        """Retrieve user by username"""
-        user = self.db.users.find_one({"user_id": username})
-        return user if user else {}
+    def retrieve_user(self, username: str, fields: Optional[Iterable[str]] = None) -> Dict:
+        """Retrieve user by username (only `fields`, if given)"""
+        return self._find_one(self.db.users, {"user_id": username}, fields)
 
     def create_user(self, user_data: Dict) -> bool:
         """Create a new user"""
-        if self.db.users.find_one({"user_id": user_data["user_id"]}):
-            return False  # User already exists
-        self.db.users.insert_one(user_data)
-        return True
+        return self._insert_new(self.db.users, "user_id", user_data)
 
     def update_user(self, username: str, user_data: Dict) -> bool:
         """Update existing user data"""
@@ -26,17 +97,13 @@ class MongoAdapter:
         return result.modified_count > 0
 
     # === GREENHOUSES ===
-    def retrieve_greenhouse(self, greenhouse_id: str) -> Dict:
-        """Retrieve greenhouse data"""
-        greenhouse = self.db.greenhouses.find_one({"greenhouse_id": greenhouse_id})
-        return greenhouse if greenhouse else {}
+    def retrieve_greenhouse(self, greenhouse_id: str, fields: Optional[Iterable[str]] = None) -> Dict:
+        """Retrieve greenhouse data (only `fields`, if given)"""
+        return self._find_one(self.db.greenhouses, {"greenhouse_id": greenhouse_id}, fields)
 
     def create_greenhouse(self, greenhouse_data: Dict) -> bool:
         """Create a new greenhouse"""
-        if self.db.greenhouses.find_one({"greenhouse_id": greenhouse_data["greenhouse_id"]}):
-            return False  # Greenhouse already exists
-        self.db.greenhouses.insert_one(greenhouse_data)
-        return True
+        return self._insert_new(self.db.greenhouses, "greenhouse_id", greenhouse_data)
 
     def greenhouse_name_exists(self, name: str, tenant_id: str) -> bool:
         return self.db.greenhouses.count_documents(
@@ -61,17 +128,13 @@ class MongoAdapter:
         ) > 0
 
     # === DEVICES ===
-    def retrieve_device(self, device_id: str) -> Dict:
-        """Retrieve device details by device ID"""
-        device = self.db.devices.find_one({"device_id": device_id})
-        return device if device else {}
+    def retrieve_device(self, device_id: str, fields: Optional[Iterable[str]] = None) -> Dict:
+        """Retrieve device details by device ID (only `fields`, if given)"""
+        return self._find_one(self.db.devices, {"device_id": device_id}, fields)
 
     def create_device(self, device_data: Dict) -> bool:
         """Create a new device"""
-        if self.db.devices.find_one({"device_id": device_data["device_id"]}):
-            return False  # Device already exists
-        self.db.devices.insert_one(device_data)
-        return True
+        return self._insert_new(self.db.devices, "device_id", device_data)
 
     def update_device(self, device_id: str, device_data: Dict) -> bool:
         """Update device data"""
@@ -89,7 +152,7 @@ class MongoAdapter:
         ) > 0
 
     def is_device_associated(self, device_id: str) -> bool:
-        doc = self.db.devices.find_one({"device_id": device_id}, {"greenhouse_id": 1, "associated_greenhouse": 1})
+        doc = self._find_one(self.db.devices, {"device_id": device_id}, ("greenhouse_id", "associated_greenhouse"))
         if not doc:
             return False
         return bool(doc.get("greenhouse_id") or doc.get("associated_greenhouse"))
@@ -114,24 +177,27 @@ class MongoAdapter:
 
     def retrieve_devices_in_greenhouse(self, greenhouse_id: str) -> List[Dict]:
         """Retrieve all devices associated with a greenhouse"""
-        greenhouse = self.db.greenhouses.find_one({"greenhouse_id": greenhouse_id})
-        return greenhouse["devices"] if greenhouse else []
+        greenhouse = self._find_one(self.db.greenhouses, {"greenhouse_id": greenhouse_id}, ("devices",))
+        return greenhouse.get("devices", [])
 
     def verify_device_association(self, device_id: str, greenhouse_id: str) -> bool:
         """Verify if device is associated with a greenhouse"""
-        greenhouse = self.db.greenhouses.find_one({"greenhouse_id": greenhouse_id})
-        return device_id in greenhouse["devices"] if greenhouse else False
+        # `devices` holds ids: the server matches the element, only _id comes back
+        return self.db.greenhouses.find_one(
+            {"greenhouse_id": greenhouse_id, "devices": device_id},
+            {"_id": 1}
+        ) is not None
 
     # === GREENHOUSE CONFIG ===
     def retrieve_greenhouse_thresholds(self, greenhouse_id: str) -> Dict:
         """Return thresholds object for a greenhouse or {} if missing."""
-        greenhouse = self.retrieve_greenhouse(greenhouse_id)
-        return greenhouse.get("thresholds", {}) if greenhouse else {}
+        greenhouse = self.retrieve_greenhouse(greenhouse_id, ("thresholds",))
+        return greenhouse.get("thresholds", {})
 
     def retrieve_greenhouse_effects(self, greenhouse_id: str) -> List[Dict]:
         """Return list of actuator effects for a greenhouse."""
-        doc = self.db.greenhouse_effects.find_one({"greenhouse_id": greenhouse_id})
-        return doc.get("effects", []) if doc else []
+        doc = self._find_one(self.db.greenhouse_effects, {"greenhouse_id": greenhouse_id}, ("effects",))
+        return doc.get("effects", [])
 
     # === BINDINGS ===
     def bind_actuator_to_device(self, actuator_id: str, controller_id: str) -> bool:
@@ -145,7 +211,11 @@ class MongoAdapter:
     # === TELEMETRY ===
     def retrieve_telemetry(self, device_id: str, metric: str, time_range: str) -> Optional[List[Dict]]:
         """Retrieve telemetry points for a device/metric/range if stored in DB."""
-        doc = self.db.telemetry.find_one({"device_id": device_id})
+        # only the requested series, not every metric and range of the device
+        doc = self._find_one(
+            self.db.telemetry, {"device_id": device_id},
+            dict.fromkeys((f"metrics.{metric}.{time_range}", f"metrics.{metric.lower()}.{time_range}"))
+        )
         if not doc:
             return None
         metrics = doc.get("metrics", {})
@@ -0,0 +1,142 @@
+"""
+Benchmark: MongoAdapter hot queries before and after the index bootstrap and
+the projections.
+
+    python -m Adapters.mongo.bench_mongo_adapter [--devices 100000] [--uri mongodb://localhost:27017/]
+
+Without --uri the database is an in-process mongomock (pip install
+mongomock); with --uri a scratch database on that server is used and
+dropped at the end. The catalog has --devices devices, 10 per greenhouse,
+and telemetry (every metric and range, 60 points each) for the raspberry of
+the first --telemetry greenhouses.
+
+"before" runs the queries as the adapter did, fetching whole documents,
+with no index but _id; "after" calls the adapter after ensure_indexes().
+mongomock scans the collection whatever the indexes, so there the gain is
+what the projections save; against a mongod the indexes turn the scans
+into lookups.
+"""
+import argparse
+import time
+import uuid
+from unittest.mock import patch
+
+from Adapters.mongo import Mongo_DB_adapter
+from Adapters.mongo.Mongo_DB_adapter import MongoAdapter
+
+METRICS = ("temperature", "humidity", "light", "soil_humidity", "pH")
+RANGES = ("1h", "6h", "1d", "7d", "1m", "3m", "1y")
+
+
+def make_db(db, devices: int, telemetry: int) -> None:
+    greenhouses = max(1, devices // 10)
+    db.users.insert_many(
+        [{"user_id": f"user_{g}", "name": f"User {g}", "greenhouses": [f"gh_{g}"]} for g in range(greenhouses)]
+    )
+    db.greenhouses.insert_many([
+        {"greenhouse_id": f"gh_{g}", "tenant_id": f"user_{g}", "name": f"gh {g}",
+         "devices": [f"dev_{g * 10 + i}" for i in range(10)],
+         "thresholds": {m: {"lower": 1.0, "upper": 2.0, "deadband": 0.1} for m in METRICS}}
+        for g in range(greenhouses)
+    ])
+    db.devices.insert_many([
+        {"device_id": f"dev_{d}", "greenhouse_id": f"gh_{d // 10}", "name": f"dev {d}",
+         "device_type": "raspberry" if d % 10 == 0 else "actuator",
+         "role": "controller" if d % 10 == 0 else "heating_system", "status": "offline"}
+        for d in range(devices)
+    ])
+    points = [{"t": i, "v": 20.0 + i / 10} for i in range(60)]
+    db.telemetry.insert_many([
+        {"device_id": f"dev_{g * 10}", "metrics": {m: {r: points for r in RANGES} for m in METRICS}}
+        for g in range(min(telemetry, greenhouses))
+    ])
+
+
+# The queries as they were before the projections
+def before_association(db, device_id, greenhouse_id):
+    greenhouse = db.greenhouses.find_one({"greenhouse_id": greenhouse_id})
+    return device_id in greenhouse["devices"] if greenhouse else False
+
+
+def before_device_association(db, device_id):
+    device = db.devices.find_one({"device_id": device_id}) or {}
+    return device.get("greenhouse_id") or device.get("associated_greenhouse")
+
+
+def before_ownership(db, greenhouse_id):
+    greenhouse = db.greenhouses.find_one({"greenhouse_id": greenhouse_id}) or {}
+    return greenhouse.get("tenant_id")
+
+
+def before_telemetry(db, device_id, metric, time_range):
+    doc = db.telemetry.find_one({"device_id": device_id})
+    if not doc:
+        return None
+    return (doc.get("metrics", {}).get(metric) or {}).get(time_range)
+
+
+def bench(fn, args_list) -> float:
+    t0 = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - t0) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MongoAdapter query microbenchmark.")
+    parser.add_argument("--devices", type=int, default=100_000)
+    parser.add_argument("--telemetry", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--uri", default=None, help="mongod to use instead of mongomock")
+    args = parser.parse_args()
+
+    if args.uri is None:
+        import mongomock
+        with patch.object(Mongo_DB_adapter, "MongoClient", mongomock.MongoClient):
+            adapter = MongoAdapter("mongodb://localhost:27017/", "bench")
+    else:
+        adapter = MongoAdapter(args.uri, f"bench_{uuid.uuid4().hex[:8]}")
+    db = adapter.db
+
+    t0 = time.perf_counter()
+    make_db(db, args.devices, args.telemetry)
+    print(f"devices={args.devices} load {time.perf_counter() - t0:.1f}s "
+          f"({'mongomock' if args.uri is None else args.uri})")
+
+    n, g, t = args.devices, max(1, args.devices // 10), min(args.telemetry, max(1, args.devices // 10))
+    ids = [(f"dev_{(i * 7919) % n}",) for i in range(args.requests)]
+    pairs = [(f"dev_{(i * 7919) % n}", f"gh_{(i * 7919) % n // 10}") for i in range(args.requests)]
+    ghs = [(f"gh_{(i * 7919) % g}",) for i in range(args.requests)]
+    series = [(f"dev_{(i * 7919) % t * 10}", METRICS[i % len(METRICS)], RANGES[i % len(RANGES)])
+              for i in range(args.requests)]
+    ops = [
+        ("gh member", lambda d, h: before_association(db, d, h), adapter.verify_device_association, pairs),
+        ("dev assoc", lambda d: before_device_association(db, d),
+         lambda d: adapter.retrieve_device(d, ("greenhouse_id", "associated_greenhouse")).get("greenhouse_id"), ids),
+        ("gh owner", lambda h: before_ownership(db, h),
+         lambda h: adapter.retrieve_greenhouse(h, ("tenant_id",)).get("tenant_id"), ghs),
+        ("telemetry", lambda d, m, r: before_telemetry(db, d, m, r), adapter.retrieve_telemetry, series),
+    ]
+    try:
+        # same answers before timing
+        for _, old, new, items in ops:
+            for item in items[:20]:
+                assert old(*item) == new(*item), item
+
+        rows = [(op, bench(old, items)) for op, old, _, items in ops]
+        t0 = time.perf_counter()
+        indexes = adapter.ensure_indexes()
+        index_s = time.perf_counter() - t0
+        rows = [(op, before_us, bench(new, items)) for (op, before_us), (_, _, new, items) in zip(rows, ops)]
+
+        print(f"{len(indexes)} indexes built in {index_s:.2f}s; again: {len(adapter.ensure_indexes())} in place")
+        print(f"{'op':>10} {'before us':>11} {'after us':>11} {'speedup':>8}")
+        for op, before_us, after_us in rows:
+            print(f"{op:>10} {before_us:>11.1f} {after_us:>11.1f} {before_us / after_us:>7.1f}x")
+    finally:
+        if args.uri is not None:
+            adapter.client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    main()
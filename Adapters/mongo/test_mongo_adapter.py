@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from pymongo.errors import DuplicateKeyError, OperationFailure, ServerSelectionTimeoutError
+
+from Adapters.mongo.Mongo_DB_adapter import INDEXES, MongoAdapter
+
+
+class TestMongoAdapter(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('Adapters.mongo.Mongo_DB_adapter.MongoClient')
+        mock_mongo_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_db = MagicMock()
+        mock_mongo_client.return_value.__getitem__.return_value = self.mock_db
+        self.adapter = MongoAdapter(db_uri="mongodb://fake:27017/", db_name="test_db")
+
+    def test_ensure_indexes(self):
+        """
+        Every declared index is created; a conflicting one is skipped, an
+        unreachable server stops the step.
+        """
+        collection = self.mock_db.__getitem__.return_value
+        collection.create_index.side_effect = lambda keys, **options: "_".join(k for k, _ in keys)
+        names = self.adapter.ensure_indexes()
+        self.assertEqual(len(names), sum(len(indexes) for indexes in INDEXES.values()))
+        self.assertIn("devices.device_id", names)
+        collection.create_index.assert_any_call([("device_id", 1)], unique=True, sparse=True)
+
+        collection.create_index.reset_mock()
+        collection.create_index.side_effect = [OperationFailure("IndexOptionsConflict"), "greenhouse_id"] + ["x"] * 10
+        self.assertEqual(len(self.adapter.ensure_indexes()), len(names) - 1)
+
+        collection.create_index.reset_mock()
+        collection.create_index.side_effect = ServerSelectionTimeoutError("no server")
+        self.assertEqual(self.adapter.ensure_indexes(), [])
+        collection.create_index.assert_called_once()
+
+    def test_projections(self):
+        """
+        Lookups fetch only the fields they need.
+        """
+        self.mock_db.greenhouses.find_one.return_value = {"_id": 1}
+        self.assertTrue(self.adapter.verify_device_association("d1", "gh1"))
+        self.mock_db.greenhouses.find_one.assert_called_once_with(
+            {"greenhouse_id": "gh1", "devices": "d1"}, {"_id": 1})
+
+        self.mock_db.devices.find_one.return_value = {"_id": 1, "greenhouse_id": "gh1"}
+        device = self.adapter.retrieve_device("d1", ("greenhouse_id",))
+        self.mock_db.devices.find_one.assert_called_once_with({"device_id": "d1"}, {"greenhouse_id": 1})
+        self.assertEqual(device["greenhouse_id"], "gh1")
+
+        self.mock_db.telemetry.find_one.return_value = {"metrics": {"pH": {"1h": [7.0]}}}
+        self.assertEqual(self.adapter.retrieve_telemetry("d1", "pH", "1h"), [7.0])
+        self.mock_db.telemetry.find_one.assert_called_once_with(
+            {"device_id": "d1"}, {"metrics.pH.1h": 1, "metrics.ph.1h": 1})
+
+    def test_create_device_race(self):
+        """
+        A device created between the check and the insert is reported as existing.
+        """
+        self.mock_db.devices.count_documents.return_value = 0
+        self.mock_db.devices.insert_one.side_effect = DuplicateKeyError("dup")
+        self.assertFalse(self.adapter.create_device({"device_id": "d1"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import cryptography.fernet
 import datetime
 import json
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from os import path
 
@@ -53,3 +56,65 @@ class Token:
         expiration_time = now() + datetime.timedelta(weeks=4).total_seconds()
         token = Token(username, expiration_time)
         return token
+
+
+class TokenCache:
+    """
+    Bounded LRU of decrypted session tokens: token string -> (username,
+    expiration_time), so that a token is decrypted once and not on every
+    request. An entry past its expiration is dropped and the token
+    decrypted again (and found expired); tokens that fail to decrypt are
+    not cached.
+    """
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = int(os.getenv('CATALOG_TOKEN_CACHE_SIZE', 4096))
+        self.max_entries = int(max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, crypt_token):
+        """The Token for crypt_token, decrypting it only when not cached."""
+        with self._lock:
+            entry = self._entries.get(crypt_token)
+            if entry is not None:
+                if entry[1] >= now():
+                    self._entries.move_to_end(crypt_token)
+                    self.hits += 1
+                    return Token(*entry)
+                del self._entries[crypt_token]
+                self.expired += 1
+            self.misses += 1
+        token = Token.deserialize(crypt_token)
+        if self.max_entries > 0 and not token.is_expired():
+            with self._lock:
+                self._entries[crypt_token] = (token.username, token.expiration_time)
+                self._entries.move_to_end(crypt_token)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return token
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+            }
+
+
+token_cache = TokenCache()
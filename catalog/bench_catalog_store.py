@@ -0,0 +1,114 @@
+"""
+Benchmark: catalog request latency against the catalog size, per-request
+JSON file I/O versus the in-memory CatalogStore.
+
+    python -m catalog.bench_catalog_store [--devices 10 1000 10000 100000]
+
+For each size a catalog with that many devices (10 per greenhouse) is
+written to a temporary directory. "file" runs the read-modify-write the
+catalog_interface functions did on every request; "store" calls the
+catalog_interface functions on a write-behind CatalogStore over the same
+files. "flush" is the time the flusher takes to write devices.json once.
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from catalog import catalog_interface
+from catalog.catalog_store import CatalogStore
+
+
+def make_catalog(directory: Path, devices: int) -> dict:
+    greenhouses = max(1, devices // 10)
+    files = {name: directory / f"{name}.json" for name in ("users", "greenhouses", "devices", "strategies")}
+    docs = {
+        "users": {f"user_{g}": {"password": "pw", "greenhouses": [f"gh_{g}"]} for g in range(greenhouses)},
+        "greenhouses": {
+            f"gh_{g}": {"owner": f"user_{g}", "name": f"gh {g}", "devices": [f"dev_{g * 10 + i}" for i in range(10)]}
+            for g in range(greenhouses)
+        },
+        "devices": {
+            f"dev_{d}": {"owner": f"user_{d // 10}", "greenhouse_id": f"gh_{d // 10}", "name": f"dev {d}",
+                         "device_type": "actuator", "role": "heating_system" if d % 10 else "ventilation_system"}
+            for d in range(devices)
+        },
+        "strategies": {f"gh_{g}": {"crop": "tomato", "targets": {}, "controls": {}} for g in range(greenhouses)},
+    }
+    for name, doc in docs.items():
+        with open(files[name], "w") as f:
+            json.dump(doc, f)
+    return files
+
+
+def file_update_device_status(devices_file: Path, device_id: str, new_status: str) -> bool:
+    with open(devices_file, "r") as f:
+        devices = json.load(f)
+    if device_id not in devices:
+        return False
+    devices[device_id]["status"] = new_status
+    with open(devices_file, "w") as f:
+        json.dump(devices, f, indent=2)
+    return True
+
+
+def file_device_status(devices_file: Path, device_id: str):
+    with open(devices_file, "r") as f:
+        devices = json.load(f)
+    return devices[device_id].get("status", "unknown")
+
+
+def file_roles(devices_file: Path, greenhouse_id: str) -> set:
+    with open(devices_file, "r") as f:
+        devices = json.load(f)
+    return {d["role"] for d in devices.values() if d.get("greenhouse_id") == greenhouse_id and d.get("role")}
+
+
+def bench(fn, args_list) -> float:
+    t0 = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - t0) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog store latency microbenchmark.")
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 1000, 10_000, 100_000])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'devices':>8} {'op':>12} {'file us':>10} {'store us':>10} {'flush ms':>9}")
+    for n in args.devices:
+        with tempfile.TemporaryDirectory() as tmp:
+            files = make_catalog(Path(tmp), n)
+            ids = [(f"dev_{(i * 7919) % n}",) for i in range(args.requests)]
+            ghs = [(f"gh_{(i * 7919) % max(1, n // 10)}",) for i in range(args.requests)]
+            # The file path rewrites the whole catalog per request: fewer requests at large sizes
+            few = max(5, min(args.requests, 2_000_000 // max(1, n)))
+
+            store = CatalogStore(**files, flush_interval_s=3600)
+            with patch.object(catalog_interface, "get_store", return_value=store):
+                # same answer before timing
+                assert catalog_interface._available_roles_in_greenhouse(ghs[0][0]) == file_roles(files["devices"], ghs[0][0])
+                rows = [
+                    ("status put", bench(lambda d: file_update_device_status(files["devices"], d, "on"), ids[:few]),
+                     bench(lambda d: catalog_interface.update_device_status(d, "on"), ids)),
+                    ("status get", bench(lambda d: file_device_status(files["devices"], d), ids[:few]),
+                     bench(catalog_interface.retrieve_device_status, ids)),
+                    ("gh roles", bench(lambda g: file_roles(files["devices"], g), ghs[:few]),
+                     bench(catalog_interface._available_roles_in_greenhouse, ghs)),
+                ]
+            store.close()
+            t0 = time.perf_counter()
+            with patch.object(catalog_interface, "get_store", return_value=store):
+                catalog_interface.update_device_status(ids[0][0], "off")
+            store.flush()
+            flush_ms = (time.perf_counter() - t0) * 1e3
+            for op, file_us, store_us in rows:
+                print(f"{n:>8} {op:>12} {file_us:>10.1f} {store_us:>10.2f} {flush_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: routing cost per catalog request, for every endpoint.
+
+    python -m catalog.bench_dispatch [--requests 200000]
+
+Times CatalogGet/Post/PutDispatcher.dispatch on a request to each endpoint
+(plus a path that matches none) with the query the endpoint requires, in
+nanoseconds per call. The routing results are checked against ENDPOINTS
+before timing.
+"""
+import argparse
+import time
+
+from catalog.catalog_dispatcher import (CatalogGetDispatcher, CatalogPostDispatcher, CatalogPutDispatcher,
+                                        CatalogGetRequest, CatalogPostRequest, CatalogPutRequest)
+
+DISPATCHERS = {'GET': CatalogGetDispatcher, 'POST': CatalogPostDispatcher, 'PUT': CatalogPutDispatcher}
+
+# (method, path, query, expected request)
+ENDPOINTS = [
+    ('GET', ('broker',), {}, CatalogGetRequest.RETRIEVE_BROKER),
+    ('GET', ('generate_id',), {}, CatalogGetRequest.GENERATE_ID),
+    ('GET', ('device_join',), {'device_id': 'd1'}, CatalogGetRequest.DEVICE_JOIN),
+    ('GET', ('retrieve', 'greenhouses'), {'token': 't'}, CatalogGetRequest.RETRIEVE_GREENHOUSES),
+    ('GET', ('retrieve', 'devices'), {'greenhouse_id': 'gh1'}, CatalogGetRequest.RETRIEVE_DEVICES),
+    ('GET', ('device', 'status'), {'device_id': 'd1'}, CatalogGetRequest.GET_DEVICE_STATUS),
+    ('GET', ('crops',), {}, CatalogGetRequest.GET_CROPS),
+    ('GET', ('devices',), {'greenhouse_id': 'gh1'}, CatalogGetRequest.GET_DEVICES),
+    ('GET', ('services', 'overview'), {}, CatalogGetRequest.SERVICE_OVERVIEW),
+    ('GET', ('services', 'gh'), {'greenhouse_id': 'gh1'}, CatalogGetRequest.SERVICE_GH_DETAIL),
+    ('GET', ('register', 'greenhouse'), {'greenhouse_id': 'gh1'}, CatalogGetRequest.REGISTER_NEW_GREENHOUSE),
+    ('GET', ('register', 'device'), {'device_id': 'd1', 'device_type': 'sensor'}, CatalogGetRequest.REGISTER_NEW_DEVICE),
+    ('GET', ('devices', 'd1', 'config'), {}, CatalogGetRequest.DEVICE_CONFIG),
+    ('GET', ('greenhouses', 'gh1', 'thresholds'), {}, CatalogGetRequest.GREENHOUSE_THRESHOLDS),
+    ('GET', ('greenhouses', 'gh1', 'effects'), {}, CatalogGetRequest.GREENHOUSE_EFFECTS),
+    ('GET', ('user',), {}, CatalogGetRequest.USER_INFO),
+    ('GET', ('devices', 'd1', 'actuator-info'), {}, CatalogGetRequest.ACTUATOR_INFO),
+    ('GET', ('measures',), {'device_id': 'd1', 'metric': 'temperature', 'range': '1d'}, CatalogGetRequest.MEASURES),
+    ('GET', ('no', 'such', 'endpoint'), {}, CatalogGetRequest.NOT_FOUND),
+    ('POST', ('register', 'greenhouse'), {'greenhouse_id': 'gh1'}, CatalogPostRequest.REGISTER_NEW_GREENHOUSE),
+    ('POST', ('register', 'device'), {'device_id': 'd1', 'device_type': 'sensor'}, CatalogPostRequest.REGISTER_NEW_DEVICE),
+    ('POST', ('signup',), {}, CatalogPostRequest.SIGN_UP),
+    ('POST', ('login',), {}, CatalogPostRequest.LOGIN),
+    ('POST', ('greenhouse', 'crop'), {'greenhouse_id': 'gh1', 'crop': 'tomato', 'token': 't'}, CatalogPostRequest.SET_CROP),
+    ('POST', ('greenhouses',), {'name': 'serra'}, CatalogPostRequest.CREATE_GREENHOUSE),
+    ('PUT', ('associate', 'device'), {'device_id': 'd1', 'greenhouse_id': 'gh1', 'device_name': 'n'},
+     CatalogPutRequest.ASSOCIATE_DEVICE),
+    ('PUT', ('associate', 'greenhouse'), {'greenhouse_id': 'gh1', 'greenhouse_name': 'n'},
+     CatalogPutRequest.ASSOCIATE_GREENHOUSE),
+    ('PUT', ('device', 'status'), {'device_id': 'd1', 'status': 'on', 'token': 't'}, CatalogPutRequest.UPDATE_DEVICE_STATUS),
+    ('PUT', ('strategy',), {'greenhouse_id': 'gh1', 'update': '{}'}, CatalogPutRequest.UPDATE_STRATEGY),
+    ('PUT', ('actuators', 'a1', 'bind'), {'raspberry_id': 'rb1'}, CatalogPutRequest.ACTUATOR_BIND),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog routing microbenchmark.")
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for method, path, query, expected in ENDPOINTS:
+        got = DISPATCHERS[method].dispatch(path=path, query=dict(query))
+        assert got == expected, (method, path, got, expected)
+
+    print(f"requests={args.requests} per endpoint")
+    print(f"{'method':>6} {'path':<36} {'ns':>8}")
+    total = 0.0
+    for method, path, query, _ in ENDPOINTS:
+        dispatch = DISPATCHERS[method].dispatch
+        queries = [dict(query) for _ in range(args.requests)]
+        t0 = time.perf_counter()
+        for q in queries:
+            dispatch(path=path, query=q)
+        ns = (time.perf_counter() - t0) / args.requests * 1e9
+        total += ns
+        print(f"{method:>6} {'/'.join(path):<36} {ns:>8.0f}")
+    print(f"{'mean':>6} {'':<36} {total / len(ENDPOINTS):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import Dict, Iterable, List, Optional, Tuple
 
 
 
@@ -23,6 +24,8 @@ class CatalogGetRequest(Enum):
     USER_INFO = auto(),
     ACTUATOR_INFO = auto(),
     MEASURES = auto(),
+    TOPOLOGY_DEVICE = auto(),
+    TOPOLOGY_ZONES = auto(),
 
 
 class CatalogPostRequest(Enum):
@@ -49,438 +52,158 @@ class CatalogDeleteRequest(Enum):
     NOT_FOUND = auto(),
 
 
-class CatalogGetDispatcher:
-    @staticmethod
-    def dispatch(path, query):
-        if CatalogGetDispatcher._is_broker_request(path):
-            return CatalogGetRequest.RETRIEVE_BROKER
-        if CatalogGetDispatcher._is_generate_id_request(path, query):
-            return CatalogGetRequest.GENERATE_ID
-        if CatalogGetDispatcher._is_device_join_request(path, query):
-            return CatalogGetRequest.DEVICE_JOIN
-        if CatalogGetDispatcher._is_retrieve_greenhouses_request(path, query):
-            return CatalogGetRequest.RETRIEVE_GREENHOUSES
-        if CatalogGetDispatcher._is_retrieve_devices_request(path, query):
-            return CatalogGetRequest.RETRIEVE_DEVICES
-        if CatalogGetDispatcher._is_device_status_request(path, query):
-            return CatalogGetRequest.GET_DEVICE_STATUS
-        if CatalogGetDispatcher._is_get_crops_request(path, query):
-            return CatalogGetRequest.GET_CROPS
-        if CatalogGetDispatcher._is_get_devices_request(path, query):
-            return CatalogGetRequest.GET_DEVICES
-        if len(path) == 2 and path[0] == 'services' and path[1] == 'overview':
-            return CatalogGetRequest.SERVICE_OVERVIEW
-        if len(path) == 2 and path[0] == 'services' and path[1] == 'gh':
-            return CatalogGetRequest.SERVICE_GH_DETAIL
-        if CatalogGetDispatcher._is_register_new_greenhouse_request(path, query):
-            return CatalogGetRequest.REGISTER_NEW_GREENHOUSE
-        if CatalogGetDispatcher._is_register_new_device_request(path, query):
-            return CatalogGetRequest.REGISTER_NEW_DEVICE
-        if CatalogGetDispatcher._is_device_config_request(path, query):
-            return CatalogGetRequest.DEVICE_CONFIG
-        if CatalogGetDispatcher._is_greenhouse_thresholds_request(path, query):
-            return CatalogGetRequest.GREENHOUSE_THRESHOLDS
-        if CatalogGetDispatcher._is_greenhouse_effects_request(path, query):
-            return CatalogGetRequest.GREENHOUSE_EFFECTS
-        if CatalogGetDispatcher._is_user_info_request(path):
-            return CatalogGetRequest.USER_INFO
-        if CatalogGetDispatcher._is_actuator_info_request(path, query):
-            return CatalogGetRequest.ACTUATOR_INFO
-        if CatalogGetDispatcher._is_measures_request(path, query):
-            return CatalogGetRequest.MEASURES
-        return CatalogGetRequest.NOT_FOUND
-
-    @staticmethod
-    def _is_get_devices_request(path, query):
-        #tolto 'token' dai campi obbligatori
-        return len(path) == 1 and path[0] == 'devices' and {'greenhouse_id'}.issubset(query)
-
-    @staticmethod
-    def _is_get_crops_request(path, query):
-        """
-        path: crops
-        query: (optional) token for authenticated UI
-        """
-        return len(path) == 1 and path[0] == 'crops'
-
-    @staticmethod
-    def _is_set_crop_request(path, query):
-        if len(path) != 2 or path[0] != 'greenhouse' or path[1] != 'crop':
-          return False
-        return {'greenhouse_id', 'crop'}.issubset(query)
-
-
-    @staticmethod
-    def _is_device_status_request(path, query):
-        """
-        Retrieve current status of a device.
-        path: device/status
-        query: device_id
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'device' or path[1] != 'status':
-            return False
-        if 'device_id' not in query:
-            return False
-        return True
-
-    @staticmethod
-    def _is_broker_request(path):
-        """
-        Called to retrieve ip and port of the broker.
-        path: broker
-        query: -
-        auth: -
-        """
-        if len(path) != 1:
-            return False
-        if path[0] != 'broker':
-            return False
-        return True
-
-    @staticmethod
-    def _is_generate_id_request(path, query):
-        """
-        Called by the organization to generate a new unique id to be
-        assigned to a device or a greenhouse that will be distributed.
-        path: generate_id
-        query: -
-        auth: admin token
-        """
-        if len(path) != 1:
-            return False
-        if path[0] != 'generate_id':
-            return False
-        return True
-
-    @staticmethod
-    def _is_device_join_request(path, query):
-        """
-        Called by a device (Raspberry, actuator, etc...) to join
-        the catalog and obtain its resource catalog (i.e. id of the
-        greenhouse it is associated with). When called before the user
-        has successfully registered the device, it does not return
-        anything useful.
-        path: device_join
-        query: device_id
-        auth: -
-        """
-        if len(path) != 1:
-            return False
-        if path[0] != 'device_join':
-            return False
-        if not 'device_id' in query:
-            return False
-        return True
-
-    @staticmethod
-    def _is_retrieve_greenhouses_request(path, query):
-        """
-        Called by a user that wants to retrieve its set of greenhouses.
-        path: retrieve/greenhouses
-        query: -
-        auth: token
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'retrieve':
-            return False
-        if path[1] != 'greenhouses':
-            return False
-        return True
-
-    @staticmethod
-    def _is_retrieve_devices_request(path, query):
-        """
-        Called by a user that wants to retrieve the devices associated
-        with a greenhouse.
-        path: retrieve/devices
-        query: greenhouse_id
-        auth: token
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'retrieve':
-            return False
-        if path[1] != 'devices':
-            return False
-        if 'greenhouse_id' not in query:
-            return False
-        return True
-
-    @staticmethod
-    def _is_register_new_greenhouse_request(path, query):
-        """
-        Admin endpoint to register a greenhouse id before shipping
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'register' or path[1] != 'greenhouse':
-            return False
-        return 'greenhouse_id' in query
-
-    @staticmethod
-    def _is_register_new_device_request(path, query):
-        """
-        Admin endpoint to register a device id before shipping
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'register' or path[1] != 'device':
-            return False
-        return {'device_id', 'device_type'}.issubset(query)
-
-    @staticmethod
-    def _is_device_config_request(path, query):
-        if len(path) != 3:
-            return False
-        if path[0] != 'devices' or path[2] != 'config':
-            return False
-        query.setdefault('device_id', path[1])
-        return True
-
-    @staticmethod
-    def _is_greenhouse_thresholds_request(path, query):
-        if len(path) != 3:
-            return False
-        if path[0] != 'greenhouses' or path[2] != 'thresholds':
-            return False
-        query.setdefault('greenhouse_id', path[1])
-        return True
+class Route:
+    """
+    One endpoint: a path pattern such as 'devices/{device_id}/config', the
+    request it dispatches to and the query keys it requires. A {name}
+    segment matches any value, which is copied into the query under `name`
+    unless the query already has that key.
+    """
+
+    def __init__(self, pattern: str, request: Enum, required: Iterable[str] = ()):
+        self.pattern = pattern
+        self.request = request
+        self.required = frozenset(required)
+        segments = tuple(pattern.split('/')) if pattern else ()
+        self.params = tuple((i, seg[1:-1]) for i, seg in enumerate(segments)
+                            if seg.startswith('{') and seg.endswith('}'))
+        placeholders = {i for i, _ in self.params}
+        self.key = tuple(None if i in placeholders else seg for i, seg in enumerate(segments))
+
+
+class RouteTable:
+    """
+    Routes compiled into dicts keyed by path shape: literal routes by their
+    path, the others by their segments with None where the pattern has a
+    placeholder. A path costs one lookup, plus one per placeholder layout
+    of its length when no literal route matches, so the cost of a dispatch
+    does not grow with the number of routes.
+    """
+
+    def __init__(self, routes: Iterable[Route], not_found: Enum):
+        self.not_found = not_found
+        self._literal: Dict[Tuple[str, ...], Route] = {}
+        self._patterns: Dict[Tuple[Optional[str], ...], Route] = {}
+        self._layouts: Dict[int, List[Tuple[int, ...]]] = {}
+        for route in routes:
+            if route.key in self._literal or route.key in self._patterns:
+                raise ValueError(f"Unsupported duplicate route '{route.pattern}'")
+            if not route.params:
+                self._literal[route.key] = route
+                continue
+            self._patterns[route.key] = route
+            layouts = self._layouts.setdefault(len(route.key), [])
+            layout = tuple(i for i, _ in route.params)
+            if layout not in layouts:
+                layouts.append(layout)
+                layouts.sort(key=len)
+
+    def match(self, path) -> Optional[Route]:
+        path = tuple(path)
+        route = self._literal.get(path)
+        if route is not None:
+            return route
+        for layout in self._layouts.get(len(path), ()):
+            key = list(path)
+            for i in layout:
+                key[i] = None
+            route = self._patterns.get(tuple(key))
+            if route is not None:
+                return route
+        return None
+
+    def dispatch(self, path, query) -> Enum:
+        route = self.match(path)
+        if route is None:
+            return self.not_found
+        for i, name in route.params:
+            query.setdefault(name, path[i])
+        if not route.required.issubset(query):
+            return self.not_found
+        return route.request
+
+
+GET_ROUTES = RouteTable([
+    # ip and port of the broker. auth: -
+    Route('broker', CatalogGetRequest.RETRIEVE_BROKER),
+    # New unique id for a device or greenhouse to be distributed. auth: admin token
+    Route('generate_id', CatalogGetRequest.GENERATE_ID),
+    # Called by a device (Raspberry, actuator, etc...) to join the catalog and
+    # obtain its resource catalog (i.e. id of the greenhouse it is associated
+    # with). Before the user has registered the device it returns nothing
+    # useful. auth: -
+    Route('device_join', CatalogGetRequest.DEVICE_JOIN, {'device_id'}),
+    # Greenhouses of the user. auth: token
+    Route('retrieve/greenhouses', CatalogGetRequest.RETRIEVE_GREENHOUSES),
+    # Devices associated with a greenhouse. auth: token
+    Route('retrieve/devices', CatalogGetRequest.RETRIEVE_DEVICES, {'greenhouse_id'}),
+    # Current status of a device
+    Route('device/status', CatalogGetRequest.GET_DEVICE_STATUS, {'device_id'}),
+    # Crop presets. auth: (optional) token for authenticated UI
+    Route('crops', CatalogGetRequest.GET_CROPS),
+    Route('devices', CatalogGetRequest.GET_DEVICES, {'greenhouse_id'}),
+    Route('services/overview', CatalogGetRequest.SERVICE_OVERVIEW),
+    Route('services/gh', CatalogGetRequest.SERVICE_GH_DETAIL),
+    # Admin endpoints to register an id before shipping
+    Route('register/greenhouse', CatalogGetRequest.REGISTER_NEW_GREENHOUSE, {'greenhouse_id'}),
+    Route('register/device', CatalogGetRequest.REGISTER_NEW_DEVICE, {'device_id', 'device_type'}),
+    Route('devices/{device_id}/config', CatalogGetRequest.DEVICE_CONFIG),
+    Route('greenhouses/{greenhouse_id}/thresholds', CatalogGetRequest.GREENHOUSE_THRESHOLDS),
+    Route('greenhouses/{greenhouse_id}/effects', CatalogGetRequest.GREENHOUSE_EFFECTS),
+    Route('user', CatalogGetRequest.USER_INFO),
+    Route('devices/{device_id}/actuator-info', CatalogGetRequest.ACTUATOR_INFO),
+    Route('measures', CatalogGetRequest.MEASURES, {'device_id', 'metric', 'range'}),
+    # Topology view lookups: context of one device, zones of the user with
+    # their raspberries and measurements. auth: token
+    Route('topology/devices/{device_id}', CatalogGetRequest.TOPOLOGY_DEVICE),
+    Route('topology/zones', CatalogGetRequest.TOPOLOGY_ZONES),
+], CatalogGetRequest.NOT_FOUND)
+
+POST_ROUTES = RouteTable([
+    # Called by the organization to register an id associated to a greenhouse
+    # or a device that will be distributed, supposed ready to be delivered.
+    # auth: admin token
+    Route('register/greenhouse', CatalogPostRequest.REGISTER_NEW_GREENHOUSE, {'greenhouse_id'}),
+    Route('register/device', CatalogPostRequest.REGISTER_NEW_DEVICE, {'device_id', 'device_type'}),
+    # Registration of a new user. body: username, password. auth: -
+    Route('signup', CatalogPostRequest.SIGN_UP),
+    # Opens a new session (and so a new token). body: username, password. auth: -
+    Route('login', CatalogPostRequest.LOGIN),
+    Route('greenhouse/crop', CatalogPostRequest.SET_CROP, {'greenhouse_id', 'crop', 'token'}),
+    # Creates a greenhouse with a name. query/body: name. auth: token
+    Route('greenhouses', CatalogPostRequest.CREATE_GREENHOUSE),
+], CatalogPostRequest.NOT_FOUND)
+
+PUT_ROUTES = RouteTable([
+    # Associates a new device to a greenhouse of the user. auth: token
+    Route('associate/device', CatalogPutRequest.ASSOCIATE_DEVICE, {'device_id', 'greenhouse_id', 'device_name'}),
+    # Adds a new greenhouse to the user. auth: token
+    Route('associate/greenhouse', CatalogPutRequest.ASSOCIATE_GREENHOUSE, {'greenhouse_id', 'greenhouse_name'}),
+    # Current operational status of a device
+    Route('device/status', CatalogPutRequest.UPDATE_DEVICE_STATUS, {'device_id', 'status', 'token'}),
+    # 'update' è una stringa JSON con i campi da modificare
+    # (es: {"targets":{"temperature":{"min":21,"max":27}}})
+    Route('strategy', CatalogPutRequest.UPDATE_STRATEGY, {'greenhouse_id', 'update'}),
+    Route('actuators/{actuator_id}/bind', CatalogPutRequest.ACTUATOR_BIND, {'raspberry_id'}),
+], CatalogPutRequest.NOT_FOUND)
 
-    @staticmethod
-    def _is_greenhouse_effects_request(path, query):
-        if len(path) != 3:
-            return False
-        if path[0] != 'greenhouses' or path[2] != 'effects':
-            return False
-        query.setdefault('greenhouse_id', path[1])
-        return True
-
-    @staticmethod
-    def _is_user_info_request(path):
-        return len(path) == 1 and path[0] == 'user'
-
-    @staticmethod
-    def _is_actuator_info_request(path, query):
-        if len(path) != 3:
-            return False
-        if path[0] != 'devices' or path[2] != 'actuator-info':
-            return False
-        query.setdefault('device_id', path[1])
-        return True
 
+class CatalogGetDispatcher:
     @staticmethod
-    def _is_measures_request(path, query):
-        if len(path) != 1 or path[0] != 'measures':
-            return False
-        required = {'device_id', 'metric', 'range'}
-        return required.issubset(query.keys())
+    def dispatch(path, query):
+        return GET_ROUTES.dispatch(path, query)
 
 
 class CatalogPostDispatcher:
     @staticmethod
     def dispatch(path, query):
-        if CatalogPostDispatcher._is_register_new_greenhouse_request(path, query):
-            return CatalogPostRequest.REGISTER_NEW_GREENHOUSE
-        if CatalogPostDispatcher._is_register_new_device_request(path, query):
-            return CatalogPostRequest.REGISTER_NEW_DEVICE
-        if CatalogPostDispatcher._is_sign_up_request(path, query):
-            return CatalogPostRequest.SIGN_UP
-        if CatalogPostDispatcher._is_login_request(path, query):
-            return CatalogPostRequest.LOGIN
-        if CatalogPostDispatcher._is_set_crop_request(path, query):    # <-- NEW
-            return CatalogPostRequest.SET_CROP
-        if CatalogPostDispatcher._is_create_greenhouse_request(path, query):
-            return CatalogPostRequest.CREATE_GREENHOUSE
-        return CatalogPostRequest.NOT_FOUND
-
-
-    @staticmethod
-    def _is_set_crop_request(path, query):
-        """
-        path: greenhouse/crop
-        query: greenhouse_id, crop, token
-        """
-        if len(path) != 2 or path[0] != 'greenhouse' or path[1] != 'crop':
-            return False
-        return {'greenhouse_id','crop','token'}.issubset(query)
-
-    @staticmethod
-    def _is_register_new_greenhouse_request(path, query):
-        """
-        Called by the organization to register an id associated to
-        a greenhouse that will be distributed. It is supposed that the
-        greenhouse is ready to be delivered.
-        path: register/greenhouse
-        query: greenhouse_id
-        auth: admin token
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'register':
-            return False
-        if path[1] != 'greenhouse':
-            return False
-        if 'greenhouse_id' not in query:
-            return False
-        return True
-
-    @staticmethod
-    def _is_register_new_device_request(path, query):
-        """
-        Called by the organization to register an id associated to
-        a device that will be distributed. It is supposed that the
-        device is ready to be delivered.
-        path: register/device
-        query: device_id, device_type
-        auth: admin token
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'register':
-            return False
-        if path[1] != 'device':
-            return False
-        if not {'device_id', 'device_type'}.issubset(query):
-            return False
-        return True
-
-    @staticmethod
-    def _is_sign_up_request(path, query):
-        """
-        Called by a user that wants to be registered on the system.
-        path: signup
-        query: -
-        body: username, password
-        auth: -
-        """
-        if len(path) != 1:
-            return False
-        if path[0] != 'signup':
-            return False
-        return True
-
-    @staticmethod
-    def _is_login_request(path, query):
-        """
-        Called by a user that wants to log into the system opening a new
-        session. A new session (and so a new token) is initialized and
-        its set of greenhouses will be given to the user.
-        path: login
-        query: username, password
-        auth: -
-        """
-        if len(path) != 1:
-            return False
-        if path[0] != 'login':
-            return False
-        return True
-
-    @staticmethod
-    def _is_create_greenhouse_request(path, query):
-        """
-        User endpoint to create a greenhouse with a name.
-        path: greenhouses
-        query/body: name
-        auth: token
-        """
-        return len(path) == 1 and path[0] == 'greenhouses'
+        return POST_ROUTES.dispatch(path, query)
 
 
 class CatalogPutDispatcher:
     @staticmethod
     def dispatch(path, query):
-        if CatalogPutDispatcher._is_associate_device_request(path, query):
-            return CatalogPutRequest.ASSOCIATE_DEVICE
-        if CatalogPutDispatcher._is_associate_greenhouse_request(path, query):
-            return CatalogPutRequest.ASSOCIATE_GREENHOUSE
-        if CatalogPutDispatcher._is_update_device_status_request(path, query):
-            return CatalogPutRequest.UPDATE_DEVICE_STATUS
-        if CatalogPutDispatcher._is_update_strategy_request(path, query):  # <-- NEW
-            return CatalogPutRequest.UPDATE_STRATEGY
-        if CatalogPutDispatcher._is_actuator_bind_request(path, query):
-            return CatalogPutRequest.ACTUATOR_BIND
-        return CatalogPutRequest.NOT_FOUND
-
-    @staticmethod
-    def _is_update_device_status_request(path, query):
-        """
-        Update current operational status of a device.
-        path: device/status
-        query: device_id, status, token
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'device' or path[1] != 'status':
-            return False
-        if not {'device_id', 'status', 'token'}.issubset(query):
-            return False
-        return True
-
-    @staticmethod
-    def _is_update_strategy_request(path, query):
-        """
-        path: strategy
-        query: greenhouse_id, update, token
-        dove 'update' è una stringa JSON con i campi da modificare
-        (es: {"targets":{"temperature":{"min":21,"max":27}}})
-        """
-        if len(path) != 1 or path[0] != 'strategy':
-            return False
-        #tolto 'token' dai campi obbligatori
-        return {'greenhouse_id','update'}.issubset(query)
-
-    @staticmethod
-    def _is_associate_greenhouse_request(path, query):
-        """
-        Called by a user that wants to add a new greenhouse.
-        path: associate/greenhouse
-        query: greenhouse_id, greenhouse_name
-        auth: token
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'associate':
-            return False
-        if path[1] != 'greenhouse':
-            return False
-        if not {'greenhouse_id', 'greenhouse_name'}.issubset(query):
-            return False
-        return True
-
-    @staticmethod
-    def _is_associate_device_request(path, query):
-        """
-        Called by a user that wants to associate a new device to its
-        greenhouse.
-        path: associate/device
-        query: device_id, device_name, greenhouse_id
-        auth: token
-        """
-        if len(path) != 2:
-            return False
-        if path[0] != 'associate':
-            return False
-        if path[1] != 'device':
-            return False
-        if not {'device_id', 'greenhouse_id', 'device_name'}.issubset(query):
-            return False
-        return True
-
-    @staticmethod
-    def _is_actuator_bind_request(path, query):
-        """
-        path: actuators/{id}/bind
-        query: raspberry_id
-        """
-        if len(path) != 3:
-            return False
-        if path[0] != 'actuators' or path[2] != 'bind':
-            return False
-        query.setdefault('actuator_id', path[1])
-        return 'raspberry_id' in query
+        return PUT_ROUTES.dispatch(path, query)
 
 
 class CatalogDeleteDispatcher:
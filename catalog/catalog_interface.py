@@ -1,3 +1,4 @@
+import copy
 import json
 from os import path
 from pathlib import Path
@@ -6,30 +7,21 @@ from Adapters.mongo.Mongo_DB_adapter import MongoAdapter
 import os
 import requests
 
-from .auth_token import Token
+from .auth_token import Token, token_cache
+from .catalog_store import DEVICES_FILE, GREENHOUSES_FILE, STRATEGIES_FILE, USERS_FILE, get_store
+from .catalog_topology import get_topology
 
 P = Path(__file__).parent.absolute()
 CONFIG_FILE = P / 'config.json'
-USERS_FILE = P / 'users.json'
 SERVICES_FILE = P / 'services.json'
-GREENHOUSES_FILE = P / 'generator' / 'greenhouses.json'
-DEVICES_FILE = P / 'generator' / 'devices.json'
-DEVICES_LEGEND_FILE = P / 'devices_legend.json'
 ROOT_DIR = P.parent
-STRATEGIES_FILE = ROOT_DIR / 'Control_Strategies' / 'strategies.json'
 CROP_PROFILES_FILE = ROOT_DIR / 'Control_Strategies' / 'crop_profiles.json'
 MONGO_ADAPTER_URL = os.getenv("MONGO_ADAPTER_URL", "http://127.0.0.1:8082")
 MONGO_URI = os.getenv("CATALOG_MONGO_URI", os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
 MONGO_DB = os.getenv("CATALOG_MONGO_DB", os.getenv("MONGO_DB", "greenbox"))
 mongo_adapter = MongoAdapter(MONGO_URI, MONGO_DB)
-
-
-def _load_json_catalog(catalog_path: Path) -> dict:
-    try:
-        with open(catalog_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+# Device fields read to tell whether (and where) a device is associated
+ASSOCIATION_FIELDS = ('greenhouse_id', 'associated_greenhouse')
 
 
 def init():
@@ -57,16 +49,15 @@ def signup_user(username, password):
     """
     Used to register a new user into the system.
     """
-    with open(USERS_FILE, 'r') as f:
-        users = json.load(f)
-    if username in users:
-        return False
-    users[username] = {
-        'password': password,
-        'greenhouses': []
-    }
-    with open(USERS_FILE, 'w') as f:
-        f.write(json.dumps(users))
+    store = get_store()
+    with store.users.lock(username):
+        if username in store.users:
+            return False
+        store.users.put(username, {
+            'password': password,
+            'greenhouses': []
+        })
+    store.changed()
     return True
 
 
@@ -75,11 +66,10 @@ def validate_login(username, password):
     Used to validate login credentials and give a session token to the
     user.
     """
-    with open(USERS_FILE, 'r') as f:
-        users = json.load(f)
-    if username not in users:
+    user = get_store().users.get(username)
+    if user is None:
         return None
-    if not users[username]['password'] == password:
+    if not user['password'] == password:
         return None
     token = Token.generate(username)
     return Token.serialize(token)
@@ -89,9 +79,7 @@ def verify_token(token_http):
     """
     Used to verify the validity of a specific session token.
     """
-    if token_http is None:
-        return False
-    return not Token.deserialize(token_http).is_expired()
+    return retrieve_valid_username(token_http) is not None
 
 
 def retrieve_username_by_token(token_http):
@@ -100,25 +88,40 @@ def retrieve_username_by_token(token_http):
     """
     if token_http is None:
         return None
-    token = Token.deserialize(token_http)
+    token = token_cache.get(token_http)
+    return token.username
+
+
+def retrieve_valid_username(token_http):
+    """
+    Used to retrieve the username of a session token, None if the token
+    is missing or expired.
+    """
+    if token_http is None:
+        return None
+    token = token_cache.get(token_http)
+    if token.is_expired():
+        return None
     return token.username
 
 
+def token_cache_stats():
+    return token_cache.stats()
+
+
 # Existence
 def verify_device_existence(device_id: str) -> bool:
-    device = mongo_adapter.retrieve_device(device_id)
+    device = mongo_adapter.retrieve_device(device_id, fields=('device_id',))
     if device:
         return True
-    devices = _load_json_catalog(DEVICES_FILE)
-    return device_id in devices
+    return device_id in get_store().devices
 
 
 def verify_greenhouse_existence(greenhouse_id: str) -> bool:
-    greenhouse = mongo_adapter.retrieve_greenhouse(greenhouse_id)
+    greenhouse = mongo_adapter.retrieve_greenhouse(greenhouse_id, fields=('greenhouse_id',))
     if greenhouse:
         return True
-    greenhouses = _load_json_catalog(GREENHOUSES_FILE)
-    return greenhouse_id in greenhouses
+    return greenhouse_id in get_store().greenhouses
 
 
 # Ownership
@@ -126,22 +129,20 @@ def retrieve_greenhouse_ownership(greenhouse_id):
     """
     Used to retrieve the owner of a specific greenhouse
     """
-    greenhouse = mongo_adapter.retrieve_greenhouse(greenhouse_id)
+    greenhouse = mongo_adapter.retrieve_greenhouse(greenhouse_id, fields=('tenant_id',))
     if greenhouse:
         return greenhouse.get('tenant_id')
-    greenhouses = _load_json_catalog(GREENHOUSES_FILE)
-    return (greenhouses.get(greenhouse_id, {}) or {}).get('owner')
+    return (get_store().greenhouses.get(greenhouse_id, {}) or {}).get('owner')
 
 
 def retrieve_device_ownership(device_id):
     """
     Used to retrieve the owner of a specific device
     """
-    device = mongo_adapter.retrieve_device(device_id)
+    device = mongo_adapter.retrieve_device(device_id, fields=('owner',))
     if device:
         return device.get('owner')
-    devices = _load_json_catalog(DEVICES_FILE)
-    return (devices.get(device_id, {}) or {}).get('owner')
+    return (get_store().devices.get(device_id, {}) or {}).get('owner')
 
 
 def verify_greenhouse_ownership(greenhouse_id, username):
@@ -170,11 +171,10 @@ def is_device_available(device_id):
     """
     Returns true if a device is available and ready to be associated to a greenhouse.
     """
-    device = mongo_adapter.retrieve_device(device_id)
+    device = mongo_adapter.retrieve_device(device_id, fields=ASSOCIATION_FIELDS)
     if device:
         return not device.get('greenhouse_id') and not device.get('associated_greenhouse')
-    devices = _load_json_catalog(DEVICES_FILE)
-    entry = devices.get(device_id)
+    entry = get_store().devices.get(device_id)
     if not entry:
         return False
     associated = entry.get('associated_greenhouse') or entry.get('greenhouse_id')
@@ -186,44 +186,62 @@ def retrieve_greenhouses(username):
     """
     Used to retrieve all the greenhouses owned by the given user.
     """
-    with open(USERS_FILE, 'r') as f:
-        users = json.load(f)
-    with open(GREENHOUSES_FILE, 'r') as f:
-        greenhouses = json.load(f)
-    with open(DEVICES_FILE, 'r') as f:
-        devices = json.load(f)
-    with open(DEVICES_LEGEND_FILE, 'r') as f:
-        devices_legend = json.load(f)
-    owned_greenhouses = users[username]['greenhouses']
+    topology = get_topology()
     out_greenhouses = list()
-    for greenhouse_id in owned_greenhouses:
-        greenhouse = {
-            'id': greenhouse_id,
-            'name': greenhouses[greenhouse_id]['name'],
-            'devices': []
-        }
-        gh_devices = retrieve_devices(greenhouse_id)
-        for device_id in gh_devices:
-            device_type = devices[device_id]["device_type"]
-            device_name = devices[device_id]["name"]
-            device = devices_legend[device_type]
-            device['id'] = device_id
-            device['name'] = device_name
-            device['type'] = device_type
-            greenhouse['devices'].append(device)
-        out_greenhouses.append(greenhouse)
+    for greenhouse_id in _owned_greenhouse_ids(username):
+        zone = topology.zone(greenhouse_id)
+        if zone is None:
+            raise KeyError(greenhouse_id)
+        if zone['missing']:
+            # listed in the greenhouse but not registered in devices.json
+            raise KeyError(zone['missing'][0])
+        out_greenhouses.append({
+            'id': zone['greenhouse_id'],
+            'name': zone['name'],
+            'devices': zone['devices']
+        })
     return out_greenhouses
 
 
+def _owned_greenhouse_ids(username):
+    user = get_store().users.get(username) or {}
+    return [gh for gh in user.get('greenhouses', []) if isinstance(gh, str)]
+
+
+def retrieve_device_context(device_id, username):
+    """
+    Used to retrieve the context of a device (greenhouse, kind) from the
+    topology view, if its greenhouse belongs to the user.
+    """
+    device = get_topology().device(device_id)
+    if device is None:
+        return None, 'device_not_found'
+    if not device['greenhouse_id']:
+        return None, 'device_not_associated'
+    if device['greenhouse_id'] not in _owned_greenhouse_ids(username):
+        return None, 'forbidden'
+    return device, None
+
+
+def retrieve_zones(username):
+    """
+    Used to retrieve the user's greenhouses from the topology view, with
+    their raspberries, sensors, actuators and measurements.
+    """
+    return [
+        {k: zone[k] for k in ('greenhouse_id', 'name', 'raspberries', 'sensors', 'actuators', 'measurements')}
+        for zone in get_topology().zones(_owned_greenhouse_ids(username))
+    ]
+
+
 def retrieve_devices(greenhouse_id):
     """
     Used to retrieve all the devices registered under the given
     greenhouse.
     """
-    with open(GREENHOUSES_FILE, 'r') as f:
-        greenhouses = json.load(f)
-    if greenhouse_id in greenhouses:
-        return greenhouses[greenhouse_id]['devices']
+    greenhouse = get_store().greenhouses.get(greenhouse_id)
+    if greenhouse is not None:
+        return greenhouse['devices']
     return None
 
 
@@ -232,39 +250,39 @@ def associate_greenhouse(greenhouse_id, greenhouse_name, username):
     """
     Used to associate a greenhouse to a user.
     """
+    store = get_store()
     # Updating user's catalog
-    with open(USERS_FILE, 'r') as f:
-        users = json.load(f)
-    users[username]['greenhouses'].append(greenhouse_id)
-    with open(USERS_FILE, 'w') as f:
-        f.write(json.dumps(users))
+    with store.users.lock(username):
+        user = store.users.get(username)
+        user['greenhouses'].append(greenhouse_id)
+        store.users.put(username, user)
     # Updating greenhouses' catalog
-    with open(GREENHOUSES_FILE, 'r') as f:
-        greenhouses = json.load(f)
-    greenhouses[greenhouse_id]['owner'] = username
-    greenhouses[greenhouse_id]['name'] = greenhouse_name
-    with open(GREENHOUSES_FILE, 'w') as f:
-        f.write(json.dumps(greenhouses))
+    with store.greenhouses.lock(greenhouse_id):
+        greenhouse = store.greenhouses.get(greenhouse_id)
+        greenhouse['owner'] = username
+        greenhouse['name'] = greenhouse_name
+        store.greenhouses.put(greenhouse_id, greenhouse)
+    store.changed()
 
 
 def associate_device(device_id, greenhouse_id, device_name, username):
     """
     Used to associate a device to a user and its greenhouse.
     """
+    store = get_store()
     # Updating greenhouses' catalog
-    with open(GREENHOUSES_FILE, 'r') as f:
-        greenhouses = json.load(f)
-    greenhouses[greenhouse_id]['devices'].append(device_id)
-    with open(GREENHOUSES_FILE, 'w') as f:
-        f.write(json.dumps(greenhouses))
+    with store.greenhouses.lock(greenhouse_id):
+        greenhouse = store.greenhouses.get(greenhouse_id)
+        greenhouse['devices'].append(device_id)
+        store.greenhouses.put(greenhouse_id, greenhouse)
     # Updating devices' catalog
-    with open(DEVICES_FILE, 'r') as f:
-        devices = json.load(f)
-    devices[device_id]['owner'] = username
-    devices[device_id]['associated_greenhouse'] = greenhouse_id
-    devices[device_id]['name'] = device_name
-    with open(DEVICES_FILE, 'w') as f:
-        f.write(json.dumps(devices))
+    with store.devices.lock(device_id):
+        device = store.devices.get(device_id)
+        device['owner'] = username
+        device['associated_greenhouse'] = greenhouse_id
+        device['name'] = device_name
+        store.devices.put(device_id, device)
+    store.changed()
 
 
 def retrieve_device_association(device_id):
@@ -272,11 +290,10 @@ def retrieve_device_association(device_id):
     Used to retrieve the greenhouse associated to the given device.
     Note: if device is not associated, it will return None.
     """
-    device = mongo_adapter.retrieve_device(device_id)
+    device = mongo_adapter.retrieve_device(device_id, fields=ASSOCIATION_FIELDS)
     if device:
         return device.get('greenhouse_id') or device.get('associated_greenhouse')
-    devices = _load_json_catalog(DEVICES_FILE)
-    entry = devices.get(device_id)
+    entry = get_store().devices.get(device_id)
     if not entry:
         return None
     return entry.get('associated_greenhouse') or entry.get('greenhouse_id')
@@ -289,11 +306,10 @@ def retrieve_device_status(device_id: str):
     Legacy: legge 'status' da devices.json se presente (evitare in produzione).
     Per il runtime vero usare services/services.json via resolver GET /device/status.
     """
-    with open(DEVICES_FILE, 'r') as file:
-        devices = json.load(file)
-    if device_id not in devices:
+    device = get_store().devices.get(device_id)
+    if device is None:
         return None
-    return devices[device_id].get('status', 'unknown')
+    return device.get('status', 'unknown')
 
 
 def update_device_status(device_id: str, new_status: str):
@@ -301,13 +317,14 @@ def update_device_status(device_id: str, new_status: str):
     Legacy: scrive 'status' in devices.json (solo per compatibilità).
     Il runtime corretto viene gestito dal resolver in services.json.
     """
-    with open(DEVICES_FILE, 'r') as file:
-        devices = json.load(file)
-    if device_id not in devices:
-        return False
-    devices[device_id]['status'] = new_status
-    with open(DEVICES_FILE, 'w') as file:
-        json.dump(devices, file, indent=2)
+    store = get_store()
+    with store.devices.lock(device_id):
+        device = store.devices.get(device_id)
+        if device is None:
+            return False
+        device['status'] = new_status
+        store.devices.put(device_id, device)
+    store.changed()
     return True
 
 
@@ -323,13 +340,11 @@ def list_crops():
 def _available_roles_in_greenhouse(greenhouse_id):
     """
     Raccoglie i roles effettivi dei device associati alla serra
-    filtrando devices.json per greenhouse_id.
+    dall'indice per greenhouse_id di devices.json.
     """
-    with open(DEVICES_FILE, 'r') as f:
-        devices = json.load(f)
     roles = set()
-    for d in devices.values():
-        if d.get('greenhouse_id') == greenhouse_id and d.get('role'):
+    for _, d in get_store().devices.values_in(greenhouse_id):
+        if d.get('role'):
             roles.add(d['role'])
     return roles
 
@@ -358,13 +373,11 @@ def set_crop_for_greenhouse(greenhouse_id: str, crop: str, username: str):
         if role in roles_ok:
             cloned["controls"][role] = ctrl
 
-    with open(STRATEGIES_FILE, 'r') as f:
-        strategies = json.load(f)
-    strategies[greenhouse_id] = cloned
-    with open(STRATEGIES_FILE, 'w') as f:
-        json.dump(strategies, f, indent=2)
+    store = get_store()
+    store.strategies.put(greenhouse_id, cloned)
+    store.changed()
 
-    return cloned, None
+    return copy.deepcopy(cloned), None
 
 
 def update_strategy(greenhouse_id: str, username: str, update: dict):
@@ -373,12 +386,21 @@ def update_strategy(greenhouse_id: str, username: str, update: dict):
     if not verify_greenhouse_ownership(greenhouse_id, username):
         return None, 'greenhouse_not_available'
 
-    with open(STRATEGIES_FILE, 'r') as f:
-        strategies = json.load(f)
-    if greenhouse_id not in strategies:
-        return None, 'strategy_not_found'
+    store = get_store()
+    with store.strategies.lock(greenhouse_id):
+        current, err = _apply_strategy_update(greenhouse_id, update)
+        if err is None:
+            store.strategies.put(greenhouse_id, current)
+    if err is not None:
+        return None, err
+    store.changed()
+    return copy.deepcopy(current), None
+
 
-    current = strategies[greenhouse_id]
+def _apply_strategy_update(greenhouse_id: str, update: dict):
+    current = get_store().strategies.get(greenhouse_id)
+    if current is None:
+        return None, 'strategy_not_found'
 
     if 'targets' in update and isinstance(update['targets'], dict):
         for k, v in update['targets'].items():
@@ -403,9 +425,6 @@ def update_strategy(greenhouse_id: str, username: str, update: dict):
             base.update(ctrl_patch)
             current['controls'][role] = base
 
-    strategies[greenhouse_id] = current
-    with open(STRATEGIES_FILE, 'w') as f:
-        json.dump(strategies, f, indent=2)
     return current, None
 
 def retrieve_greenhouses_from_mongo(username: str):
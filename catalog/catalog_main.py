@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from pathlib import Path
 
 import cherrypy
@@ -8,6 +9,8 @@ from . import catalog_interface
 from .catalog_dispatcher import CatalogGetDispatcher, CatalogPostDispatcher, CatalogPutDispatcher, \
     CatalogDeleteDispatcher
 from .catalog_resolver import CatalogGetResolver, CatalogPostResolver, CatalogPutResolver, CatalogDeleteResolver
+from .catalog_store import get_store
+from .catalog_topology import get_topology
 
 catalog_interface.init()
 
@@ -108,5 +111,11 @@ if __name__ == '__main__':
     }
     cherrypy.tree.mount(Catalog(), '/', config)
     cherrypy.config.update(socket_config)
+    # Build the topology view before the first request
+    get_topology()
+    # Mongo indexes, in the background: a missing server must not hold the startup
+    threading.Thread(target=catalog_interface.mongo_adapter.ensure_indexes, name="mongo-indexes", daemon=True).start()
+    # Write-behind catalog: write what is pending before the server exits
+    cherrypy.engine.subscribe('stop', get_store().flush)
     cherrypy.engine.start()
     cherrypy.engine.block()
@@ -8,6 +8,7 @@ from dotenv import load_dotenv
 
 from . import catalog_interface
 from .catalog_dispatcher import CatalogGetRequest, CatalogPostRequest, CatalogPutRequest, CatalogDeleteRequest
+from .catalog_store import get_store
 from .generator import generator
 from pathlib import Path
 from Adapters.mongo.Mongo_DB_adapter import MongoAdapter
@@ -16,6 +17,8 @@ from Adapters.mongo.Mongo_DB_adapter import MongoAdapter
 MONGO_URI = os.getenv("CATALOG_MONGO_URI", os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
 MONGO_DB = os.getenv("CATALOG_MONGO_DB", os.getenv("MONGO_DB", "greenbox"))
 mongo_adapter = MongoAdapter(MONGO_URI, MONGO_DB)
+# Device fields read to check ownership and kind (actuator / controller)
+DEVICE_KIND_FIELDS = ('greenhouse_id', 'device_type', 'role')
 
 load_dotenv()
 ENV_PATH = Path(__file__).parent / '.env'   # forza la .env nella cartella del catalog
@@ -40,21 +43,37 @@ DEFAULT_EFFECTS = [
 ]
 
 
-def validate_authentication(headers, query=None):
-    """
-    Enforce token-based authentication. Looks for a token in headers,
-    optionally falling back to query params.
-    """
+def _request_token(headers, query=None):
     token = (headers or {}).get('token')
     if token is None and query is not None:
         token = query.get('token')
     if token is None:
         raise cherrypy.HTTPError(status=401, message='missing_token')
+    return token
+
+
+def validate_authentication(headers, query=None):
+    """
+    Enforce token-based authentication. Looks for a token in headers,
+    optionally falling back to query params.
+    """
+    token = _request_token(headers, query)
     if not catalog_interface.verify_token(token):
         raise cherrypy.HTTPError(status=401, message='invalid_token')
     return token
 
 
+def authenticate(headers, query=None):
+    """
+    Like validate_authentication, but returns the token's username, so that
+    the handler does not decode the token a second time.
+    """
+    username = catalog_interface.retrieve_valid_username(_request_token(headers, query))
+    if username is None:
+        raise cherrypy.HTTPError(status=401, message='invalid_token')
+    return username
+
+
 def admin_authentication(headers):
     if 'token' not in headers:
         raise cherrypy.HTTPError(status=401)
@@ -67,54 +86,14 @@ def admin_authentication(headers):
 class CatalogGetResolver:
     @staticmethod
     def resolve(request: CatalogGetRequest, query, headers):
-        match request:
-            case CatalogGetRequest.RETRIEVE_BROKER:
-                return CatalogGetResolver._retrieve_broker(query, headers)
-            case CatalogGetRequest.GENERATE_ID:
-                return CatalogGetResolver._generate_id(query, headers)
-            case CatalogGetRequest.DEVICE_JOIN:
-                return CatalogGetResolver._device_join(query, headers)
-            case CatalogGetRequest.DEVICE_CONFIG:
-                return CatalogGetResolver._device_config(query)
-            case CatalogGetRequest.REGISTER_NEW_GREENHOUSE:
-                return CatalogPostResolver._register_new_greenhouse(query, headers)
-            case CatalogGetRequest.REGISTER_NEW_DEVICE:
-                return CatalogPostResolver._register_new_device(query, headers)
-            case CatalogGetRequest.RETRIEVE_GREENHOUSES:
-                return CatalogGetResolver._retrieve_greenhouses(query, headers)
-            case CatalogGetRequest.RETRIEVE_DEVICES:
-                return CatalogGetResolver._retrieve_devices(query, headers)
-            case CatalogGetRequest.GET_DEVICE_STATUS:
-                return CatalogGetResolver._get_device_status(query)
-            case CatalogGetRequest.GET_CROPS:
-                return CatalogGetResolver._get_crops()
-            case CatalogGetRequest.GET_DEVICES:
-                return CatalogGetResolver._get_devices(query, headers)
-            case CatalogGetRequest.GREENHOUSE_THRESHOLDS:
-                return CatalogGetResolver._greenhouse_thresholds(query)
-            case CatalogGetRequest.GREENHOUSE_EFFECTS:
-                return CatalogGetResolver._greenhouse_effects(query)
-            case CatalogGetRequest.USER_INFO:
-                return CatalogGetResolver._user_info(query, headers)
-            case CatalogGetRequest.ACTUATOR_INFO:
-                return CatalogGetResolver._actuator_info(query, headers)
-            case CatalogGetRequest.MEASURES:
-                return CatalogGetResolver._measures(query, headers)
-            case CatalogGetRequest.SERVICE_OVERVIEW:
-                return CatalogGetResolver._service_overview(query, headers)
-            case CatalogGetRequest.SERVICE_GH_DETAIL:
-                return CatalogGetResolver._service_gh_detail(query, headers)
-            case CatalogGetRequest.SERVICE_OVERVIEW:
-                return CatalogGetResolver._service_overview(query, headers)
-            case CatalogGetRequest.SERVICE_GH_DETAIL:
-                return CatalogGetResolver._service_gh_detail(query, headers)
-
-        raise cherrypy.HTTPError(status=400)
+        handler = GET_HANDLERS.get(request)
+        if handler is None:
+            raise cherrypy.HTTPError(status=400)
+        return handler(query, headers)
 
     @staticmethod
     def _service_overview(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         user_ghs = set(catalog_interface.retrieve_greenhouses(username))
 
         # carica cache
@@ -130,8 +109,7 @@ class CatalogGetResolver:
 
     @staticmethod
     def _service_gh_detail(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         gh_id = query.get('id')
         if not gh_id:
             raise cherrypy.HTTPError(status=400, message='missing_greenhouse_id')
@@ -148,8 +126,7 @@ class CatalogGetResolver:
 
     @staticmethod
     def _get_devices(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         
 
 
@@ -160,9 +137,8 @@ class CatalogGetResolver:
 
         base = Path(__file__).parent
 
-        # carica anagrafica
-        with open(base / 'generator' / 'devices.json') as f:
-            devices_all = json.load(f)
+        # anagrafica: device della serra dall'indice in memoria
+        devices_all = get_store().devices
 
         # carica runtime
         try:
@@ -174,7 +150,7 @@ class CatalogGetResolver:
 
         # fondi le due sorgenti
         items = []
-        for did, d in devices_all.items():
+        for did, d in devices_all.values_in(gh_id):
             if d.get("greenhouse_id") == gh_id:
                 runtime_status = runtime_devices.get(did, {}).get("status")
                 status = runtime_status or d.get("status", "unknown")
@@ -279,7 +255,7 @@ class CatalogGetResolver:
         if not device_id:
             raise cherrypy.HTTPError(status=400, message='missing_device_id')
 
-        device = mongo_adapter.retrieve_device(device_id)
+        device = mongo_adapter.retrieve_device(device_id, fields=('greenhouse_id', 'device_type', 'role'))
         if not device:
             raise cherrypy.HTTPError(status=404, message='device_not_found')
 
@@ -298,13 +274,48 @@ class CatalogGetResolver:
         }
         return response
 
+    @staticmethod
+    def _topology_device(query, headers):
+        """
+        Context of a device from the topology view, with the broker.
+        path: topology/devices/{device_id}
+        auth: token
+        """
+        username = authenticate(headers, query)
+        device, err = catalog_interface.retrieve_device_context(query['device_id'], username)
+        if err == 'forbidden':
+            raise cherrypy.HTTPError(status=403, message=err)
+        if err:
+            raise cherrypy.HTTPError(status=404, message=err)
+        broker_ip, broker_port = catalog_interface.retrieve_broker()
+        response = dict(device)
+        response['broker_ip'] = broker_ip
+        response['broker_port'] = broker_port
+        return response
+
+    @staticmethod
+    def _topology_zones(query, headers):
+        """
+        The user's greenhouses with their raspberries and measurements, with
+        the broker.
+        path: topology/zones
+        auth: token
+        """
+        username = authenticate(headers, query)
+        broker_ip, broker_port = catalog_interface.retrieve_broker()
+        return {
+            'broker_ip': broker_ip,
+            'broker_port': broker_port,
+            'greenhouses': catalog_interface.retrieve_zones(username)
+        }
+
     @staticmethod
     def _greenhouse_thresholds(query):
         greenhouse_id = query.get('greenhouse_id')
         if not greenhouse_id:
             raise cherrypy.HTTPError(status=400, message='missing_greenhouse_id')
 
-        greenhouse = mongo_adapter.retrieve_greenhouse(greenhouse_id)
+        greenhouse = mongo_adapter.retrieve_greenhouse(greenhouse_id, fields=('thresholds',))
         if not greenhouse:
             raise cherrypy.HTTPError(status=404, message='greenhouse_not_found')
 
@@ -331,18 +342,12 @@ class CatalogGetResolver:
 
     @staticmethod
     def _user_info(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
 
         # prefer Mongo user profile, fallback to users.json
-        user = mongo_adapter.retrieve_user(username) or {}
+        user = mongo_adapter.retrieve_user(username, fields=('country', 'paese', 'account_level')) or {}
         if not user:
-            try:
-                with open(catalog_interface.USERS_FILE, 'r') as f:
-                    users = json.load(f)
-                user = users.get(username, {})
-            except Exception:
-                user = {}
+            user = get_store().users.get(username, {})
 
         country = user.get('country') or user.get('paese')
         account_level = user.get('account_level')
@@ -355,13 +360,13 @@ class CatalogGetResolver:
 
     @staticmethod
     def _actuator_info(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         device_id = query.get('device_id')
         if not device_id:
             raise cherrypy.HTTPError(status=400, message='missing_device_id')
 
-        device = mongo_adapter.retrieve_device(device_id)
+        device = mongo_adapter.retrieve_device(
+            device_id, fields=('greenhouse_id', 'device_type', 'role', 'name', 'bound_device_id', 'bound_to'))
         if not device:
             raise cherrypy.HTTPError(status=404, message='device_not_found')
 
@@ -377,14 +382,7 @@ class CatalogGetResolver:
             raise cherrypy.HTTPError(status=400, message='not_actuator')
 
         # strategy id: usa strategia della serra se presente
-        strategy_id = None
-        try:
-            with open(catalog_interface.STRATEGIES_FILE, 'r') as f:
-                strategies = json.load(f)
-            if gh_id in strategies:
-                strategy_id = gh_id
-        except Exception:
-            strategy_id = gh_id
+        strategy_id = gh_id if gh_id in get_store().strategies else None
 
         info = {
             "device_id": device_id,
@@ -399,8 +397,7 @@ class CatalogGetResolver:
 
     @staticmethod
     def _measures(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
 
         device_id = query.get('device_id')
         metric = query.get('metric')
@@ -409,7 +406,7 @@ class CatalogGetResolver:
         if not device_id or not metric or not time_range:
             raise cherrypy.HTTPError(status=400, message='missing_fields')
 
-        device = mongo_adapter.retrieve_device(device_id)
+        device = mongo_adapter.retrieve_device(device_id, fields=DEVICE_KIND_FIELDS)
         if not device:
             raise cherrypy.HTTPError(status=404, message='device_not_found')
 
@@ -453,8 +450,7 @@ class CatalogGetResolver:
         }
     @staticmethod
     def _retrieve_greenhouses(query, headers=None):
-        token = validate_authentication(headers or {}, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers or {}, query)
         # greenhouses = catalog_interface.retrieve_greenhouses(username)
         # Chiamata al MongoDB Adapter per recuperare le serre dell'utente
         greenhouses = catalog_interface.retrieve_greenhouses_from_mongo(username)
@@ -466,9 +462,8 @@ class CatalogGetResolver:
 
     @staticmethod
     def _retrieve_devices(query, headers=None):
-        token = validate_authentication(headers or {}, query)
+        username = authenticate(headers or {}, query)
         greenhouse_id = query['greenhouse_id']
-        username = catalog_interface.retrieve_username_by_token(token)
         
         # Verifica la proprietà della serra (Mongo)
         if not mongo_adapter.verify_greenhouse_ownership(greenhouse_id, username):
@@ -484,37 +479,14 @@ class CatalogGetResolver:
 class CatalogPostResolver:
     @staticmethod
     def resolve(request: CatalogPostRequest, query, body, headers):
-        response = None
-        match request:
-            case CatalogPostRequest.NOT_FOUND:
-                raise cherrypy.HTTPError(status=400)
-            case CatalogPostRequest.REGISTER_NEW_GREENHOUSE:
-                response = CatalogPostResolver._register_new_greenhouse(query, headers)
-            case CatalogPostRequest.REGISTER_NEW_DEVICE:
-                response = CatalogPostResolver._register_new_device(query, headers)
-            case CatalogPostRequest.SIGN_UP:
-                response = CatalogPostResolver._sign_up(body)
-            case CatalogPostRequest.LOGIN:
-                response = CatalogPostResolver._login(body)
-            case CatalogPostRequest.TOKEN_LOGIN:
-                response = CatalogPostResolver._token_login(query)
-            case CatalogPostRequest.SET_CROP:
-                response = CatalogPostResolver._set_crop(query, headers)
-            case CatalogPostRequest.CREATE_GREENHOUSE:
-                response = CatalogPostResolver._create_greenhouse(query, body, headers)
-            case CatalogGetRequest.SERVICE_OVERVIEW:
-                return CatalogGetResolver._service_overview(query, headers)
-            case CatalogGetRequest.SERVICE_GH_DETAIL:
-                return CatalogGetResolver._service_gh_detail(query, headers)
-
-                
-        return response
-    
+        if request == CatalogPostRequest.NOT_FOUND:
+            raise cherrypy.HTTPError(status=400)
+        handler = POST_HANDLERS.get(request)
+        return handler(query, body, headers) if handler else None
 
     @staticmethod
     def _set_crop(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         gh_id = query.get('greenhouse_id')
         crop = query.get('crop')
         strat, err = catalog_interface.set_crop_for_greenhouse(gh_id, crop, username)
@@ -554,9 +526,9 @@ class CatalogPostResolver:
         query: token
         """
         token = query['token']
-        is_token_valid = catalog_interface.verify_token(token)
+        username = catalog_interface.retrieve_valid_username(token)
+        is_token_valid = username is not None
         if is_token_valid:
-            username = catalog_interface.retrieve_username_by_token(token)
             greenhouses = catalog_interface.retrieve_greenhouses(username)
         else:
             greenhouses = None
@@ -626,8 +598,7 @@ class CatalogPostResolver:
         body: name
         auth: token
         """
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         name = (body or {}).get('name') or query.get('name')
         if not name:
             raise cherrypy.HTTPError(status=400, message='missing_name')
@@ -650,10 +621,9 @@ class CatalogPostResolver:
             raise cherrypy.HTTPError(status=409, message='greenhouse_id_taken')
 
         # Optional: update legacy users.json structure if present
-        try:
-            with open(catalog_interface.USERS_FILE, 'r') as f:
-                users = json.load(f)
-            user_entry = users.get(username)
+        store = get_store()
+        with store.users.lock(username):
+            user_entry = store.users.get(username)
             if user_entry is not None:
                 gh_list = user_entry.get('greenhouses')
                 if isinstance(gh_list, list):
@@ -661,11 +631,8 @@ class CatalogPostResolver:
                 elif isinstance(gh_list, dict):
                     # normalize if legacy structure uses list of dicts
                     pass
-                users[username] = user_entry
-                with open(catalog_interface.USERS_FILE, 'w') as f:
-                    json.dump(users, f, indent=2)
-        except Exception:
-            pass
+                store.users.put(username, user_entry)
+        store.changed()
 
         return {"greenhouse_id": greenhouse_id, "name": name}
 
@@ -697,23 +664,10 @@ class CatalogPostResolver:
 class CatalogPutResolver:
     @staticmethod
     def resolve(request: CatalogPutRequest, query, body, headers):
-        response = None
-        match request:
-            case CatalogPutRequest.NOT_FOUND:
-                raise cherrypy.HTTPError(status=404)
-            case CatalogPutRequest.ASSOCIATE_GREENHOUSE:
-                response = CatalogPutResolver._associate_greenhouse(query, headers)
-            case CatalogPutRequest.ASSOCIATE_DEVICE:
-                response = CatalogPutResolver._associate_device(query, headers)
-            case CatalogPutRequest.UPDATE_DEVICE_STATUS:
-                response = CatalogPutResolver._update_device_status(query)
-            case CatalogPutRequest.UPDATE_STRATEGY:
-                response = CatalogPutResolver._update_strategy(query, headers)
-            case CatalogPostRequest.SET_CROP:
-                response = CatalogPostResolver._set_crop(query, headers)
-            case CatalogPutRequest.ACTUATOR_BIND:
-                response = CatalogPutResolver._actuator_bind(query, headers)
-        return response
+        if request == CatalogPutRequest.NOT_FOUND:
+            raise cherrypy.HTTPError(status=404)
+        handler = PUT_HANDLERS.get(request)
+        return handler(query, body, headers) if handler else None
 
     @staticmethod
     def _update_device_status(query):
@@ -732,18 +686,11 @@ class CatalogPutResolver:
             raise cherrypy.HTTPError(status=404, message='device_not_found')
 
         # Recupera i metadati del device per determinare role/kind.
-        device_doc = mongo_adapter.retrieve_device(device_id) or {}
+        device_doc = mongo_adapter.retrieve_device(device_id, fields=('device_type', 'role')) or {}
 
         # Fallback legacy al catalogo statico se necessario.
         if not device_doc:
-            from pathlib import Path
-            base = Path(__file__).parent
-            try:
-                with open(base / 'generator' / 'devices.json') as f:
-                    devices_all = json.load(f)
-                device_doc = devices_all.get(device_id, {})
-            except FileNotFoundError:
-                device_doc = {}
+            device_doc = get_store().devices.get(device_id, {})
 
         if not device_doc:
             raise cherrypy.HTTPError(status=404, message='device_not_found')
@@ -784,8 +731,7 @@ class CatalogPutResolver:
     #new version update_strategy
     @staticmethod
     def _update_strategy(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         gh_id = query.get('greenhouse_id')
         raw = query.get('update')
         try:
@@ -837,8 +783,7 @@ class CatalogPutResolver:
         query: greenhouse_id, greenhouse_name
         auth: token
         """
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         greenhouse_id = query['greenhouse_id']
         greenhouse_name = query['greenhouse_name']
         # Greenhouse registration verification
@@ -858,8 +803,7 @@ class CatalogPutResolver:
 
     @staticmethod
     def _associate_device(query, headers):
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
         device_id = query['device_id']
         greenhouse_id = query['greenhouse_id']
         device_name = query.get('device_name')
@@ -875,8 +819,7 @@ class CatalogPutResolver:
             raise cherrypy.HTTPError(status=403, message='forbidden')
 
         # Check not already associated
-        dev_doc = mongo_adapter.retrieve_device(device_id)
-        if dev_doc.get('greenhouse_id') or dev_doc.get('associated_greenhouse'):
+        if mongo_adapter.is_device_associated(device_id):
             raise cherrypy.HTTPError(status=409, message='device_already_associated')
 
         # Unique name in greenhouse
@@ -896,16 +839,15 @@ class CatalogPutResolver:
         path: actuators/{id}/bind
         query: raspberry_id
         """
-        token = validate_authentication(headers, query)
-        username = catalog_interface.retrieve_username_by_token(token)
+        username = authenticate(headers, query)
 
         actuator_id = query.get('actuator_id')
         raspberry_id = query.get('raspberry_id')
         if not actuator_id or not raspberry_id:
             raise cherrypy.HTTPError(status=400, message='missing_fields')
 
-        actuator = mongo_adapter.retrieve_device(actuator_id)
-        controller = mongo_adapter.retrieve_device(raspberry_id)
+        actuator = mongo_adapter.retrieve_device(actuator_id, fields=DEVICE_KIND_FIELDS)
+        controller = mongo_adapter.retrieve_device(raspberry_id, fields=DEVICE_KIND_FIELDS)
         if not actuator or not controller:
             raise cherrypy.HTTPError(status=404, message='device_not_found')
 
@@ -941,6 +883,51 @@ class CatalogDeleteResolver:
     @staticmethod
     def resolve(request: CatalogDeleteRequest, query, headers):
         pass
+
+
+# Request -> handler(query, headers) for GET, handler(query, body, headers) for POST/PUT
+GET_HANDLERS = {
+    CatalogGetRequest.RETRIEVE_BROKER: lambda q, h: CatalogGetResolver._retrieve_broker(q, h),
+    CatalogGetRequest.GENERATE_ID: lambda q, h: CatalogGetResolver._generate_id(q, h),
+    CatalogGetRequest.DEVICE_JOIN: lambda q, h: CatalogGetResolver._device_join(q, h),
+    CatalogGetRequest.DEVICE_CONFIG: lambda q, h: CatalogGetResolver._device_config(q),
+    CatalogGetRequest.REGISTER_NEW_GREENHOUSE: lambda q, h: CatalogPostResolver._register_new_greenhouse(q, h),
+    CatalogGetRequest.REGISTER_NEW_DEVICE: lambda q, h: CatalogPostResolver._register_new_device(q, h),
+    CatalogGetRequest.RETRIEVE_GREENHOUSES: lambda q, h: CatalogGetResolver._retrieve_greenhouses(q, h),
+    CatalogGetRequest.RETRIEVE_DEVICES: lambda q, h: CatalogGetResolver._retrieve_devices(q, h),
+    CatalogGetRequest.GET_DEVICE_STATUS: lambda q, h: CatalogGetResolver._get_device_status(q),
+    CatalogGetRequest.GET_CROPS: lambda q, h: CatalogGetResolver._get_crops(),
+    CatalogGetRequest.GET_DEVICES: lambda q, h: CatalogGetResolver._get_devices(q, h),
+    CatalogGetRequest.GREENHOUSE_THRESHOLDS: lambda q, h: CatalogGetResolver._greenhouse_thresholds(q),
+    CatalogGetRequest.GREENHOUSE_EFFECTS: lambda q, h: CatalogGetResolver._greenhouse_effects(q),
+    CatalogGetRequest.USER_INFO: lambda q, h: CatalogGetResolver._user_info(q, h),
+    CatalogGetRequest.ACTUATOR_INFO: lambda q, h: CatalogGetResolver._actuator_info(q, h),
+    CatalogGetRequest.MEASURES: lambda q, h: CatalogGetResolver._measures(q, h),
+    CatalogGetRequest.SERVICE_OVERVIEW: lambda q, h: CatalogGetResolver._service_overview(q, h),
+    CatalogGetRequest.SERVICE_GH_DETAIL: lambda q, h: CatalogGetResolver._service_gh_detail(q, h),
+    CatalogGetRequest.TOPOLOGY_DEVICE: lambda q, h: CatalogGetResolver._topology_device(q, h),
+    CatalogGetRequest.TOPOLOGY_ZONES: lambda q, h: CatalogGetResolver._topology_zones(q, h),
+}
+
+POST_HANDLERS = {
+    CatalogPostRequest.REGISTER_NEW_GREENHOUSE: lambda q, b, h: CatalogPostResolver._register_new_greenhouse(q, h),
+    CatalogPostRequest.REGISTER_NEW_DEVICE: lambda q, b, h: CatalogPostResolver._register_new_device(q, h),
+    CatalogPostRequest.SIGN_UP: lambda q, b, h: CatalogPostResolver._sign_up(b),
+    CatalogPostRequest.LOGIN: lambda q, b, h: CatalogPostResolver._login(b),
+    CatalogPostRequest.TOKEN_LOGIN: lambda q, b, h: CatalogPostResolver._token_login(q),
+    CatalogPostRequest.SET_CROP: lambda q, b, h: CatalogPostResolver._set_crop(q, h),
+    CatalogPostRequest.CREATE_GREENHOUSE: lambda q, b, h: CatalogPostResolver._create_greenhouse(q, b, h),
+}
+
+PUT_HANDLERS = {
+    CatalogPutRequest.ASSOCIATE_GREENHOUSE: lambda q, b, h: CatalogPutResolver._associate_greenhouse(q, h),
+    CatalogPutRequest.ASSOCIATE_DEVICE: lambda q, b, h: CatalogPutResolver._associate_device(q, h),
+    CatalogPutRequest.UPDATE_DEVICE_STATUS: lambda q, b, h: CatalogPutResolver._update_device_status(q),
+    CatalogPutRequest.UPDATE_STRATEGY: lambda q, b, h: CatalogPutResolver._update_strategy(q, h),
+    CatalogPutRequest.ACTUATOR_BIND: lambda q, b, h: CatalogPutResolver._actuator_bind(q, h),
+}
+
+
 class CatalogInterface:
     def verify_device_existence(self, device_id: str) -> bool:
         device = mongo_adapter.retrieve_device(device_id)
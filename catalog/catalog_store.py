@@ -0,0 +1,253 @@
+"""
+In-memory catalog documents with write-behind persistence.
+
+users.json, greenhouses.json, devices.json and strategies.json are loaded
+once and served from memory. Entries are copy-on-write: a writer takes the
+lock stripe of the entry's key, edits a copy and stores it back, so readers
+never lock and a flush can serialize a shallow snapshot of the document
+while other requests keep writing.
+
+Changed documents are written back by a background thread every
+CATALOG_FLUSH_INTERVAL_S seconds, or sooner once CATALOG_FLUSH_MAX_PENDING
+changes are waiting, to a temporary file renamed over the original (a
+reader of the file never sees half a catalog). With CATALOG_FLUSH_INTERVAL_S
+= 0 every change is written through before the request returns. The catalog
+process owns these files: edits made to them by hand while it runs are
+overwritten by the next flush.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+P = Path(__file__).parent.absolute()
+USERS_FILE = P / 'users.json'
+GREENHOUSES_FILE = P / 'generator' / 'greenhouses.json'
+DEVICES_FILE = P / 'generator' / 'devices.json'
+STRATEGIES_FILE = P.parent / 'Control_Strategies' / 'strategies.json'
+
+
+class Document:
+    """
+    One JSON catalog file ({key: entry}) held in memory.
+
+    `get` returns a copy of the entry; changes go through `put`/`delete`,
+    under `lock(key)` when they depend on the current value. With
+    `group_by`, the keys are also indexed by that field of their entries.
+    Listeners added with `subscribe` are called as fn(key, old, new) after
+    each change, under the key's lock.
+    """
+
+    def __init__(self, path: Path, stripes: int = 16, indent: Optional[int] = None,
+                 group_by: Optional[str] = None) -> None:
+        self.path = Path(path)
+        self.indent = indent
+        self.group_by = group_by
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+        self._meta = threading.Lock()
+        self._data: Dict[str, Any] = self._read()
+        self._groups: Dict[Any, Set[str]] = {}
+        self._listeners: List[Callable[[str, Any, Any], None]] = []
+        if group_by:
+            for key, entry in self._data.items():
+                self._index(key, None, entry)
+        self.version = 0
+        self.flushed_version = 0
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _group(self, entry) -> Any:
+        return entry.get(self.group_by) if isinstance(entry, dict) else None
+
+    def _index(self, key: str, old, new) -> None:
+        before, after = self._group(old), self._group(new)
+        if old is not None and before == after:
+            return
+        with self._meta:
+            if old is not None and before is not None:
+                members = self._groups.get(before)
+                if members is not None:
+                    members.discard(key)
+                    if not members:
+                        del self._groups[before]
+            if after is not None:
+                self._groups.setdefault(after, set()).add(key)
+
+    def subscribe(self, fn: Callable[[str, Any, Any], None]) -> None:
+        self._listeners.append(fn)
+
+    def _notify(self, key: str, old, new) -> None:
+        for fn in self._listeners:
+            try:
+                fn(key, old, new)
+            except Exception:
+                logging.exception("[catalog] listener error for %s/%s", self.path.name, key)
+
+    def lock(self, key: str) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str, default=None):
+        entry = self._data.get(key)
+        return default if entry is None else copy.deepcopy(entry)
+
+    def peek(self, key: str):
+        """The stored entry itself, read-only: do not modify it."""
+        return self._data.get(key)
+
+    def keys_in(self, group) -> List[str]:
+        """Keys whose entry has group_by == group."""
+        with self._meta:
+            return sorted(self._groups.get(group, ()))
+
+    def values_in(self, group) -> List[Tuple[str, Any]]:
+        """(key, entry) of the group, read-only: do not modify the entries."""
+        return [(key, entry) for key in self.keys_in(group)
+                if (entry := self._data.get(key)) is not None]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Snapshot of the entries (read-only: do not modify them)."""
+        return iter(list(self._data.items()))
+
+    def put(self, key: str, entry) -> None:
+        with self.lock(key):
+            old = self._data.get(key)
+            self._data[key] = entry
+            if self.group_by:
+                self._index(key, old, entry)
+            self._changed()
+            self._notify(key, old, entry)
+
+    def delete(self, key: str) -> bool:
+        with self.lock(key):
+            old = self._data.pop(key, None)
+            if old is None:
+                return False
+            if self.group_by:
+                self._index(key, old, None)
+            self._changed()
+            self._notify(key, old, None)
+            return True
+
+    def _changed(self) -> None:
+        with self._meta:
+            self.version += 1
+
+    @property
+    def pending(self) -> int:
+        return self.version - self.flushed_version
+
+    def flush(self) -> bool:
+        """Write the document if it changed since the last flush; True if written."""
+        with self._meta:
+            version = self.version
+            if version == self.flushed_version:
+                return False
+            snapshot = dict(self._data)
+        fd, tmp = tempfile.mkstemp(prefix=self.path.name + '.', suffix='.tmp', dir=self.path.parent)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(snapshot, f, indent=self.indent)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._meta:
+            self.flushed_version = max(self.flushed_version, version)
+        return True
+
+
+class CatalogStore:
+    """The catalog documents and their write-behind flusher."""
+
+    def __init__(self, users: Path = USERS_FILE, greenhouses: Path = GREENHOUSES_FILE,
+                 devices: Path = DEVICES_FILE, strategies: Path = STRATEGIES_FILE,
+                 flush_interval_s: Optional[float] = None, max_pending: Optional[int] = None) -> None:
+        stripes = int(os.getenv("CATALOG_LOCK_STRIPES", 16))
+        self.flush_interval_s = float(
+            os.getenv("CATALOG_FLUSH_INTERVAL_S", 1.0) if flush_interval_s is None else flush_interval_s
+        )
+        self.max_pending = int(os.getenv("CATALOG_FLUSH_MAX_PENDING", 100) if max_pending is None else max_pending)
+        self.users = Document(users, stripes)
+        self.greenhouses = Document(greenhouses, stripes)
+        self.devices = Document(devices, stripes, group_by='greenhouse_id')
+        self.strategies = Document(strategies, stripes, indent=2)
+        self.documents = (self.users, self.greenhouses, self.devices, self.strategies)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if self.flush_interval_s > 0:
+            self._thread = threading.Thread(target=self._flusher, name="catalog-flusher", daemon=True)
+            self._thread.start()
+
+    def changed(self) -> None:
+        """Called after a request's writes: flush now (write-through) or wake the flusher when enough are pending."""
+        if self._thread is None:
+            self.flush()
+        elif self.pending >= self.max_pending:
+            self._wake.set()
+
+    @property
+    def pending(self) -> int:
+        return sum(doc.pending for doc in self.documents)
+
+    def flush(self) -> int:
+        """Write every changed document; returns how many were written."""
+        with self._flush_lock:
+            written = 0
+            for doc in self.documents:
+                try:
+                    written += doc.flush()
+                except OSError:
+                    logging.exception("[catalog] could not write %s", doc.path)
+            return written
+
+    def _flusher(self) -> None:
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher and write what is still pending."""
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+
+_store: Optional[CatalogStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> CatalogStore:
+    """The catalog's store, loaded on first use and flushed at exit."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CatalogStore()
+                atexit.register(_store.close)
+    return _store
@@ -0,0 +1,196 @@
+"""
+Denormalized topology of the catalog: greenhouse -> raspberries, sensors
+and actuators -> measurements, and the context of every device.
+
+The view is built once from the CatalogStore and kept up to date by the
+store's listeners: registering or associating a greenhouse or a device
+recomputes only the greenhouses it touches (a status change none), so
+retrieve_greenhouses and the topology endpoints read precomputed entries
+instead of joining users, greenhouses, devices and the device legend on
+every request.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .catalog_store import CatalogStore, get_store
+
+P = Path(__file__).parent.absolute()
+DEVICES_LEGEND_FILE = P / 'devices_legend.json'
+
+
+def device_kind(entry: Dict[str, Any]) -> str:
+    """'raspberry', 'actuator' or 'sensor', from the device's type and role."""
+    dtype = (entry.get('device_type') or '').lower()
+    role = (entry.get('role') or '').lower()
+    if dtype == 'raspberry':
+        return 'raspberry'
+    if dtype == 'actuator' or dtype.endswith('_system') or role.endswith('_system'):
+        return 'actuator'
+    return 'sensor'
+
+
+def device_association(entry: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not entry:
+        return None
+    return entry.get('associated_greenhouse') or entry.get('greenhouse_id')
+
+
+def _view_fields(entry: Optional[Dict[str, Any]]):
+    """What the view reads from a device entry."""
+    if entry is None:
+        return None
+    return entry.get('device_type'), entry.get('name'), entry.get('role'), device_association(entry)
+
+
+class TopologyView:
+    """
+    Per greenhouse: the devices in the retrieve_greenhouses format, the ids
+    of its raspberries, sensors and actuators and its measurements; per
+    device: its greenhouse and kind. A greenhouse's devices are the ones in
+    its `devices` list; listed ids missing from devices.json are kept in
+    `missing`. Entries are replaced, never modified, so lookups do not lock
+    (and callers must not modify them).
+    """
+
+    def __init__(self, store: CatalogStore, legend: Optional[Dict[str, Any]] = None) -> None:
+        self.store = store
+        if legend is None:
+            with open(DEVICES_LEGEND_FILE, 'r') as f:
+                legend = json.load(f)
+        self.legend = legend
+        self._lock = threading.RLock()
+        self._zones: Dict[str, Dict[str, Any]] = {}
+        self._devices: Dict[str, Dict[str, Any]] = {}
+        self._listed: Dict[str, List[str]] = {}
+        self._member_of: Dict[str, Set[str]] = {}
+        self.rebuilds = 0
+        store.greenhouses.subscribe(self._on_greenhouse)
+        store.devices.subscribe(self._on_device)
+        with self._lock:
+            for gh_id, _ in store.greenhouses.items():
+                self._rebuild(gh_id)
+            for device_id, _ in store.devices.items():
+                if device_id not in self._devices:
+                    self._refresh_device(device_id)
+
+    # ---- lookups ----
+
+    def zone(self, greenhouse_id: str) -> Optional[Dict[str, Any]]:
+        return self._zones.get(greenhouse_id)
+
+    def device(self, device_id: str) -> Optional[Dict[str, Any]]:
+        return self._devices.get(device_id)
+
+    def zones(self, greenhouse_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        return [z for z in map(self._zones.get, greenhouse_ids) if z is not None]
+
+    # ---- maintenance ----
+
+    def _set_members(self, gh_id: str, old_ids: Iterable[str], new_ids: Iterable[str]) -> None:
+        old_ids, new_ids = set(old_ids), set(new_ids)
+        for device_id in old_ids - new_ids:
+            zones = self._member_of.get(device_id)
+            if zones is not None:
+                zones.discard(gh_id)
+                if not zones:
+                    del self._member_of[device_id]
+        for device_id in new_ids - old_ids:
+            self._member_of.setdefault(device_id, set()).add(gh_id)
+        for device_id in old_ids | new_ids:
+            self._refresh_device(device_id)
+
+    def _rebuild(self, gh_id: str) -> None:
+        greenhouse = self.store.greenhouses.peek(gh_id)
+        old_listed = self._listed.pop(gh_id, ())
+        if greenhouse is None:
+            self._zones.pop(gh_id, None)
+            self._set_members(gh_id, old_listed, ())
+            return
+        listed = list(greenhouse.get('devices') or [])
+        devices, ids, missing = [], [], []
+        by_kind: Dict[str, List[str]] = {'raspberry': [], 'sensor': [], 'actuator': []}
+        measurements = set()
+        for device_id in listed:
+            entry = self.store.devices.peek(device_id)
+            if entry is None:
+                missing.append(device_id)
+                continue
+            ids.append(device_id)
+            device_type = entry.get('device_type')
+            legend = self.legend.get(device_type) or {}
+            device = dict(legend)
+            device['id'] = device_id
+            device['name'] = entry.get('name')
+            device['type'] = device_type
+            devices.append(device)
+            kind = device_kind(entry)
+            by_kind[kind].append(device_id)
+            if kind == 'sensor':
+                measurements.update(m.get('type') for m in legend.get('measurements', []) if m.get('type'))
+        self._zones[gh_id] = {
+            'greenhouse_id': gh_id,
+            'name': greenhouse.get('name'),
+            'owner': greenhouse.get('owner'),
+            'devices': devices,
+            'device_ids': ids,
+            'missing': missing,
+            'raspberries': by_kind['raspberry'],
+            'sensors': by_kind['sensor'],
+            'actuators': by_kind['actuator'],
+            'measurements': sorted(measurements),
+        }
+        self.rebuilds += 1
+        self._listed[gh_id] = listed
+        # missing ids included: registering one of them rebuilds the greenhouse
+        self._set_members(gh_id, old_listed, listed)
+
+    def _refresh_device(self, device_id: str) -> None:
+        entry = self.store.devices.peek(device_id)
+        gh_id = self._greenhouse_of(device_id, entry)
+        if entry is None:
+            self._devices.pop(device_id, None)
+            return
+        self._devices[device_id] = {
+            'device_id': device_id,
+            'device_type': entry.get('device_type'),
+            'name': entry.get('name'),
+            'role': entry.get('role'),
+            'kind': device_kind(entry),
+            'greenhouse_id': gh_id,
+        }
+
+    def _greenhouse_of(self, device_id: str, entry) -> Optional[str]:
+        gh_id = device_association(entry)
+        if gh_id:
+            return gh_id
+        zones = self._member_of.get(device_id)
+        return min(zones) if zones else None
+
+    def _on_greenhouse(self, gh_id: str, old, new) -> None:
+        with self._lock:
+            self._rebuild(gh_id)
+
+    def _on_device(self, device_id: str, old, new) -> None:
+        if _view_fields(old) == _view_fields(new):
+            # e.g. a status update: nothing the view shows changed
+            return
+        with self._lock:
+            for gh_id in list(self._member_of.get(device_id, ())):
+                self._rebuild(gh_id)
+            self._refresh_device(device_id)
+
+
+_view: Optional[TopologyView] = None
+_view_lock = threading.Lock()
+
+
+def get_topology() -> TopologyView:
+    """The topology view of the catalog's store, built on first use."""
+    global _view
+    if _view is None:
+        with _view_lock:
+            if _view is None:
+                _view = TopologyView(get_store())
+    return _view
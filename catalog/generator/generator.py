@@ -9,6 +9,8 @@ import uuid
 from os import path
 from pathlib import Path
 
+from ..catalog_store import get_store
+
 P = Path(__file__).parent.absolute()
 DEVICES_FILE = P / 'devices.json'
 GREENHOUSES_FILE = P / 'greenhouses.json'
@@ -37,15 +39,13 @@ def register_greenhouse(greenhouse_id):
     It will also be initialized the field for the owner, which is the user that will claim
     this greenhouse.
     """
-    with open(GREENHOUSES_FILE, 'r') as f:
-        greenhouses = json.load(f)
-    greenhouses[greenhouse_id] = {
+    store = get_store()
+    store.greenhouses.put(greenhouse_id, {
         'owner': None,
         'name': None,
         'devices': []
-    }
-    with open(GREENHOUSES_FILE, 'w') as f:
-        f.write(json.dumps(greenhouses))
+    })
+    store.changed()
 
 
 def register_device(device_id, device_type):
@@ -54,13 +54,11 @@ def register_device(device_id, device_type):
     It will also be initialized the field for the owner, which is the user that will claim
     this device.
     """
-    with open(DEVICES_FILE, 'r') as f:
-        devices = json.load(f)
-    devices[device_id] = {
+    store = get_store()
+    store.devices.put(device_id, {
         'owner': None,
         'associated_greenhouse': None,
         'name': None,
         'device_type': device_type
-    }
-    with open(DEVICES_FILE, 'w') as f:
-        f.write(json.dumps(devices))
+    })
+    store.changed()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+
+import cryptography.fernet
+
+from catalog import auth_token, catalog_interface
+from catalog.auth_token import Token, TokenCache
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def test_decrypts_once_and_respects_expiry(self):
+        cache = TokenCache(max_entries=2)
+        crypt = Token.serialize(Token("alice", auth_token.now() + 60))
+        with patch.object(Token, "deserialize", wraps=Token.deserialize) as deserialize:
+            self.assertEqual(cache.get(crypt).username, "alice")
+            self.assertEqual(cache.get(crypt).username, "alice")
+            self.assertEqual(deserialize.call_count, 1)
+            # Past its expiration the entry is dropped and the token found expired
+            with patch.object(auth_token, "now", return_value=auth_token.now() + 120):
+                self.assertTrue(cache.get(crypt).is_expired())
+            self.assertEqual(deserialize.call_count, 2)
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual((cache.hits, cache.misses, cache.expired), (1, 2, 1))
+
+    def test_lru_bound_and_invalid_tokens(self):
+        cache = TokenCache(max_entries=2)
+        tokens = [Token.serialize(Token.generate(f"user_{i}")) for i in range(3)]
+        for t in tokens:
+            cache.get(t)
+        cache.get(tokens[1])
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.hits, 1)
+        with self.assertRaises(cryptography.fernet.InvalidToken):
+            cache.get("not-a-token")
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_interface_shares_the_cache(self):
+        cache = TokenCache()
+        crypt = Token.serialize(Token.generate("alice"))
+        with patch.object(catalog_interface, "token_cache", cache):
+            self.assertTrue(catalog_interface.verify_token(crypt))
+            self.assertEqual(catalog_interface.retrieve_username_by_token(crypt), "alice")
+            self.assertEqual(catalog_interface.retrieve_valid_username(crypt), "alice")
+            self.assertFalse(catalog_interface.verify_token(None))
+        self.assertEqual((cache.misses, cache.hits), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
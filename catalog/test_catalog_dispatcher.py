@@ -0,0 +1,63 @@
+import unittest
+
+from catalog.catalog_dispatcher import (CatalogGetDispatcher, CatalogPostDispatcher, CatalogPutDispatcher,
+                                        CatalogGetRequest, CatalogPostRequest, CatalogPutRequest,
+                                        GET_ROUTES, POST_ROUTES, PUT_ROUTES, Route, RouteTable)
+from catalog.catalog_resolver import GET_HANDLERS, POST_HANDLERS, PUT_HANDLERS
+
+
+class TestRouteTable(unittest.TestCase):
+
+    def test_same_results_as_the_predicate_chain(self):
+        # (dispatcher, path, query, expected request, query after dispatch), as the _is_*_request predicates answered
+        cases = [
+            (CatalogGetDispatcher, ('broker',), {'token': 't'}, CatalogGetRequest.RETRIEVE_BROKER, {'token': 't'}),
+            (CatalogGetDispatcher, ('device_join',), {}, CatalogGetRequest.NOT_FOUND, {}),
+            (CatalogGetDispatcher, ('devices',), {'greenhouse_id': 'gh1'}, CatalogGetRequest.GET_DEVICES,
+             {'greenhouse_id': 'gh1'}),
+            (CatalogGetDispatcher, ('register', 'device'), {'device_id': 'd1'}, CatalogGetRequest.NOT_FOUND,
+             {'device_id': 'd1'}),
+            (CatalogGetDispatcher, ('devices', 'd1', 'config'), {}, CatalogGetRequest.DEVICE_CONFIG, {'device_id': 'd1'}),
+            (CatalogGetDispatcher, ('devices', 'd1', 'config'), {'device_id': 'd2'}, CatalogGetRequest.DEVICE_CONFIG,
+             {'device_id': 'd2'}),
+            (CatalogGetDispatcher, ('greenhouses', 'gh1', 'effects'), {}, CatalogGetRequest.GREENHOUSE_EFFECTS,
+             {'greenhouse_id': 'gh1'}),
+            (CatalogGetDispatcher, ('devices', 'd1', 'unknown'), {}, CatalogGetRequest.NOT_FOUND, {}),
+            (CatalogGetDispatcher, ('greenhouse', 'crop'), {'greenhouse_id': 'gh1', 'crop': 'c'},
+             CatalogGetRequest.NOT_FOUND, {'greenhouse_id': 'gh1', 'crop': 'c'}),
+            (CatalogGetDispatcher, (), {}, CatalogGetRequest.NOT_FOUND, {}),
+            (CatalogPostDispatcher, ('greenhouse', 'crop'), {'greenhouse_id': 'gh1', 'crop': 'c'},
+             CatalogPostRequest.NOT_FOUND, {'greenhouse_id': 'gh1', 'crop': 'c'}),
+            (CatalogPostDispatcher, ('greenhouses',), {}, CatalogPostRequest.CREATE_GREENHOUSE, {}),
+            (CatalogPutDispatcher, ('device', 'status'), {'device_id': 'd1', 'status': 'on'},
+             CatalogPutRequest.NOT_FOUND, {'device_id': 'd1', 'status': 'on'}),
+            (CatalogPutDispatcher, ('actuators', 'a1', 'bind'), {'raspberry_id': 'rb1'}, CatalogPutRequest.ACTUATOR_BIND,
+             {'raspberry_id': 'rb1', 'actuator_id': 'a1'}),
+            # The path parameter is bound before the required keys are checked
+            (CatalogPutDispatcher, ('actuators', 'a1', 'bind'), {}, CatalogPutRequest.NOT_FOUND, {'actuator_id': 'a1'}),
+        ]
+        for dispatcher, path, query, expected, after in cases:
+            with self.subTest(path=path, query=query):
+                query = dict(query)
+                self.assertEqual(dispatcher.dispatch(path=path, query=query), expected)
+                self.assertEqual(query, after)
+
+    def test_every_route_has_a_handler(self):
+        for table, handlers in ((GET_ROUTES, GET_HANDLERS), (POST_ROUTES, POST_HANDLERS), (PUT_ROUTES, PUT_HANDLERS)):
+            for route in list(table._literal.values()) + list(table._patterns.values()):
+                self.assertIn(route.request, handlers, route.pattern)
+
+    def test_literal_routes_win_and_duplicates_are_rejected(self):
+        table = RouteTable([
+            Route('devices/{device_id}/config', CatalogGetRequest.DEVICE_CONFIG),
+            Route('devices/default/config', CatalogGetRequest.GET_CROPS),
+        ], CatalogGetRequest.NOT_FOUND)
+        self.assertEqual(table.dispatch(('devices', 'default', 'config'), {}), CatalogGetRequest.GET_CROPS)
+        self.assertEqual(table.dispatch(('devices', 'd1', 'config'), {}), CatalogGetRequest.DEVICE_CONFIG)
+        with self.assertRaises(ValueError):
+            RouteTable([Route('user', CatalogGetRequest.USER_INFO), Route('user', CatalogGetRequest.USER_INFO)],
+                       CatalogGetRequest.NOT_FOUND)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from catalog import catalog_interface
+from catalog.catalog_store import CatalogStore
+
+
+def _write(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _read(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class TestCatalogStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        d = Path(self.tmp.name)
+        self.files = {name: d / f"{name}.json" for name in ("users", "greenhouses", "devices", "strategies")}
+        _write(self.files["users"], {"alice": {"password": "pw", "greenhouses": ["gh1"]}})
+        _write(self.files["greenhouses"], {"gh1": {"owner": "alice", "name": "Serra", "devices": []}})
+        _write(self.files["devices"], {
+            "d1": {"greenhouse_id": "gh1", "role": "heating_system", "device_type": "actuator"},
+            "d2": {"owner": None, "associated_greenhouse": None, "name": None, "device_type": "sensor"},
+        })
+        _write(self.files["strategies"], {"gh1": {"crop": "tomato", "targets": {}, "controls": {}}})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _store(self, **kwargs):
+        store = CatalogStore(**self.files, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_write_behind_and_index(self):
+        store = self._store(flush_interval_s=3600)
+        self.assertEqual(store.devices.keys_in("gh1"), ["d1"])
+        d2 = store.devices.get("d2")
+        d2["greenhouse_id"] = "gh1"
+        store.devices.put("d2", d2)
+        d1 = store.devices.get("d1")
+        d1["greenhouse_id"] = "gh2"
+        store.devices.put("d1", d1)
+        store.changed()
+        self.assertEqual(store.devices.keys_in("gh1"), ["d2"])
+        self.assertEqual(store.devices.keys_in("gh2"), ["d1"])
+        # Not written yet
+        self.assertNotIn("greenhouse_id", _read(self.files["devices"])["d2"])
+        self.assertEqual(store.pending, 2)
+        self.assertEqual(store.flush(), 1)
+        self.assertEqual(store.flush(), 0)
+        self.assertEqual(_read(self.files["devices"])["d2"]["greenhouse_id"], "gh1")
+        self.assertEqual(list(Path(self.tmp.name).glob("*.tmp")), [])
+
+    def test_concurrent_writers_and_pending_threshold(self):
+        store = self._store(flush_interval_s=3600, max_pending=50)
+
+        def add(n):
+            for i in range(n):
+                with store.users.lock("alice"):
+                    user = store.users.get("alice")
+                    user["greenhouses"].append(f"{threading.get_ident()}-{i}")
+                    store.users.put("alice", user)
+                store.changed()
+
+        threads = [threading.Thread(target=add, args=(25,)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(store.users.get("alice")["greenhouses"]), 101)
+        # 100 changes woke the flusher before its interval
+        deadline = time.monotonic() + 5
+        while store.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        store.flush()
+        self.assertEqual(len(_read(self.files["users"])["alice"]["greenhouses"]), 101)
+
+    def test_interface_goes_through_the_store(self):
+        store = self._store(flush_interval_s=0)
+        with patch.object(catalog_interface, "get_store", return_value=store), \
+                patch.object(catalog_interface.mongo_adapter, "retrieve_greenhouse", return_value=None), \
+                patch.object(catalog_interface.mongo_adapter, "retrieve_device", return_value=None):
+            self.assertTrue(catalog_interface.signup_user("bob", "pw"))
+            self.assertFalse(catalog_interface.signup_user("bob", "pw"))
+            catalog_interface.associate_device("d2", "gh1", "sonda", "alice")
+            self.assertEqual(catalog_interface.retrieve_device_association("d2"), "gh1")
+            self.assertTrue(catalog_interface.update_device_status("d1", "on"))
+
+            strat, err = catalog_interface.update_strategy("gh1", "alice", {"controls": {"lighting": {}}})
+            self.assertEqual((strat, err), (None, "role_not_available:lighting"))
+            strat, err = catalog_interface.update_strategy(
+                "gh1", "alice", {"targets": {"temperature": {"min": 20, "max": 26}}, "controls": {"heating_system": {"on": 1}}})
+            self.assertIsNone(err)
+            self.assertEqual(strat["controls"], {"heating_system": {"on": 1}})
+
+        # Write-through: every change is already on disk
+        self.assertIn("bob", _read(self.files["users"]))
+        self.assertEqual(_read(self.files["greenhouses"])["gh1"]["devices"], ["d2"])
+        self.assertEqual(_read(self.files["devices"])["d1"]["status"], "on")
+        self.assertEqual(_read(self.files["strategies"])["gh1"]["targets"]["temperature"], {"min": 20, "max": 26})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from catalog import catalog_interface
+from catalog.catalog_store import CatalogStore
+from catalog.catalog_topology import TopologyView
+
+LEGEND = {
+    "raspberry": {"measurements": [{"type": "temperature", "unit": "celsius"}]},
+    "dht11": {"measurements": [{"type": "temperature", "unit": "celsius"}, {"type": "humidity", "unit": "%"}]},
+    "pH_sensor": {"measurements": [{"type": "pH", "unit": "pH"}]},
+    "heating_system": {"measurements": [{"type": "temperature", "unit": "celsius"}]},
+}
+
+
+class TestTopologyView(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        docs = {
+            "users": {"alice": {"password": "pw", "greenhouses": ["gh1"]}, "bob": {"password": "pw", "greenhouses": []}},
+            "greenhouses": {
+                "gh1": {"owner": "alice", "name": "Serra", "devices": ["rb1", "th1"]},
+                "gh2": {"owner": None, "name": None, "devices": []},
+            },
+            "devices": {
+                "rb1": {"owner": "alice", "associated_greenhouse": "gh1", "name": "rb", "device_type": "raspberry"},
+                "th1": {"owner": "alice", "associated_greenhouse": "gh1", "name": "sonda", "device_type": "dht11"},
+                "heat1": {"greenhouse_id": "gh1", "name": "stufa", "device_type": "heating_system"},
+                "ph1": {"owner": None, "associated_greenhouse": None, "name": None, "device_type": "pH_sensor"},
+            },
+            "strategies": {},
+        }
+        files = {}
+        for name, doc in docs.items():
+            files[name] = Path(tmp.name) / f"{name}.json"
+            with open(files[name], "w") as f:
+                json.dump(doc, f)
+        self.store = CatalogStore(**files, flush_interval_s=3600)
+        self.addCleanup(self.store.close)
+        self.view = TopologyView(self.store, legend=LEGEND)
+
+    def test_built_from_the_store(self):
+        zone = self.view.zone("gh1")
+        self.assertEqual(zone["raspberries"], ["rb1"])
+        self.assertEqual(zone["sensors"], ["th1"])
+        # Associated through greenhouse_id only, not in the greenhouse's list: not a member
+        self.assertEqual(zone["actuators"], [])
+        self.assertEqual(zone["device_ids"], ["rb1", "th1"])
+        self.assertEqual(zone["missing"], [])
+        self.assertEqual(zone["measurements"], ["humidity", "temperature"])
+        self.assertEqual(zone["devices"][1], {**LEGEND["dht11"], "id": "th1", "name": "sonda", "type": "dht11"})
+        self.assertEqual(self.view.device("heat1")["kind"], "actuator")
+        self.assertEqual(self.view.device("heat1")["greenhouse_id"], "gh1")
+        self.assertIsNone(self.view.device("ph1")["greenhouse_id"])
+
+    def test_follows_association_and_registration_writes(self):
+        with patch.object(catalog_interface, "get_store", return_value=self.store), \
+                patch.object(catalog_interface, "get_topology", return_value=self.view):
+            catalog_interface.associate_device("ph1", "gh1", "ph", "alice")
+            self.assertEqual(self.view.zone("gh1")["measurements"], ["humidity", "pH", "temperature"])
+            self.assertEqual(self.view.device("ph1")["greenhouse_id"], "gh1")
+
+            # A status change does not touch the view
+            rebuilds = self.view.rebuilds
+            catalog_interface.update_device_status("th1", "on")
+            self.assertEqual(self.view.rebuilds, rebuilds)
+
+            # Listing a device, then renaming it, rebuilds its greenhouse
+            self.store.greenhouses.put("gh2", {"owner": None, "name": None, "devices": ["heat1"]})
+            self.assertEqual(self.view.zone("gh2")["actuators"], ["heat1"])
+            heat = self.store.devices.get("heat1")
+            heat["name"] = "stufa 2"
+            self.store.devices.put("heat1", heat)
+            self.assertEqual(self.view.zone("gh2")["devices"][0]["name"], "stufa 2")
+            self.assertEqual(self.view.zone("gh1")["actuators"], [])
+
+            self.store.greenhouses.put("gh3", {"owner": None, "name": None, "devices": []})
+            self.assertEqual(self.view.zone("gh3")["device_ids"], [])
+
+            greenhouses = catalog_interface.retrieve_greenhouses("alice")
+            self.assertEqual([gh["id"] for gh in greenhouses], ["gh1"])
+            self.assertEqual([d["id"] for d in greenhouses[0]["devices"]], ["rb1", "th1", "ph1"])
+            device, err = catalog_interface.retrieve_device_context("rb1", "alice")
+            self.assertEqual((device["greenhouse_id"], err), ("gh1", None))
+            self.assertEqual(catalog_interface.retrieve_device_context("rb1", "bob"), (None, "forbidden"))
+            self.assertEqual(catalog_interface.retrieve_device_context("nope", "alice"), (None, "device_not_found"))
+            zones = catalog_interface.retrieve_zones("alice")
+            self.assertEqual([(z["greenhouse_id"], z["raspberries"]) for z in zones], [("gh1", ["rb1"])])
+
+
+    def test_unregistered_devices(self):
+        with patch.object(catalog_interface, "get_store", return_value=self.store), \
+                patch.object(catalog_interface, "get_topology", return_value=self.view):
+            gh1 = self.store.greenhouses.get("gh1")
+            gh1["devices"].append("rb9")
+            self.store.greenhouses.put("gh1", gh1)
+            self.assertEqual(self.view.zone("gh1")["missing"], ["rb9"])
+            # as when devices.json was read directly
+            with self.assertRaises(KeyError):
+                catalog_interface.retrieve_greenhouses("alice")
+
+            # registering it completes the greenhouse
+            self.store.devices.put("rb9", {"owner": "alice", "associated_greenhouse": "gh1", "name": "rb 9",
+                                           "device_type": "raspberry"})
+            self.assertEqual(self.view.zone("gh1")["raspberries"], ["rb1", "rb9"])
+            greenhouses = catalog_interface.retrieve_greenhouses("alice")
+            self.assertEqual([d["id"] for d in greenhouses[0]["devices"]], ["rb1", "th1", "rb9"])
+
+            users = self.store.users.get("bob")
+            users["greenhouses"] = ["gh404"]
+            self.store.users.put("bob", users)
+            with self.assertRaises(KeyError):
+                catalog_interface.retrieve_greenhouses("bob")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,14 @@
-import json
-import time
 import logging
 import threading
 from typing import Dict, List
 from pathlib import Path
 from pprint import pformat
-from datetime import datetime, timezone
+from datetime import timezone
 
 import pandas as pd
+from greenbox.utils.clock import SYSTEM_CLOCK
 from greenbox.utils.mqtt import MyMQTT
+from greenbox.utils.serializers import decode_payload
 from greenbox.utils import catalog_client
 
 class Actuator:
@@ -17,9 +17,24 @@ class Actuator:
     It connects to MQTT, listens for commands on its specific topic,
     and publishes its simulated state. It uses the global logger,
     which is configured by the script that launches it.
+
+    With publisher_thread=False no thread is started when it turns on: the
+    caller (the simulation engine) calls publish_state() every
+    publish_period_s while is_on.
     """
 
-    def __init__(self, device_id: str, system: str, gh_id: str, rb_id: str, broker_ip: str, broker_port: int):
+    def __init__(
+        self,
+        device_id: str,
+        system: str,
+        gh_id: str,
+        rb_id: str,
+        broker_ip: str,
+        broker_port: int,
+        mqtt_factory=None,
+        clock=None,
+        publisher_thread: bool = True,
+    ):
         self.device_id = device_id
         self.system = system
         self.gh_id = gh_id
@@ -42,7 +57,7 @@ class Actuator:
         self.DATA_TOPIC = f"/{self.gh_id}/{self.rb_id}/actuators/{self.system}/{self.device_id}/data"
 
         # MQTT wrapper
-        self.mqtt = MyMQTT(
+        self.mqtt = (mqtt_factory or MyMQTT)(
             clientID=self.device_id,
             broker=broker_ip,
             port=broker_port,
@@ -54,6 +69,8 @@ class Actuator:
         self.publish_period_s = 5.0
         self._is_on = False
         self._on_epoch = None
+        self.clock = clock or SYSTEM_CLOCK
+        self.publisher_thread = publisher_thread
         self._stop_event = threading.Event()
         self._pub_thread = None
         self._lock = threading.Lock()
@@ -97,14 +114,9 @@ class Actuator:
     def notify(self, topic, payload):
         """Handle received MQTT command messages."""
         try:
-            payload_str = (
-                payload.decode("utf-8", errors="ignore")
-                if isinstance(payload, (bytes, bytearray))
-                else str(payload)
-            )
-            obj = json.loads(payload_str)
+            obj = decode_payload(payload)
             if not isinstance(obj, dict) or "cmd" not in obj:
-                logging.warning(f"[{self.device_id}] Invalid format: {payload_str!r}")
+                logging.warning(f"[{self.device_id}] Invalid format: {payload!r}")
                 return
 
             cmd = str(obj["cmd"]).upper()
@@ -123,8 +135,8 @@ class Actuator:
             else:
                 logging.warning(f"[{self.device_id}] Unsupported 'cmd': {cmd!r}")
 
-        except json.JSONDecodeError:
-            logging.warning(f"[{self.device_id}] Invalid JSON payload: {payload!r}")
+        except ValueError:
+            logging.warning(f"[{self.device_id}] Invalid payload: {payload!r}")
         except Exception as e:
             logging.error(f"[{self.device_id}] Error in notify: {e}", exc_info=True)
 
@@ -135,19 +147,20 @@ class Actuator:
                 prev = self.level
                 self.set_level(level)
                 if self._is_on and self.level != prev:
-                    self._on_epoch = time.time()
+                    self._on_epoch = self.clock.time()
                     logging.info(f"[{self.device_id}] Level changed to {self.level}%.")
                     return
             if self._is_on:
                 return
 
             self._is_on = True
-            self._on_epoch = time.time()
+            self._on_epoch = self.clock.time()
             self._stop_event.clear()
-            self._pub_thread = threading.Thread(
-                target=self._publisher_loop, name=f"{self.device_id}-pub", daemon=True
-            )
-            self._pub_thread.start()
+            if self.publisher_thread:
+                self._pub_thread = threading.Thread(
+                    target=self._publisher_loop, name=f"{self.device_id}-pub", daemon=True
+                )
+                self._pub_thread.start()
             logging.info(f"[{self.device_id}] State: ON (level={self.level}%).")
 
     def turn_off(self):
@@ -166,35 +179,36 @@ class Actuator:
             self.set_level(0)
         logging.info(f"[{self.device_id}] State: OFF. Publishing stopped.")
 
+    @property
+    def is_on(self) -> bool:
+        return self._is_on
+
+    def publish_state(self):
+        """Publish the current level and its effects since the actuator was turned on."""
+        now = self.clock.time()
+        with self._lock:
+            elapsed = int(now - self._on_epoch) if self._on_epoch else 0
+            lvl = self.level
+        effects = self.apply(lvl, float(elapsed)) # Pass elapsed as float
+        ts_iso = self.clock.now(timezone.utc).isoformat()
+        payload = {
+            "id": self.device_id,
+            "timestamp": ts_iso,
+            "seconds_since_on": elapsed,
+            "system": self.system,
+            "level": lvl,
+        } | effects
+        # Ensure water_consumption is always present, defaulting to 0.0 if not provided by effects
+        payload.setdefault("water_consumption", 0.0)
+        try:
+            self.mqtt.MyPublish(self.DATA_TOPIC, payload)
+        except Exception as e:
+            logging.warning(f"[{self.device_id}] Publish error: {e}")
+
     def _publisher_loop(self):
         """Periodic data publishing loop."""
-        # next_ts = time.time() # No longer needed for elapsed calculation
-        # last_ts = next_ts # No longer needed for elapsed calculation
         while not self._stop_event.is_set():
-            now = time.time()
-            # dt = now - last_ts # No longer needed
-            # last_ts = now # No longer needed
-            with self._lock:
-                elapsed = int(now - self._on_epoch) if self._on_epoch else 0
-                lvl = self.level
-            effects = self.apply(lvl, float(elapsed)) # Pass elapsed as float
-            ts_iso = datetime.now(timezone.utc).isoformat()
-            payload = {
-                "id": self.device_id,
-                "timestamp": ts_iso,
-                "seconds_since_on": elapsed,
-                "system": self.system,
-                "level": lvl,
-            } | effects
-            # Ensure water_consumption is always present, defaulting to 0.0 if not provided by effects
-            payload.setdefault("water_consumption", 0.0)
-            try:
-                self.mqtt.MyPublish(self.DATA_TOPIC, payload)
-            except Exception as e:
-                logging.warning(f"[{self.device_id}] Publish error: {e}")
-
-            # next_ts += self.publish_period_s # No longer needed if using sleep
-            # delay = max(0.0, next_ts - time.time()) # No longer needed
+            self.publish_state()
             if self._stop_event.wait(timeout=self.publish_period_s): # Simplified sleep
                 break
 
@@ -0,0 +1,142 @@
+"""
+Benchmark: Optimizer search strategies.
+
+    python -m greenbox.controller.bench_optimizer [--states 200]
+    python -m greenbox.controller.bench_optimizer --scaling [--states 20]
+
+The default run compares the vectorized engine with the itertools.product
+loop on sim/effects/effects.csv; --scaling runs the branch-and-bound search
+on synthetic effects tables with 5 to 12 systems.
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from greenbox.controller.optimizer import Optimizer
+from greenbox.sim.thresholds.thresholds import Threshold
+
+EFFECTS_CSV = Path(__file__).resolve().parents[1] / "sim" / "effects" / "effects.csv"
+
+THRESHOLDS = {
+    "temperature": Threshold(18, 26, 3),
+    "humidity": Threshold(60, 80, 5),
+    "light": Threshold(300, 800, 50),
+    "soil_humidity": Threshold(60, 95, 5),
+    "pH": Threshold(5, 6.5, 0.5),
+}
+
+
+SYNTHETIC_METRICS = ("temperature", "humidity", "soil_humidity")
+SYNTHETIC_SCALE = {"temperature": 0.015, "humidity": 0.15, "soil_humidity": 0.03}
+
+
+def synthetic_effects(n_systems: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Effects table shaped like effects.csv: 0/25/50/75/100% levels, an empty
+    0% row, effects and consumptions linear in the level.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for s in range(n_systems):
+        system = f"system_{s:02d}"
+        touched = rng.sample(SYNTHETIC_METRICS, rng.randint(1, 2))
+        rates = {m: rng.choice((-1, 1)) * rng.uniform(0.2, 1.0) * SYNTHETIC_SCALE[m] for m in touched}
+        energy = rng.uniform(5, 100)
+        water = rng.choice((0.0, rng.uniform(0.01, 0.4)))
+        rows.append({"system": system, "level": "0%"})
+        for lvl in (25, 50, 75, 100):
+            f = lvl / 100
+            row = {"system": system, "level": f"{lvl}%", "energy_consumption": energy * f}
+            if water:
+                row["water_consumption"] = water * f
+            row.update({m: r * f for m, r in rates.items()})
+            rows.append(row)
+    columns = ["system", "level", "energy_consumption", "water_consumption", *SYNTHETIC_METRICS, "light", "pH"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def random_states(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        {
+            "temperature": {"median": rng.uniform(10, 34)},
+            "humidity": {"median": rng.uniform(40, 100)},
+            "soil_humidity": {"median": rng.uniform(40, 100)},
+        }
+        for _ in range(n)
+    ]
+
+
+def time_decisions(opt: Optimizer, states):
+    t0 = time.perf_counter()
+    out = [opt.decide(s, current_actuator_state={}) for s in states]
+    return time.perf_counter() - t0, out
+
+
+def scaling(n_states: int):
+    """Branch-and-bound on synthetic tables; exhaustive reference while it fits in memory."""
+    states = random_states(n_states, seed=1)
+    print(f"{'systems':>7} {'combos':>12} {'vec MB':>8} {'vec ms':>9} {'bnb ms':>9} {'nodes':>9} {'mismatch':>8}")
+    for n_systems in range(5, 13):
+        effects = synthetic_effects(n_systems, seed=n_systems)
+        bnb = Optimizer(THRESHOLDS, effects, search="bnb")
+        combos = bnb._engine.size
+        # net (C x M) + energy + water + levels (C x A)
+        vec_mb = combos * (8 * len(bnb.metrics) + 16 + 8 * len(bnb.actuators)) / 1e6
+
+        t_bnb, res_bnb = 0.0, []
+        nodes = 0
+        for s in states:
+            t0 = time.perf_counter()
+            res_bnb.append(bnb.decide(s, current_actuator_state={}))
+            t_bnb += time.perf_counter() - t0
+            nodes += bnb.nodes_visited or 0
+
+        vec_ms, mismatch = "-", "-"
+        if combos <= Optimizer.VECTORIZED_MAX_COMBOS * 10:
+            vec = Optimizer(THRESHOLDS, effects, search="vectorized")
+            t_vec, res_vec = time_decisions(vec, states)
+            vec_ms = f"{t_vec / len(states) * 1e3:.3f}"
+            mismatch = str(sum(a != b for a, b in zip(res_vec, res_bnb)))
+
+        print(
+            f"{n_systems:>7} {combos:>12} {vec_mb:>8.1f} {vec_ms:>9} "
+            f"{t_bnb / len(states) * 1e3:>9.3f} {nodes // len(states):>9} {mismatch:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimizer search benchmark.")
+    parser.add_argument("--states", type=int, default=200, help="Number of random zone states.")
+    parser.add_argument("--scaling", action="store_true", help="Branch-and-bound scaling on 5-12 synthetic systems.")
+    args = parser.parse_args()
+
+    if args.scaling:
+        scaling(args.states)
+        return
+
+    effects = pd.read_csv(EFFECTS_CSV)
+    states = random_states(args.states)
+
+    t0 = time.perf_counter()
+    vectorized = Optimizer(THRESHOLDS, effects, search="vectorized")
+    build_s = time.perf_counter() - t0
+    product = Optimizer(THRESHOLDS, effects, search="product")
+
+    t_prod, res_prod = time_decisions(product, states)
+    t_vec, res_vec = time_decisions(vectorized, states)
+    mismatches = sum(a != b for a, b in zip(res_prod, res_vec))
+
+    print(f"systems={len(vectorized.actuators)} combos={vectorized._engine.size} states={len(states)}")
+    print(f"engine build      : {build_s * 1e3:8.2f} ms (once per zone)")
+    print(f"product loop      : {t_prod / len(states) * 1e3:8.3f} ms/decision")
+    print(f"vectorized engine : {t_vec / len(states) * 1e3:8.3f} ms/decision")
+    print(f"speedup           : {t_prod / t_vec:8.1f}x")
+    print(f"mismatches        : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
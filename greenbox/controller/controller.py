@@ -1,12 +1,23 @@
-import json
+import copy
+import hashlib
 import logging
-from typing import Any, Dict, Tuple
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
 from dataclasses import dataclass
 
+import pandas as pd
+
+from greenbox.utils.clock import SYSTEM_CLOCK
 from greenbox.utils.mqtt import MyMQTT
+from greenbox.utils.serializers import decode_payload
 # Importa il modulo catalog_client in modo unificato
 from greenbox.utils import catalog_client
 from greenbox.controller.optimizer import Optimizer, LightOptimizer, PhMonitor
+from greenbox.controller.dispatcher import ZoneDispatcher
+from greenbox.sim.thresholds.thresholds import Threshold
 
 
 @dataclass
@@ -15,19 +26,148 @@ class ZoneOptimizers:
     main: Optimizer
     light: LightOptimizer
     ph: PhMonitor
+    fingerprint: str = ""
+    version: Tuple[str, ...] = ()
+
+
+def config_fingerprint(thresholds: Dict[str, Threshold], effects: pd.DataFrame) -> str:
+    """Stable digest of a zone's thresholds/effects, used to detect config changes."""
+    h = hashlib.sha1()
+    h.update(repr(sorted(thresholds.items())).encode())
+    h.update(effects.to_csv(index=False).encode())
+    return h.hexdigest()
+
+
+class DecisionCache:
+    """
+    Per-zone memo of main optimizer decisions.
+
+    Keys are the zone's metric medians quantized to `resolution` times each
+    Threshold deadband (or band width when the deadband is 0), plus the
+    current actuator state. Each zone keeps an LRU of at most `max_entries`
+    decisions that expire after `ttl_s` seconds; a zone's entries are dropped
+    whenever its thresholds/effects fingerprint changes.
+    """
+
+    def __init__(self, resolution: float = 0.1, ttl_s: float = 60.0, max_entries: int = 128, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.resolution = float(resolution)
+        self.ttl_s = float(ttl_s)
+        self.max_entries = int(max_entries)
+        self._zones: Dict[Tuple[str, str], "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]"] = {}
+        self._fingerprints: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.miss_time_s = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.resolution > 0 and self.max_entries > 0 and self.ttl_s > 0
+
+    def key(
+        self,
+        optimizer: Optimizer,
+        metrics_payload: Dict[str, Dict[str, Any]],
+        actuator_state: Dict[str, Any],
+    ) -> Hashable:
+        cur = optimizer._current_from_payloads(metrics_payload)
+        q = []
+        for m in optimizer.metrics:
+            th = optimizer.thresholds[m]
+            step = self.resolution * (th.deadband if th.deadband > 0 else (th.upper - th.lower))
+            x = cur.get(m, th.center)
+            q.append(round(x / step) if step > 0 else x)
+        return tuple(q), tuple(sorted((actuator_state or {}).items()))
+
+    def bind(self, zone_key: Tuple[str, str], fingerprint: str) -> None:
+        """Associate the zone with a config fingerprint; a different one drops its entries."""
+        with self._lock:
+            if self._fingerprints.get(zone_key) != fingerprint:
+                if zone_key in self._zones:
+                    self.invalidations += 1
+                self._zones.pop(zone_key, None)
+                self._fingerprints[zone_key] = fingerprint
+
+    def invalidate(self, zone_key: Optional[Tuple[str, str]] = None) -> None:
+        """Drop the entries of one zone, or of every zone."""
+        with self._lock:
+            keys = list(self._zones) if zone_key is None else [zone_key]
+            for k in keys:
+                if self._zones.pop(k, None) is not None:
+                    self.invalidations += 1
+                self._fingerprints.pop(k, None)
+
+    def get(self, zone_key: Tuple[str, str], key: Hashable) -> Optional[Dict[str, Any]]:
+        now = self.clock.monotonic()
+        with self._lock:
+            entries = self._zones.get(zone_key)
+            item = entries.get(key) if entries is not None else None
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, result = item
+            if now - stored_at > self.ttl_s:
+                del entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(result)
+
+    def put(self, zone_key: Tuple[str, str], key: Hashable, result: Dict[str, Any], elapsed_s: float = 0.0) -> None:
+        with self._lock:
+            self.miss_time_s += elapsed_s
+            entries = self._zones.setdefault(zone_key, OrderedDict())
+            entries[key] = (self.clock.monotonic(), copy.deepcopy(result))
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters across all zones; saved_cpu_s estimates optimizer time avoided by hits."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss = self.miss_time_s / self.misses if self.misses else 0.0
+            return {
+                "zones": len(self._zones),
+                "entries": sum(len(e) for e in self._zones.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "saved_cpu_s": self.hits * avg_miss,
+            }
 
 
 class Controller:
-    """Bridge between statistics and actuators/alerts (multi-tenant, zone-aware)."""
+    """
+    Bridge between statistics and actuators/alerts (multi-tenant, zone-aware).
 
-    def __init__(self):
+    The simulation engine passes an MQTT client factory (no broker lookup in
+    the catalog) and its clock.
+    """
+
+    def __init__(self, mqtt_factory=None, clock=None):
         # Chiama direttamente le funzioni necessarie invece di log_to_catalog
-        broker_ip, broker_port = catalog_client.get_broker_info()
+        if mqtt_factory is None:
+            broker_ip, broker_port = catalog_client.get_broker_info()
+        else:
+            broker_ip, broker_port = None, None
         self.broker = broker_ip
         self.port = broker_port
+        self.clock = clock or SYSTEM_CLOCK
 
         self.clientID = "controller_all"
-        self.mqtt = MyMQTT(
+        self.mqtt = (mqtt_factory or MyMQTT)(
             self.clientID, broker=self.broker, port=self.port, notifier=self
         )
 
@@ -37,7 +177,30 @@ class Controller:
         # Mappa per tenere traccia dello stato degli attuatori per zona (per evitare comandi ridondanti)
         self.last_actuator_commands: Dict[Tuple[str, str], Dict[str, Any]] = {}
 
+        # Strategia di ricerca dell'ottimizzatore ("auto" sceglie per zona in base al numero di combinazioni)
+        self.optimizer_search = os.getenv("OPTIMIZER_SEARCH", "auto")
+
+        # Cache delle decisioni dell'ottimizzatore principale (resolution=0 la disabilita)
+        self.decision_cache = DecisionCache(
+            resolution=float(os.getenv("DECISION_CACHE_RESOLUTION", "0.1")),
+            ttl_s=float(os.getenv("DECISION_CACHE_TTL_S", "60")),
+            max_entries=int(os.getenv("DECISION_CACHE_SIZE", "128")),
+            clock=self.clock,
+        )
+
+        # Con CONTROLLER_WORKERS > 0 gli snapshot vengono elaborati da un pool di thread
+        # (partizionato per zona, con coalescenza degli snapshot superati) invece che
+        # direttamente sul thread di rete di paho.
+        workers = int(os.getenv("CONTROLLER_WORKERS", "0"))
+        self.dispatcher: Optional[ZoneDispatcher] = (
+            ZoneDispatcher(self._process_snapshot, workers=workers, name=self.clientID)
+            if workers > 0
+            else None
+        )
+
     def start(self):
+        if self.dispatcher is not None:
+            self.dispatcher.start()
         # Il controller si iscrive ora ai topic di snapshot per ogni zona
         self.mqtt.start()
         # Topic: /{greenhouse_id}/{raspberry_id}/statistics/state
@@ -45,21 +208,35 @@ class Controller:
 
     def stop(self):
         self.mqtt.stop()
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
 
     def _get_or_create_optimizers(self, gh_id: str, rb_id: str) -> ZoneOptimizers:
         """
         Recupera dalla cache o crea un nuovo set di ottimizzatori per la zona (gh_id, rb_id).
+        Gli ottimizzatori vengono ricreati solo se thresholds/effects sono cambiati
+        (catalog_client.config_version, servito dalla cache delle configurazioni).
         """
         zone_key = (gh_id, rb_id)
-        if zone_key in self.optimizer_cache:
-            return self.optimizer_cache[zone_key]
+        version = catalog_client.config_version(gh_id)
+        cached = self.optimizer_cache.get(zone_key)
+        if cached is not None and cached.version == version:
+            return cached
 
-        logging.info(
-            "[%s] No optimizer found for zone '%s/%s'. Creating new instance...",
-            self.clientID,
-            gh_id,
-            rb_id,
-        )
+        if cached is None:
+            logging.info(
+                "[%s] No optimizer found for zone '%s/%s'. Creating new instance...",
+                self.clientID,
+                gh_id,
+                rb_id,
+            )
+        else:
+            logging.info(
+                "[%s] Thresholds/effects of zone '%s/%s' changed. Rebuilding optimizers...",
+                self.clientID,
+                gh_id,
+                rb_id,
+            )
 
         # Usa il catalog_client unificato per caricare le configurazioni
         thresholds = catalog_client.get_thresholds_config(gh_id)
@@ -70,30 +247,69 @@ class Controller:
             thresholds_config=thresholds,
             effects_config_df=effects,
             weights={"energy": 1.0, "water": 1.0},
+            search=self.optimizer_search,
         )
         light_opt = LightOptimizer(
             thresholds_config=thresholds, effects_config_df=effects
         )
         ph_mon = PhMonitor(thresholds_config=thresholds)
 
-        new_optimizers = ZoneOptimizers(main=main_opt, light=light_opt, ph=ph_mon)
+        new_optimizers = ZoneOptimizers(
+            main=main_opt,
+            light=light_opt,
+            ph=ph_mon,
+            fingerprint=config_fingerprint(thresholds, effects),
+            version=version,
+        )
         self.optimizer_cache[zone_key] = new_optimizers
+        self.decision_cache.bind(zone_key, new_optimizers.fingerprint)
         logging.info(
-            "[%s] Successfully created optimizer instance for zone '%s/%s'.",
+            "[%s] Successfully created optimizer instance for zone '%s/%s' (search=%s).",
             self.clientID,
             gh_id,
             rb_id,
+            main_opt.search,
         )
 
         return new_optimizers
 
+    def invalidate_zone(self, gh_id: str, rb_id: str) -> None:
+        """
+        Forget the optimizers and cached decisions of a zone, e.g. after its
+        thresholds or effects changed in a way the config cache cannot see
+        yet; the configs are reloaded and the optimizers rebuilt on the next
+        snapshot.
+        """
+        zone_key = (gh_id, rb_id)
+        catalog_client.invalidate_config(gh_id)
+        self.optimizer_cache.pop(zone_key, None)
+        self.decision_cache.invalidate(zone_key)
+
+    def _decide_main(self, zone_key: Tuple[str, str], optimizers: ZoneOptimizers, metrics_payload: Dict[str, Any], current_actuator_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the main optimizer, reusing a cached decision for an equivalent quantized state."""
+        cache = self.decision_cache
+        key = None
+        if cache.enabled:
+            key = cache.key(optimizers.main, metrics_payload, current_actuator_state)
+            cached = cache.get(zone_key, key)
+            if cached is not None:
+                return cached
+
+        t0 = time.perf_counter()
+        res = optimizers.main.decide(metrics_payload, current_actuator_state=current_actuator_state)
+        if key is not None:
+            cache.put(zone_key, key, res, elapsed_s=time.perf_counter() - t0)
+        if optimizers.main.nodes_visited is not None:
+            logging.debug("[%s] Zone %s/%s - Branch-and-bound visited %d nodes.", self.clientID, zone_key[0], zone_key[1], optimizers.main.nodes_visited)
+        return res
+
     def notify(self, topic: str, payload: str):
         """
         Gestisce i messaggi MQTT di stato aggregato per zona.
-        Si aspetta un payload JSON completo per una specifica zona.
+        Si aspetta un payload completo per una specifica zona (JSON, o MessagePack/CBOR).
         """
         try:
-            data = json.loads(payload)
+            data = decode_payload(payload)
 
             gh_id = data.get("greenhouse_id")
             rb_id = data.get("raspberry_id")
@@ -106,13 +322,32 @@ class Controller:
                 )
                 return
 
+            if self.dispatcher is not None:
+                self.dispatcher.submit((gh_id, rb_id), (topic, data))
+            else:
+                self._process_snapshot((gh_id, rb_id), (topic, data))
+
+        except Exception as e:
+            logging.error(
+                "[%s] Unhandled exception in notify for topic %s with payload %s: %s",
+                self.clientID,
+                topic,
+                payload,
+                e,
+                exc_info=True,
+            )
+
+    def _process_snapshot(self, zone_key: Tuple[str, str], item: Tuple[str, Dict[str, Any]]):
+        """Run the optimizers for one zone snapshot and publish the resulting commands/alerts."""
+        topic, data = item
+        gh_id, rb_id = zone_key
+        try:
             optimizers = self._get_or_create_optimizers(gh_id, rb_id)
             metrics_payload = data.get("metrics", {})
-            zone_key = (gh_id, rb_id)
             current_actuator_state = self.last_actuator_commands.get(zone_key, {}) # Recupera l'ultimo stato noto
             
             # --- Gestione Ottimizzatore Principale ---
-            res_main = optimizers.main.decide(metrics_payload, current_actuator_state=current_actuator_state)
+            res_main = self._decide_main(zone_key, optimizers, metrics_payload, current_actuator_state)
             if res_main and res_main.get("mode") != "hold":
                 actions = res_main.get("actions", {})
                 
@@ -155,10 +390,10 @@ class Controller:
 
         except Exception as e:
             logging.error(
-                "[%s] Unhandled exception in notify for topic %s with payload %s: %s",
+                "[%s] Unhandled exception processing snapshot from topic %s with payload %s: %s",
                 self.clientID,
                 topic,
-                payload,
+                data,
                 e,
                 exc_info=True,
             )
\ No newline at end of file
@@ -0,0 +1,111 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class ZoneDispatcher:
+    """
+    Bounded worker pool that processes per-zone items off the MQTT thread.
+
+    Each zone key is pinned to one worker (hash partitioning), so a zone's
+    items are handled strictly in arrival order. A zone holds at most one
+    pending item: when a newer item arrives before the previous one was
+    picked up, the stale one is dropped (coalescing). Queue depth is
+    therefore bounded by the number of zones.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Hashable, Any], None],
+        workers: int = 4,
+        name: str = "zone-worker",
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self._handler = handler
+        self._name = name
+        self._queues: List["queue.SimpleQueue[Optional[Hashable]]"] = [
+            queue.SimpleQueue() for _ in range(workers)
+        ]
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+        # zone -> (item, enqueue time) not yet picked up by its worker
+        self._pending: Dict[Hashable, Tuple[Any, float]] = {}
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._lag: Dict[Hashable, Dict[str, float]] = {}
+
+    @property
+    def workers(self) -> int:
+        return len(self._queues)
+
+    def _partition(self, zone_key: Hashable) -> int:
+        return hash(zone_key) % len(self._queues)
+
+    def start(self) -> None:
+        for i, q in enumerate(self._queues):
+            t = threading.Thread(
+                target=self._worker, args=(q,), name=f"{self._name}-{i}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Let the workers finish the items already picked up, then join them."""
+        for q in self._queues:
+            q.put(None)
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def submit(self, zone_key: Hashable, item: Any) -> None:
+        """Queue an item for its zone, replacing a pending stale one."""
+        with self._lock:
+            self.submitted += 1
+            if zone_key in self._pending:
+                # The zone is already queued: its worker will pick up the newest item
+                self._pending[zone_key] = (item, self._pending[zone_key][1])
+                self.dropped += 1
+                return
+            self._pending[zone_key] = (item, time.monotonic())
+        self._queues[self._partition(zone_key)].put(zone_key)
+
+    def _worker(self, q: "queue.SimpleQueue[Optional[Hashable]]") -> None:
+        while True:
+            zone_key = q.get()
+            if zone_key is None:
+                return
+            with self._lock:
+                item, enqueued = self._pending.pop(zone_key)
+                lag = time.monotonic() - enqueued
+                zl = self._lag.setdefault(zone_key, {"last_s": 0.0, "max_s": 0.0})
+                zl["last_s"] = lag
+                zl["max_s"] = max(zl["max_s"], lag)
+            try:
+                self._handler(zone_key, item)
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                logging.exception("[%s] Handler error for zone %s", self._name, zone_key)
+            with self._lock:
+                self.processed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, drop counts and per-zone lag (seconds from enqueue to pickup)."""
+        with self._lock:
+            return {
+                "workers": len(self._queues),
+                "queue_depth": len(self._pending),
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "max_lag_s": max((z["max_s"] for z in self._lag.values()), default=0.0),
+                "zone_lag_s": {k: dict(v) for k, v in self._lag.items()},
+            }
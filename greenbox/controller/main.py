@@ -1,4 +1,5 @@
 import logging
+import os
 import time
 from dotenv import load_dotenv
 from greenbox.utils.logging import setup_logger
@@ -12,10 +13,19 @@ def main():
     ctrl = Controller()
     setup_logger("controller")
 
+    stats_period_s = float(os.getenv("CONTROLLER_STATS_PERIOD_S", "60"))
     try:
         ctrl.start()
+        last_stats = time.monotonic()
         while True:
             time.sleep(1)
+            if time.monotonic() - last_stats >= stats_period_s:
+                last_stats = time.monotonic()
+                logging.info("Decision cache stats: %s", ctrl.decision_cache.stats())
+                if ctrl.dispatcher is not None:
+                    stats = ctrl.dispatcher.stats()
+                    stats.pop("zone_lag_s")
+                    logging.info("Dispatcher stats: %s", stats)
     except KeyboardInterrupt:
         logging.info("Interrupted, shutting down controller...")
     finally:
@@ -4,6 +4,7 @@ import math
 import pandas as pd
 
 from greenbox.sim.thresholds.thresholds import Threshold
+from greenbox.controller.search import VectorizedSearch, BranchAndBoundSearch
 
 
 class Optimizer:
@@ -12,15 +13,27 @@ class Optimizer:
       - Derives per-metric net derivatives from actuator effects.
       - Finds minimal time T to re-enter band for all out-of-band metrics.
       - Among feasible combos, minimizes weighted energy/water over T.
+
+    Search strategies (all return the same optimum):
+      - "vectorized": precompiled NumPy evaluation of every combo.
+      - "bnb": pruned best-first branch-and-bound, for many actuator systems.
+      - "product": reference itertools.product loop over _time_to_band.
+      - "auto": "vectorized" up to VECTORIZED_MAX_COMBOS combos, "bnb" above (default).
     """
 
+    SEARCH_STRATEGIES = ("auto", "vectorized", "bnb", "product")
+    VECTORIZED_MAX_COMBOS = 200_000
+
     def __init__(
         self,
         thresholds_config: Dict[str, Threshold],
         effects_config_df: pd.DataFrame,
         *,
         weights: Dict[str, float] | None = None,
+        search: str = "auto",
     ) -> None:
+        if search not in self.SEARCH_STRATEGIES:
+            raise ValueError(f"Unsupported search strategy '{search}'")
 
         self.thresholds = thresholds_config
         self.metrics: List[str] = [
@@ -51,6 +64,30 @@ class Optimizer:
         self.w_energy = float(w.get("energy", 1.0))
         self.w_water = float(w.get("water", 1.0))
 
+        if search == "auto":
+            n_combos = math.prod(len(lv) for lv in self.levels_by_actuator.values())
+            search = "vectorized" if n_combos <= self.VECTORIZED_MAX_COMBOS else "bnb"
+        self.search = search
+
+        self._engine: Optional[VectorizedSearch | BranchAndBoundSearch] = None
+        engine_cls = {"vectorized": VectorizedSearch, "bnb": BranchAndBoundSearch}.get(search)
+        if engine_cls is not None:
+            self._engine = engine_cls(
+                self.metrics,
+                self.thresholds,
+                self.actuators,
+                self.levels_by_actuator,
+                w_energy=self.w_energy,
+                w_water=self.w_water,
+            )
+
+    @property
+    def nodes_visited(self) -> Optional[int]:
+        """Nodes evaluated by the last branch-and-bound search (None for other strategies)."""
+        if isinstance(self._engine, BranchAndBoundSearch):
+            return self._engine.nodes_visited
+        return None
+
     def decide(
         self,
         per_metric_payloads: Dict[str, Dict[str, Any]],
@@ -76,15 +113,34 @@ class Optimizer:
             }
 
         # Search best combination
+        if self._engine is not None:
+            actions = self._engine.search(cur, horizon_cap_s)
+        else:
+            actions = self._search_product(cur, horizon_cap_s)
+
+        if actions is None:
+            # Every combo was discarded by the horizon cap
+            actions, post = {a: 0 for a in self.actuators}, dict(cur)
+        else:
+            _, _, post, _, _, _ = self._time_to_band(cur, actions)
+
+        return {
+            "mode": "optimized",
+            "actions": actions,
+            # "duration_s": float(best["T"]), # Rimosso duration_s
+            "post_metrics": post,
+            "violation": self._violation_sum(post),
+        }
+
+    def _search_product(
+        self, cur: Dict[str, float], horizon_cap_s: Optional[float] = None
+    ) -> Optional[Dict[str, int]]:
+        """Reference exhaustive search: one _time_to_band call per combo."""
         acts = list(self.actuators)
         levels = [self.levels_by_actuator[a] for a in acts]
 
-        best = {
-            "key": (1, float("inf"), float("inf"), float("inf")),
-            "actions": {a: 0 for a in acts},  # Default to off
-            "T": 0.0,
-            "post": dict(cur),
-        }
+        best_key = (1, float("inf"), float("inf"), float("inf"))
+        best_actions = None
 
         for combo in product(*levels):
             actions = {a: lvl for a, lvl in zip(acts, combo)}
@@ -92,16 +148,10 @@ class Optimizer:
             if feasible and horizon_cap_s is not None and T > horizon_cap_s:
                 continue
             key = self._score(feasible, T, resid, e_rate, w_rate)
-            if key < best["key"]:
-                best = {"key": key, "actions": actions, "T": T, "post": post}
+            if key < best_key:
+                best_key, best_actions = key, actions
 
-        return {
-            "mode": "optimized",
-            "actions": best["actions"],
-            # "duration_s": float(best["T"]), # Rimosso duration_s
-            "post_metrics": best["post"],
-            "violation": self._violation_sum(best["post"]),
-        }
+        return best_actions
 
     def _time_to_band(
         self,
@@ -0,0 +1,436 @@
+import heapq
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from greenbox.sim.thresholds.thresholds import Threshold
+
+
+def _level_tables(
+    metrics: List[str], rows: Dict[str, Dict[str, float]], levels: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (effects[level, metric], energy[level], water[level]) for one actuator."""
+    index = {m: j for j, m in enumerate(metrics)}
+    eff = np.zeros((levels.size, len(metrics)), dtype=float)
+    e = np.zeros(levels.size, dtype=float)
+    w = np.zeros(levels.size, dtype=float)
+    for i, lvl in enumerate(levels.tolist()):
+        row = rows.get(f"{int(lvl)}%", rows.get(str(int(lvl))))
+        if not row:
+            continue
+        for col, val in row.items():
+            v = float(val)
+            if not np.isfinite(v):
+                continue
+            cl = str(col).lower()
+            if cl.startswith("energy_consumption"):
+                e[i] += v
+            elif cl.startswith("water_consumption"):
+                w[i] += v
+            elif col in index:
+                eff[i, index[col]] += v
+    return eff, e, w
+
+
+class VectorizedSearch:
+    """
+    Precompiled exhaustive search over every actuator-level combination.
+
+    The per-combination net derivatives and energy/water rates depend only on
+    the effects table, so they are built once (in itertools.product order) and
+    every decision is evaluated as a batched array operation. Ties are broken
+    on the first combination in product order, exactly like the Python loop.
+    """
+
+    def __init__(
+        self,
+        metrics: Sequence[str],
+        thresholds: Dict[str, Threshold],
+        actuators: Dict[str, Dict[str, Dict[str, float]]],
+        levels_by_actuator: Dict[str, List[int]],
+        *,
+        w_energy: float = 1.0,
+        w_water: float = 1.0,
+    ) -> None:
+        self.metrics = list(metrics)
+        self.acts = list(actuators)
+        self.w_energy = float(w_energy)
+        self.w_water = float(w_water)
+
+        bands = [thresholds[m].band() for m in self.metrics]
+        self.lo = np.array([b[0] for b in bands], dtype=float)
+        self.hi = np.array([b[1] for b in bands], dtype=float)
+        self.center = np.array([thresholds[m].center for m in self.metrics], dtype=float)
+
+        n_metrics = len(self.metrics)
+        net = np.zeros((1, n_metrics), dtype=float)
+        e_rate = np.zeros(1, dtype=float)
+        w_rate = np.zeros(1, dtype=float)
+        levels = np.zeros((1, 0), dtype=np.int64)
+
+        # Accumulate actuator by actuator so that float sums happen in the
+        # same order as the scalar evaluation (first actuator varies slowest).
+        for a in self.acts:
+            lv = np.asarray(levels_by_actuator[a], dtype=np.int64)
+            eff, e, w = _level_tables(self.metrics, actuators[a], lv)
+            n_prev, n_lv = net.shape[0], lv.size
+            net = (net[:, None, :] + eff[None, :, :]).reshape(n_prev * n_lv, n_metrics)
+            e_rate = (e_rate[:, None] + e[None, :]).reshape(-1)
+            w_rate = (w_rate[:, None] + w[None, :]).reshape(-1)
+            levels = np.concatenate(
+                [
+                    np.repeat(levels, n_lv, axis=0),
+                    np.tile(lv, n_prev)[:, None],
+                ],
+                axis=1,
+            )
+
+        self.net = net
+        self.e_rate = e_rate
+        self.w_rate = w_rate
+        self.levels = levels
+
+    @property
+    def size(self) -> int:
+        """Number of precompiled combinations."""
+        return int(self.net.shape[0])
+
+    def evaluate(self, cur: Dict[str, float]):
+        """
+        Batched counterpart of Optimizer._time_to_band.
+        Returns (feasible[C], T[C]) for every combination.
+        """
+        x = np.array(
+            [float(cur.get(m, c)) for m, c in zip(self.metrics, self.center)],
+            dtype=float,
+        )
+        lo, hi, dx = self.lo, self.hi, self.net
+        below = x < lo
+        above = x > hi
+        inside = ~(below | above)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            wrong_way = (below & (dx <= 0)) | (above & (dx >= 0))
+            t_need = np.where(
+                below, (lo - x) / dx, np.where(above, (x - hi) / (-dx), 0.0)
+            )
+            t_left = np.where(
+                inside & (dx > 0),
+                (hi - x) / dx,
+                np.where(inside & (dx < 0), (x - lo) / (-dx), np.inf),
+            )
+
+        t_req = np.maximum(t_need.max(axis=1, initial=0.0), 0.0)
+        t_max = t_left.min(axis=1, initial=np.inf)
+        feasible = ~wrong_way.any(axis=1) & ~(t_req > t_max)
+        return feasible, t_req
+
+    def search(
+        self, cur: Dict[str, float], horizon_cap_s: Optional[float] = None
+    ) -> Optional[Dict[str, int]]:
+        """
+        Best combination by the Optimizer._score key, or None when every
+        combination was discarded by the horizon cap.
+        """
+        feasible, T = self.evaluate(cur)
+        candidates = feasible if horizon_cap_s is None else feasible & (T <= horizon_cap_s)
+
+        if candidates.any():
+            idx = np.flatnonzero(candidates)
+            for key in (
+                lambda i: T[i],
+                lambda i: self.w_energy * self.e_rate[i] * T[i],
+                lambda i: self.w_water * self.w_rate[i] * T[i],
+            ):
+                k = key(idx)
+                idx = idx[k == k.min()]
+            best = int(idx[0])
+        elif not feasible.all():
+            # Infeasible combos all share the same key: the first one wins.
+            best = int(np.argmin(feasible))
+        else:
+            return None
+
+        return {a: int(lvl) for a, lvl in zip(self.acts, self.levels[best])}
+
+
+class BranchAndBoundSearch:
+    """
+    Best-first branch-and-bound over actuator levels, for zones whose full
+    Cartesian product is too large to precompile.
+
+    Per decision:
+      - actuators that cannot influence any out-of-band metric (directly or by
+        counteracting a side effect on an in-band one) are pinned to their
+        cheapest neutral level;
+      - levels with identical effects and higher energy/water cost are dropped;
+      - nodes are expanded in order of an admissible lower bound on the
+        Optimizer._score key (T, energy*T, water*T), with the level-index
+        prefix as tie-breaker, so the first complete node popped is the same
+        optimum the exhaustive product order would pick.
+    The number of nodes evaluated by the last search is kept in nodes_visited.
+    """
+
+    # Relative slack applied to the bounds so float rounding never prunes the optimum
+    _REL = 1e-9
+
+    def __init__(
+        self,
+        metrics: Sequence[str],
+        thresholds: Dict[str, Threshold],
+        actuators: Dict[str, Dict[str, Dict[str, float]]],
+        levels_by_actuator: Dict[str, List[int]],
+        *,
+        w_energy: float = 1.0,
+        w_water: float = 1.0,
+    ) -> None:
+        self.metrics = list(metrics)
+        self.acts = list(actuators)
+        self.w_energy = float(w_energy)
+        self.w_water = float(w_water)
+
+        bands = [thresholds[m].band() for m in self.metrics]
+        self.lo = [float(b[0]) for b in bands]
+        self.hi = [float(b[1]) for b in bands]
+        self.center = [float(thresholds[m].center) for m in self.metrics]
+
+        self.levels: List[List[int]] = []
+        self.eff: List[List[Tuple[float, ...]]] = []
+        self.e: List[List[float]] = []
+        self.w: List[List[float]] = []
+        for a in self.acts:
+            lv = np.asarray(levels_by_actuator[a], dtype=np.int64)
+            eff, e, w = _level_tables(self.metrics, actuators[a], lv)
+            self.levels.append([int(x) for x in lv.tolist()])
+            self.eff.append([tuple(row) for row in eff.tolist()])
+            self.e.append(e.tolist())
+            self.w.append(w.tolist())
+
+        n_metrics = len(self.metrics)
+        # Per-actuator set of metrics it can move at some level
+        self.moves = [
+            {j for j in range(n_metrics) if any(row[j] != 0.0 for row in rows)}
+            for rows in self.eff
+        ]
+        # Absolute tolerance on each metric's net derivative
+        self.tol = [
+            self._REL * (1.0 + sum(max(abs(row[j]) for row in rows) for rows in self.eff if rows))
+            for j in range(n_metrics)
+        ]
+        self.nondominated = [self._nondominated(i) for i in range(len(self.acts))]
+        self.neutral = [self._cheapest_neutral(i) for i in range(len(self.acts))]
+        self.nodes_visited = 0
+
+    @property
+    def size(self) -> int:
+        """Number of combinations in the unpruned search space."""
+        n = 1
+        for lv in self.levels:
+            n *= len(lv)
+        return n
+
+    def _cost(self, i: int, k: int) -> Tuple[float, float]:
+        return self.w_energy * self.e[i][k], self.w_water * self.w[i][k]
+
+    def _nondominated(self, i: int) -> List[int]:
+        """Level indices not dominated by a cheaper level with identical effects."""
+        keep = []
+        for k, row in enumerate(self.eff[i]):
+            dominated = any(
+                self.eff[i][o] == row and (self._cost(i, o), o) < (self._cost(i, k), k)
+                for o in range(len(self.eff[i]))
+                if o != k
+            )
+            if not dominated:
+                keep.append(k)
+        return keep
+
+    def _cheapest_neutral(self, i: int) -> Optional[int]:
+        """The first cheapest level, if it has no effect on any metric."""
+        if not self.eff[i]:
+            return None
+        k = min(range(len(self.eff[i])), key=lambda o: (self._cost(i, o), o))
+        return k if not any(self.eff[i][k]) else None
+
+    def _exact(self, x: List[float], idx: Sequence[int]):
+        """Scalar evaluation in full actuator order; mirrors Optimizer._time_to_band."""
+        n_metrics = len(self.metrics)
+        net = [0.0] * n_metrics
+        e_rate = 0.0
+        w_rate = 0.0
+        for i, k in enumerate(idx):
+            row = self.eff[i][k]
+            for j in range(n_metrics):
+                net[j] += row[j]
+            e_rate += self.e[i][k]
+            w_rate += self.w[i][k]
+
+        T_req = 0.0
+        T_max = float("inf")
+        for j in range(n_metrics):
+            xj, lo, hi, dx = x[j], self.lo[j], self.hi[j], net[j]
+            if xj < lo:
+                if dx <= 0:
+                    return False, 0.0, e_rate, w_rate
+                T_req = max(T_req, (lo - xj) / dx)
+            elif xj > hi:
+                if dx >= 0:
+                    return False, 0.0, e_rate, w_rate
+                T_req = max(T_req, (xj - hi) / (-dx))
+            else:
+                if dx > 0:
+                    T_max = min(T_max, (hi - xj) / dx)
+                elif dx < 0:
+                    T_max = min(T_max, (xj - lo) / (-dx))
+        if T_req > T_max:
+            return False, 0.0, e_rate, w_rate
+        return True, max(0.0, T_req), e_rate, w_rate
+
+    def _relevant(self, violated: List[int]) -> List[int]:
+        """Actuators that may influence the optimum; the others get pinned."""
+        touched = set(violated)
+        relevant = set()
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(self.acts)):
+                if i not in relevant and self.moves[i] & touched:
+                    relevant.add(i)
+                    touched |= self.moves[i]
+                    changed = True
+        # Actuators without a cheapest neutral level cannot be pinned safely
+        return [
+            i for i in range(len(self.acts))
+            if i in relevant or self.neutral[i] is None
+        ]
+
+    def search(
+        self, cur: Dict[str, float], horizon_cap_s: Optional[float] = None
+    ) -> Optional[Dict[str, int]]:
+        """
+        Best combination by the Optimizer._score key, or None when every
+        combination was discarded by the horizon cap.
+        """
+        n_metrics = len(self.metrics)
+        x = [float(cur.get(m, c)) for m, c in zip(self.metrics, self.center)]
+        below = [j for j in range(n_metrics) if x[j] < self.lo[j]]
+        above = [j for j in range(n_metrics) if x[j] > self.hi[j]]
+        inside = [j for j in range(n_metrics) if self.lo[j] <= x[j] <= self.hi[j]]
+        self.nodes_visited = 0
+
+        # Pruning relies on T > 0, i.e. on at least one out-of-band metric:
+        # with T == 0 every feasible key ties and product order decides alone.
+        if below or above:
+            order = self._relevant(below + above)
+            choices = {i: self.nondominated[i] for i in order}
+        else:
+            order = list(range(len(self.acts)))
+            choices = {i: list(range(len(self.eff[i]))) for i in order}
+        pinned = {
+            i: self.neutral[i] for i in range(len(self.acts)) if i not in choices
+        }
+
+        # Suffix bounds over the branching actuators
+        depth = len(order)
+        smin = [[0.0] * n_metrics for _ in range(depth + 1)]
+        smax = [[0.0] * n_metrics for _ in range(depth + 1)]
+        se = [0.0] * (depth + 1)
+        sw = [0.0] * (depth + 1)
+        for d in range(depth - 1, -1, -1):
+            i = order[d]
+            rows = [self.eff[i][k] for k in choices[i]]
+            for j in range(n_metrics):
+                smin[d][j] = smin[d + 1][j] + min(r[j] for r in rows)
+                smax[d][j] = smax[d + 1][j] + max(r[j] for r in rows)
+            se[d] = se[d + 1] + min(self.e[i][k] for k in choices[i])
+            sw[d] = sw[d + 1] + min(self.w[i][k] for k in choices[i])
+
+        base_net = [0.0] * n_metrics
+        base_e = sum(self.e[i][k] for i, k in pinned.items())
+        base_w = sum(self.w[i][k] for i, k in pinned.items())
+        lo_rel, hi_rel = 1.0 - self._REL, 1.0 + self._REL
+
+        def bound(d, net, e_rate, w_rate):
+            t_lb = 0.0
+            for j in below:
+                dmax = net[j] + smax[d][j] + self.tol[j]
+                if dmax <= 0:
+                    return None
+                t_lb = max(t_lb, (self.lo[j] - x[j]) / dmax)
+            for j in above:
+                dmin = net[j] + smin[d][j] - self.tol[j]
+                if dmin >= 0:
+                    return None
+                t_lb = max(t_lb, (x[j] - self.hi[j]) / (-dmin))
+            t_ub = float("inf")
+            for j in inside:
+                dmin = net[j] + smin[d][j] - self.tol[j]
+                dmax = net[j] + smax[d][j] + self.tol[j]
+                if dmin > 0:
+                    t_ub = min(t_ub, (self.hi[j] - x[j]) / dmin)
+                elif dmax < 0:
+                    t_ub = min(t_ub, (x[j] - self.lo[j]) / (-dmax))
+            t_lb *= lo_rel
+            if t_lb > t_ub * hi_rel:
+                return None
+            if horizon_cap_s is not None and t_lb > horizon_cap_s:
+                return None
+            e_lb = e_rate + se[d]
+            w_lb = w_rate + sw[d]
+            ek = self.w_energy * e_lb * t_lb * lo_rel if e_lb >= 0 and self.w_energy >= 0 else -float("inf")
+            wk = self.w_water * w_lb * t_lb * lo_rel if w_lb >= 0 and self.w_water >= 0 else -float("inf")
+            return t_lb, ek, wk
+
+        def full_index(prefix):
+            idx = [0] * len(self.acts)
+            for i, k in pinned.items():
+                idx[i] = k
+            for i, k in zip(order, prefix):
+                idx[i] = k
+            return idx
+
+        heap = []
+        root = bound(0, base_net, base_e, base_w)
+        self.nodes_visited += 1
+        if root is not None:
+            heap.append((root, (), 0, base_net, base_e, base_w))
+
+        while heap:
+            key, prefix, d, net, e_rate, w_rate = heapq.heappop(heap)
+            if d == depth:
+                if d == 0:
+                    # Nothing to branch on: the pinned combination is the only candidate
+                    feasible, T, e_c, w_c = self._exact(x, full_index(prefix))
+                    if not feasible or (horizon_cap_s is not None and T > horizon_cap_s):
+                        break
+                return self._actions(full_index(prefix))
+            i = order[d]
+            for k in choices[i]:
+                row = self.eff[i][k]
+                child_net = [a + b for a, b in zip(net, row)]
+                child_e = e_rate + self.e[i][k]
+                child_w = w_rate + self.w[i][k]
+                child = prefix + (k,)
+                self.nodes_visited += 1
+                if d + 1 == depth:
+                    feasible, T, e_c, w_c = self._exact(x, full_index(child))
+                    if not feasible or (horizon_cap_s is not None and T > horizon_cap_s):
+                        continue
+                    child_key = (T, self.w_energy * e_c * T, self.w_water * w_c * T)
+                else:
+                    child_key = bound(d + 1, child_net, child_e, child_w)
+                    if child_key is None:
+                        continue
+                heapq.heappush(heap, (child_key, child, d + 1, child_net, child_e, child_w))
+
+        # No feasible combination within the cap: like the exhaustive loop,
+        # fall back to the first infeasible combination in product order.
+        for idx in product(*(range(len(lv)) for lv in self.levels)):
+            self.nodes_visited += 1
+            if not self._exact(x, idx)[0]:
+                return self._actions(idx)
+        return None
+
+    def _actions(self, idx: Sequence[int]) -> Dict[str, int]:
+        return {a: self.levels[i][k] for i, (a, k) in enumerate(zip(self.acts, idx))}
@@ -0,0 +1,134 @@
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+
+from greenbox.controller.controller import Controller, DecisionCache, config_fingerprint
+from greenbox.controller.dispatcher import ZoneDispatcher
+from greenbox.controller.optimizer import Optimizer
+from greenbox.sim.thresholds.thresholds import Threshold
+from greenbox.utils.mqtt_local import LocalBroker
+
+EFFECTS_CSV = Path(__file__).resolve().parents[1] / "sim" / "effects" / "effects.csv"
+
+THRESHOLDS = {
+    "temperature": Threshold(18, 26, 3),
+    "humidity": Threshold(60, 80, 5),
+    "light": Threshold(300, 800, 50),
+    "soil_humidity": Threshold(60, 95, 5),
+    "pH": Threshold(5, 6.5, 0.5),
+}
+
+ZONE = ("gh01", "rb_001")
+
+
+class TestDecisionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.effects = pd.read_csv(EFFECTS_CSV)
+        self.optimizer = Optimizer(THRESHOLDS, self.effects)
+        self.cache = DecisionCache(resolution=0.1, ttl_s=60, max_entries=2)
+        self.cache.bind(ZONE, config_fingerprint(THRESHOLDS, self.effects))
+
+    def test_quantized_states_share_a_key(self):
+        """
+        Medians closer than resolution * deadband map to the same entry.
+        """
+        a = self.cache.key(self.optimizer, {"temperature": {"median": 14.00}}, {})
+        b = self.cache.key(self.optimizer, {"temperature": {"median": 14.05}}, {})
+        c = self.cache.key(self.optimizer, {"temperature": {"median": 15.00}}, {})
+        d = self.cache.key(self.optimizer, {"temperature": {"median": 14.00}}, {"heating_system": 50})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertNotEqual(a, d)
+
+    def test_hit_miss_counters(self):
+        key = self.cache.key(self.optimizer, {"temperature": {"median": 14}}, {})
+        self.assertIsNone(self.cache.get(ZONE, key))
+        res = self.optimizer.decide({"temperature": {"median": 14}}, current_actuator_state={})
+        self.cache.put(ZONE, key, res)
+        self.assertEqual(self.cache.get(ZONE, key), res)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_lru_eviction(self):
+        for i in range(3):
+            self.cache.put(ZONE, i, {"mode": "hold"})
+        self.assertIsNone(self.cache.get(ZONE, 0))
+        self.assertIsNotNone(self.cache.get(ZONE, 2))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        with patch("greenbox.controller.controller.time.monotonic", return_value=100.0):
+            self.cache.put(ZONE, "k", {"mode": "hold"})
+        with patch("greenbox.controller.controller.time.monotonic", return_value=161.0):
+            self.assertIsNone(self.cache.get(ZONE, "k"))
+        self.assertEqual(self.cache.stats()["expired"], 1)
+
+    def test_config_change_invalidates_zone(self):
+        self.cache.put(ZONE, "k", {"mode": "hold"})
+        changed = dict(THRESHOLDS, temperature=Threshold(16, 24, 2))
+        self.cache.bind(ZONE, config_fingerprint(changed, self.effects))
+        self.assertIsNone(self.cache.get(ZONE, "k"))
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+
+class TestOptimizerCache(unittest.TestCase):
+
+    def test_rebuilt_only_when_config_changes(self):
+        controller = Controller(mqtt_factory=LocalBroker().client)
+        with patch("greenbox.controller.controller.catalog_client.config_version", return_value=("a", "b")):
+            first = controller._get_or_create_optimizers(*ZONE)
+            self.assertIs(controller._get_or_create_optimizers(*ZONE), first)
+        with patch("greenbox.controller.controller.catalog_client.config_version", return_value=("a", "c")):
+            second = controller._get_or_create_optimizers(*ZONE)
+            self.assertIsNot(second, first)
+            self.assertIs(controller._get_or_create_optimizers(*ZONE), second)
+
+
+class TestZoneDispatcher(unittest.TestCase):
+
+    def test_stale_snapshots_are_coalesced_and_order_is_kept(self):
+        """
+        While a zone is busy, only its newest queued snapshot survives.
+        """
+        release = threading.Event()
+        started = threading.Event()
+        seen = []
+
+        def handler(zone_key, item):
+            seen.append((zone_key, item))
+            if item == 0:
+                started.set()
+                release.wait(timeout=5)
+
+        dispatcher = ZoneDispatcher(handler, workers=2)
+        dispatcher.start()
+        dispatcher.submit(ZONE, 0)
+        self.assertTrue(started.wait(timeout=5))
+        for i in range(1, 5):
+            dispatcher.submit(ZONE, i)
+        self.assertEqual(dispatcher.stats()["queue_depth"], 1)
+        release.set()
+        dispatcher.stop()
+
+        self.assertEqual(seen, [(ZONE, 0), (ZONE, 4)])
+        stats = dispatcher.stats()
+        self.assertEqual((stats["submitted"], stats["processed"], stats["dropped"]), (5, 2, 3))
+        self.assertIn(ZONE, stats["zone_lag_s"])
+
+    def test_handler_errors_are_counted(self):
+        def handler(zone_key, item):
+            raise RuntimeError("boom")
+
+        dispatcher = ZoneDispatcher(handler, workers=1)
+        dispatcher.start()
+        dispatcher.submit(ZONE, 1)
+        dispatcher.stop()
+        self.assertEqual(dispatcher.stats()["errors"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import random
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from greenbox.controller.bench_optimizer import synthetic_effects
+from greenbox.controller.optimizer import Optimizer
+from greenbox.sim.thresholds.thresholds import Threshold
+
+EFFECTS_CSV = Path(__file__).resolve().parents[1] / "sim" / "effects" / "effects.csv"
+
+THRESHOLDS = {
+    "temperature": Threshold(18, 26, 3),
+    "humidity": Threshold(60, 80, 5),
+    "light": Threshold(300, 800, 50),
+    "soil_humidity": Threshold(60, 95, 5),
+    "pH": Threshold(5, 6.5, 0.5),
+}
+
+
+def random_payloads(rng: random.Random):
+    return {
+        "temperature": {"median": rng.uniform(10, 34)},
+        "humidity": {"median": rng.uniform(40, 100)},
+        "soil_humidity": {"median": rng.uniform(40, 100)},
+        "pH": {"median": rng.uniform(4, 8)},
+    }
+
+
+class TestOptimizerSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        effects = pd.read_csv(EFFECTS_CSV)
+        cls.reference = Optimizer(THRESHOLDS, effects, search="product")
+        cls.vectorized = Optimizer(THRESHOLDS, effects, search="vectorized")
+
+    def assertSameDecision(self, payloads, **kwargs):
+        expected = self.reference.decide(payloads, current_actuator_state={}, **kwargs)
+        actual = self.vectorized.decide(payloads, current_actuator_state={}, **kwargs)
+        self.assertEqual(actual, expected)
+
+    def test_vectorized_matches_product_loop(self):
+        """
+        The precompiled engine must pick exactly the same combo as the loop.
+        """
+        rng = random.Random(42)
+        for _ in range(40):
+            self.assertSameDecision(random_payloads(rng))
+
+    def test_vectorized_matches_product_loop_with_horizon_cap(self):
+        rng = random.Random(7)
+        for cap in (0.0, 60.0, 600.0):
+            for _ in range(10):
+                self.assertSameDecision(random_payloads(rng), horizon_cap_s=cap)
+
+    def test_branch_and_bound_matches_exhaustive(self):
+        effects = pd.read_csv(EFFECTS_CSV)
+        bnb = Optimizer(THRESHOLDS, effects, search="bnb")
+        rng = random.Random(3)
+        for cap in (None, 0.0, 120.0):
+            for _ in range(40):
+                payloads = random_payloads(rng)
+                expected = self.vectorized.decide(payloads, current_actuator_state={}, horizon_cap_s=cap)
+                actual = bnb.decide(payloads, current_actuator_state={}, horizon_cap_s=cap)
+                self.assertEqual(actual, expected)
+                self.assertGreater(bnb.nodes_visited, 0)
+
+    def test_branch_and_bound_matches_exhaustive_on_synthetic_tables(self):
+        rng = random.Random(11)
+        for n_systems in (6, 7):
+            effects = synthetic_effects(n_systems, seed=n_systems)
+            vectorized = Optimizer(THRESHOLDS, effects, search="vectorized")
+            bnb = Optimizer(THRESHOLDS, effects, search="bnb")
+            for cap in (None, 300.0):
+                for _ in range(20):
+                    payloads = random_payloads(rng)
+                    self.assertEqual(
+                        bnb.decide(payloads, current_actuator_state={}, horizon_cap_s=cap),
+                        vectorized.decide(payloads, current_actuator_state={}, horizon_cap_s=cap),
+                    )
+
+    def test_auto_search_selection(self):
+        self.assertEqual(Optimizer(THRESHOLDS, pd.read_csv(EFFECTS_CSV)).search, "vectorized")
+        self.assertEqual(Optimizer(THRESHOLDS, synthetic_effects(10)).search, "bnb")
+
+    def test_hold_when_in_band(self):
+        payloads = {"temperature": {"median": 22}, "humidity": {"median": 70}}
+        res = self.vectorized.decide(payloads, current_actuator_state={"heating_system": 25})
+        self.assertEqual(res["mode"], "hold")
+        self.assertEqual(res["actions"], {"heating_system": 25})
+
+    def test_unknown_search_strategy(self):
+        with self.assertRaises(ValueError):
+            Optimizer(THRESHOLDS, pd.read_csv(EFFECTS_CSV), search="random")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -88,6 +88,16 @@ class InfluxDBAdapter:
         result = self.query(sql, **kwargs)
         return result.to_pandas()
 
+    def write(self, record: Any, **kwargs: Any) -> None:
+        """
+        Write points to the default database.
+
+        :param record: Line protocol string, list of line protocol strings, or Point(s).
+        :param kwargs: Extra keyword arguments passed to client.write().
+        """
+        client = self._ensure_client()
+        client.write(record=record, **kwargs)
+
     # Optional: context manager support
     def __enter__(self) -> "InfluxDBAdapter":
         """
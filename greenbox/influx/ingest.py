@@ -0,0 +1,490 @@
+"""
+MQTT -> InfluxDB ingestion service.
+
+Subscribes to the sensor readings (/<gh>/<rb>/sensors/<sensor>/<metric> and
+/<gh>/<rb>/sensors/batch) and actuator data (/<gh>/<rb>/actuators/<system>/<id>/data),
+converts each payload to line protocol points and writes them to InfluxDB in
+batches bounded by size (INGEST_BATCH_SIZE) and age (INGEST_FLUSH_INTERVAL_S).
+
+    python -m greenbox.influx.ingest [--dry-run]
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from greenbox.influx.adapter import InfluxDBAdapter
+from greenbox.utils.sensor_messages import parse_sensor_message
+from greenbox.utils.serializers import decode_payload
+
+
+SENSOR_MEASUREMENT = "sensor_data"
+ACTUATOR_MEASUREMENT = "actuator_data"
+
+
+def _escape_tag(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace(",", "\\,").replace("=", "\\=").replace(" ", "\\ ")
+
+
+def _escape_measurement(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(" ", "\\ ")
+
+
+def _field(value: Any) -> Optional[str]:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return f"{value}i"
+    if isinstance(value, float):
+        return repr(value) if value == value and value not in (float("inf"), float("-inf")) else None
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return None
+
+
+def series_key(measurement: str, tags: Dict[str, Any]) -> str:
+    """'measurement,tag=value,...' with the tags sorted; tags with empty values are skipped."""
+    tag_part = "".join(
+        f",{_escape_tag(k)}={_escape_tag(v)}" for k, v in sorted(tags.items()) if v not in (None, "")
+    )
+    return _escape_measurement(measurement) + tag_part
+
+
+def line_protocol(measurement: str, tags: Dict[str, Any], fields: Dict[str, Any], ts_ns: int) -> Optional[str]:
+    """
+    Build one line protocol point; tags with empty values and fields that
+    cannot be represented (None, NaN, nested objects) are skipped.
+    """
+    field_items = []
+    for k, v in fields.items():
+        encoded = _field(v)
+        if encoded is not None:
+            field_items.append(f"{_escape_tag(k)}={encoded}")
+    if not field_items:
+        return None
+    return f"{series_key(measurement, tags)} {','.join(field_items)} {int(ts_ns)}"
+
+
+def _timestamp_ns(value: Any, default_ns: int) -> int:
+    if isinstance(value, str):
+        try:
+            ts = datetime.fromisoformat(value)
+        except ValueError:
+            return default_ns
+        if ts.tzinfo is None:
+            return int(ts.timestamp() * 1e9)
+        # Integer arithmetic keeps the microseconds exact
+        delta = ts - datetime(1970, 1, 1, tzinfo=timezone.utc)
+        return (delta.days * 86_400 + delta.seconds) * 10**9 + delta.microseconds * 1_000
+    return default_ns
+
+
+def parse_message(topic: str, payload: bytes, now_ns: Optional[int] = None) -> List[str]:
+    """
+    Convert an MQTT message to line protocol points.
+
+    Sensor readings (per-measurement or batch messages, see
+    utils.sensor_messages) become `sensor_data` points tagged
+    site/device/metric/sensor/unit with a float `value`, so they match what
+    Queries.sensor_data reads. Actuator data become
+    `actuator_data` points tagged site/device/system/actuator with the
+    numeric payload fields (level, consumptions, delta_*).
+    Raises ValueError on payloads that cannot be converted.
+    """
+    now_ns = time.time_ns() if now_ns is None else now_ns
+    parts = topic.strip("/").split("/")
+    if len(parts) >= 3 and parts[2] == "sensors":
+        lines = []
+        for r in parse_sensor_message(topic, payload):
+            tags = {"site": r.site, "device": r.device, "metric": r.metric, "sensor": r.sensor, "unit": r.unit}
+            line = line_protocol(SENSOR_MEASUREMENT, tags, {"value": r.value}, _timestamp_ns(r.timestamp, now_ns))
+            if line:
+                lines.append(line)
+        return lines
+
+    data = decode_payload(payload)
+    if not isinstance(data, dict):
+        raise ValueError("Payload is not an object")
+
+    if len(parts) == 6 and parts[2] == "actuators" and parts[5] == "data":
+        gh_id, rb_id, _, system, actuator_id, _ = parts
+        tags = {
+            "site": gh_id,
+            "device": rb_id,
+            "system": data.get("system") or system,
+            "actuator": data.get("id") or actuator_id,
+        }
+        # Numbers are written as floats (except the level) so a field keeps one type across points
+        fields = {
+            k: (float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) and k != "level" else v)
+            for k, v in data.items()
+            if k not in ("id", "system", "timestamp")
+        }
+        line = line_protocol(ACTUATOR_MEASUREMENT, tags, fields, _timestamp_ns(data.get("timestamp"), now_ns))
+        return [line] if line else []
+
+    raise ValueError(f"Unsupported topic '{topic}'")
+
+
+class InfluxLineWriter:
+    """Writes line protocol batches through InfluxDBAdapter."""
+
+    def __init__(self, adapter: Optional[InfluxDBAdapter] = None) -> None:
+        self._adapter = adapter or InfluxDBAdapter()
+
+    def write(self, lines: List[str]) -> None:
+        self._adapter.write("\n".join(lines))
+
+    def close(self) -> None:
+        self._adapter.close()
+
+
+class MemoryWriter:
+    """
+    Local stub writer: keeps the batches in memory. `fail` makes the next
+    writes raise ConnectionError (to exercise retries and the spool).
+    """
+
+    def __init__(self, latency_s: float = 0.0) -> None:
+        self.batches: List[List[str]] = []
+        self.latency_s = latency_s
+        self.fail = False
+        self._lock = threading.Lock()
+
+    @property
+    def lines(self) -> List[str]:
+        with self._lock:
+            return [line for batch in self.batches for line in batch]
+
+    def write(self, lines: List[str]) -> None:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if self.fail:
+            raise ConnectionError("stub writer unavailable")
+        with self._lock:
+            self.batches.append(list(lines))
+
+    def close(self) -> None:
+        pass
+
+
+class IngestionService:
+    """
+    Buffers line protocol points and writes them in batches from a single
+    flusher thread.
+
+    - A batch is written when it reaches `batch_size` points or its oldest
+      point is `flush_interval_s` old.
+    - Backpressure: the buffer holds at most `max_pending` points; `notify`
+      (the MQTT thread) waits up to `enqueue_timeout_s` for room, which slows
+      the broker delivery down, then drops the point.
+    - Failed batches go to a bounded retry queue (`retry_batches`), retried
+      with exponential backoff before new data. When it overflows the oldest
+      batch is written to `spool_dir` (if set, else dropped); spooled files
+      are replayed once writes succeed again.
+    """
+
+    def __init__(
+        self,
+        writer,
+        *,
+        batch_size: int = 5000,
+        flush_interval_s: float = 1.0,
+        max_pending: int = 100_000,
+        enqueue_timeout_s: float = 0.5,
+        retry_batches: int = 50,
+        spool_dir: Optional[str] = None,
+        max_backoff_s: float = 30.0,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.writer = writer
+        self.batch_size = int(batch_size)
+        self.flush_interval_s = float(flush_interval_s)
+        self.enqueue_timeout_s = float(enqueue_timeout_s)
+        self.max_backoff_s = float(max_backoff_s)
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._retry: Deque[List[str]] = deque()
+        self._retry_batches = max(0, int(retry_batches))
+        self._spool = Path(spool_dir) if spool_dir else None
+        if self._spool is not None:
+            self._spool.mkdir(parents=True, exist_ok=True)
+        self._spool_seq = 0
+        # Files left by a previous run are replayed too
+        self._spool_pending = bool(self._spool_files())
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._backoff_s = 0.0
+        self._next_attempt = 0.0
+
+        # Instrumentation
+        self._lock = threading.Lock()
+        self.received = 0
+        self.parse_errors = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.spooled = 0
+        self.max_batch = 0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self._rate_mark: Tuple[float, int] = (time.monotonic(), 0)
+
+    # --- input ---
+
+    def notify(self, topic: str, payload: bytes) -> None:
+        """MyMQTT callback: parse and enqueue (blocking briefly when the buffer is full)."""
+        try:
+            lines = parse_message(topic, payload)
+        except ValueError as e:
+            with self._lock:
+                self.parse_errors += 1
+            logging.debug("[ingest] Skipping message on %s: %s", topic, e)
+            return
+        for line in lines:
+            self.put(line)
+
+    def put(self, line: str) -> bool:
+        try:
+            self._queue.put(line, timeout=self.enqueue_timeout_s)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.received += 1
+        return True
+
+    # --- lifecycle ---
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush what is buffered (one attempt), spool what cannot be written."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        batch = self._drain(self.batch_size)
+        while batch:
+            self._retry.append(batch)
+            batch = self._drain(self.batch_size)
+        while self._retry:
+            batch = self._retry.popleft()
+            if not self._write(batch):
+                self._to_spool(batch)
+                for rest in self._retry:
+                    self._to_spool(rest)
+                self._retry.clear()
+
+    # --- flusher ---
+
+    def _drain(self, limit: int) -> List[str]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _collect(self) -> List[str]:
+        """Wait for the first point, then fill the batch until it is full or old enough."""
+        try:
+            first = self._queue.get(timeout=self.flush_interval_s)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size and not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            batch.extend(self._drain(self.batch_size - len(batch)))
+            if len(batch) >= self.batch_size:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            if self._retry or self._spool_pending:
+                if time.monotonic() < self._next_attempt:
+                    # Keep buffering while backing off, but never past the retry bound
+                    self._stop_event.wait(min(0.1, self._next_attempt - time.monotonic()))
+                    if self._queue.qsize() >= self.batch_size:
+                        self._fail(self._drain(self.batch_size))
+                    continue
+                if not self._flush_backlog():
+                    continue
+            batch = self._collect()
+            if batch and not self._write(batch):
+                self._fail(batch)
+
+    def _flush_backlog(self) -> bool:
+        """Retry queue first, then spooled files; False as soon as a write fails."""
+        while self._retry:
+            if not self._write(self._retry[0]):
+                self._schedule_retry()
+                return False
+            self._retry.popleft()
+        for path in self._spool_files():
+            lines = path.read_text(encoding="utf-8").splitlines()
+            if lines and not self._write(lines):
+                self._schedule_retry()
+                return False
+            path.unlink(missing_ok=True)
+        self._spool_pending = False
+        return True
+
+    def _write(self, batch: List[str]) -> bool:
+        t0 = time.perf_counter()
+        try:
+            self.writer.write(batch)
+        except Exception as e:
+            with self._lock:
+                self.write_errors += 1
+            logging.warning("[ingest] Write of %d points failed: %s", len(batch), e)
+            return False
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.max_batch = max(self.max_batch, len(batch))
+            self._latencies.append(elapsed)
+        self._backoff_s = 0.0
+        return True
+
+    def _schedule_retry(self) -> None:
+        self._backoff_s = min(self.max_backoff_s, max(0.5, self._backoff_s * 2))
+        self._next_attempt = time.monotonic() + self._backoff_s
+
+    def _fail(self, batch: List[str]) -> None:
+        if not batch:
+            return
+        self._retry.append(batch)
+        while len(self._retry) > self._retry_batches:
+            self._to_spool(self._retry.popleft())
+        if time.monotonic() >= self._next_attempt:
+            self._schedule_retry()
+
+    # --- spool ---
+
+    def _to_spool(self, batch: List[str]) -> None:
+        if self._spool is None:
+            with self._lock:
+                self.dropped += len(batch)
+            logging.error("[ingest] Dropped %d points (retry queue full, no spool).", len(batch))
+            return
+        self._spool_seq += 1
+        path = self._spool / f"{time.time_ns()}-{self._spool_seq:06d}.lp"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text("\n".join(batch), encoding="utf-8")
+        os.replace(tmp, path)
+        self._spool_pending = True
+        with self._lock:
+            self.spooled += len(batch)
+        logging.warning("[ingest] Spooled %d points to %s", len(batch), path)
+
+    def _spool_files(self) -> List[Path]:
+        if self._spool is None:
+            return []
+        return sorted(self._spool.glob("*.lp"))
+
+    # --- metrics ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, points/s written since the previous call, batch sizes and write latency."""
+        now = time.monotonic()
+        with self._lock:
+            mark_t, mark_written = self._rate_mark
+            self._rate_mark = (now, self.written)
+            latencies = sorted(self._latencies)
+            out = {
+                "received": self.received,
+                "written": self.written,
+                "dropped": self.dropped,
+                "parse_errors": self.parse_errors,
+                "write_errors": self.write_errors,
+                "spooled": self.spooled,
+                "batches": self.batches,
+                "avg_batch": self.written / self.batches if self.batches else 0.0,
+                "max_batch": self.max_batch,
+                "points_per_s": (self.written - mark_written) / (now - mark_t) if now > mark_t else 0.0,
+            }
+        out["pending"] = self._queue.qsize()
+        out["retry_batches"] = len(self._retry)
+        out["spool_files"] = len(self._spool_files())
+        out["write_latency_p50_s"] = latencies[len(latencies) // 2] if latencies else 0.0
+        out["write_latency_p95_s"] = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        out["write_latency_max_s"] = latencies[-1] if latencies else 0.0
+        return out
+
+
+def main():
+    import argparse
+
+    from dotenv import load_dotenv
+
+    from greenbox.utils.catalog_client import get_broker_info
+    from greenbox.utils.logging import setup_logger
+    from greenbox.utils.mqtt import MyMQTT
+
+    parser = argparse.ArgumentParser(description="MQTT -> InfluxDB ingestion service.")
+    parser.add_argument("--dry-run", action="store_true", help="Keep points in memory instead of writing to InfluxDB.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_logger("influx_ingest")
+
+    writer = MemoryWriter() if args.dry_run else InfluxLineWriter()
+    service = IngestionService(
+        writer,
+        batch_size=int(os.getenv("INGEST_BATCH_SIZE", "5000")),
+        flush_interval_s=float(os.getenv("INGEST_FLUSH_INTERVAL_S", "1")),
+        max_pending=int(os.getenv("INGEST_MAX_PENDING", "100000")),
+        retry_batches=int(os.getenv("INGEST_RETRY_BATCHES", "50")),
+        spool_dir=os.getenv("INGEST_SPOOL_DIR") or None,
+    )
+    stats_period_s = float(os.getenv("INGEST_STATS_PERIOD_S", "60"))
+
+    broker_ip, broker_port = get_broker_info()
+    client = MyMQTT(clientID="influx_ingest", broker=broker_ip, port=broker_port, notifier=service)
+    topics = [
+        os.getenv("INGEST_SENSOR_TOPIC", "/+/+/sensors/#"),
+        os.getenv("INGEST_ACTUATOR_TOPIC", "/+/+/actuators/+/+/data"),
+    ]
+
+    service.start()
+    try:
+        client.start()
+        for topic in topics:
+            client.MySubscribe(topic)
+        while True:
+            time.sleep(stats_period_s)
+            logging.info("[ingest] Stats: %s", service.stats())
+    except KeyboardInterrupt:
+        logging.info("Interrupted, shutting down ingestion service...")
+    finally:
+        try:
+            client.stop()
+        except Exception:
+            logging.exception("Error during MQTT shutdown.")
+        service.stop()
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
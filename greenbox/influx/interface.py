@@ -1,5 +1,5 @@
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 import cherrypy
 import pandas as pd
@@ -50,6 +50,126 @@ class InfluxInterface:
         )
         return self._adapter.query_dataframe(sql, language="sql")
 
+    # hard caps on batch requests to avoid huge scans
+    MAX_BATCH_ITEMS = 500
+
+    def read_batch(
+        self,
+        metrics: List[str],
+        *,
+        sites: Optional[List[str]] = None,
+        devices: Optional[List[str]] = None,
+        time_range: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit_per_series: int = 100,
+    ) -> pd.DataFrame:
+        if not metrics:
+            raise ValueError("missing metrics")
+        for values in (metrics, sites or [], devices or []):
+            if len(values) > self.MAX_BATCH_ITEMS:
+                raise ValueError("too many items in batch")
+        for metric in metrics:
+            if metric not in Queries.METRICS:
+                raise ValueError(f"unsupported metric '{metric}'")
+        limit_per_series = min(int(limit_per_series), 10_000)
+
+        if time_range and time_range not in Queries.TIME_RANGES:
+            raise ValueError("unsupported time_range")
+
+        sql = Queries.sensor_data_batch(
+            metrics,
+            sites=sites,
+            devices=devices,
+            time_range=time_range,
+            start=start,
+            end=end,
+            limit_per_series=limit_per_series,
+        )
+        return self._adapter.query_dataframe(sql, language="sql")
+
+    @staticmethod
+    def group_series(df: pd.DataFrame) -> Dict[str, Dict[str, Dict[str, List[Dict[str, Any]]]]]:
+        """
+        Nest rows as {site: {device: {metric: [{"time", "value"}, ...]}}}.
+        """
+        out: Dict[str, Dict[str, Dict[str, List[Dict[str, Any]]]]] = {}
+        if df.empty:
+            return out
+        df = df.assign(time=df["time"].astype(str))
+        for (site, device, metric), g in df.groupby(["site", "device", "metric"], sort=False):
+            out.setdefault(site, {}).setdefault(device, {})[metric] = g[["time", "value"]].to_dict(orient="records")
+        return out
+
+    # hard cap on the number of percentiles per stats request
+    MAX_PERCENTILES = 20
+
+    def read_stats(
+        self,
+        metrics: List[str],
+        *,
+        sites: Optional[List[str]] = None,
+        devices: Optional[List[str]] = None,
+        time_range: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        percentiles: Optional[List[float]] = None,
+    ) -> pd.DataFrame:
+        if not metrics:
+            raise ValueError("missing metrics")
+        for values in (metrics, sites or [], devices or []):
+            if len(values) > self.MAX_BATCH_ITEMS:
+                raise ValueError("too many items in batch")
+        for metric in metrics:
+            if metric not in Queries.METRICS:
+                raise ValueError(f"unsupported metric '{metric}'")
+        percentiles = [5.0, 95.0] if percentiles is None else list(percentiles)
+        if len(percentiles) > self.MAX_PERCENTILES:
+            raise ValueError("too many percentiles")
+
+        if time_range and time_range not in Queries.TIME_RANGES:
+            raise ValueError("unsupported time_range")
+
+        sql = Queries.sensor_stats(
+            metrics,
+            sites=sites,
+            devices=devices,
+            time_range=time_range,
+            start=start,
+            end=end,
+            percentiles=percentiles,
+        )
+        return self._adapter.query_dataframe(sql, language="sql")
+
+    @staticmethod
+    def group_stats(df: pd.DataFrame) -> Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]:
+        """
+        Nest summary rows as {site: {device: {metric: {"count", "mean", ...}}}}.
+        Missing values (e.g. stddev of a single point) become None.
+        """
+        out: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        if df.empty:
+            return out
+        keys = ("site", "device", "metric")
+        columns = [c for c in df.columns if c not in keys]
+        for row in df.itertuples(index=False):
+            rec = row._asdict()
+            summary = {}
+            for c in columns:
+                v = rec[c]
+                summary[c] = None if pd.isna(v) else (int(v) if c == "count" else float(v))
+            out.setdefault(rec["site"], {}).setdefault(rec["device"], {})[rec["metric"]] = summary
+        return out
+
+
+def _split_list(value: Any) -> List[str]:
+    """Parse a comma separated query parameter (also accepts repeated params)."""
+    if value is None:
+        return []
+    parts = value if isinstance(value, list) else [value]
+    return [x.strip() for p in parts for x in str(p).split(",") if x.strip()]
+
+
 class InfluxAPI:
     """
     CherryPy endpoint: GET for queries (read-only).
@@ -107,6 +227,108 @@ class InfluxAPI:
             cherrypy.log(f"ERRORE SERVER GET: {e}", traceback=True)
             raise cherrypy.HTTPError(500, "Internal Error")
 
+class InfluxBatchAPI:
+    """
+    CherryPy endpoint: GET /batch for several metrics/sites/devices in one query.
+    Query params: metrics, sites, devices (comma separated), time_range | start/end,
+    limit_per_series. Response: {"series": {site: {device: {metric: [...]}}}, "rows": n}.
+    """
+
+    exposed = True
+
+    def __init__(self, iface: Optional[InfluxInterface] = None) -> None:
+        self._iface = iface or InfluxInterface()
+
+    @cherrypy.tools.json_out()
+    def GET(self, **params):
+        metrics = _split_list(params.get("metrics"))
+        if not metrics:
+            raise cherrypy.HTTPError(400, "missing 'metrics'")
+        try:
+            limit_per_series = int(params.get("limit_per_series", 100))
+        except (TypeError, ValueError):
+            raise cherrypy.HTTPError(400, "invalid 'limit_per_series'")
+
+        try:
+            df = self._iface.read_batch(
+                metrics,
+                sites=_split_list(params.get("sites")),
+                devices=_split_list(params.get("devices")),
+                time_range=params.get("time_range"),
+                start=params.get("start"),
+                end=params.get("end"),
+                limit_per_series=limit_per_series,
+            )
+            logging.info(
+                "GET batch metrics=%s sites=%s devices=%s limit_per_series=%s rows=%s",
+                params.get("metrics"),
+                params.get("sites"),
+                params.get("devices"),
+                limit_per_series,
+                len(df),
+            )
+            return {"series": self._iface.group_series(df), "rows": int(len(df))}
+
+        except ValueError as e:
+            logging.warning("Bad request: %s", e)
+            raise cherrypy.HTTPError(400, str(e))
+        except Exception as e:
+            cherrypy.log(f"ERRORE SERVER GET BATCH: {e}", traceback=True)
+            raise cherrypy.HTTPError(500, "Internal Error")
+
+class InfluxStatsAPI:
+    """
+    CherryPy endpoint: GET /stats for summary statistics computed by InfluxDB.
+    Query params: metrics, sites, devices, percentiles (comma separated),
+    time_range | start/end. Response: {"stats": {site: {device: {metric:
+    {"count", "mean", "min", "max", "stddev", "median", "p5", ...}}}}, "series": n}.
+    """
+
+    exposed = True
+
+    def __init__(self, iface: Optional[InfluxInterface] = None) -> None:
+        self._iface = iface or InfluxInterface()
+
+    @cherrypy.tools.json_out()
+    def GET(self, **params):
+        metrics = _split_list(params.get("metrics"))
+        if not metrics:
+            raise cherrypy.HTTPError(400, "missing 'metrics'")
+        percentiles = None
+        if params.get("percentiles") is not None:
+            try:
+                percentiles = [float(p) for p in _split_list(params.get("percentiles"))]
+            except ValueError:
+                raise cherrypy.HTTPError(400, "invalid 'percentiles'")
+
+        try:
+            df = self._iface.read_stats(
+                metrics,
+                sites=_split_list(params.get("sites")),
+                devices=_split_list(params.get("devices")),
+                time_range=params.get("time_range"),
+                start=params.get("start"),
+                end=params.get("end"),
+                percentiles=percentiles,
+            )
+            logging.info(
+                "GET stats metrics=%s sites=%s devices=%s percentiles=%s series=%s",
+                params.get("metrics"),
+                params.get("sites"),
+                params.get("devices"),
+                params.get("percentiles"),
+                len(df),
+            )
+            return {"stats": self._iface.group_stats(df), "series": int(len(df))}
+
+        except ValueError as e:
+            logging.warning("Bad request: %s", e)
+            raise cherrypy.HTTPError(400, str(e))
+        except Exception as e:
+            cherrypy.log(f"ERRORE SERVER GET STATS: {e}", traceback=True)
+            raise cherrypy.HTTPError(500, "Internal Error")
+
+
 if __name__ == "__main__":
     from dotenv import load_dotenv
 
@@ -125,8 +347,11 @@ if __name__ == "__main__":
         }
     }
 
-    # Montiamo la nuova classe InfluxAPI
-    cherrypy.tree.mount(InfluxAPI(), "/", conf)
+    # Montiamo la nuova classe InfluxAPI (e gli endpoint batch/stats, sulla stessa connessione)
+    iface = InfluxInterface()
+    cherrypy.tree.mount(InfluxAPI(iface), "/", conf)
+    cherrypy.tree.mount(InfluxBatchAPI(iface), "/batch", conf)
+    cherrypy.tree.mount(InfluxStatsAPI(iface), "/stats", conf)
 
     # Opzionale: per renderlo accessibile dalla rete locale
     # cherrypy.config.update({'server.socket_host': '0.0.0.0'})
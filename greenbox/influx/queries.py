@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Sequence
 
 
 class Queries(object):
@@ -58,31 +58,177 @@ class Queries(object):
             raise ValueError(f"Unsupported metric '{metric}'")
 
         conditions = [f"metric = '{metric}'"]
+        conditions += cls._window_conditions(time_range, start, end)
 
+        if device:
+            conditions.append(f"device = '{cls._escape(device)}'")
+        if site:
+            conditions.append(f"site = '{cls._escape(site)}'")
+
+        where_clause = " AND ".join(conditions) if conditions else "1 = 1"
+        sort_direction = "DESC" if order_desc else "ASC"
+
+        return f"""
+        SELECT time, value, site, device, metric
+        FROM sensor_data
+        WHERE {where_clause}
+        ORDER BY time {sort_direction}
+        LIMIT {int(limit)};
+        """
+
+    @classmethod
+    def _in_list(cls, column: str, values: Sequence[str]) -> str:
+        """
+        Build a 'column IN (...)' condition with escaped string literals.
+        """
+        literals = ", ".join(f"'{cls._escape(str(v))}'" for v in values)
+        return f"{column} IN ({literals})"
+
+    @classmethod
+    def _window_conditions(
+        cls,
+        time_range: Optional[str],
+        start: Optional[str],
+        end: Optional[str],
+    ) -> list:
+        conditions = []
         if time_range is not None:
             try:
                 conditions.append(cls.TIME_RANGES[time_range])
             except KeyError as exc:
                 raise ValueError(f"Unsupported time range '{time_range}'") from exc
-
         if start:
             conditions.append(f"time >= '{cls._escape(start)}'")
         if end:
             conditions.append(f"time <= '{cls._escape(end)}'")
-        if device:
-            conditions.append(f"device = '{cls._escape(device)}'")
-        if site:
-            conditions.append(f"site = '{cls._escape(site)}'")
+        return conditions
 
-        where_clause = " AND ".join(conditions) if conditions else "1 = 1"
-        sort_direction = "DESC" if order_desc else "ASC"
+    @classmethod
+    def sensor_data_batch(
+        cls,
+        metrics: Sequence[str],
+        *,
+        sites: Optional[Sequence[str]] = None,
+        devices: Optional[Sequence[str]] = None,
+        time_range: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        limit_per_series: int = 100,
+    ) -> str:
+        """
+        Build a single SQL query for several metrics, sites and devices.
+        Rows come back ordered by site, device, metric and time (newest first),
+        keeping at most `limit_per_series` rows for each (site, device, metric).
+
+        :param metrics: Metrics to fetch, each one of METRICS.
+        :param sites: Optional site filter (any of).
+        :param devices: Optional device filter (any of).
+        :param time_range: Shortcut key from TIME_RANGES (e.g. 'last_hour').
+        :param start: Lower bound for the time column (inclusive), ISO timestamp.
+        :param end: Upper bound for the time column (inclusive), ISO timestamp.
+        :param limit_per_series: Limit for returned rows of each series.
+        :return: Composed SQL query string.
+        """
+        if not metrics:
+            raise ValueError("At least one metric is required")
+        for metric in metrics:
+            if metric not in cls.METRICS:
+                raise ValueError(f"Unsupported metric '{metric}'")
+
+        conditions = [cls._in_list("metric", metrics)]
+        conditions += cls._window_conditions(time_range, start, end)
+        if devices:
+            conditions.append(cls._in_list("device", devices))
+        if sites:
+            conditions.append(cls._in_list("site", sites))
+
+        where_clause = " AND ".join(conditions)
 
         return f"""
         SELECT time, value, site, device, metric
+        FROM (
+            SELECT time, value, site, device, metric,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY site, device, metric ORDER BY time DESC
+                   ) AS rn
+            FROM sensor_data
+            WHERE {where_clause}
+        ) AS s
+        WHERE rn <= {int(limit_per_series)}
+        ORDER BY site, device, metric, time DESC;
+        """
+
+    # Summary columns computed per (site, device, metric) by sensor_stats
+    STATS = ("count", "mean", "min", "max", "stddev", "median")
+
+    @staticmethod
+    def percentile_column(p: float) -> str:
+        """
+        Column name for a percentile, e.g. 5 -> 'p5', 99.9 -> 'p99_9'.
+        """
+        return "p" + f"{float(p):g}".replace(".", "_")
+
+    @classmethod
+    def sensor_stats(
+        cls,
+        metrics: Sequence[str],
+        *,
+        sites: Optional[Sequence[str]] = None,
+        devices: Optional[Sequence[str]] = None,
+        time_range: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        percentiles: Sequence[float] = (5, 95),
+    ) -> str:
+        """
+        Build a SQL query computing summary statistics server-side: one row
+        per (site, device, metric) with the STATS columns plus one column per
+        requested percentile (see percentile_column). The median is exact,
+        percentiles use approx_percentile_cont (t-digest).
+
+        :param metrics: Metrics to summarize, each one of METRICS.
+        :param sites: Optional site filter (any of).
+        :param devices: Optional device filter (any of).
+        :param time_range: Shortcut key from TIME_RANGES (e.g. 'last_hour').
+        :param start: Lower bound for the time column (inclusive), ISO timestamp.
+        :param end: Upper bound for the time column (inclusive), ISO timestamp.
+        :param percentiles: Percentiles in (0, 100).
+        :return: Composed SQL query string.
+        """
+        if not metrics:
+            raise ValueError("At least one metric is required")
+        for metric in metrics:
+            if metric not in cls.METRICS:
+                raise ValueError(f"Unsupported metric '{metric}'")
+        for p in percentiles:
+            if not 0 < float(p) < 100:
+                raise ValueError(f"Unsupported percentile '{p}'")
+
+        conditions = [cls._in_list("metric", metrics)]
+        conditions += cls._window_conditions(time_range, start, end)
+        if devices:
+            conditions.append(cls._in_list("device", devices))
+        if sites:
+            conditions.append(cls._in_list("site", sites))
+
+        where_clause = " AND ".join(conditions)
+        percentile_columns = "".join(
+            f',\n               approx_percentile_cont(value, {float(p) / 100:g}) AS "{cls.percentile_column(p)}"'
+            for p in percentiles
+        )
+
+        return f"""
+        SELECT site, device, metric,
+               count(value) AS "count",
+               avg(value) AS "mean",
+               min(value) AS "min",
+               max(value) AS "max",
+               stddev(value) AS "stddev",
+               median(value) AS "median"{percentile_columns}
         FROM sensor_data
         WHERE {where_clause}
-        ORDER BY time {sort_direction}
-        LIMIT {int(limit)};
+        GROUP BY site, device, metric
+        ORDER BY site, device, metric;
         """
 
     TEST_DATA = """
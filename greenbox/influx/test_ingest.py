@@ -0,0 +1,127 @@
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from greenbox.influx.ingest import IngestionService, MemoryWriter, line_protocol, parse_message
+
+
+def sensor_msg(value, gh="gh01", rb="rb_001", sensor="dht_001", metric="temperature"):
+    topic = f"/{gh}/{rb}/sensors/{sensor}/{metric}"
+    payload = {"value": value, "unit": "°C", "sensor": sensor, "metric": metric, "site": gh, "device": rb}
+    return topic, json.dumps(payload).encode()
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestLineProtocol(unittest.TestCase):
+
+    def test_sensor_payload(self):
+        topic, payload = sensor_msg(21.5)
+        [line] = parse_message(topic, payload, now_ns=123)
+        self.assertEqual(
+            line,
+            "sensor_data,device=rb_001,metric=temperature,sensor=dht_001,site=gh01,unit=°C value=21.5 123",
+        )
+
+    def test_actuator_payload(self):
+        payload = {
+            "id": "fan_001", "timestamp": "2025-01-01T00:00:00+00:00", "seconds_since_on": 10,
+            "system": "ventilation", "level": 50, "energy_consumption": 0, "delta_temperature": -0.1,
+        }
+        [line] = parse_message("/gh01/rb_001/actuators/ventilation/fan_001/data", json.dumps(payload))
+        self.assertEqual(
+            line,
+            "actuator_data,actuator=fan_001,device=rb_001,site=gh01,system=ventilation "
+            "seconds_since_on=10.0,level=50i,energy_consumption=0.0,delta_temperature=-0.1 1735689600000000000",
+        )
+
+    def test_batch_payload(self):
+        payload = {
+            "site": "gh01", "device": "rb_001", "timestamp": "2025-01-01T00:00:00.000001+00:00",
+            "readings": [["tthh_001", "temperature", 21.5, "°C"], ["tthh_001", "humidity", 70, "%"], ["bad"]],
+        }
+        lines = parse_message("/gh01/rb_001/sensors/batch", json.dumps(payload).encode())
+        self.assertEqual(lines, [
+            "sensor_data,device=rb_001,metric=temperature,sensor=tthh_001,site=gh01,unit=°C value=21.5 1735689600000001000",
+            "sensor_data,device=rb_001,metric=humidity,sensor=tthh_001,site=gh01,unit=% value=70.0 1735689600000001000",
+        ])
+
+    def test_escaping_and_invalid(self):
+        line = line_protocol("m", {"site": "gh 1,a=b", "empty": ""}, {"note": 'say "hi"', "x": float("nan")}, 1)
+        self.assertEqual(line, 'm,site=gh\\ 1\\,a\\=b note="say \\"hi\\"" 1')
+        with self.assertRaises(ValueError):
+            parse_message("/gh/rb/sensors/s/temperature", b"not json")
+        with self.assertRaises(ValueError):
+            parse_message("/gh/rb/sensors/s/temperature", b'{"value": "abc"}')
+        with self.assertRaises(ValueError):
+            parse_message("/gh/rb/actuators/fan/cmd", b"{}")
+
+
+class TestIngestionService(unittest.TestCase):
+
+    def test_size_and_time_bounded_batches(self):
+        writer = MemoryWriter()
+        service = IngestionService(writer, batch_size=10, flush_interval_s=0.2)
+        service.start()
+        try:
+            for i in range(25):
+                service.notify(*sensor_msg(float(i)))
+            self.assertTrue(wait_for(lambda: len(writer.lines) == 25))
+        finally:
+            service.stop()
+        self.assertEqual([len(b) for b in writer.batches][:2], [10, 10])
+        stats = service.stats()
+        self.assertEqual(stats["written"], 25)
+        self.assertEqual(stats["max_batch"], 10)
+        self.assertEqual(stats["pending"], 0)
+
+    def test_backpressure_drops_when_full(self):
+        service = IngestionService(MemoryWriter(), max_pending=3, enqueue_timeout_s=0.01)
+        results = [service.put(f"m v={i} 1") for i in range(5)]
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(service.stats()["dropped"], 2)
+
+    def test_retry_spool_and_replay(self):
+        writer = MemoryWriter()
+        writer.fail = True
+        with tempfile.TemporaryDirectory() as spool:
+            service = IngestionService(writer, batch_size=5, flush_interval_s=0.05, retry_batches=1, spool_dir=spool)
+            service.start()
+            try:
+                for i in range(20):
+                    service.notify(*sensor_msg(float(i)))
+                self.assertTrue(wait_for(lambda: service.stats()["spooled"] > 0))
+                self.assertTrue(list(Path(spool).glob("*.lp")))
+
+                writer.fail = False
+                self.assertTrue(wait_for(lambda: len(writer.lines) == 20, timeout=10))
+                self.assertFalse(list(Path(spool).glob("*.lp")))
+            finally:
+                service.stop()
+            values = sorted(float(line.split(" ")[1].split("=")[1]) for line in writer.lines)
+            self.assertEqual(values, [float(i) for i in range(20)])
+            self.assertGreater(service.stats()["write_errors"], 0)
+
+    def test_stop_spools_unwritten_points(self):
+        writer = MemoryWriter()
+        writer.fail = True
+        with tempfile.TemporaryDirectory() as spool:
+            service = IngestionService(writer, batch_size=100, flush_interval_s=10, spool_dir=spool)
+            for i in range(7):
+                service.notify(*sensor_msg(float(i)))
+            service.stop()
+            lines = [l for p in Path(spool).glob("*.lp") for l in p.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(len(lines), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from greenbox.influx.interface import InfluxInterface
+
+START, END = "2025-06-01T11:55:00+00:00", "2025-06-01T12:00:00+00:00"
+
+
+class TestInfluxInterface(unittest.TestCase):
+
+    def setUp(self):
+        self.adapter = MagicMock()
+        self.iface = InfluxInterface(self.adapter)
+
+    def test_read_batch(self):
+        t = pd.Timestamp("2025-06-01T11:59:00Z")
+        self.adapter.query_dataframe.return_value = pd.DataFrame([
+            {"time": t, "value": 21.5, "site": "gh1", "device": "rb1", "metric": "temperature"},
+            {"time": t - pd.Timedelta(minutes=1), "value": 21.0, "site": "gh1", "device": "rb1", "metric": "temperature"},
+            {"time": t, "value": 6.4, "site": "gh1", "device": "rb1", "metric": "pH"},
+            {"time": t, "value": 20.0, "site": "gh1", "device": "rb2", "metric": "temperature"},
+        ])
+        df = self.iface.read_batch(["temperature", "pH"], sites=["gh1"], start=START, end=END, limit_per_series=50)
+
+        self.adapter.query_dataframe.assert_called_once()
+        sql = self.adapter.query_dataframe.call_args.args[0]
+        self.assertIn("metric IN ('temperature', 'pH')", sql)
+        self.assertIn("PARTITION BY site, device, metric", sql)
+        self.assertIn(f"time >= '{START}'", sql)
+        self.assertIn(f"time <= '{END}'", sql)
+        self.assertIn("rn <= 50", sql)
+
+        series = InfluxInterface.group_series(df)
+        self.assertEqual(series, {"gh1": {
+            "rb1": {
+                "temperature": [{"time": str(t), "value": 21.5},
+                                {"time": str(t - pd.Timedelta(minutes=1)), "value": 21.0}],
+                "pH": [{"time": str(t), "value": 6.4}],
+            },
+            "rb2": {"temperature": [{"time": str(t), "value": 20.0}]},
+        }})
+        self.assertEqual(InfluxInterface.group_series(pd.DataFrame()), {})
+
+        with self.assertRaises(ValueError):
+            self.iface.read_batch(["temperature", "co2"])
+        with self.assertRaises(ValueError):
+            self.iface.read_batch(["temperature"], devices=["rb"] * (InfluxInterface.MAX_BATCH_ITEMS + 1))
+
+    def test_read_stats(self):
+        self.adapter.query_dataframe.return_value = pd.DataFrame([
+            {"site": "gh1", "device": "rb1", "metric": "temperature", "count": 3, "mean": 21.0,
+             "min": 20.0, "max": 22.0, "stddev": 1.0, "median": 21.0, "p5": 20.1, "p95": 21.9},
+            {"site": "gh1", "device": "rb2", "metric": "pH", "count": 1, "mean": 6.5,
+             "min": 6.5, "max": 6.5, "stddev": float("nan"), "median": 6.5, "p5": 6.5, "p95": 6.5},
+        ])
+        df = self.iface.read_stats(["temperature", "pH"], sites=["gh1"], devices=["rb1", "rb2"], start=START, end=END)
+
+        sql = self.adapter.query_dataframe.call_args.args[0]
+        self.assertIn("GROUP BY site, device, metric", sql)
+        self.assertIn(f"time >= '{START}'", sql)
+        self.assertIn(f"time <= '{END}'", sql)
+        self.assertIn("device IN ('rb1', 'rb2')", sql)
+        self.assertIn('"p5"', sql)
+        self.assertIn('"p95"', sql)
+
+        stats = InfluxInterface.group_stats(df)
+        self.assertEqual(stats["gh1"]["rb1"]["temperature"], {
+            "count": 3, "mean": 21.0, "min": 20.0, "max": 22.0, "stddev": 1.0, "median": 21.0, "p5": 20.1, "p95": 21.9,
+        })
+        self.assertIsInstance(stats["gh1"]["rb1"]["temperature"]["count"], int)
+        # the stddev of a single point is missing
+        self.assertIsNone(stats["gh1"]["rb2"]["pH"]["stddev"])
+        self.assertEqual(InfluxInterface.group_stats(pd.DataFrame()), {})
+
+        with self.assertRaises(ValueError):
+            self.iface.read_stats(["temperature"], percentiles=[5.0] * (InfluxInterface.MAX_PERCENTILES + 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from greenbox.influx.queries import Queries
+
+
+class TestQueries(unittest.TestCase):
+
+    def test_sensor_data_filters(self):
+        sql = Queries.sensor_data(
+            "temperature", time_range="last_hour", device="rb_001", site="gh01", limit=10
+        )
+        self.assertIn("metric = 'temperature'", sql)
+        self.assertIn(Queries.TIME_RANGES["last_hour"], sql)
+        self.assertIn("device = 'rb_001'", sql)
+        self.assertIn("site = 'gh01'", sql)
+        self.assertIn("LIMIT 10;", sql)
+
+    def test_sensor_data_batch_single_query(self):
+        """
+        A batch covers several metrics/sites/devices with IN lists and a per-series limit.
+        """
+        sql = Queries.sensor_data_batch(
+            ["temperature", "humidity"],
+            sites=["gh01"],
+            devices=["rb_001", "rb_002"],
+            start="2025-01-01T00:00:00+00:00",
+            limit_per_series=50,
+        )
+        self.assertIn("metric IN ('temperature', 'humidity')", sql)
+        self.assertIn("site IN ('gh01')", sql)
+        self.assertIn("device IN ('rb_001', 'rb_002')", sql)
+        self.assertIn("time >= '2025-01-01T00:00:00+00:00'", sql)
+        self.assertIn("PARTITION BY site, device, metric", sql)
+        self.assertIn("rn <= 50", sql)
+        self.assertEqual(sql.count("FROM sensor_data"), 1)
+
+    def test_sensor_data_batch_escapes_literals(self):
+        sql = Queries.sensor_data_batch(["pH"], devices=["rb'1"])
+        self.assertIn("device IN ('rb''1')", sql)
+
+    def test_sensor_data_batch_rejects_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            Queries.sensor_data_batch(["temperature", "co2"])
+        with self.assertRaises(ValueError):
+            Queries.sensor_data_batch([])
+
+    def test_sensor_stats_one_row_per_series(self):
+        sql = Queries.sensor_stats(
+            ["temperature", "humidity"], sites=["gh01"], time_range="last_hour", percentiles=(5, 99.9)
+        )
+        self.assertIn("GROUP BY site, device, metric", sql)
+        self.assertIn('median(value) AS "median"', sql)
+        self.assertIn('stddev(value) AS "stddev"', sql)
+        self.assertIn('approx_percentile_cont(value, 0.05) AS "p5"', sql)
+        self.assertIn('approx_percentile_cont(value, 0.999) AS "p99_9"', sql)
+        self.assertNotIn("LIMIT", sql)
+
+    def test_sensor_stats_rejects_bad_percentile(self):
+        for p in (0, 100, -1):
+            with self.assertRaises(ValueError):
+                Queries.sensor_stats(["temperature"], percentiles=(p,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Shared asyncio runtime for RaspberryHub (SENSOR_HUB_MODE=asyncio).
+
+Every hub of the process runs on one event loop in one background thread;
+sensors are coroutines woken by a TimerWheel, and MQTT goes through
+MyMQTT(loop=...) so no hub owns a thread.
+"""
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wheel: Optional["TimerWheel"] = None
+_lock = threading.Lock()
+
+
+class TimerWheel:
+    """
+    Aligned periodic ticks for many coroutines.
+
+    `await wheel.tick(interval)` returns at the next multiple of `interval`
+    (wall clock), so every coroutine with the same interval wakes at the
+    same instant from a single timer, and their work runs back to back in
+    one loop iteration.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._slots: Dict[float, asyncio.Future] = {}
+        self.fired = 0
+
+    async def tick(self, interval: float) -> float:
+        """Wait for the next aligned tick; returns its timestamp."""
+        fut = self._slots.get(interval)
+        if fut is None:
+            now = time.time()
+            due = (math.floor(now / interval) + 1) * interval
+            fut = self._loop.create_future()
+            self._slots[interval] = fut
+            self._loop.call_later(due - now, self._fire, interval, fut, due)
+        # shield: a cancelled waiter must not cancel the others' tick
+        return await asyncio.shield(fut)
+
+    def _fire(self, interval: float, fut: asyncio.Future, due: float) -> None:
+        if self._slots.get(interval) is fut:
+            del self._slots[interval]
+        self.fired += 1
+        fut.set_result(due)
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide hub loop, started on first use."""
+    global _loop, _wheel
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _wheel = TimerWheel(_loop)
+            threading.Thread(target=_loop.run_forever, name="hub-loop", daemon=True).start()
+        return _loop
+
+
+def get_wheel() -> TimerWheel:
+    get_loop()
+    return _wheel
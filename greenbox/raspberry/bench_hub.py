@@ -0,0 +1,135 @@
+"""
+Benchmark: thread-per-sensor hubs vs asyncio hubs in one process.
+
+    python -m greenbox.raspberry.bench_hub [--sensors 1000 10000] [--per-hub 100]
+                                           [--seconds 20] [--interval 5]
+
+Builds sensors/per-hub RaspberryHubs (per-measurement publishing, two
+measurements per sensor every --interval seconds) against the broker
+stand-in of utils.bench_mqtt in a child process, starts them, runs them for
+--seconds and reports the start time, then threads, RSS, CPU time and
+messages published over the run. 'threads' uses the shared MQTT connection
+(MQTT_SHARED=1), since one dedicated connection per sensor stops working
+past a few hundred sensors (see utils.bench_mqtt_pool); 'asyncio' is
+SENSOR_HUB_MODE=asyncio with one loop-driven connection per hub.
+
+Readings come from a constant stub so that scheduling and publishing are
+measured, not the mock series.
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import threading
+import time
+
+from greenbox.raspberry.raspberry import RaspberryHub
+from greenbox.raspberry.sensors import Sensor
+from greenbox.utils.bench_mqtt_pool import _rss_mb, _serve
+
+
+class StubSensor(Sensor):
+    def hardware_read(self):
+        return {"temperature": 21.5, "humidity": 60.0}
+
+
+def _published(hubs) -> int:
+    total = 0
+    for hub in hubs:
+        if hub.mqtt is not None:
+            total += hub.mqtt.published
+        total += sum(s._mqtt.published for s in hub.sensors if s._mqtt is not None)
+    return total
+
+
+def run(port: int, sensors: int, per_hub: int, seconds: float, mode: str) -> dict:
+    os.environ["SENSOR_HUB_MODE"] = mode
+    os.environ["MQTT_SHARED"] = "1" if mode == "threads" else "0"
+    base_threads, base_rss = threading.active_count(), _rss_mb()
+    context = {"broker_ip": "127.0.0.1", "broker_port": port, "greenhouse_id": "greenhouse_0001"}
+    sensor_config = {"measurements": ["temperature", "humidity"], "units": {"temperature": "°C", "humidity": "%"}}
+
+    hubs = []
+    for h in range(max(1, sensors // per_hub)):
+        rb = f"raspberry_{h:04d}"
+        hub = RaspberryHub(rb, {"sensors": []}, is_sim=False, device_context=context)
+        hub.sensors = [
+            StubSensor({"id": f"tthh_{h:04d}_{i:03d}", **sensor_config}, "127.0.0.1", port, hub.topic)
+            for i in range(per_hub)
+        ]
+        hubs.append(hub)
+
+    t0 = time.perf_counter()
+    for hub in hubs:
+        hub.start()
+    start_s = time.perf_counter() - t0
+
+    cpu0, published0, t0 = resource.getrusage(resource.RUSAGE_SELF), _published(hubs), time.perf_counter()
+    time.sleep(seconds)
+    cpu1, published1, elapsed = resource.getrusage(resource.RUSAGE_SELF), _published(hubs), time.perf_counter() - t0
+    threads = threading.active_count() - base_threads
+    rss = _rss_mb() - base_rss
+    for hub in hubs:
+        hub.stop()
+    cpu_s = (cpu1.ru_utime - cpu0.ru_utime) + (cpu1.ru_stime - cpu0.ru_stime)
+    published = published1 - published0
+    return {
+        "start_s": start_s,
+        "threads": threads,
+        "rss": rss,
+        "published": published,
+        # two measurements per sensor per tick
+        "expected": int(sensors * 2 * elapsed / float(os.environ["TIME_INTERVAL_SENSORS"])),
+        "cpu_us_per_msg": cpu_s / max(published, 1) * 1e6,
+    }
+
+
+def _run_child(queue, *args) -> None:
+    queue.put(run(*args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thread vs asyncio sensor hub benchmark.")
+    parser.add_argument("--sensors", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--per-hub", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument(
+        "--threads-max", type=int, default=2000,
+        help="Skip thread-mode runs above this many sensors (10k threads take minutes to start and stop).",
+    )
+    args = parser.parse_args()
+
+    log_file = tempfile.NamedTemporaryFile(prefix="bench_hub_", suffix=".log", delete=False)
+    logging.basicConfig(filename=log_file.name, level=logging.WARNING, force=True)
+    os.environ["TIME_INTERVAL_SENSORS"] = str(args.interval)
+    os.environ["MQTT_LOG_EVERY"] = "0"
+
+    queue = mp.Queue()
+    broker = mp.Process(target=_serve, args=(queue,), daemon=True)
+    broker.start()
+    port = queue.get(timeout=10)
+
+    print(f"per_hub={args.per_hub} seconds={args.seconds} interval={args.interval} log={log_file.name}")
+    print(f"{'sensors':>7} {'mode':>8} {'start s':>7} {'threads':>7} {'rss MB':>7} {'published':>9} {'expected':>8} {'cpu us/msg':>10}")
+    for sensors in args.sensors:
+        for mode in ("asyncio", "threads"):
+            if mode == "threads" and sensors > args.threads_max:
+                print(f"{sensors:>7} {mode:>8} skipped (--threads-max {args.threads_max})")
+                continue
+            # fresh process per configuration
+            proc = mp.Process(target=_run_child, args=(queue, port, sensors, args.per_hub, args.seconds, mode))
+            proc.start()
+            r = queue.get()
+            proc.join()
+            print(
+                f"{sensors:>7} {mode:>8} {r['start_s']:>7.2f} {r['threads']:>7} {r['rss']:>7.1f} {r['published']:>9} "
+                f"{r['expected']:>8} {r['cpu_us_per_msg']:>10.1f}"
+            )
+    broker.terminate()
+
+
+if __name__ == "__main__":
+    main()
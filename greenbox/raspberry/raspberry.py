@@ -1,10 +1,16 @@
 from pprint import pformat
 from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
-from typing import Dict, Any
+import os
+import threading
+from typing import Dict, Any, Optional
 
+from greenbox.raspberry import aio
 from greenbox.raspberry.sensors import Sensor, SensorSim
 from greenbox.utils.catalog_client import get_device_config
+from greenbox.utils.mqtt import MyMQTT
+from greenbox.utils.sensor_messages import batch_topic, build_batch
 
 
 class RaspberryHub:
@@ -13,15 +19,22 @@ class RaspberryHub:
     It receives its specific configuration upon initialization.
     """
 
-    def __init__(self, raspberry_id: str, local_config: Dict[str, Any], is_sim: bool = True):
+    def __init__(
+        self,
+        raspberry_id: str,
+        local_config: Dict[str, Any],
+        is_sim: bool = True,
+        device_context: Optional[Dict[str, Any]] = None,
+    ):
         self.raspberry_id = raspberry_id
         self.is_sim = is_sim
         
         # Sensor configuration is passed directly from the runner
         associated_sensors = local_config.get("sensors", [])
 
-        # Get context (greenhouse, broker) from the central catalog
-        device_context = get_device_config(self.raspberry_id)
+        # Get context (greenhouse, broker) from the central catalog, unless given
+        if device_context is None:
+            device_context = get_device_config(self.raspberry_id)
         self.broker_ip = device_context["broker_ip"]
         self.broker_port = device_context["broker_port"]
         self.greenhouse_id = device_context["greenhouse_id"]
@@ -44,15 +57,155 @@ class RaspberryHub:
         self._executor = None
         self.futures = []
 
+        # Publish mode: "per_measurement" (each sensor publishes each measurement)
+        # or "batch" (one message per tick with every sensor's readings)
+        self.publish_mode = os.getenv("SENSOR_PUBLISH_MODE", "per_measurement")
+        if self.publish_mode not in ("per_measurement", "batch"):
+            raise ValueError(f"Unsupported SENSOR_PUBLISH_MODE '{self.publish_mode}'")
+        self.batch_topic = batch_topic(self.greenhouse_id, self.raspberry_id)
+        self.mqtt = None
+        self._stop_event = threading.Event()
+        self._batch_thread = None
+
+        # Hub mode: "threads" (one thread per sensor, or one for the batch) or
+        # "asyncio" (coroutines on the process-wide loop of raspberry.aio)
+        self.hub_mode = os.getenv("SENSOR_HUB_MODE", "threads")
+        if self.hub_mode not in ("threads", "asyncio"):
+            raise ValueError(f"Unsupported SENSOR_HUB_MODE '{self.hub_mode}'")
+        self._async_run = None
+
     def start(self):
         """Start all sensor loops in parallel threads."""
+        if self.hub_mode == "asyncio":
+            self._start_asyncio()
+            return
+        if self.publish_mode == "batch":
+            self._start_batch()
+            return
         self._executor = ThreadPoolExecutor(max_workers=len(self.sensors))
         self.futures = [self._executor.submit(s.read_value) for s in self.sensors]
         logging.info(f"[{self.raspberry_id}] All %d sensor workers started.", len(self.sensors))
 
+    def _start_batch(self):
+        """Single publisher thread: read every sensor, send one batch message per tick."""
+        self.mqtt = MyMQTT(clientID=self.raspberry_id, broker=self.broker_ip, port=self.broker_port, notifier=None)
+        self.mqtt.start()
+        for s in self.sensors:
+            if isinstance(s, SensorSim):
+                # Still needed to receive the actuator deltas
+                s.start()
+        self._stop_event.clear()
+        self._batch_thread = threading.Thread(target=self._batch_loop, daemon=True)
+        self._batch_thread.start()
+        logging.info(f"[{self.raspberry_id}] Batch publisher started for %d sensors on %s.", len(self.sensors), self.batch_topic)
+
+    def _collect_batch(self):
+        readings = []
+        for s in self.sensors:
+            try:
+                readings.extend(s.batch_readings())
+            except Exception:
+                logging.exception("[%s] Reading of sensor %s failed", self.raspberry_id, s.device_id)
+        if readings:
+            self.mqtt.MyPublish(self.batch_topic, build_batch(self.greenhouse_id, self.raspberry_id, readings))
+
+    def _batch_loop(self):
+        interval = float(os.getenv("TIME_INTERVAL_SENSORS"))
+        while not self._stop_event.is_set():
+            self._collect_batch()
+            if self._stop_event.wait(timeout=interval):
+                break
+
+    def _stop_batch(self):
+        self._stop_event.set()
+        if self._batch_thread:
+            self._batch_thread.join(timeout=5)
+            self._batch_thread = None
+        for s in self.sensors:
+            if isinstance(s, SensorSim):
+                s.stop()
+        if self.mqtt:
+            self.mqtt.stop()
+            self.mqtt = None
+
+    # --- asyncio mode ---
+
+    def _start_asyncio(self):
+        """Schedule the hub on the shared loop: one coroutine per sensor (or one for the batch), no threads."""
+        loop = aio.get_loop()
+        self._async_run = asyncio.run_coroutine_threadsafe(self._spawn(), loop).result()
+        logging.info(f"[{self.raspberry_id}] %d sensors scheduled on the shared event loop.", len(self.sensors))
+
+    async def _spawn(self):
+        return asyncio.get_running_loop().create_task(self._run_async())
+
+    async def _run_async(self):
+        loop = asyncio.get_running_loop()
+        wheel = aio.get_wheel()
+        self.mqtt = MyMQTT(clientID=self.raspberry_id, broker=self.broker_ip, port=self.broker_port, notifier=None, loop=loop)
+        try:
+            # blocking TCP connect off the loop; the socket is then served by it
+            await loop.run_in_executor(None, self.mqtt.start)
+            if any(isinstance(s, SensorSim) for s in self.sensors):
+                # One subscription for the whole zone instead of one per sensor
+                self.mqtt.MySubscribe(
+                    f"/{self.greenhouse_id}/{self.raspberry_id}/actuators/+system/+actuator_id/data",
+                    handler=self._on_actuator_data,
+                )
+            if self.publish_mode == "batch":
+                tasks = [self._batch_task(wheel)]
+            else:
+                tasks = [self._sensor_task(s, wheel) for s in self.sensors]
+            await asyncio.gather(*tasks)
+        finally:
+            self.mqtt.stop()
+            self.mqtt = None
+
+    async def _sensor_task(self, sensor, wheel):
+        while True:
+            await wheel.tick(sensor.time_interval)
+            try:
+                for topic, payload in sensor.messages(sensor.adjust(sensor.read_once())):
+                    self.mqtt.MyPublish(topic, payload)
+            except Exception:
+                logging.exception("[%s] Reading of sensor %s failed", self.raspberry_id, sensor.device_id)
+
+    async def _batch_task(self, wheel):
+        interval = float(os.getenv("TIME_INTERVAL_SENSORS"))
+        while True:
+            await wheel.tick(interval)
+            self._collect_batch()
+
+    def _on_actuator_data(self, topic, payload, segments):
+        for s in self.sensors:
+            if isinstance(s, SensorSim):
+                s.on_actuator_data(topic, payload, segments)
+
+    def _stop_asyncio(self):
+        task, self._async_run = self._async_run, None
+        if task is None:
+            return
+
+        async def cancel():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel(), aio.get_loop()).result(timeout=5)
+        except Exception:
+            logging.exception(f"[{self.raspberry_id}] Error in sensor worker during shutdown.")
+
     def stop(self):
         """Signal graceful stop and wait for all workers to finish."""
         logging.info(f"[{self.raspberry_id}] Stopping all sensor workers...")
+        if self.hub_mode == "asyncio":
+            self._stop_asyncio()
+            logging.info(f"[{self.raspberry_id}] All sensor workers stopped.")
+            return
+        if self.publish_mode == "batch":
+            self._stop_batch()
+            logging.info(f"[{self.raspberry_id}] All sensor workers stopped.")
+            return
         for s in self.sensors:
             s.request_stop()
         
@@ -1,17 +1,18 @@
 import os
 from dotenv import load_dotenv
-import json
 import threading
 import logging
 
+from greenbox.utils.clock import SYSTEM_CLOCK
 from greenbox.utils.mqtt import MyMQTT
+from greenbox.utils.serializers import decode_payload
 from greenbox.sim.mockseries.mockseries import SimulateRealTimeReading
 
 load_dotenv()
 
 
 class Sensor:
-    def __init__(self, config_dict, broker_ip, broker_port, base_topic):
+    def __init__(self, config_dict, broker_ip, broker_port, base_topic, mqtt_factory=None, clock=None):
 
         # Load sensor attribute
         self.device_id = config_dict["id"]
@@ -22,9 +23,11 @@ class Sensor:
         self.time_interval = float(os.getenv("TIME_INTERVAL_SENSORS"))
         # self.time_interval = os.getenv("TIME_INTERVAL_SENSORS")
 
-        self.mqtt = MyMQTT(
-            clientID=self.device_id, broker=broker_ip, port=broker_port, notifier=None
-        )
+        # Created on first use: sensors of an asyncio hub publish through the hub's client
+        self._broker = (broker_ip, broker_port)
+        self._mqtt = None
+        self._mqtt_factory = mqtt_factory or MyMQTT
+        self.clock = clock or SYSTEM_CLOCK
         self.base_topic = base_topic
         topic_parts = base_topic.strip("/").split("/")
         self.site_id = topic_parts[0] if len(topic_parts) > 0 else None
@@ -32,6 +35,15 @@ class Sensor:
 
         self._stop_event = threading.Event()
 
+    @property
+    def mqtt(self):
+        if self._mqtt is None:
+            broker_ip, broker_port = self._broker
+            self._mqtt = self._mqtt_factory(
+                clientID=self.device_id, broker=broker_ip, port=broker_port, notifier=None
+            )
+        return self._mqtt
+
     def _build_publisher_topic(self, measurement_key):
         return self.base_topic + self.device_id + "/" + measurement_key
 
@@ -53,6 +65,26 @@ class Sensor:
     def hardware_read(self):
         raise NotImplementedError
 
+    def read_once(self):
+        """One raw reading (dict keyed by measurement, or scalar)."""
+        return self.hardware_read()
+
+    def adjust(self, value):
+        """Hook applied to a reading before it is published."""
+        return value
+
+    def batch_readings(self):
+        """
+        Take one reading and return it as [sensor_id, metric, value, unit] rows
+        for a batch message (see utils.sensor_messages).
+        """
+        rows = []
+        for field, raw in self._fields(self.adjust(self.read_once())):
+            payload = self._build_payload(field, raw)
+            if payload is not None:
+                rows.append([self.device_id, field, payload["value"], payload["unit"]])
+        return rows
+
     def start(self):
         self.mqtt.start()
 
@@ -64,26 +96,30 @@ class Sensor:
         finally:
             logging.info("[%s] Stopped.", self.device_id)
 
-    def send_value(self, value):
+    def _fields(self, value):
         """
         If value is a dict, look up each measurement by its 'field' key.
         If value is scalar, replicate to all measurements.
         """
-        if isinstance(value, dict):
-            for m in self.measurements:
-                field = m.get("field") if isinstance(m, dict) else str(m)
+        for m in self.measurements:
+            field = m.get("field") if isinstance(m, dict) else str(m)
+            if isinstance(value, dict):
                 if field in value:
-                    topic = self._build_publisher_topic(field)
-                    payload = self._build_payload(field, value[field])
-                    if payload is not None:
-                        self.mqtt.MyPublish(topic, payload)
-        else:
-            for m in self.measurements:
-                field = m.get("field") if isinstance(m, dict) else str(m)
-                topic = self._build_publisher_topic(field)
-                payload = self._build_payload(field, value)
-                if payload is not None:
-                    self.mqtt.MyPublish(topic, payload)
+                    yield field, value[field]
+            else:
+                yield field, value
+
+    def messages(self, value):
+        """(topic, payload) of each measurement of a reading."""
+        for field, raw in self._fields(value):
+            payload = self._build_payload(field, raw)
+            if payload is not None:
+                yield self._build_publisher_topic(field), payload
+
+    def send_value(self, value):
+        """Publish one message per measurement."""
+        for topic, payload in self.messages(value):
+            self.mqtt.MyPublish(topic, payload)
 
     def request_stop(self):
         """Signal the reading loop to stop gracefully."""
@@ -116,28 +152,24 @@ class SensorSim(Sensor):
     before publishing the read value.
     """
 
-    def __init__(self, config_dict, broker_ip, broker_port, base_topic):
-        super().__init__(config_dict, broker_ip, broker_port, base_topic)
-        # Replace MQTT client with one that calls back here
-        self.mqtt = MyMQTT(
-            clientID=self.device_id, broker=broker_ip, port=broker_port, notifier=self
-        )
+    def __init__(self, config_dict, broker_ip, broker_port, base_topic, mqtt_factory=None, clock=None):
+        super().__init__(config_dict, broker_ip, broker_port, base_topic, mqtt_factory, clock)
 
         # Latest deltas per actuator, e.g. {"fan_001": {"temperature": -0.12, "humidity": -0.4}, ...}
         self._actuator_deltas = {}
         self._lock = threading.Lock()
+        # One daily series per measurement, built on first read
+        self._readers = {}
 
         # Subscribe to all actuators' data for THIS specific zone (greenhouse/raspberry)
-        self._actuator_topic = f"/{self.site_id}/{self.raspberry_id}/actuators/+/+/data"
-        # self._actuator_topic = (
-        #     self.base_topic.replace(f"/+/sensors/", "/actuators/") + "+/+/data"
-        # )
+        self._actuator_topic = f"/{self.site_id}/{self.raspberry_id}/actuators/+system/+actuator_id/data"
 
-    def notify(self, topic, payload):
+    def on_actuator_data(self, topic, payload, segments):
         """
         Called by MyMQTT when a message arrives at subscribed actuator topics.
         Store the *latest* delta_<field> per actuator.
-        Topic format: /<gh>/<rb>/actuators/<system>/<id>/data
+        Topic format: /<gh>/<rb>/actuators/<system>/<id>/data (the router
+        hands over <system> and <id> in `segments`).
         Expects payload like:
         {
           "id": "...",
@@ -147,20 +179,11 @@ class SensorSim(Sensor):
         }
         """
         try:
-            data = json.loads(
-                payload.decode() if isinstance(payload, (bytes, bytearray)) else payload
-            )
-        except Exception:
-            return
-
-            # Extract actuator_id from topic
-        parts = topic.strip("/").split("/")
-        try:
-            i = parts.index("actuators")
-            actuator_id = parts[i + 2]  # <system>=i+1, <id>=i+2
-        except Exception:
+            data = decode_payload(payload)
+        except ValueError:
             return
 
+        actuator_id = segments["actuator_id"]
         with self._lock:
             slot = self._actuator_deltas.setdefault(actuator_id, {})
             for k, v in data.items():
@@ -174,7 +197,7 @@ class SensorSim(Sensor):
     def start(self):
         super().start()
         # Listen to all actuators on this box
-        self.mqtt.MySubscribe(self._actuator_topic)
+        self.mqtt.MySubscribe(self._actuator_topic, handler=self.on_actuator_data)
 
     def stop(self):
         try:
@@ -264,14 +287,27 @@ class SensorSim(Sensor):
         adjusted = self._apply_and_clear_deltas(value)
         super().send_value(adjusted)
 
+    def adjust(self, value):
+        return self._apply_and_clear_deltas(value)
+
+    def read_once(self):
+        return self._fake_read()
+
     def read_value(self):
         self.loop(self._fake_read)
 
+    def _reader(self, measurement):
+        reader = self._readers.get(measurement)
+        if reader is None:
+            reader = self._readers[measurement] = SimulateRealTimeReading(measurement)
+        return reader
+
     def _fake_read(self):
         if len(self.measurements) == 1:
             m = self.measurements[0]
-            return SimulateRealTimeReading(m).read()
+            return self._reader(m).value_at(self.clock.now())
 
+        now = self.clock.now()
         sensors = [m for m in self.measurements if m != "light_natural"]
-        readings = {m: SimulateRealTimeReading(m).read() for m in sensors}
+        readings = {m: self._reader(m).value_at(now) for m in sensors}
         return readings
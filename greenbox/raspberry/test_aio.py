@@ -0,0 +1,114 @@
+import asyncio
+import contextlib
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from greenbox.raspberry.aio import TimerWheel
+from greenbox.raspberry.raspberry import RaspberryHub
+from greenbox.utils.mqtt_local import LocalBroker
+from greenbox.utils.serializers import decode_payload
+
+SENSORS = [
+    {"id": "tthh_001", "measurements": ["temperature", "humidity"], "units": {"temperature": "°C", "humidity": "%"}},
+    {"id": "shsh_001", "measurements": ["soil_humidity"], "units": {"soil_humidity": "%"}},
+]
+CONTEXT = {"greenhouse_id": "gh1", "broker_ip": "localhost", "broker_port": 1883}
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestTimerWheel(unittest.TestCase):
+
+    def test_same_interval_shares_one_tick(self):
+        async def main():
+            wheel = TimerWheel(asyncio.get_running_loop())
+            woke = []
+
+            async def sensor(i):
+                woke.append((i, await wheel.tick(0.05)))
+
+            await asyncio.gather(*(sensor(i) for i in range(100)))
+            return wheel, woke
+
+        wheel, woke = asyncio.run(main())
+        self.assertEqual(wheel.fired, 1)
+        self.assertEqual(len({due for _, due in woke}), 1)
+        due = woke[0][1]
+        self.assertAlmostEqual(due / 0.05, round(due / 0.05), places=6)
+
+    def test_cancelled_waiter_keeps_tick(self):
+        async def main():
+            wheel = TimerWheel(asyncio.get_running_loop())
+            a = asyncio.ensure_future(wheel.tick(0.05))
+            b = asyncio.ensure_future(wheel.tick(0.05))
+            await asyncio.sleep(0)
+            a.cancel()
+            return await b, wheel.fired
+
+        due, fired = asyncio.run(main())
+        self.assertEqual(fired, 1)
+        self.assertGreater(due, 0)
+
+
+
+class TestAsyncioHub(unittest.TestCase):
+    """RaspberryHub with SENSOR_HUB_MODE=asyncio on a LocalBroker."""
+
+    @contextlib.contextmanager
+    def _run_hub(self, publish_mode):
+        broker = LocalBroker()
+        received = []
+        broker.router.add("/gh1/rb1/sensors/#", lambda topic, payload, segments: received.append((topic, payload)))
+        env = {"SENSOR_HUB_MODE": "asyncio", "SENSOR_PUBLISH_MODE": publish_mode, "TIME_INTERVAL_SENSORS": "0.05"}
+        with patch.dict(os.environ, env), patch("greenbox.raspberry.raspberry.MyMQTT", broker.client):
+            hub = RaspberryHub("rb1", {"sensors": SENSORS}, is_sim=True, device_context=CONTEXT)
+            hub.start()
+            try:
+                yield hub, broker, received
+            finally:
+                hub.stop()
+
+    def _check_deltas_and_stop(self, hub, broker, received):
+        # One zone-wide subscription feeds every SensorSim
+        broker.client("act").MyPublish("/gh1/rb1/actuators/heating_system/h1/data", {"delta_temperature": 1.5})
+        for sensor in hub.sensors:
+            self.assertEqual(sensor._actuator_deltas, {"h1": {"temperature": 1.5}})
+            # The sensors publish through the hub's client, never their own
+            self.assertIsNone(sensor._mqtt)
+        hub.stop()
+        self.assertIsNone(hub._async_run)
+        self.assertIsNone(hub.mqtt)
+        self.assertEqual(len(broker.router.route("/gh1/rb1/actuators/heating_system/h1/data")), 0)
+        count = len(received)
+        time.sleep(0.15)
+        self.assertEqual(len(received), count)
+
+    def test_per_measurement(self):
+        with self._run_hub("per_measurement") as (hub, broker, received):
+            expected = {"/gh1/rb1/sensors/tthh_001/temperature", "/gh1/rb1/sensors/tthh_001/humidity",
+                        "/gh1/rb1/sensors/shsh_001/soil_humidity"}
+            self.assertTrue(_wait(lambda: expected <= {topic for topic, _ in received}))
+            payload = decode_payload(dict(received)["/gh1/rb1/sensors/tthh_001/temperature"])
+            self.assertEqual((payload["sensor"], payload["unit"], payload["site"]), ("tthh_001", "°C", "gh1"))
+            self._check_deltas_and_stop(hub, broker, received)
+
+    def test_batch(self):
+        with self._run_hub("batch") as (hub, broker, received):
+            self.assertTrue(_wait(lambda: received))
+            topic, payload = received[0]
+            self.assertEqual(topic, "/gh1/rb1/sensors/batch")
+            rows = decode_payload(payload)["readings"]
+            self.assertEqual({(r[0], r[1]) for r in rows},
+                             {("tthh_001", "temperature"), ("tthh_001", "humidity"), ("shsh_001", "soil_humidity")})
+            self._check_deltas_and_stop(hub, broker, received)
+
+
+if __name__ == '__main__':
+    unittest.main()
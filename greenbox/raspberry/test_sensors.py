@@ -0,0 +1,35 @@
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from greenbox.raspberry.sensors import Sensor
+
+CONFIG = {"id": "tthh_001", "measurements": ["temperature", "humidity"], "units": {"temperature": "°C", "humidity": "%"}}
+
+
+@patch.dict(os.environ, {"TIME_INTERVAL_SENSORS": "5"})
+class TestSensor(unittest.TestCase):
+
+    def test_messages(self):
+        sensor = Sensor(CONFIG, "localhost", 1883, "/gh1/rb1/sensors/")
+        messages = list(sensor.messages({"temperature": 21.23456, "humidity": "n/a", "light": 3}))
+        # unparsable and unconfigured fields are dropped
+        self.assertEqual(messages, [(
+            "/gh1/rb1/sensors/tthh_001/temperature",
+            {"value": 21.235, "unit": "°C", "sensor": "tthh_001", "metric": "temperature", "site": "gh1", "device": "rb1"},
+        )])
+        # a scalar goes to every measurement
+        self.assertEqual([topic for topic, _ in sensor.messages(50)],
+                         ["/gh1/rb1/sensors/tthh_001/temperature", "/gh1/rb1/sensors/tthh_001/humidity"])
+
+    def test_client_created_on_first_use(self):
+        factory = MagicMock()
+        sensor = Sensor(CONFIG, "broker", 1884, "/gh1/rb1/sensors/", mqtt_factory=factory)
+        factory.assert_not_called()
+        sensor.send_value({"temperature": 20, "humidity": 60})
+        factory.assert_called_once_with(clientID="tthh_001", broker="broker", port=1884, notifier=None)
+        self.assertEqual(factory.return_value.MyPublish.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
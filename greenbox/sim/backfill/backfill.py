@@ -0,0 +1,447 @@
+"""
+Historical backfill: months of synthetic telemetry without running SensorSim
+in real time.
+
+    python -m greenbox.sim.backfill.backfill --start 2025-01-01 --end 2025-04-01
+        [--step 1] [--format lp|parquet|influx|null] [--out backfill]
+        [--workers N] [--chunk-hours 24] [--seed 0]
+        [--duty 0.25] [--slot-s 900] [--no-effects]
+
+Every sensor metric of raspberry/config.json is generated with
+Measure.generate_batch, one batch per metric across all zones. Each actuator
+of actuators/config.json (matched by raspberry id) follows a random schedule:
+in every --slot-s slot it is on with probability --duty, at one of its
+effects.csv levels. Its delta_* effects are added to the sensors of its zone
+the way SensorSim applies them (rate x seconds since on, light as a
+constant), and while on it reports every --actuator-period seconds with the
+fields an Actuator publishes.
+
+Points have the measurements and tags of influx.ingest (sensor_data /
+actuator_data), so they are read like live data. The range is cut into
+chunks generated by --workers processes; each chunk becomes one line
+protocol file, Parquet files, or --batch sized writes through
+InfluxDBAdapter ('null' formats the line protocol and discards it).
+
+Each chunk draws its noise from (seed, chunk) and starts with its actuators
+off, so chunks are reproducible and independent of each other.
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from greenbox.influx.ingest import ACTUATOR_MEASUREMENT, SENSOR_MEASUREMENT, series_key
+from greenbox.sim.mockseries.mockseries import Measure
+from greenbox.utils import catalog_client
+
+ROOT = Path(__file__).resolve().parents[2]
+SENSOR_CONFIG = ROOT / "raspberry" / "config.json"
+ACTUATOR_CONFIG = ROOT / "actuators" / "config.json"
+FORMATS = ("lp", "parquet", "influx", "null")
+
+
+@dataclass(frozen=True)
+class SensorSeries:
+    """One metric of one sensor."""
+    device: str
+    sensor: str
+    metric: str
+    unit: Optional[str]
+
+
+@dataclass(frozen=True)
+class ActuatorSpec:
+    device: str
+    actuator: str
+    system: str
+
+
+@dataclass
+class ActuatorRun:
+    """Points of one actuator in a chunk: sample positions and field arrays."""
+    spec: ActuatorSpec
+    positions: np.ndarray
+    fields: Dict[str, np.ndarray]
+
+
+@dataclass
+class Chunk:
+    start: pd.Timestamp
+    time_ns: np.ndarray
+    values: np.ndarray  # (len(series), len(time_ns))
+    actuators: List[ActuatorRun]
+
+    @property
+    def points(self) -> int:
+        return self.values.size + sum(len(r.positions) for r in self.actuators)
+
+
+def load_topology(
+    sensor_config: Path = SENSOR_CONFIG, actuator_config: Optional[Path] = ACTUATOR_CONFIG
+) -> Tuple[List[SensorSeries], List[ActuatorSpec]]:
+    """Sensor series of every raspberry of `sensor_config` and the actuators of those raspberries."""
+    with open(sensor_config, "r", encoding="utf-8") as f:
+        raspberries = json.load(f).get("raspberries", [])
+    series = []
+    for rb in raspberries:
+        for sensor in rb.get("sensors", []):
+            for m in sensor["measurements"]:
+                metric = m.get("field") if isinstance(m, dict) else str(m)
+                series.append(SensorSeries(rb["id"], sensor["id"], metric, sensor.get("units", {}).get(metric)))
+
+    actuators = []
+    if actuator_config is not None and Path(actuator_config).is_file():
+        devices = {rb["id"] for rb in raspberries}
+        with open(actuator_config, "r", encoding="utf-8") as f:
+            greenhouses = json.load(f).get("greenhouses", [])
+        for gh in greenhouses:
+            for rb in gh.get("raspberries", []):
+                if rb["id"] in devices:
+                    actuators += [ActuatorSpec(rb["id"], a["id"], a["type"]) for a in rb.get("actuators", [])]
+    return series, actuators
+
+
+class EffectsTable:
+    """
+    effects.csv by system: the 'on' levels with their consumptions and
+    delta rates per metric (missing values are 0).
+    """
+
+    CONSUMPTIONS = ("energy_consumption", "water_consumption")
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.systems: Dict[str, dict] = {}
+        metric_cols = [c for c in df.columns if c not in ("system", "level") + self.CONSUMPTIONS]
+        for system, rows in df.groupby("system", sort=False):
+            levels = rows["level"].astype(str).str.rstrip("%").astype(float).astype(int).to_numpy()
+            on = rows[levels > 0]
+            self.systems[system] = {
+                "levels": levels[levels > 0],
+                "consumption": {c: on[c].fillna(0.0).to_numpy(float) for c in self.CONSUMPTIONS},
+                "rates": {m: on[m].fillna(0.0).to_numpy(float) for m in metric_cols if on[m].notna().any()},
+            }
+
+
+class Backfill:
+    """Generates the chunks of a backfill; see the module docstring."""
+
+    def __init__(
+        self,
+        site: str,
+        series: List[SensorSeries],
+        actuators: List[ActuatorSpec],
+        effects: Optional[EffectsTable],
+        step_s: int = 1,
+        seed: int = 0,
+        duty: float = 0.25,
+        slot_s: int = 900,
+        actuator_period_s: int = 5,
+        tz: str = "UTC",
+    ) -> None:
+        if step_s < 1:
+            raise ValueError("step_s must be >= 1")
+        self.site = site
+        self.series = series
+        self.effects = effects
+        self.actuators = [a for a in actuators if effects is not None and a.system in effects.systems]
+        self.step_s = int(step_s)
+        self.seed = int(seed)
+        self.duty = float(duty)
+        self.slot_s = int(slot_s)
+        self.actuator_period_s = int(actuator_period_s)
+        self.tz = tz
+
+        self._by_metric: Dict[str, List[int]] = {}
+        for i, s in enumerate(series):
+            self._by_metric.setdefault(s.metric, []).append(i)
+        self._measures = {m: Measure.from_json(m) for m in self._by_metric}
+        # Line protocol up to the value of each series, built once
+        self._prefixes = [
+            series_key(
+                SENSOR_MEASUREMENT,
+                {"site": site, "device": s.device, "metric": s.metric, "sensor": s.sensor, "unit": s.unit},
+            ) + " value="
+            for s in series
+        ]
+
+    def chunks(self, start, end, hours: float) -> List[Tuple[int, pd.Timestamp, pd.Timestamp]]:
+        """(chunk number, start, end) covering [start, end)."""
+        start, end = pd.Timestamp(start, tz=self.tz), pd.Timestamp(end, tz=self.tz)
+        if end <= start:
+            raise ValueError("end must be after start")
+        size = pd.Timedelta(hours=hours)
+        out, t = [], start
+        while t < end:
+            out.append((len(out), t, min(t + size, end)))
+            t += size
+        return out
+
+    def _seed(self, chunk_no: int, stream: int) -> int:
+        return int(np.random.SeedSequence([self.seed, chunk_no, stream]).generate_state(1)[0])
+
+    def generate(self, chunk_no: int, start: pd.Timestamp, end: pd.Timestamp) -> Chunk:
+        index = pd.date_range(start, end, freq=f"{self.step_s}s", inclusive="left")
+        n = len(index)
+        values = np.empty((len(self.series), n))
+        for stream, (metric, rows) in enumerate(self._by_metric.items()):
+            values[rows] = self._measures[metric].generate_batch(
+                metric, index, len(rows), seed=self._seed(chunk_no, stream)
+            )
+
+        seconds = (index.asi8 - index.asi8[0]) // 10**9
+        rng = np.random.default_rng(self._seed(chunk_no, len(self._by_metric)))
+        deltas: Dict[Tuple[str, str], np.ndarray] = {}
+        runs = []
+        for spec in self.actuators:
+            run = self._actuator(spec, seconds, rng, deltas)
+            if run is not None:
+                runs.append(run)
+        for i, s in enumerate(self.series):
+            delta = deltas.get((s.device, s.metric))
+            if delta is not None:
+                values[i] += delta
+        # Sensors publish 3 decimals
+        np.round(values, 3, out=values)
+        return Chunk(start, index.asi8, values, runs)
+
+    def _actuator(self, spec: ActuatorSpec, seconds: np.ndarray, rng, deltas) -> Optional[ActuatorRun]:
+        """
+        Draw the actuator's schedule, add its effects to `deltas` and return
+        its reported points (None if it stays off for the whole chunk).
+        """
+        system = self.effects.systems[spec.system]
+        n_slots = int(seconds[-1]) // self.slot_s + 1
+        # Index into the system's 'on' levels per slot, -1 when off
+        plan = np.where(
+            rng.random(n_slots) < self.duty, rng.integers(0, len(system["levels"]), n_slots), -1
+        )
+        slot = seconds // self.slot_s
+        code = plan[slot]
+        on = code >= 0
+        if not on.any():
+            return None
+        # A level change restarts the 'seconds since on' count, as Actuator._turn_on does
+        changed = np.ones(n_slots, dtype=bool)
+        changed[1:] = plan[1:] != plan[:-1]
+        run_start = np.maximum.accumulate(np.where(changed, np.arange(n_slots), 0))
+        elapsed = (seconds - run_start[slot] * self.slot_s).astype(float)
+        level = np.where(on, code, 0)
+
+        fields: Dict[str, np.ndarray] = {}
+        for metric, rates in system["rates"].items():
+            rate = np.where(on, rates[level], 0.0)
+            # Light is a constant output, the others accumulate since on (see Actuator.apply)
+            delta = rate if metric == "light" else rate * elapsed
+            key = (spec.device, metric)
+            deltas[key] = deltas[key] + delta if key in deltas else delta
+            fields[f"delta_{metric}"] = delta
+
+        period = max(self.actuator_period_s, self.step_s)
+        positions = np.flatnonzero(on & (seconds % period < self.step_s))
+        out = {
+            "level": system["levels"][code[positions]],
+            "seconds_since_on": elapsed[positions],
+        }
+        for c, v in system["consumption"].items():
+            out[c] = v[code[positions]]
+        for k, v in fields.items():
+            out[k] = v[positions]
+        return ActuatorRun(spec, positions, out)
+
+    # --- output ---
+
+    def line_protocol(self, chunk: Chunk) -> List[pa.Array]:
+        """The chunk as arrays of newline-terminated line protocol points."""
+        ts = pc.cast(pa.array(chunk.time_ns), pa.string())
+        out = [
+            _join(prefix, pc.cast(pa.array(values), pa.string()), " ", ts, "\n")
+            for prefix, values in zip(self._prefixes, chunk.values)
+        ]
+        for run in chunk.actuators:
+            spec = run.spec
+            key = series_key(
+                ACTUATOR_MEASUREMENT,
+                {"site": self.site, "device": spec.device, "system": spec.system, "actuator": spec.actuator},
+            )
+            parts: list = []
+            for i, (name, v) in enumerate(run.fields.items()):
+                parts.append(f"{key} {name}=" if i == 0 else f",{name}=")
+                parts.append(pc.cast(pa.array(v), pa.string()))
+                if name == "level":
+                    parts.append("i")
+            out.append(_join(*parts, " ", pc.take(ts, pa.array(run.positions)), "\n"))
+        return out
+
+    def tables(self, chunk: Chunk) -> Tuple[pa.Table, Optional[pa.Table]]:
+        """The chunk as (sensor_data, actuator_data) tables, one row per point."""
+        k, n = chunk.values.shape
+        rows = np.repeat(np.arange(k, dtype=np.int32), n)
+
+        def tag(values) -> pa.DictionaryArray:
+            return pa.DictionaryArray.from_arrays(rows, pa.array(values, pa.string()))
+
+        sensors = pa.table({
+            "time": pa.array(np.tile(chunk.time_ns, k), pa.timestamp("ns", tz="UTC")),
+            "site": tag([self.site] * k),
+            "device": tag([s.device for s in self.series]),
+            "sensor": tag([s.sensor for s in self.series]),
+            "metric": tag([s.metric for s in self.series]),
+            "unit": tag([s.unit for s in self.series]),
+            "value": chunk.values.ravel(),
+        })
+        if not chunk.actuators:
+            return sensors, None
+        frames = [
+            pd.DataFrame({
+                "time": pd.to_datetime(chunk.time_ns[run.positions], utc=True),
+                "site": self.site,
+                "device": run.spec.device,
+                "system": run.spec.system,
+                "actuator": run.spec.actuator,
+                **run.fields,
+            })
+            for run in chunk.actuators
+        ]
+        return sensors, pa.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False)
+
+
+def _join(*parts) -> pa.Array:
+    return pc.binary_join_element_wise(*[pa.scalar(p) if isinstance(p, str) else p for p in parts], pa.scalar(""))
+
+
+def _text(lines: pa.Array) -> memoryview:
+    """The concatenated string data of `lines` (no copy)."""
+    offsets = np.frombuffer(lines.buffers()[1], dtype=np.int32, count=len(lines) + 1, offset=lines.offset * 4)
+    return memoryview(lines.buffers()[2])[offsets[0]:offsets[-1]]
+
+
+# --- worker processes ---
+
+_backfill: Optional[Backfill] = None
+_options: dict = {}
+_adapter = None
+
+
+def _init_worker(backfill: Backfill, options: dict) -> None:
+    global _backfill, _options
+    _backfill, _options = backfill, options
+
+
+def write_chunk(backfill: Backfill, chunk: Chunk, fmt: str, out: Optional[Path], batch: int = 50_000) -> int:
+    """Write one chunk; returns the bytes of line protocol (or Parquet) produced."""
+    global _adapter
+    name = chunk.start.strftime("%Y%m%dT%H%M%S")
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        size = 0
+        for measurement, table in zip((SENSOR_MEASUREMENT, ACTUATOR_MEASUREMENT), backfill.tables(chunk)):
+            if table is not None:
+                path = out / f"{measurement}_{name}.parquet"
+                pq.write_table(table, path)
+                size += path.stat().st_size
+        return size
+
+    arrays = backfill.line_protocol(chunk)
+    if fmt == "lp":
+        with open(out / f"{name}.lp", "wb") as f:
+            return sum(f.write(_text(lines)) for lines in arrays)
+    if fmt == "influx":
+        from greenbox.influx.adapter import InfluxDBAdapter
+
+        if _adapter is None:
+            _adapter = InfluxDBAdapter()
+        size = 0
+        for lines in arrays:
+            for i in range(0, len(lines), batch):
+                text = _text(lines.slice(i, batch))
+                _adapter.write(bytes(text).decode())
+                size += len(text)
+        return size
+    if fmt == "null":
+        return sum(len(_text(lines)) for lines in arrays)
+    raise ValueError(f"Unsupported format '{fmt}'")
+
+
+def _run_chunk(job: Tuple[int, pd.Timestamp, pd.Timestamp]) -> Tuple[int, int, int]:
+    chunk_no, start, end = job
+    chunk = _backfill.generate(chunk_no, start, end)
+    size = write_chunk(_backfill, chunk, _options["format"], _options["out"], _options["batch"])
+    logging.info("[backfill] Chunk %d (%s): %d points, %d bytes", chunk_no, start, chunk.points, size)
+    return chunk_no, chunk.points, size
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Generate historical sensor and actuator telemetry.")
+    parser.add_argument("--start", required=True, help="First timestamp, e.g. 2025-01-01.")
+    parser.add_argument("--end", required=True, help="End of the range (excluded).")
+    parser.add_argument("--step", type=int, default=1, help="Seconds between readings.")
+    parser.add_argument("--site", default="greenhouse_0001", help="Greenhouse id used as the 'site' tag.")
+    parser.add_argument("--tz", default="UTC", help="Timezone of --start/--end and of the daily cycle.")
+    parser.add_argument("--sensors", type=Path, default=SENSOR_CONFIG, help="raspberry/config.json topology.")
+    parser.add_argument("--actuators", type=Path, default=ACTUATOR_CONFIG, help="actuators/config.json topology.")
+    parser.add_argument("--no-effects", action="store_true", help="Sensors only, no actuator schedule.")
+    parser.add_argument("--duty", type=float, default=0.25, help="Probability an actuator is on in a slot.")
+    parser.add_argument("--slot-s", type=int, default=900, help="Length of an actuator schedule slot.")
+    parser.add_argument("--actuator-period", type=int, default=5, help="Seconds between actuator points while on.")
+    parser.add_argument("--format", choices=FORMATS, default="lp")
+    parser.add_argument("--out", type=Path, default=Path("backfill"), help="Output directory (lp, parquet).")
+    parser.add_argument("--batch", type=int, default=50_000, help="Points per InfluxDB write.")
+    parser.add_argument("--chunk-hours", type=float, default=24.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s: %(message)s")
+
+    series, actuators = load_topology(args.sensors, None if args.no_effects else args.actuators)
+    effects = None if args.no_effects else EffectsTable(catalog_client.get_effects_config(args.site))
+    backfill = Backfill(
+        args.site, series, actuators, effects,
+        step_s=args.step, seed=args.seed, duty=args.duty, slot_s=args.slot_s,
+        actuator_period_s=args.actuator_period, tz=args.tz,
+    )
+    jobs = backfill.chunks(args.start, args.end, args.chunk_hours)
+    if args.format in ("lp", "parquet"):
+        args.out.mkdir(parents=True, exist_ok=True)
+    options = {"format": args.format, "out": args.out, "batch": args.batch}
+    logging.info(
+        "[backfill] %d series, %d actuators, %d chunks, %d workers, format=%s",
+        len(series), len(backfill.actuators), len(jobs), args.workers, args.format,
+    )
+
+    t0 = time.perf_counter()
+    points = size = 0
+    if args.workers <= 1:
+        _init_worker(backfill, options)
+        results = map(_run_chunk, jobs)
+        for _, p, b in results:
+            points, size = points + p, size + b
+        if _adapter is not None:
+            _adapter.close()
+    else:
+        with mp.Pool(args.workers, initializer=_init_worker, initargs=(backfill, options)) as pool:
+            for _, p, b in pool.imap_unordered(_run_chunk, jobs):
+                points, size = points + p, size + b
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{points} points ({size / 2**20:.1f} MB) in {elapsed:.1f} s: "
+        f"{points / elapsed / 1e6:.2f} M points/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
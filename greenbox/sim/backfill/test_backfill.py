@@ -0,0 +1,106 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from greenbox.influx.ingest import SENSOR_MEASUREMENT, line_protocol
+from greenbox.sim.backfill import backfill as bf
+
+EFFECTS = pd.DataFrame({
+    "system": ["heating_system", "heating_system"],
+    "level": ["0%", "50%"],
+    "energy_consumption": [np.nan, 50.0],
+    "water_consumption": [np.nan, np.nan],
+    "temperature": [np.nan, 0.01],
+    "humidity": [np.nan, np.nan],
+    "light": [np.nan, np.nan],
+})
+
+
+class _Adapter:
+    def __init__(self):
+        self.writes = []
+
+    def write(self, record):
+        self.writes.append(record)
+
+
+class TestBackfill(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        root = Path(self.dir.name)
+        self.sensors = root / "sensors.json"
+        self.actuators = root / "actuators.json"
+        self.sensors.write_text(json.dumps({"raspberries": [{"id": "rb_001", "sensors": [
+            {"id": "tthh_001", "measurements": ["temperature", "humidity"], "units": {"temperature": "°C", "humidity": "%"}},
+        ]}]}))
+        self.actuators.write_text(json.dumps({"greenhouses": [{"id": "gh01", "raspberries": [
+            {"id": "rb_001", "actuators": [{"id": "heater_001", "type": "heating_system"}]},
+            {"id": "rb_999", "actuators": [{"id": "heater_999", "type": "heating_system"}]},
+        ]}]}))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def backfill(self, effects=True, **kwargs):
+        series, actuators = bf.load_topology(self.sensors, self.actuators)
+        return bf.Backfill("gh01", series, actuators, bf.EffectsTable(EFFECTS) if effects else None, **kwargs)
+
+    def test_line_protocol_matches_ingest(self):
+        backfill = self.backfill(effects=False)
+        (_, start, end), = backfill.chunks("2025-01-01", "2025-01-01 00:10", 1)
+        chunk = backfill.generate(0, start, end)
+        lines = bytes(bf._text(backfill.line_protocol(chunk)[0])).decode().splitlines()
+        self.assertEqual(len(lines), 600)
+        key, value, ts = lines[5].rsplit(" ", 2)
+        expected = line_protocol(
+            SENSOR_MEASUREMENT,
+            {"site": "gh01", "device": "rb_001", "metric": "temperature", "sensor": "tthh_001", "unit": "°C"},
+            {"value": float(chunk.values[0, 5])},
+            int(chunk.time_ns[5]),
+        )
+        e_key, e_value, e_ts = expected.rsplit(" ", 2)
+        self.assertEqual((key, ts), (e_key, e_ts))
+        self.assertEqual(float(value.split("=")[1]), float(e_value.split("=")[1]))
+
+    def test_effects_overlay(self):
+        plain = self.backfill(effects=False, seed=3)
+        heated = self.backfill(seed=3, duty=1.0, slot_s=600)
+        self.assertEqual([a.actuator for a in heated.actuators], ["heater_001"])
+        (_, start, end), = plain.chunks("2025-01-01", "2025-01-01 00:20", 1)
+        a, b = plain.generate(0, start, end), heated.generate(0, start, end)
+        # Always on at the same level: one run, temperature += 0.01/s since start
+        expected = 0.01 * np.arange(1200)
+        np.testing.assert_allclose(b.values[0] - a.values[0], expected, atol=2e-3)
+        np.testing.assert_array_equal(b.values[1], a.values[1])
+        run, = b.actuators
+        self.assertEqual(len(run.positions), 240)
+        self.assertEqual(set(run.fields["level"]), {50})
+        self.assertEqual(set(run.fields["energy_consumption"]), {50.0})
+
+    def test_chunks_reproducible_and_batched_writes(self):
+        backfill = self.backfill(seed=7, duty=0.5)
+        jobs = backfill.chunks("2025-01-01", "2025-01-01 03:00", 1)
+        self.assertEqual(len(jobs), 3)
+        first = backfill.generate(*jobs[1])
+        np.testing.assert_array_equal(first.values, backfill.generate(*jobs[1]).values)
+        self.assertFalse(np.array_equal(first.values, backfill.generate(*jobs[2]).values))
+
+        adapter = _Adapter()
+        bf._adapter = adapter
+        try:
+            size = bf.write_chunk(backfill, first, "influx", None, batch=1000)
+        finally:
+            bf._adapter = None
+        lines = "".join(adapter.writes).splitlines()
+        self.assertEqual(len(lines), first.points)
+        self.assertEqual(size, sum(len(w.encode()) for w in adapter.writes))
+        self.assertTrue(all(len(w.splitlines()) <= 1000 for w in adapter.writes))
+
+
+if __name__ == '__main__':
+    unittest.main()
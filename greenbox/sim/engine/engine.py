@@ -0,0 +1,287 @@
+"""
+Accelerated-time closed loop: sensors, actuators, statistics and controller
+in one process on a virtual clock.
+
+    python -m greenbox.sim.engine.engine [--start 2025-06-01] [--days 7]
+        [--speed 0] [--out sim_out] [--env OPTIMIZER_SEARCH=bnb ...]
+
+The real components run unchanged on a LocalBroker (in-process MQTT) and a
+VirtualClock: a SensorSim per sensor of raspberry/config.json reads every
+TIME_INTERVAL_SENSORS seconds, each Actuator of actuators/config.json
+publishes its state every publish_period_s while on, a stream-mode
+StateAggregator publishes a snapshot per zone every
+STATS_AGGREGATION_INTERVAL_S and the Controller answers with commands. The
+Scheduler runs these events in virtual time order, either as fast as
+possible (--speed 0) or at most --speed times faster than real time.
+
+--env KEY=VALUE sets the components' environment settings (optimizer
+search, decision cache, statistics window...) before they are built, so
+runs with different settings can be compared. For each zone a CSV with one
+row per snapshot is written to --out: the metric medians the controller
+saw, the level of every system, the commands sent so far and the
+cumulative energy (J/m³) and water (g/m³); a summary with the time spent
+in band per metric is printed at the end.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from greenbox.actuators.actuators import Actuator
+from greenbox.controller.controller import Controller
+from greenbox.controller.optimizer import Optimizer
+from greenbox.raspberry.sensors import SensorSim
+from greenbox.statistics.statistics import StateAggregator
+from greenbox.utils import catalog_client
+from greenbox.utils.clock import VirtualClock
+from greenbox.utils.mqtt_local import LocalBroker
+from greenbox.utils.serializers import decode_payload
+
+ROOT = Path(__file__).resolve().parents[2]
+SENSOR_CONFIG = ROOT / "raspberry" / "config.json"
+ACTUATOR_CONFIG = ROOT / "actuators" / "config.json"
+
+
+class Scheduler:
+    """Discrete-event queue on a VirtualClock: events run in time order, FIFO at equal times."""
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+        self._queue: List[Tuple[float, int, Callable, tuple]] = []
+        self._seq = itertools.count()
+        self.events = 0
+
+    def call_at(self, t: float, fn: Callable, *args) -> None:
+        heapq.heappush(self._queue, (t, next(self._seq), fn, args))
+
+    def call_soon(self, fn: Callable, *args) -> None:
+        self.call_at(self.clock.time(), fn, *args)
+
+    def every(self, period_s: float, fn: Callable, first: Optional[float] = None) -> None:
+        """Call fn() every period_s seconds, first at `first` (default: one period from now)."""
+        start = self.clock.time() + period_s if first is None else first
+
+        def tick(k: int) -> None:
+            fn()
+            self.call_at(start + (k + 1) * period_s, tick, k + 1)
+
+        self.call_at(start, tick, 0)
+
+    def run_until(self, end: float, speed: float = 0.0) -> None:
+        """
+        Run the events up to `end` (virtual seconds); with speed > 0, wait so
+        that virtual time runs at most `speed` times faster than real time.
+        """
+        wall0, virtual0 = time.monotonic(), self.clock.time()
+        while self._queue and self._queue[0][0] <= end:
+            t, _, fn, args = heapq.heappop(self._queue)
+            if speed > 0:
+                delay = wall0 + (t - virtual0) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self.clock.advance(t)
+            fn(*args)
+            self.events += 1
+        self.clock.advance(end)
+
+
+class Recorder:
+    """Per-zone time series read off the bus: snapshots, commands and actuator consumptions."""
+
+    def __init__(self, broker: LocalBroker, clock: VirtualClock, actuator_period_s: float) -> None:
+        self.clock = clock
+        self.actuator_period_s = float(actuator_period_s)
+        self.rows: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self.levels: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.mqtt = broker.client("sim_recorder")
+        self.mqtt.MySubscribe("/+gh/+rb/statistics/state", handler=self._on_state)
+        self.mqtt.MySubscribe("/+gh/+rb/actuators/+system/cmd", handler=self._on_cmd)
+        self.mqtt.MySubscribe("/+gh/+rb/actuators/+system/+actuator/data", handler=self._on_data)
+
+    def _zone(self, segments) -> Tuple[str, str]:
+        zone = (segments["gh"], segments["rb"])
+        if zone not in self.totals:
+            self.rows[zone] = []
+            self.levels[zone] = {}
+            self.totals[zone] = {"commands": 0, "energy": 0.0, "water": 0.0}
+        return zone
+
+    def _on_state(self, topic, payload, segments):
+        zone = self._zone(segments)
+        metrics = decode_payload(payload).get("metrics", {})
+        row = {"time": self.clock.now(timezone.utc)}
+        row.update({m: v.get("median") for m, v in metrics.items() if isinstance(v, dict)})
+        row.update(self.levels[zone])
+        row.update(self.totals[zone])
+        self.rows[zone].append(row)
+
+    def _on_cmd(self, topic, payload, segments):
+        zone = self._zone(segments)
+        cmd = decode_payload(payload)
+        level = int(float(cmd.get("level") or 0)) if str(cmd.get("cmd", "")).upper() == "ON" else 0
+        self.levels[zone][segments["system"]] = level
+        self.totals[zone]["commands"] += 1
+
+    def _on_data(self, topic, payload, segments):
+        totals = self.totals[self._zone(segments)]
+        data = decode_payload(payload)
+        # Rates held until the next report
+        totals["energy"] += float(data.get("energy_consumption") or 0.0) * self.actuator_period_s
+        totals["water"] += float(data.get("water_consumption") or 0.0) * self.actuator_period_s
+
+    def frames(self) -> Dict[Tuple[str, str], pd.DataFrame]:
+        return {zone: pd.DataFrame(rows).set_index("time") for zone, rows in self.rows.items() if rows}
+
+    def summary(self, thresholds) -> pd.DataFrame:
+        """Per zone: share of snapshots in band per metric, commands, energy and water totals."""
+        out = {}
+        for zone, df in self.frames().items():
+            row = {}
+            for metric, th in thresholds.items():
+                if metric in df:
+                    values = df[metric].dropna()
+                    row[f"{metric}_in_band"] = round(float(((values >= th.lower) & (values <= th.upper)).mean()), 3)
+            row.update(self.totals[zone])
+            out["/".join(zone)] = row
+        return pd.DataFrame(out).T
+
+
+class Simulation:
+    """
+    The closed loop of one greenhouse on a virtual clock starting at `start`:
+    every component is built on the same LocalBroker and clock, and the
+    Scheduler drives their periodic work (see the module docstring).
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        site: str = "greenhouse_0001",
+        sensor_config: Path = SENSOR_CONFIG,
+        actuator_config: Path = ACTUATOR_CONFIG,
+    ) -> None:
+        self.site = site
+        self.clock = VirtualClock(start.timestamp())
+        self.scheduler = Scheduler(self.clock)
+        self.broker = LocalBroker(schedule=self.scheduler.call_soon)
+        factory = self.broker.client
+
+        with open(sensor_config, "r", encoding="utf-8") as f:
+            raspberries = json.load(f).get("raspberries", [])
+        self.sensors = [
+            SensorSim(cfg, None, None, f"/{site}/{rb['id']}/sensors/", mqtt_factory=factory, clock=self.clock)
+            for rb in raspberries
+            for cfg in rb.get("sensors", [])
+        ]
+
+        self.actuators = []
+        devices = {rb["id"] for rb in raspberries}
+        with open(actuator_config, "r", encoding="utf-8") as f:
+            for gh in json.load(f).get("greenhouses", []):
+                for rb in gh.get("raspberries", []):
+                    if rb["id"] not in devices:
+                        continue
+                    self.actuators += [
+                        Actuator(
+                            a["id"], a["type"], site, rb["id"], None, None,
+                            mqtt_factory=factory, clock=self.clock, publisher_thread=False,
+                        )
+                        for a in rb.get("actuators", [])
+                    ]
+
+        measurements = sorted({
+            m.get("field") if isinstance(m, dict) else str(m)
+            for s in self.sensors
+            for m in s.measurements
+        })
+        zones = {"broker_ip": None, "broker_port": None, "greenhouses": [
+            {"greenhouse_id": site, "raspberries": sorted(devices), "measurements": measurements},
+        ]}
+        self.aggregator = StateAggregator(catalog_data=zones, mqtt_factory=factory, clock=self.clock, fetch_mode="stream")
+        self.controller = Controller(mqtt_factory=factory, clock=self.clock)
+        self.actuator_period_s = self.actuators[0].publish_period_s if self.actuators else 5.0
+        self.recorder = Recorder(self.broker, self.clock, self.actuator_period_s)
+        self._started = False
+
+    def _publish_actuators(self) -> None:
+        for actuator in self.actuators:
+            if actuator.is_on:
+                actuator.publish_state()
+
+    def start(self) -> None:
+        """Subscribe every component and schedule their periodic work."""
+        for sensor in self.sensors:
+            sensor.start()
+            self.scheduler.every(sensor.time_interval, lambda s=sensor: s.send_value(s.read_once()))
+        for actuator in self.actuators:
+            actuator.start()
+        self.scheduler.every(self.actuator_period_s, self._publish_actuators)
+        self.aggregator.mqtt.start()
+        self.aggregator.mqtt.MySubscribe(self.aggregator.sensor_topic)
+        self.scheduler.every(self.aggregator.aggregation_interval_s, self.aggregator.run_cycle)
+        self.controller.mqtt.start()
+        self.controller.mqtt.MySubscribe("/+/+/statistics/state")
+        self._started = True
+
+    def run(self, seconds: float, speed: float = 0.0) -> None:
+        """Advance the loop by `seconds` of virtual time."""
+        if not self._started:
+            self.start()
+        self.scheduler.run_until(self.clock.time() + seconds, speed)
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Closed-loop greenhouse simulation on a virtual clock.")
+    parser.add_argument("--start", default="2025-06-01", help="Virtual start time (local).")
+    parser.add_argument("--days", type=float, default=7.0)
+    parser.add_argument("--speed", type=float, default=0.0, help="Times faster than real time (0 = as fast as possible).")
+    parser.add_argument("--site", default="greenhouse_0001")
+    parser.add_argument("--sensors", type=Path, default=SENSOR_CONFIG, help="raspberry/config.json topology.")
+    parser.add_argument("--actuators", type=Path, default=ACTUATOR_CONFIG, help="actuators/config.json topology.")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Setting for the components.")
+    parser.add_argument("--out", type=Path, default=Path("sim_out"), help="Directory of the per-zone CSV files.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s: %(message)s")
+    os.environ.setdefault("TIME_INTERVAL_SENSORS", "5")
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Unsupported --env '{item}', expected KEY=VALUE")
+        os.environ[key] = value
+    # The controller would only log the error on every snapshot and never act
+    search = os.getenv("OPTIMIZER_SEARCH", "auto")
+    if search not in Optimizer.SEARCH_STRATEGIES:
+        raise ValueError(f"Unsupported search strategy '{search}', expected one of {', '.join(Optimizer.SEARCH_STRATEGIES)}")
+
+    sim = Simulation(datetime.fromisoformat(args.start), site=args.site, sensor_config=args.sensors, actuator_config=args.actuators)
+    seconds = args.days * 86400
+    t0 = time.perf_counter()
+    sim.run(seconds, speed=args.speed)
+    elapsed = time.perf_counter() - t0
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    for (gh_id, rb_id), df in sim.recorder.frames().items():
+        df.to_csv(args.out / f"{gh_id}_{rb_id}.csv")
+    print(
+        f"{args.days:g} days in {elapsed:.1f} s ({seconds / elapsed:.0f}x real time), "
+        f"{sim.scheduler.events} events, {sim.broker.published} messages"
+    )
+    print(sim.recorder.summary(catalog_client.get_thresholds_config(args.site)).to_string())
+    print(f"decision cache: {sim.controller.decision_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
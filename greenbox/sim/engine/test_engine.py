@@ -0,0 +1,79 @@
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from greenbox.sim.engine.engine import Scheduler, Simulation
+from greenbox.utils.clock import VirtualClock
+from greenbox.utils.mqtt_local import LocalBroker
+from greenbox.utils.serializers import decode_payload
+
+
+class _Inbox:
+    def __init__(self):
+        self.messages = []
+
+    def notify(self, topic, payload):
+        self.messages.append((topic, payload))
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_time_order_and_periodic_events(self):
+        clock = VirtualClock(1000.0)
+        scheduler = Scheduler(clock)
+        seen = []
+        scheduler.every(10, lambda: seen.append(("tick", clock.time())))
+        scheduler.call_at(1015, lambda: seen.append(("once", clock.time())))
+        scheduler.call_at(1015, lambda: seen.append(("same time, later", clock.time())))
+        scheduler.run_until(1030)
+        self.assertEqual(seen, [
+            ("tick", 1010.0), ("once", 1015.0), ("same time, later", 1015.0), ("tick", 1020.0), ("tick", 1030.0),
+        ])
+        self.assertEqual(clock.time(), 1030.0)
+        with self.assertRaises(ValueError):
+            clock.advance(1000)
+
+    def test_local_broker_delivers_after_the_current_event(self):
+        clock = VirtualClock()
+        scheduler = Scheduler(clock)
+        broker = LocalBroker(schedule=scheduler.call_soon)
+        inbox = _Inbox()
+        sub = broker.client("sub", notifier=inbox)
+        sub.MySubscribe("/gh/+/sensors/#")
+        pub = broker.client("pub")
+        pub.MyPublish("/gh/rb_001/sensors/t_001/temperature", {"value": 21.0})
+        pub.MyPublish("/gh/rb_001/actuators/fan/cmd", {"cmd": "ON"})
+        self.assertEqual(inbox.messages, [])
+        scheduler.run_until(0)
+        (topic, payload), = inbox.messages
+        self.assertEqual((topic, decode_payload(payload)), ("/gh/rb_001/sensors/t_001/temperature", {"value": 21.0}))
+        sub.MyUnsubscribe()
+        pub.MyPublish("/gh/rb_001/sensors/t_001/temperature", {"value": 22.0})
+        scheduler.run_until(0)
+        self.assertEqual(len(inbox.messages), 1)
+
+
+class TestSimulation(unittest.TestCase):
+
+    @patch.dict(os.environ, {"TIME_INTERVAL_SENSORS": "5", "STATS_AGGREGATION_INTERVAL_S": "10"})
+    def test_closed_loop_hour(self):
+        sim = Simulation(datetime(2025, 6, 1, 12))
+        start = sim.clock.time()
+        sim.run(3600)
+        self.assertEqual(sim.clock.time(), start + 3600)
+        frames = sim.recorder.frames()
+        self.assertEqual(sorted(rb for _, rb in frames), ["rb_001", "rb_002"])
+        df = frames[("greenhouse_0001", "rb_001")]
+        # One snapshot per aggregation interval, on virtual time
+        self.assertEqual(len(df), 360)
+        self.assertEqual((df.index[-1] - df.index[0]).total_seconds(), 3590)
+        self.assertIn("temperature", df)
+        # The controller acted and the actuators reported their consumption
+        self.assertGreater(df["commands"].iloc[-1], 0)
+        self.assertGreater(df["energy"].iloc[-1], 0)
+        self.assertTrue(any(a.is_on for a in sim.actuators))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: series generation, per-sample loops vs vectorized.
+
+    python -m greenbox.sim.mockseries.bench_generation [--days 1] [--sensors 20]
+
+'loop' is the previous implementation (AR(1) noise with a Python loop per
+sample, year starts with a list comprehension per timestamp); 'vectorized'
+is the current RedNoise / YearlySeasonality; 'batch' generates all sensors
+at once with Measure.generate_batch.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from greenbox.sim.mockseries.mockseries import Measure, RedNoise, YearlySeasonality
+
+
+def loop_red_noise(noise: RedNoise, n: int) -> np.ndarray:
+    eps_std = noise.std * np.sqrt(max(1e-12, 1.0 - noise.rho**2))
+    x = np.empty(n, dtype=float)
+    x[0] = noise.rng.normal(noise.mean, noise.std)
+    for t in range(1, n):
+        x[t] = noise.mean + noise.rho * (x[t - 1] - noise.mean) + noise.rng.normal(0.0, eps_std)
+    return x
+
+
+def loop_yearly(season: YearlySeasonality, index: pd.DatetimeIndex) -> np.ndarray:
+    year_start = pd.to_datetime(
+        [pd.Timestamp(ts).replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0) for ts in index]
+    )
+    return season._interp((index - year_start).total_seconds())
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock series generation benchmark.")
+    parser.add_argument("--days", type=float, default=1.0, help="Length of the 1 s series.")
+    parser.add_argument("--sensors", type=int, default=20)
+    args = parser.parse_args()
+
+    measure = Measure.from_json("temperature")
+    index = pd.date_range("2025-01-01", periods=int(args.days * 86400), freq="1s")
+    n = len(index)
+    season = YearlySeasonality(measure.yearly_knots)
+    print(f"samples={n} sensors={args.sensors}")
+    print(f"{'step':>20} {'loop s':>9} {'vectorized s':>13} {'speedup':>8}")
+
+    t_noise, a = timed(lambda: loop_red_noise(RedNoise(**measure.noise, seed=1), n))
+    t_vec, b = timed(lambda: RedNoise(**measure.noise, seed=1).evaluate(index).to_numpy())
+    assert np.allclose(a, b, atol=1e-9)
+    print(f"{'red noise':>20} {t_noise:>9.3f} {t_vec:>13.4f} {t_noise / t_vec:>7.0f}x")
+
+    t_year, a = timed(lambda: loop_yearly(season, index))
+    t_vec, b = timed(lambda: season.evaluate(index).to_numpy())
+    assert np.allclose(a, b)
+    print(f"{'yearly seasonality':>20} {t_year:>9.3f} {t_vec:>13.4f} {t_year / t_vec:>7.0f}x")
+
+    # K sensors: one generate() each vs one generate_batch()
+    t_single, _ = timed(lambda: [measure.generate("temperature", index, seed=i) for i in range(args.sensors)])
+    t_batch, out = timed(lambda: measure.generate_batch("temperature", index, args.sensors, seed=1))
+    assert out.shape == (args.sensors, n)
+    print(f"{'generate x K':>20} {'':>9} {t_single:>13.4f}")
+    print(f"{'generate_batch K':>20} {'':>9} {t_batch:>13.4f} {t_single / t_batch:>7.1f}x")
+    scale = 365 * 86400 / n
+    print(
+        f"1 year of 1 s data, per sensor: loops ~{(t_noise + t_year) * scale:.0f} s, "
+        f"generate_batch ~{t_batch * scale / args.sensors:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: CPU per simulated sensor read.
+
+    python -m greenbox.sim.mockseries.bench_mockseries [--reads 2000]
+
+'per tick (old)' is what SensorSim did before the daily cache: build a
+SimulateRealTimeReading on every tick (read real.json, generate the day's
+hourly series, resample the current hour to 1 s, take one value).
+'new instance' builds the current SimulateRealTimeReading every tick;
+'cached' keeps one instance per measurement, as SensorSim does now.
+"""
+import argparse
+import json
+import time
+from datetime import timedelta
+
+from greenbox.sim.mockseries.mockseries import (
+    Measure,
+    SimulateRealTimeReading,
+    Today,
+    datetime_range,
+    get_latest_entry_before_now,
+)
+
+MEASUREMENTS = ["temperature", "humidity", "light", "pH", "soil_humidity"]
+
+
+def old_read(name: str) -> float:
+    """The pre-cache SimulateRealTimeReading(name).read()."""
+    with open(Measure._get_data_file_path(), "r", encoding="utf-8") as f:
+        json.load(f)  # from_json parsed the file on every construction
+    measure = Measure.from_json(name)
+    today = Today()
+    index = datetime_range(timedelta(hours=1), today.start_day, today.end_day)
+    s = measure.generate(name, index)
+    t0 = get_latest_entry_before_now(s) or index[0]
+    window = s.loc[t0 : t0 + timedelta(hours=1)].astype(float)
+    resampled = window.resample("1s").interpolate("linear").round(2)
+    ts = get_latest_entry_before_now(resampled) or resampled.index[0]
+    return float(resampled.loc[ts])
+
+
+def cpu_us(fn, reads: int) -> float:
+    t0 = time.process_time()
+    for i in range(reads):
+        fn(MEASUREMENTS[i % len(MEASUREMENTS)])
+    return (time.process_time() - t0) / reads * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated sensor read benchmark.")
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+
+    cached = {m: SimulateRealTimeReading(m) for m in MEASUREMENTS}
+    rows = [
+        ("per tick (old)", old_read, max(1, args.reads // 20)),
+        ("new instance", lambda m: SimulateRealTimeReading(m).read(), max(1, args.reads // 5)),
+        ("cached", lambda m: cached[m].read(), args.reads * 50),
+    ]
+    print(f"{'read':>15} {'reads':>8} {'cpu us/read':>12}")
+    base = None
+    for label, fn, reads in rows:
+        us = cpu_us(fn, reads)
+        base = base or us
+        print(f"{label:>15} {reads:>8} {us:>12.1f}  x{base / us:.0f}")
+
+
+if __name__ == "__main__":
+    main()
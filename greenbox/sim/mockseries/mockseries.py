@@ -1,5 +1,6 @@
 import json
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict
 import numpy as np
 import pandas as pd
@@ -12,6 +13,13 @@ load_dotenv()
 P = Path(__file__).resolve().parent
 
 
+@lru_cache(maxsize=8)
+def _load_json(path: Path, mtime_ns: int) -> dict:
+    """Parsed JSON file, re-read only when its mtime changes."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def datetime_range(granularity: timedelta, start_time, end_time) -> pd.DatetimeIndex:
     """Return a left-inclusive, right-exclusive DatetimeIndex with lowercase freq."""
     if start_time is None or end_time is None:
@@ -89,18 +97,68 @@ class YearlySeasonality(_PeriodicSeasonality):
         super().__init__(knots, 365 * 24 * 3600)
 
     def evaluate(self, index: pd.DatetimeIndex) -> pd.Series:
-        year_start = pd.to_datetime(
-            [
-                pd.Timestamp(ts).replace(
-                    month=1, day=1, hour=0, minute=0, second=0, microsecond=0
-                )
-                for ts in index
-            ]
-        )
-        seconds = (index - year_start).total_seconds()
+        # Wall-clock time since Jan 1st of each timestamp's year
+        wall = index.tz_localize(None) if index.tz is not None else index
+        ts = wall.values
+        year_start = ts.astype("datetime64[Y]").astype(ts.dtype)
+        seconds = (ts - year_start) / np.timedelta64(1, "s")
         return pd.Series(self._interp(seconds), index=index)
 
 
+def ar1_filter(e: np.ndarray, rho: float, y0) -> np.ndarray:
+    """
+    y[..., t] = rho * y[..., t-1] + e[..., t] with y[..., -1] = y0, along
+    the last axis, without a Python loop over samples.
+
+    The samples are cut into blocks short enough that rho**-len stays
+    within ~1e10. Inside a block the recursion is a scaled cumulative sum
+    (y_t = rho**t * (y0 + sum_k rho**-k * e_k)). The state carried from
+    block to block is itself an AR(1) with coefficient rho**len, solved
+    the same way; once that coefficient is negligible, as a sum of the few
+    lags that still matter in double precision.
+    """
+    e = np.asarray(e, dtype=float)
+    y0 = np.broadcast_to(np.asarray(y0, dtype=float), e.shape[:-1])
+    n = e.shape[-1]
+    if n == 0:
+        return e.copy()
+    if rho == 0.0:
+        return e.copy()
+    log_rho = abs(np.log(abs(rho)))
+    if log_rho * 2 > 23.0 and abs(rho) > 1.0:
+        y = np.empty_like(e)
+        prev = y0
+        for t in range(n):
+            prev = y[..., t] = rho * prev + e[..., t]
+        return y
+    if log_rho * 2 > 23.0:
+        # |rho| < ~1e-5: rho**lag falls below double precision within a few lags
+        lags = int(np.ceil(37.0 / log_rho))
+        y = e.copy()
+        for lag in range(1, min(lags, n)):
+            y[..., lag:] += rho ** lag * e[..., :-lag]
+        head = min(lags, n)
+        y[..., :head] += y0[..., None] * rho ** np.arange(1, head + 1)
+        return y
+
+    size = n if log_rho == 0.0 else int(min(n, 23.0 / log_rho))
+    blocks = -(-n // size)
+    padded = np.zeros(e.shape[:-1] + (blocks * size,))
+    padded[..., :n] = e
+    padded = padded.reshape(e.shape[:-1] + (blocks, size))
+    k = np.arange(1, size + 1)
+    up, down = rho ** k, rho ** -k.astype(float)
+    # Each block started from zero
+    zero_start = np.cumsum(padded * down, axis=-1) * up
+    # State entering each block: carried[b] = rho**size * carried[b-1] + zero_start[b-1, -1]
+    carried = np.empty(e.shape[:-1] + (blocks,))
+    carried[..., 0] = y0
+    if blocks > 1:
+        carried[..., 1:] = ar1_filter(zero_start[..., :-1, -1], rho ** size, y0)
+    y = zero_start + carried[..., None] * up
+    return y.reshape(e.shape[:-1] + (blocks * size,))[..., :n]
+
+
 class RedNoise:
     """AR(1) noise with marginal std≈std and lag-1 corr≈rho."""
 
@@ -117,19 +175,27 @@ class RedNoise:
         self.rng = np.random.default_rng(seed)
 
     def evaluate(self, index: pd.DatetimeIndex) -> pd.Series:
+        if len(index) == 0:
+            return pd.Series(dtype=float, index=index)
+        return pd.Series(self.evaluate_batch(index, 1)[0], index=index)
+
+    def evaluate_batch(self, index: pd.DatetimeIndex, k: int) -> np.ndarray:
+        """
+        K independent series over one index, shape (k, len(index)), with the
+        same mean, std and lag-1 correlation. With k=1 and the same seed it
+        returns exactly what the per-sample recursion drew: the first value,
+        then one innovation per step.
+        """
         n = len(index)
         if n == 0:
-            return pd.Series(dtype=float, index=index)
+            return np.empty((k, 0))
         eps_std = self.std * np.sqrt(max(1e-12, 1.0 - self.rho**2))
-        x = np.empty(n, dtype=float)
-        x[0] = self.rng.normal(self.mean, self.std)
-        for t in range(1, n):
-            x[t] = (
-                self.mean
-                + self.rho * (x[t - 1] - self.mean)
-                + self.rng.normal(0.0, eps_std)
-            )
-        return pd.Series(x, index=index)
+        first = self.rng.normal(self.mean, self.std, size=k)
+        eps = self.rng.normal(0.0, eps_std, size=(k, n - 1))
+        x = np.empty((k, n))
+        x[:, 0] = first - self.mean
+        x[:, 1:] = ar1_filter(eps, self.rho, x[:, 0])
+        return x + self.mean
 
 
 class Measure:
@@ -156,8 +222,7 @@ class Measure:
     @classmethod
     def from_json(cls, name: str) -> "Measure":
         path = cls._get_data_file_path()
-        with open(path, "r", encoding="utf-8") as f:
-            all_data = json.load(f)
+        all_data = _load_json(path, path.stat().st_mtime_ns)
         if name not in all_data:
             raise ValueError(
                 f"Measurement '{name}' not found in {path.name}. "
@@ -207,32 +272,62 @@ class Measure:
             f"Simulate must be one of {available} (missing file: {path.name})"
         )
 
-    def generate(self, name: str, index: pd.DatetimeIndex) -> pd.Series:
+    def generate(self, name: str, index: pd.DatetimeIndex, seed: int | None = None) -> pd.Series:
         """Compose base + seasonality (+ noise); for 'light' use daily*yearly."""
         base = pd.Series(self.base, index=index, dtype=float)
         d = DailySeasonality(self.daily_knots).evaluate(index)
         y = YearlySeasonality(self.yearly_knots).evaluate(index)
-        n = RedNoise(**self.noise).evaluate(index)
+        n = RedNoise(**self.noise, seed=seed).evaluate(index)
         s = base + (d * y if name == "light" else d + y) + n
         return s.clip(lower=0) if name == "light" else s
 
+    def generate_batch(self, name: str, index: pd.DatetimeIndex, k: int, seed: int | None = None) -> np.ndarray:
+        """
+        K series of `name` over one index as an array of shape (k, len(index)):
+        base and seasonality are shared, each row has its own noise.
+        """
+        d = DailySeasonality(self.daily_knots).evaluate(index).to_numpy()
+        y = YearlySeasonality(self.yearly_knots).evaluate(index).to_numpy()
+        n = RedNoise(**self.noise, seed=seed).evaluate_batch(index, k)
+        s = self.base + (d * y if name == "light" else d + y) + n
+        return np.clip(s, 0, None) if name == "light" else s
+
 
 class SimulateRealTimeReading:
-    """Generate today's series and sample a 1s-resolution value up to now."""
+    """
+    Today's series of one measurement, sampled at the current time.
+
+    The hourly series (base + seasonality + noise) is generated once per day
+    and kept as a NumPy array; `read()` interpolates it linearly at the
+    current second, and the next day's series is generated on the first
+    read after midnight. Keep one instance per sensor and measurement.
+    """
 
     def __init__(self, measurement_name: str):
         self.name = measurement_name
         self.measure = Measure.from_json(measurement_name)
-        today = Today()
-        self.index = datetime_range(timedelta(hours=1), today.start_day, today.end_day)
-
-    def read(self) -> float:
-        s = self.measure.generate(self.name, self.index)
-        t0 = get_latest_entry_before_now(s) or self.index[0]  # fallback alle 00:00
-        window = s.loc[t0 : t0 + timedelta(hours=1)].astype(float)
-        resampled = window.resample("1s").interpolate("linear").round(2)
-        ts = get_latest_entry_before_now(resampled) or resampled.index[0]
-        base_value = float(resampled.loc[ts])
+        self.day = None
+        self._build(datetime.now())
+
+    def _build(self, now: datetime) -> None:
+        start_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.day = start_day.date()
+        self._start_day = start_day
+        self.index = datetime_range(timedelta(hours=1), start_day, start_day + timedelta(days=1))
+        self.values = self.measure.generate(self.name, self.index).to_numpy(dtype=float)
+
+    def value_at(self, now: datetime) -> float:
+        if now.date() != self.day:
+            self._build(now)
+        # Last whole second, then linear between the surrounding hourly points
+        seconds = int((now - self._start_day).total_seconds())
+        hour, offset = divmod(seconds, 3600)
+        values = self.values
+        if hour + 1 < len(values):
+            base_value = values[hour] + (values[hour + 1] - values[hour]) * (offset / 3600)
+        else:
+            base_value = values[-1]
+        base_value = round(float(base_value), 2)
         if self.name in ["humidity", "soil_humidity"]:
             out = max(0.0, min(float(base_value), 100.0))
         elif self.name == "light":
@@ -245,6 +340,9 @@ class SimulateRealTimeReading:
             out = float(base_value)
         return out
 
+    def read(self) -> float:
+        return self.value_at(datetime.now())
+
 
 class Today:
     def __init__(self):
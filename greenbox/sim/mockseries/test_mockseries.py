@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from greenbox.sim.mockseries.mockseries import Measure, RedNoise, SimulateRealTimeReading, YearlySeasonality, ar1_filter
+
+
+class TestSimulateRealTimeReading(unittest.TestCase):
+
+    def test_interpolates_daily_series(self):
+        r = SimulateRealTimeReading("temperature")
+        start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        values = r.values
+        self.assertEqual(len(values), 24)
+        self.assertEqual(r.value_at(start + timedelta(hours=5)), round(values[5], 2))
+        half = r.value_at(start + timedelta(hours=5, minutes=30, microseconds=400))
+        self.assertAlmostEqual(half, (values[5] + values[6]) / 2, places=2)
+        # after the last hourly point the value is held
+        self.assertEqual(r.value_at(start + timedelta(hours=23, minutes=59)), round(values[23], 2))
+
+    def test_rolls_over_at_midnight(self):
+        r = SimulateRealTimeReading("humidity")
+        today = r.day
+        tomorrow = datetime.combine(today, datetime.min.time()) + timedelta(days=1, hours=12)
+        value = r.value_at(tomorrow)
+        self.assertEqual(r.day, tomorrow.date())
+        self.assertTrue(0.0 <= value <= 100.0)
+
+
+class TestVectorizedGeneration(unittest.TestCase):
+
+    def test_red_noise_matches_recursion(self):
+        index = pd.date_range("2025-01-01", periods=5000, freq="1s")
+        for rho in (0.0, 0.5, 0.99, -0.7, 1e-7):
+            rng = np.random.default_rng(3)
+            eps_std = 0.5 * np.sqrt(max(1e-12, 1.0 - rho**2))
+            x = [rng.normal(2.0, 0.5)]
+            for _ in range(len(index) - 1):
+                x.append(2.0 + rho * (x[-1] - 2.0) + rng.normal(0.0, eps_std))
+            got = RedNoise(2.0, 0.5, rho, seed=3).evaluate(index).to_numpy()
+            np.testing.assert_allclose(got, x, atol=1e-9)
+
+    def test_ar1_filter_rows(self):
+        e = np.random.default_rng(0).normal(size=(3, 300))
+        y = ar1_filter(e, 0.8, np.array([1.0, -1.0, 0.0]))
+        for row, y0 in zip(range(3), (1.0, -1.0, 0.0)):
+            prev, expected = y0, []
+            for v in e[row]:
+                prev = 0.8 * prev + v
+                expected.append(prev)
+            np.testing.assert_allclose(y[row], expected, atol=1e-9)
+
+    def test_yearly_offsets(self):
+        index = pd.date_range("2023-12-31 22:00", periods=5, freq="1h", tz="Europe/Rome")
+        season = YearlySeasonality({timedelta(days=0): 0.0, timedelta(days=365): 365.0 * 86400})
+        # value = seconds since Jan 1st (wall clock) of each timestamp's year
+        self.assertEqual(list(season.evaluate(index)), [364 * 86400 + 22 * 3600, 364 * 86400 + 23 * 3600, 0, 3600, 7200])
+
+    def test_batch(self):
+        index = pd.date_range("2025-06-01", periods=20000, freq="1s")
+        measure = Measure.from_json("temperature")
+        batch = measure.generate_batch("temperature", index, 4, seed=5)
+        self.assertEqual(batch.shape, (4, 20000))
+        self.assertFalse(np.allclose(batch[0], batch[1]))
+        single = measure.generate("temperature", index, seed=5).to_numpy()
+        np.testing.assert_allclose(measure.generate_batch("temperature", index, 1, seed=5)[0], single)
+
+
+if __name__ == '__main__':
+    unittest.main()
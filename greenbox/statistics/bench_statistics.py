@@ -0,0 +1,107 @@
+"""
+Benchmark: streaming windows vs polling aggregation.
+
+    python -m greenbox.statistics.bench_statistics [--sensors 1000 10000 100000]
+
+For N sensors (one series each) reporting every --period seconds over a
+--window minute window, it measures the CPU spent by one aggregation cycle
+(--interval seconds):
+
+  poll   - what the polling modes do per series: decode the JSON list of raw
+           points of the whole window and take a pandas median (network and
+           database time not included);
+  stream - ingest the readings that arrived during the interval (JSON decode
+           + MetricWindow.add), then expire and snapshot every series.
+
+Polling is measured on a sample of series and scaled to N.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from greenbox.statistics.windows import MetricWindow
+
+
+def raw_points(n_points: int, period_s: float, rng: random.Random) -> bytes:
+    end = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        {
+            "time": str(end - timedelta(seconds=i * period_s)),
+            "value": round(rng.gauss(22, 2), 3),
+            "site": "greenhouse_0001",
+            "device": "raspberry_0001",
+            "metric": "temperature",
+        }
+        for i in range(n_points)
+    ]
+    return json.dumps(rows).encode()
+
+
+def poll_cycle_s(n_sensors: int, n_points: int, period_s: float, sample: int, rng: random.Random) -> float:
+    bodies = [raw_points(n_points, period_s, rng) for _ in range(min(sample, n_sensors))]
+    t0 = time.perf_counter()
+    for body in bodies:
+        df = pd.DataFrame(json.loads(body))
+        round(float(df["value"].astype(float).median()), 3)
+    return (time.perf_counter() - t0) / len(bodies) * n_sensors
+
+
+def stream_cycle_s(n_sensors: int, n_points: int, period_s: float, window_s: float, interval_s: float, rng: random.Random):
+    windows = [MetricWindow(window_s) for _ in range(n_sensors)]
+    # Fill the windows (warm start), not timed
+    for w in windows:
+        for i in range(n_points):
+            w.add(rng.gauss(22, 2), i * period_s)
+    now = n_points * period_s
+
+    per_interval = max(1, int(round(interval_s / period_s)))
+    messages = [
+        json.dumps({"value": round(rng.gauss(22, 2), 3), "metric": "temperature"}).encode()
+        for _ in range(min(n_sensors, 1000))
+    ]
+
+    t0 = time.perf_counter()
+    for k in range(per_interval):
+        ts = now + k * period_s
+        for i, w in enumerate(windows):
+            w.add(float(json.loads(messages[i % len(messages)])["value"]), ts)
+    t_ingest = time.perf_counter() - t0
+
+    now += interval_s
+    t0 = time.perf_counter()
+    for w in windows:
+        w.expire(now)
+        s = w.snapshot()
+        {k: round(v, 3) if isinstance(v, float) else v for k, v in s.items()}
+    t_snapshot = time.perf_counter() - t0
+    return t_ingest, t_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming vs polling statistics benchmark.")
+    parser.add_argument("--sensors", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--window", type=float, default=5, help="Window length in minutes.")
+    parser.add_argument("--period", type=float, default=10, help="Sensor reporting period in seconds.")
+    parser.add_argument("--interval", type=float, default=10, help="Aggregation interval in seconds.")
+    parser.add_argument("--sample", type=int, default=500, help="Series actually timed in poll mode.")
+    args = parser.parse_args()
+
+    window_s = args.window * 60
+    n_points = int(window_s / args.period)
+    rng = random.Random(0)
+
+    print(f"window={args.window:g} min period={args.period:g} s interval={args.interval:g} s points/series={n_points}")
+    print(f"{'sensors':>8} {'poll s':>9} {'stream ingest s':>16} {'stream snap s':>14} {'stream s':>9} {'speedup':>8}")
+    for n in args.sensors:
+        t_poll = poll_cycle_s(n, n_points, args.period, args.sample, rng)
+        t_ingest, t_snap = stream_cycle_s(n, n_points, args.period, window_s, args.interval, rng)
+        t_stream = t_ingest + t_snap
+        print(f"{n:>8} {t_poll:>9.3f} {t_ingest:>16.3f} {t_snap:>14.3f} {t_stream:>9.3f} {t_poll / t_stream:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
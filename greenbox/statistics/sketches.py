@@ -0,0 +1,187 @@
+import bisect
+import math
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile estimator.
+
+    Implementations accept values with `add`, absorb another sketch of the
+    same kind with `merge` (so sub-window sketches can be combined into a
+    longer view) and answer `quantile(q)` for q in [0, 1].
+    """
+
+    kind = ""
+
+    def add(self, value: float) -> None:
+        raise NotImplementedError
+
+    def merge(self, other: "QuantileSketch") -> None:
+        raise NotImplementedError
+
+    def quantile(self, q: float) -> Optional[float]:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class ExactQuantiles(QuantileSketch):
+    """
+    Keeps every value: exact quantiles (linear interpolation, like
+    numpy.percentile) at O(n) memory. Meant for short windows.
+    """
+
+    kind = "exact"
+
+    def __init__(self) -> None:
+        self._values: List[float] = []
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, value: float) -> None:
+        self._values.append(float(value))
+        self._sorted = False
+
+    def merge(self, other: "ExactQuantiles") -> None:
+        self._values.extend(other._values)
+        self._sorted = False
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._values:
+            return None
+        if not self._sorted:
+            self._values.sort()
+            self._sorted = True
+        pos = (len(self._values) - 1) * q
+        lo = math.floor(pos)
+        hi = min(lo + 1, len(self._values) - 1)
+        return self._values[lo] + (self._values[hi] - self._values[lo]) * (pos - lo)
+
+
+class KLLSketch(QuantileSketch):
+    """
+    KLL sketch (Karnin, Lang, Liberty 2016): a stack of compactors where
+    level h holds items of weight 2**h; a full level is sorted and every
+    other item (random offset) is promoted to the next level.
+
+    Memory is O(k) items regardless of n. Error bound: the rank of the
+    returned value is within about 1.65% of n (k=200) from the requested
+    rank, with 99% probability; the error shrinks roughly as 1/k (k=400
+    gives about 0.8%). Merging two sketches gives the same guarantee on
+    the union.
+    """
+
+    kind = "kll"
+
+    def __init__(self, k: int = 200, c: float = 2.0 / 3.0, seed: Optional[int] = None) -> None:
+        if k < 8:
+            raise ValueError("k must be >= 8")
+        self.k = int(k)
+        self.c = float(c)
+        self._rng = random.Random(seed)
+        self._compactors: List[List[float]] = []
+        self._size = 0
+        self._max_size = 0
+        self._n = 0
+        self._grow()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self._compactors) - h - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _grow(self) -> None:
+        self._compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self._compactors)))
+
+    def _compress(self) -> None:
+        for h in range(len(self._compactors)):
+            level = self._compactors[h]
+            if len(level) >= self._capacity(h):
+                if h + 1 >= len(self._compactors):
+                    self._grow()
+                level.sort()
+                keep_last = level.pop() if len(level) % 2 else None
+                self._compactors[h + 1].extend(level[self._rng.randint(0, 1)::2])
+                level.clear()
+                if keep_last is not None:
+                    level.append(keep_last)
+                self._size = sum(len(c) for c in self._compactors)
+                if self._size < self._max_size:
+                    return
+
+    def add(self, value: float) -> None:
+        self._compactors[0].append(float(value))
+        self._size += 1
+        self._n += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self._compactors) < len(other._compactors):
+            self._grow()
+        for h, level in enumerate(other._compactors):
+            self._compactors[h].extend(level)
+        self._n += other._n
+        self._size = sum(len(c) for c in self._compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    def _weighted(self) -> Tuple[List[float], List[int]]:
+        items = sorted((v, 1 << h) for h, level in enumerate(self._compactors) for v in level)
+        values = [v for v, _ in items]
+        cumulative = []
+        total = 0
+        for _, w in items:
+            total += w
+            cumulative.append(total)
+        return values, cumulative
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self._n == 0:
+            return None
+        values, cumulative = self._weighted()
+        target = q * cumulative[-1]
+        i = bisect.bisect_left(cumulative, target)
+        return values[min(i, len(values) - 1)]
+
+
+SKETCHES: Dict[str, Callable[[], QuantileSketch]] = {
+    ExactQuantiles.kind: ExactQuantiles,
+    KLLSketch.kind: KLLSketch,
+}
+
+
+def make_sketch(kind: str) -> QuantileSketch:
+    try:
+        return SKETCHES[kind]()
+    except KeyError as exc:
+        raise ValueError(f"Unsupported quantile sketch '{kind}'") from exc
+
+
+def parse_mapping(spec: Optional[str]) -> Dict[str, str]:
+    """Parse 'metric=value,metric=value' (as used by the STATS_* overrides)."""
+    out: Dict[str, str] = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition("=")
+        if not sep or not key.strip() or not value.strip():
+            raise ValueError(f"Invalid override '{item.strip()}', expected metric=value")
+        out[key.strip()] = value.strip()
+    return out
+
+
+def merged(sketches: Iterable[QuantileSketch], kind: str) -> QuantileSketch:
+    """A new sketch holding the union of `sketches` (left untouched)."""
+    out = make_sketch(kind)
+    for s in sketches:
+        out.merge(s)
+    return out
@@ -2,12 +2,17 @@ import logging
 import os
 import threading
 import time
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta, timezone
+from typing import Dict, List, Any, Optional, Tuple
 
 import pandas as pd
+from greenbox.statistics.sketches import parse_mapping
+from greenbox.statistics.windows import MetricWindow, SketchWindow
 from greenbox.utils import catalog_client
+from greenbox.utils.clock import SYSTEM_CLOCK
 from greenbox.utils.mqtt import MyMQTT
+from greenbox.utils.sensor_messages import parse_sensor_message
 from greenbox.utils.influx_client import InfluxInterfaceClient
 
 
@@ -16,25 +21,74 @@ class StateAggregator:
     A timed aggregator that periodically fetches the complete state for each
     greenhouse/raspberry zone, calculates statistics, and publishes a single
     snapshot message for each zone.
+
+    The simulation engine passes the zones (`catalog_data`, in the format of
+    catalog_client.get_all_zones_with_measurements), an MQTT client factory
+    and a clock, and calls run_cycle() itself.
     """
 
-    def __init__(self):
+    def __init__(self, catalog_data=None, mqtt_factory=None, clock=None, fetch_mode=None):
         # Load configuration from catalog using the new specific function
-        catalog_data = catalog_client.get_all_zones_with_measurements()
+        if catalog_data is None:
+            catalog_data = catalog_client.get_all_zones_with_measurements()
+        self.clock = clock or SYSTEM_CLOCK
         self.broker_ip = catalog_data["broker_ip"]
         self.broker_port = catalog_data["broker_port"]
         self.greenhouses_config = catalog_data["greenhouses"]
 
-        # MQTT client for publishing
-        self.mqtt = MyMQTT(clientID="statistics_aggregator", broker=self.broker_ip, port=self.broker_port, notifier=None)
-        
-        # InfluxDB client for querying data
-        self.influx_client = InfluxInterfaceClient()
-
         # Timing configuration from environment variables
         self.window_minutes = int(os.getenv("STATS_WINDOW_MINUTES", "5"))
         self.aggregation_interval_s = int(os.getenv("STATS_AGGREGATION_INTERVAL_S", "10"))
 
+        # Fetch concurrency: how many zone/metric queries are in flight at once (1 = serial)
+        self.fetch_concurrency = max(1, int(os.getenv("STATS_FETCH_CONCURRENCY", "8")))
+        self.request_timeout_s = float(os.getenv("STATS_REQUEST_TIMEOUT_S", "5"))
+
+        # Fetch mode:
+        #   "aggregate"  - statistics computed by InfluxDB, one summary row per series (one query per greenhouse)
+        #   "batch"      - raw points of a whole greenhouse in one query, median computed here
+        #   "per_metric" - raw points, one query per zone/metric
+        #   "stream"     - sliding windows fed by the sensor topics, Influx only read once to warm start
+        self.fetch_mode = fetch_mode or os.getenv("STATS_FETCH_MODE", "aggregate")
+        if self.fetch_mode not in ("aggregate", "batch", "per_metric", "stream"):
+            raise ValueError(f"Unsupported STATS_FETCH_MODE '{self.fetch_mode}'")
+        # Percentiles reported next to the median in "aggregate" mode
+        self.percentiles = [float(p) for p in os.getenv("STATS_PERCENTILES", "5,95").split(",") if p.strip()]
+
+        # InfluxDB client for querying data (keep-alive pool sized on the concurrency)
+        self.influx_client = InfluxInterfaceClient(timeout=self.request_timeout_s, pool_size=self.fetch_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # MQTT client for publishing (and, in stream mode, for the sensor readings)
+        self.sensor_topic = os.getenv("STATS_SENSOR_TOPIC", "/+/+/sensors/#")
+        notifier = self if self.fetch_mode == "stream" else None
+        self.mqtt = (mqtt_factory or MyMQTT)(clientID="statistics_aggregator", broker=self.broker_ip, port=self.broker_port, notifier=notifier)
+
+        # Stream mode, per metric overrides ("metric=value,..."):
+        #   STATS_WINDOW_MINUTES_BY_METRIC - window length, e.g. soil_humidity=240
+        #   STATS_SKETCHES                 - quantile sketch (kll, exact) instead of raw points, e.g. soil_humidity=kll
+        self.window_minutes_by_metric = {
+            m: int(v) for m, v in parse_mapping(os.getenv("STATS_WINDOW_MINUTES_BY_METRIC")).items()
+        }
+        self.sketches = parse_mapping(os.getenv("STATS_SKETCHES"))
+        self.sketch_bucket_s = float(os.getenv("STATS_SKETCH_BUCKET_S", "60"))
+
+        # Stream mode: (gh, rb) -> {metric: MetricWindow | SketchWindow}, one lock per zone
+        self._windows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._window_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.readings = 0
+        self.ignored_readings = 0
+        if self.fetch_mode == "stream":
+            for gh_id, rb_id, measurements in self._zones():
+                self._windows[(gh_id, rb_id)] = {m: self._make_window(m) for m in measurements}
+                self._window_locks[(gh_id, rb_id)] = threading.Lock()
+
+        # Cycle metrics
+        self.cycles = 0
+        self.overruns = 0
+        self.last_cycle_s = 0.0
+        self.max_cycle_s = 0.0
+
         # Threading control
         self._stop_event = threading.Event()
         self._thread = None
@@ -43,6 +97,11 @@ class StateAggregator:
         """Start the aggregator loop in a separate thread."""
         logging.info("Starting StateAggregator...")
         self.mqtt.start()
+        if self.fetch_concurrency > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.fetch_concurrency, thread_name_prefix="stats-fetch")
+        if self.fetch_mode == "stream":
+            self._warm_start()
+            self.mqtt.MySubscribe(self.sensor_topic)
         self._thread = threading.Thread(target=self.run, daemon=True)
         self._thread.start()
         logging.info("StateAggregator started. Aggregation interval: %d seconds.", self.aggregation_interval_s)
@@ -53,6 +112,10 @@ class StateAggregator:
         self._stop_event.set()
         if self._thread and self._thread.is_alive():
             self._thread.join()  # Wait for the thread to finish
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.influx_client.close()
         self.mqtt.stop()
         logging.info("StateAggregator stopped.")
 
@@ -63,23 +126,264 @@ class StateAggregator:
             
             start_time = time.time()
 
-            for gh_config in self.greenhouses_config:
-                gh_id = gh_config["greenhouse_id"]
-                measurements = gh_config["measurements"]
-                
-                for rb_id in gh_config["raspberries"]:
-                    try:
-                        self._process_zone(gh_id, rb_id, measurements)
-                    except Exception as e:
-                        logging.error("[%s/%s] Failed to process zone: %s", gh_id, rb_id, e, exc_info=True)
+            self.run_cycle()
 
             cycle_duration = time.time() - start_time
+            self._record_cycle(cycle_duration)
             logging.info("Aggregation cycle finished in %.2f seconds.", cycle_duration)
 
             # Wait for the next cycle, accounting for processing time
             sleep_time = max(0, self.aggregation_interval_s - cycle_duration)
             self._stop_event.wait(timeout=sleep_time)
 
+    def run_cycle(self):
+        """One aggregation cycle: a snapshot per zone, computed as fetch_mode says."""
+        if self.fetch_mode == "stream":
+            self._run_cycle_stream()
+        elif self.fetch_mode == "aggregate":
+            self._run_cycle_greenhouses(self._process_greenhouse_stats)
+        elif self.fetch_mode == "batch":
+            self._run_cycle_greenhouses(self._process_greenhouse_batch)
+        elif self._executor is not None:
+            self._run_cycle_concurrent()
+        else:
+            self._run_cycle_serial()
+
+    def _record_cycle(self, cycle_duration: float):
+        """Update cycle metrics; an overrun is a cycle longer than the aggregation interval."""
+        self.cycles += 1
+        self.last_cycle_s = cycle_duration
+        self.max_cycle_s = max(self.max_cycle_s, cycle_duration)
+        if cycle_duration > self.aggregation_interval_s:
+            self.overruns += 1
+            logging.warning(
+                "Aggregation cycle overrun: %.2f s > %d s interval (%d/%d cycles).",
+                cycle_duration, self.aggregation_interval_s, self.overruns, self.cycles,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        out = {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "last_cycle_s": self.last_cycle_s,
+            "max_cycle_s": self.max_cycle_s,
+        }
+        if self.fetch_mode == "stream":
+            out["readings"] = self.readings
+            out["ignored_readings"] = self.ignored_readings
+        return out
+
+    def _zones(self):
+        for gh_config in self.greenhouses_config:
+            for rb_id in gh_config["raspberries"]:
+                yield gh_config["greenhouse_id"], rb_id, gh_config["measurements"]
+
+    def _window(self) -> Tuple[str, str]:
+        end_ts = self.clock.now(timezone.utc)
+        start_ts = end_ts - timedelta(minutes=self.window_minutes)
+        return start_ts.isoformat(), end_ts.isoformat()
+
+    def _run_cycle_serial(self):
+        for gh_id, rb_id, measurements in self._zones():
+            try:
+                self._process_zone(gh_id, rb_id, measurements)
+            except Exception as e:
+                logging.error("[%s/%s] Failed to process zone: %s", gh_id, rb_id, e, exc_info=True)
+
+    def _run_cycle_concurrent(self):
+        """
+        Fan out every zone/metric fetch on the executor and publish each zone
+        as soon as all of its metrics are in.
+        """
+        start, end = self._window()
+        zone_measurements: Dict[Tuple[str, str], List[str]] = {}
+        pending: Dict[Tuple[str, str], int] = {}
+        results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        futures = {}
+        for gh_id, rb_id, measurements in self._zones():
+            zone = (gh_id, rb_id)
+            zone_measurements[zone] = measurements
+            pending[zone] = len(measurements)
+            results[zone] = {}
+            for metric in measurements:
+                fut = self._executor.submit(self._fetch_metric, gh_id, rb_id, metric, start, end)
+                futures[fut] = (zone, metric)
+
+        for fut in as_completed(futures):
+            zone, metric = futures[fut]
+            try:
+                value = fut.result()
+                if value is not None:
+                    results[zone][metric] = value
+            except Exception as e:
+                logging.error("[%s/%s] Failed to fetch metric '%s': %s", zone[0], zone[1], metric, e, exc_info=True)
+            pending[zone] -= 1
+            if pending[zone] == 0 and results[zone]:
+                # Keep the configured metric order in the snapshot
+                ordered = {m: results[zone][m] for m in zone_measurements[zone] if m in results[zone]}
+                self._publish_zone_state(zone[0], zone[1], ordered)
+
+    def _run_cycle_greenhouses(self, process):
+        """
+        One query per greenhouse (all its raspberries and metrics), handled by
+        `process`, run concurrently when an executor is available.
+        """
+        start, end = self._window()
+        pool = self._executor
+        futures = {}
+        for gh_config in self.greenhouses_config:
+            gh_id = gh_config["greenhouse_id"]
+            if not gh_config["raspberries"] or not gh_config["measurements"]:
+                continue
+            args = (gh_id, gh_config["raspberries"], gh_config["measurements"], start, end)
+            if pool is not None:
+                futures[pool.submit(process, *args)] = gh_id
+            else:
+                try:
+                    process(*args)
+                except Exception as e:
+                    logging.error("[%s] Failed to process greenhouse: %s", gh_id, e, exc_info=True)
+
+        for fut in as_completed(futures):
+            try:
+                fut.result()
+            except Exception as e:
+                logging.error("[%s] Failed to process greenhouse: %s", futures[fut], e, exc_info=True)
+
+    def _process_greenhouse_batch(self, gh_id: str, raspberries: List[str], measurements: List[str], start: str, end: str):
+        """Fetch every zone/metric of a greenhouse in one call and publish one snapshot per zone."""
+        series = self.influx_client.get_batch(
+            metrics=measurements,
+            sites=[gh_id],
+            devices=raspberries,
+            start=start,
+            end=end,
+            limit_per_series=10_000,
+        )
+        by_device = series.get(gh_id, {})
+        for rb_id in raspberries:
+            points = by_device.get(rb_id, {})
+            metrics_data = {}
+            for metric in measurements:
+                value = self._aggregate(gh_id, rb_id, metric, points.get(metric))
+                if value is not None:
+                    metrics_data[metric] = value
+            if metrics_data:
+                self._publish_zone_state(gh_id, rb_id, metrics_data)
+
+    def _process_greenhouse_stats(self, gh_id: str, raspberries: List[str], measurements: List[str], start: str, end: str):
+        """Fetch the server-side summaries of a greenhouse and publish one snapshot per zone."""
+        stats = self.influx_client.get_stats(
+            metrics=measurements,
+            sites=[gh_id],
+            devices=raspberries,
+            percentiles=self.percentiles,
+            start=start,
+            end=end,
+        )
+        by_device = stats.get(gh_id, {})
+        for rb_id in raspberries:
+            summaries = by_device.get(rb_id, {})
+            metrics_data = {}
+            for metric in measurements:
+                summary = summaries.get(metric)
+                if summary and summary.get("median") is not None:
+                    metrics_data[metric] = {
+                        k: round(v, 3) if isinstance(v, float) else v for k, v in summary.items()
+                    }
+            if metrics_data:
+                self._publish_zone_state(gh_id, rb_id, metrics_data)
+
+    # --- stream mode ---
+
+    def notify(self, topic: str, payload: bytes):
+        """
+        Sensor readings from MQTT, per-measurement (/<gh>/<rb>/sensors/<sensor_id>/<metric>)
+        or batch (/<gh>/<rb>/sensors/batch) messages, see utils.sensor_messages.
+        Readings of unknown zones or metrics are counted and ignored.
+        """
+        try:
+            readings = parse_sensor_message(topic, payload)
+        except ValueError as e:
+            logging.debug("Invalid reading on %s: %s", topic, e)
+            self.ignored_readings += 1
+            return
+
+        now = self.clock.time()
+        for r in readings:
+            windows = self._windows.get((r.site, r.device))
+            window = windows.get(r.metric) if windows else None
+            if window is None:
+                self.ignored_readings += 1
+                continue
+            with self._window_locks[(r.site, r.device)]:
+                window.add(r.value, now)
+            self.readings += 1
+
+    def _make_window(self, metric: str):
+        """Exact two-heap window, or a bucketed sketch window for metrics listed in STATS_SKETCHES."""
+        window_s = self.window_minutes_by_metric.get(metric, self.window_minutes) * 60
+        kind = self.sketches.get(metric)
+        if kind:
+            return SketchWindow(window_s, kind=kind, bucket_s=self.sketch_bucket_s)
+        return MetricWindow(window_s)
+
+    def _warm_start(self):
+        """Fill the windows with the last (longest) window of raw points (one batch query per greenhouse)."""
+        end_ts = self.clock.now(timezone.utc)
+        minutes = max([self.window_minutes, *self.window_minutes_by_metric.values()])
+        start, end = (end_ts - timedelta(minutes=minutes)).isoformat(), end_ts.isoformat()
+        loaded = 0
+        for gh_config in self.greenhouses_config:
+            gh_id = gh_config["greenhouse_id"]
+            if not gh_config["raspberries"] or not gh_config["measurements"]:
+                continue
+            try:
+                series = self.influx_client.get_batch(
+                    metrics=gh_config["measurements"],
+                    sites=[gh_id],
+                    devices=gh_config["raspberries"],
+                    start=start,
+                    end=end,
+                    limit_per_series=10_000,
+                )
+            except Exception as e:
+                logging.error("[%s] Warm start failed: %s", gh_id, e, exc_info=True)
+                continue
+            for rb_id, by_metric in series.get(gh_id, {}).items():
+                windows = self._windows.get((gh_id, rb_id))
+                if windows is None:
+                    continue
+                for metric, points in by_metric.items():
+                    window = windows.get(metric)
+                    if window is None:
+                        continue
+                    with self._window_locks[(gh_id, rb_id)]:
+                        # Points come newest first
+                        for point in reversed(points):
+                            try:
+                                window.add(float(point["value"]), pd.Timestamp(point["time"]).timestamp())
+                                loaded += 1
+                            except (ValueError, TypeError, KeyError):
+                                continue
+        logging.info("Warm start: loaded %d points into %d zones.", loaded, len(self._windows))
+
+    def _run_cycle_stream(self):
+        """Expire old points and publish a snapshot per zone from the in-memory windows."""
+        now = self.clock.time()
+        for (gh_id, rb_id), windows in self._windows.items():
+            metrics_data = {}
+            with self._window_locks[(gh_id, rb_id)]:
+                for metric, window in windows.items():
+                    window.expire(now)
+                    summary = window.snapshot()
+                    if summary is not None:
+                        metrics_data[metric] = {
+                            k: round(v, 3) if isinstance(v, float) else v for k, v in summary.items()
+                        }
+            if metrics_data:
+                self._publish_zone_state(gh_id, rb_id, metrics_data)
+
     def _process_zone(self, gh_id: str, rb_id: str, measurements: List[str]):
         """Fetch, aggregate, and publish the state for a single zone."""
         logging.debug("[%s/%s] Processing zone...", gh_id, rb_id)
@@ -93,41 +397,50 @@ class StateAggregator:
 
     def _fetch_and_aggregate_metrics(self, gh_id: str, rb_id: str, measurements: List[str]) -> Dict[str, Any]:
         """Query InfluxDB for all metrics and calculate the median for each."""
-        end_ts = datetime.utcnow().replace(tzinfo=timezone.utc)
-        start_ts = end_ts - timedelta(minutes=self.window_minutes)
+        start, end = self._window()
         
         metrics_data = {}
         
         for metric in measurements:
-            # Query InfluxDB for a single metric
-            data = self.influx_client.get_data(
-                metric=metric,
-                start=start_ts.isoformat(),
-                end=end_ts.isoformat(),
-                site=gh_id,
-                device=rb_id,
-                limit=10_000,
-            )
-
-            if not data:
-                continue
-
-            try:
-                df = pd.DataFrame(data)
-                if "value" in df and not df["value"].empty:
-                    median_value = float(df["value"].astype(float).median()) # Explicit cast to float
-                    metrics_data[metric] = {"median": round(median_value, 3)}
-            except Exception as e:
-                logging.error("[%s/%s] Failed to process data for metric '%s': %s", gh_id, rb_id, metric, e)
+            value = self._fetch_metric(gh_id, rb_id, metric, start, end)
+            if value is not None:
+                metrics_data[metric] = value
         
         return metrics_data
 
+    def _fetch_metric(self, gh_id: str, rb_id: str, metric: str, start: str, end: str) -> Optional[Dict[str, Any]]:
+        """Query InfluxDB for a single metric of a zone and return its median."""
+        data = self.influx_client.get_data(
+            metric=metric,
+            start=start,
+            end=end,
+            site=gh_id,
+            device=rb_id,
+            limit=10_000,
+        )
+
+        return self._aggregate(gh_id, rb_id, metric, data)
+
+    def _aggregate(self, gh_id: str, rb_id: str, metric: str, data: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Median of the 'value' field of raw points."""
+        if not data:
+            return None
+
+        try:
+            df = pd.DataFrame(data)
+            if "value" in df and not df["value"].empty:
+                median_value = float(df["value"].astype(float).median()) # Explicit cast to float
+                return {"median": round(median_value, 3)}
+        except Exception as e:
+            logging.error("[%s/%s] Failed to process data for metric '%s': %s", gh_id, rb_id, metric, e)
+        return None
+
     def _publish_zone_state(self, gh_id: str, rb_id: str, aggregated_metrics: Dict[str, Any]):
         """Construct the full JSON payload and publish it to MQTT."""
         topic = f"/{gh_id}/{rb_id}/statistics/state"
         
         payload = {
-            "timestamp_utc": datetime.utcnow().replace(tzinfo=timezone.utc).isoformat(),
+            "timestamp_utc": self.clock.now(timezone.utc).isoformat(),
             "greenhouse_id": gh_id,
             "raspberry_id": rb_id,
             "metrics": aggregated_metrics
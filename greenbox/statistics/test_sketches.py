@@ -0,0 +1,82 @@
+import bisect
+import random
+import unittest
+
+import numpy as np
+
+from greenbox.statistics.sketches import ExactQuantiles, KLLSketch, make_sketch, merged, parse_mapping
+from greenbox.statistics.windows import SketchWindow
+
+
+class TestSketches(unittest.TestCase):
+
+    def test_exact_matches_numpy(self):
+        rng = random.Random(3)
+        values = [rng.uniform(0, 100) for _ in range(501)]
+        e = ExactQuantiles()
+        for v in values:
+            e.add(v)
+        for p in (5, 50, 95):
+            self.assertAlmostEqual(e.quantile(p / 100), float(np.percentile(values, p)), places=9)
+
+    def test_kll_rank_error_bound(self):
+        """
+        Merged sub-window sketches stay within the documented 1.65% rank error (k=200).
+        """
+        rng = random.Random(5)
+        values = [rng.gauss(20, 5) for _ in range(50_000)]
+        parts = [KLLSketch(seed=i) for i in range(10)]
+        for i, v in enumerate(values):
+            parts[i % 10].add(v)
+        sketch = merged(parts, "kll")
+        self.assertEqual(len(sketch), len(values))
+        self.assertLess(sum(len(c) for c in sketch._compactors), 1_000)
+
+        ordered = sorted(values)
+        for q in (0.05, 0.5, 0.95):
+            rank = bisect.bisect_left(ordered, sketch.quantile(q)) / len(ordered)
+            self.assertLess(abs(rank - q), 0.0165)
+
+    def test_merged_leaves_inputs_untouched(self):
+        a, b = KLLSketch(seed=1), KLLSketch(seed=2)
+        for v in range(1000):
+            a.add(v)
+        before = [list(c) for c in a._compactors]
+        merged([a, b], "kll")
+        self.assertEqual([list(c) for c in a._compactors], before)
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            make_sketch("p2")
+        with self.assertRaises(ValueError):
+            parse_mapping("soil_humidity")
+        self.assertEqual(parse_mapping(" soil_humidity=kll, pH=exact "), {"soil_humidity": "kll", "pH": "exact"})
+
+
+class TestSketchWindow(unittest.TestCase):
+
+    def test_views_share_buckets(self):
+        w = SketchWindow(3600, kind="exact", bucket_s=60)
+        for t in range(3600):
+            w.add(float(t // 60), float(t))
+        full = w.snapshot()
+        last5 = w.snapshot(window_s=300)
+        self.assertEqual(full["count"], 3600)
+        # The oldest overlapping bucket is included whole: 6 buckets of 60 points
+        self.assertEqual(last5["count"], 360)
+        self.assertEqual(last5["p50"], 56.5)
+        self.assertEqual(last5["median"], last5["p50"])
+        self.assertAlmostEqual(full["mean"], float(np.mean([t // 60 for t in range(3600)])))
+        self.assertAlmostEqual(full["stddev"], float(np.std([t // 60 for t in range(3600)], ddof=1)))
+
+    def test_expire_whole_buckets(self):
+        w = SketchWindow(120, kind="kll", bucket_s=60)
+        for t in range(300):
+            w.add(1.0, float(t))
+        self.assertEqual(w.expire(300.0), 180)
+        self.assertEqual(len(w), 120)
+        self.assertIsNone(SketchWindow(60, kind="kll").snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
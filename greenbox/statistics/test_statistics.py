@@ -0,0 +1,159 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from greenbox.statistics.statistics import StateAggregator
+from greenbox.utils.clock import VirtualClock
+
+CATALOG = {
+    "broker_ip": "localhost",
+    "broker_port": 1883,
+    "greenhouses": [{"greenhouse_id": "gh1", "raspberries": ["rb1"], "measurements": ["temperature"]}],
+}
+
+
+@patch.dict(os.environ, {"STATS_WINDOW_MINUTES": "5"})
+class TestWarmStart(unittest.TestCase):
+
+    def test_window_ends_at_the_aggregator_clock(self):
+        clock = VirtualClock(datetime(2025, 6, 1, 12, tzinfo=timezone.utc).timestamp())
+        aggregator = StateAggregator(CATALOG, mqtt_factory=MagicMock(), clock=clock, fetch_mode="stream")
+        aggregator.influx_client = MagicMock()
+        aggregator.influx_client.get_batch.return_value = {"gh1": {"rb1": {"temperature": [
+            {"time": "2025-06-01T11:59:00+00:00", "value": 22.0},
+            {"time": "2025-06-01T11:58:00+00:00", "value": 20.0},
+        ]}}}
+        aggregator._warm_start()
+
+        kwargs = aggregator.influx_client.get_batch.call_args.kwargs
+        self.assertEqual((kwargs["start"], kwargs["end"]), ("2025-06-01T11:55:00+00:00", "2025-06-01T12:00:00+00:00"))
+        self.assertEqual(len(aggregator._windows[("gh1", "rb1")]["temperature"]), 2)
+
+
+def _aggregator(fetch_mode, catalog=CATALOG):
+    clock = VirtualClock(datetime(2025, 6, 1, 12, tzinfo=timezone.utc).timestamp())
+    aggregator = StateAggregator(catalog, mqtt_factory=MagicMock(), clock=clock, fetch_mode=fetch_mode)
+    aggregator.influx_client = MagicMock()
+    return aggregator
+
+
+@patch.dict(os.environ, {"STATS_PERCENTILES": "5,95"})
+class TestGreenhouseStats(unittest.TestCase):
+
+    def test_summaries_published_per_zone(self):
+        aggregator = _aggregator("aggregate")
+        aggregator.influx_client.get_stats.return_value = {"gh1": {
+            "rb1": {"temperature": {"count": 3, "mean": 21.04567, "median": 21.0, "stddev": None, "p95": 21.9}},
+            # no median: nothing to publish for rb2
+            "rb2": {"temperature": {"count": 0, "median": None}},
+        }}
+        aggregator._process_greenhouse_stats("gh1", ["rb1", "rb2", "rb3"], ["temperature"], "s", "e")
+
+        aggregator.influx_client.get_stats.assert_called_once_with(
+            metrics=["temperature"], sites=["gh1"], devices=["rb1", "rb2", "rb3"],
+            percentiles=[5.0, 95.0], start="s", end="e",
+        )
+        aggregator.mqtt.MyPublish.assert_called_once_with("/gh1/rb1/statistics/state", {
+            "timestamp_utc": "2025-06-01T12:00:00+00:00",
+            "greenhouse_id": "gh1",
+            "raspberry_id": "rb1",
+            "metrics": {"temperature": {"count": 3, "mean": 21.046, "median": 21.0, "stddev": None, "p95": 21.9}},
+        })
+
+    def test_failed_fetch_publishes_nothing(self):
+        aggregator = _aggregator("aggregate")
+        # the client logs the error and returns no stats
+        aggregator.influx_client.get_stats.return_value = {}
+        aggregator.run_cycle()
+        aggregator.influx_client.get_stats.assert_called_once()
+        aggregator.mqtt.MyPublish.assert_not_called()
+
+
+class TestGreenhouseBatch(unittest.TestCase):
+
+    def test_points_split_per_zone_and_metric(self):
+        aggregator = _aggregator("batch")
+        aggregator.influx_client.get_batch.return_value = {"gh1": {
+            "rb1": {
+                "temperature": [{"time": "t2", "value": 22.0}, {"time": "t1", "value": 20.0}, {"time": "t0", "value": 21.0}],
+                "pH": [{"time": "t0", "value": 6.5}],
+            },
+            "rb2": {"pH": [{"time": "t0", "value": 7.1}]},
+        }}
+        aggregator._process_greenhouse_batch("gh1", ["rb1", "rb2", "rb3"], ["temperature", "pH"], "s", "e")
+
+        aggregator.influx_client.get_batch.assert_called_once_with(
+            metrics=["temperature", "pH"], sites=["gh1"], devices=["rb1", "rb2", "rb3"],
+            start="s", end="e", limit_per_series=10_000,
+        )
+        published = {call.args[0]: call.args[1]["metrics"] for call in aggregator.mqtt.MyPublish.call_args_list}
+        self.assertEqual(published, {
+            "/gh1/rb1/statistics/state": {"temperature": {"median": 21.0}, "pH": {"median": 6.5}},
+            "/gh1/rb2/statistics/state": {"pH": {"median": 7.1}},
+        })
+
+    def test_failed_fetch_publishes_nothing(self):
+        aggregator = _aggregator("batch")
+        aggregator.influx_client.get_batch.return_value = {}
+        aggregator.run_cycle()
+        aggregator.influx_client.get_batch.assert_called_once()
+        aggregator.mqtt.MyPublish.assert_not_called()
+
+        # an unexpected error is logged, not raised
+        aggregator.influx_client.get_batch.side_effect = RuntimeError("boom")
+        with self.assertLogs(level="ERROR") as logs:
+            aggregator.run_cycle()
+        self.assertIn("[gh1] Failed to process greenhouse", logs.output[0])
+        aggregator.mqtt.MyPublish.assert_not_called()
+
+
+CATALOG_3_ZONES = dict(CATALOG, greenhouses=[
+    {"greenhouse_id": "gh1", "raspberries": ["rb1", "rb2"], "measurements": ["temperature", "pH"]},
+    {"greenhouse_id": "gh2", "raspberries": ["rb3"], "measurements": ["temperature"]},
+])
+
+
+@patch.dict(os.environ, {"STATS_AGGREGATION_INTERVAL_S": "10"})
+class TestCycle(unittest.TestCase):
+
+    def setUp(self):
+        self.aggregator = _aggregator("per_metric", CATALOG_3_ZONES)
+        self.aggregator._executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.aggregator._executor.shutdown)
+
+    def test_every_zone_published_once(self):
+        self.aggregator.influx_client.get_data.side_effect = \
+            lambda metric, **kwargs: [{"value": 7.0 if metric == "pH" else 21.0}]
+        self.aggregator.run_cycle()
+
+        self.assertEqual(self.aggregator.influx_client.get_data.call_count, 5)
+        topics = sorted(call.args[0] for call in self.aggregator.mqtt.MyPublish.call_args_list)
+        self.assertEqual(topics, ["/gh1/rb1/statistics/state", "/gh1/rb2/statistics/state", "/gh2/rb3/statistics/state"])
+        metrics = {call.args[0]: call.args[1]["metrics"] for call in self.aggregator.mqtt.MyPublish.call_args_list}
+        # configured metric order
+        self.assertEqual(list(metrics["/gh1/rb1/statistics/state"]), ["temperature", "pH"])
+
+    def test_failing_greenhouse_does_not_stop_the_others(self):
+        def get_data(metric, site, **kwargs):
+            if site == "gh1":
+                raise RuntimeError("boom")
+            return [{"value": 20.0}]
+        self.aggregator.influx_client.get_data.side_effect = get_data
+        with self.assertLogs(level="ERROR"):
+            self.aggregator.run_cycle()
+        self.aggregator.mqtt.MyPublish.assert_called_once()
+        self.assertEqual(self.aggregator.mqtt.MyPublish.call_args.args[0], "/gh2/rb3/statistics/state")
+
+    def test_overruns(self):
+        self.aggregator._record_cycle(4.0)
+        with self.assertLogs(level="WARNING"):
+            self.aggregator._record_cycle(12.5)
+        self.aggregator._record_cycle(10.0)
+        self.assertEqual(self.aggregator.stats(),
+                         {"cycles": 3, "overruns": 1, "last_cycle_s": 10.0, "max_cycle_s": 12.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
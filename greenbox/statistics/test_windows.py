@@ -0,0 +1,71 @@
+import random
+import statistics
+import unittest
+
+from greenbox.statistics.windows import MetricWindow, SlidingMedian
+
+
+class TestSlidingMedian(unittest.TestCase):
+
+    def test_add_remove_duplicates(self):
+        m = SlidingMedian()
+        for seq, v in enumerate([3.0, 1.0, 3.0, 2.0, 3.0]):
+            m.add(v, seq)
+        self.assertEqual(m.median(), 3.0)
+        m.remove(3.0, 0)
+        m.remove(3.0, 2)
+        self.assertEqual(m.median(), 2.0)
+        m.remove(2.0, 3)
+        self.assertEqual(m.median(), 2.0)  # (1 + 3) / 2
+        m.remove(1.0, 1)
+        m.remove(3.0, 4)
+        self.assertIsNone(m.median())
+
+
+class TestMetricWindow(unittest.TestCase):
+
+    def test_matches_recomputation(self):
+        """
+        Random adds and expiries: median, mean and stddev equal a recomputation over the window.
+        """
+        rng = random.Random(7)
+        for _ in range(50):
+            w = MetricWindow(rng.uniform(1, 20))
+            points, t = [], 0.0
+            for _ in range(200):
+                t += rng.choice((0, 0.5, 1, 2))
+                v = float(rng.choice((rng.randint(0, 5), rng.uniform(-10, 10))))
+                w.add(v, t)
+                points.append((t, v))
+                if rng.random() < 0.3:
+                    t += rng.uniform(0, 3)
+                    w.expire(t)
+                    points = [p for p in points if p[0] >= t - w.window_s]
+                values = [v for _, v in points]
+                snap = w.snapshot()
+                if not values:
+                    self.assertIsNone(snap)
+                    continue
+                self.assertEqual(snap["count"], len(values))
+                self.assertEqual(snap["median"], statistics.median(values))
+                self.assertAlmostEqual(snap["mean"], statistics.mean(values), places=9)
+                if len(values) > 1:
+                    self.assertAlmostEqual(snap["stddev"], statistics.stdev(values), places=6)
+                else:
+                    self.assertIsNone(snap["stddev"])
+
+    def test_late_point_is_clamped(self):
+        w = MetricWindow(10)
+        w.add(1.0, 100.0)
+        w.add(2.0, 50.0)
+        self.assertEqual(w.expire(105.0), 0)
+        self.assertEqual(w.expire(111.0), 2)
+
+    def test_non_finite_ignored(self):
+        w = MetricWindow(10)
+        w.add(float("nan"), 0.0)
+        self.assertIsNone(w.snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+import heapq
+import itertools
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from greenbox.statistics.sketches import QuantileSketch, make_sketch, merged
+
+
+class SlidingMedian:
+    """
+    Exact median of a sliding window, updated incrementally.
+
+    Two heaps split the window: `_low` (max-heap, stored negated) holds the
+    smaller half, `_high` (min-heap) the larger one, with len(low) equal to
+    len(high) or one more. Every element is keyed by (value, seq) so keys are
+    unique and totally ordered; removals are lazy (the key is marked and
+    dropped when it reaches a heap top). add/remove are O(log n), median O(1)
+    amortized.
+    """
+
+    def __init__(self) -> None:
+        self._low: List[Tuple[float, int]] = []   # (-value, -seq)
+        self._high: List[Tuple[float, int]] = []  # (value, seq)
+        self._removed: set = set()                # seq of lazily removed elements
+        self._n_low = 0
+        self._n_high = 0
+
+    def __len__(self) -> int:
+        return self._n_low + self._n_high
+
+    def _prune(self, heap: List[Tuple[float, int]], sign: int) -> None:
+        while heap and sign * heap[0][1] in self._removed:
+            self._removed.discard(sign * heap[0][1])
+            heapq.heappop(heap)
+
+    def _rebalance(self) -> None:
+        if self._n_low > self._n_high + 1:
+            self._prune(self._low, -1)
+            v, s = heapq.heappop(self._low)
+            heapq.heappush(self._high, (-v, -s))
+            self._n_low -= 1
+            self._n_high += 1
+        elif self._n_low < self._n_high:
+            self._prune(self._high, 1)
+            v, s = heapq.heappop(self._high)
+            heapq.heappush(self._low, (-v, -s))
+            self._n_high -= 1
+            self._n_low += 1
+        self._prune(self._low, -1)
+        self._prune(self._high, 1)
+
+    def add(self, value: float, seq: int) -> None:
+        self._prune(self._low, -1)
+        if self._n_low == 0 or (value, seq) <= (-self._low[0][0], -self._low[0][1]):
+            heapq.heappush(self._low, (-value, -seq))
+            self._n_low += 1
+        else:
+            heapq.heappush(self._high, (value, seq))
+            self._n_high += 1
+        self._rebalance()
+
+    def remove(self, value: float, seq: int) -> None:
+        """Remove an element previously added with the same (value, seq)."""
+        self._prune(self._low, -1)
+        self._removed.add(seq)
+        if self._n_low and (value, seq) <= (-self._low[0][0], -self._low[0][1]):
+            self._n_low -= 1
+        else:
+            self._n_high -= 1
+        self._rebalance()
+
+    def median(self) -> Optional[float]:
+        if not len(self):
+            return None
+        lo = -self._low[0][0]
+        if self._n_low > self._n_high:
+            return lo
+        return (lo + self._high[0][0]) / 2.0
+
+
+class MetricWindow:
+    """
+    Time-based sliding window of one series (zone/metric): exact median
+    (SlidingMedian) plus running mean and variance (Welford, with removal).
+    Points must be added in non-decreasing timestamp order; expiry is FIFO.
+    """
+
+    _seq = itertools.count()
+
+    def __init__(self, window_s: float) -> None:
+        self.window_s = float(window_s)
+        self._points: Deque[Tuple[float, float, int]] = deque()  # (ts, value, seq)
+        self._median = SlidingMedian()
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def add(self, value: float, ts: float) -> None:
+        value = float(value)
+        if not math.isfinite(value):
+            return
+        if self._points and ts < self._points[-1][0]:
+            # Late point: clamp so expiry stays FIFO
+            ts = self._points[-1][0]
+        seq = next(self._seq)
+        self._points.append((ts, value, seq))
+        self._median.add(value, seq)
+
+        n = len(self._points)
+        delta = value - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (value - self._mean)
+
+    def expire(self, now: float) -> int:
+        """Drop points older than now - window_s; returns how many were dropped."""
+        cutoff = now - self.window_s
+        dropped = 0
+        while self._points and self._points[0][0] < cutoff:
+            _, value, seq = self._points.popleft()
+            self._median.remove(value, seq)
+            dropped += 1
+
+            n = len(self._points)
+            if n == 0:
+                self._mean = 0.0
+                self._m2 = 0.0
+            else:
+                delta = value - self._mean
+                self._mean -= delta / n
+                self._m2 -= delta * (value - self._mean)
+        return dropped
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Median, mean, sample stddev and count of the points in the window."""
+        n = len(self._points)
+        if n == 0:
+            return None
+        stddev = math.sqrt(max(self._m2, 0.0) / (n - 1)) if n > 1 else None
+        return {
+            "count": n,
+            "mean": self._mean,
+            "stddev": stddev,
+            "median": self._median.median(),
+        }
+
+
+class _Bucket:
+    """One sub-window: its sketch plus count/mean/M2 of the values."""
+
+    __slots__ = ("start", "sketch", "n", "mean", "m2")
+
+    def __init__(self, start: float, sketch: QuantileSketch) -> None:
+        self.start = start
+        self.sketch = sketch
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+
+class SketchWindow:
+    """
+    Sliding window of one series backed by quantile sketches, for windows
+    too long to keep every raw point (e.g. hours of soil_humidity).
+
+    Time is cut into buckets of `bucket_s` seconds, each with its own sketch
+    (see sketches.SKETCHES) and moments. A snapshot merges the buckets that
+    overlap the requested view, so views of different lengths (1 hour and
+    5 minutes) share the same state. Expiry drops whole buckets: the oldest
+    bucket may extend up to `bucket_s` before the window start. Memory is
+    O(window_s / bucket_s) sketches; quantile accuracy is the sketch's own
+    (exact, or about 1.65% rank error for KLL with k=200).
+    """
+
+    QUANTILES = (5, 50, 95)
+
+    def __init__(self, window_s: float, kind: str = "kll", bucket_s: float = 60.0) -> None:
+        make_sketch(kind)  # validate early
+        self.window_s = float(window_s)
+        self.bucket_s = float(bucket_s)
+        self.kind = kind
+        self._buckets: Deque[_Bucket] = deque()
+        self._now = 0.0
+
+    def __len__(self) -> int:
+        return sum(b.n for b in self._buckets)
+
+    def add(self, value: float, ts: float) -> None:
+        value = float(value)
+        if not math.isfinite(value):
+            return
+        start = math.floor(ts / self.bucket_s) * self.bucket_s
+        if not self._buckets or self._buckets[-1].start < start:
+            self._buckets.append(_Bucket(start, make_sketch(self.kind)))
+        # Late points land in the newest bucket
+        b = self._buckets[-1]
+        b.sketch.add(value)
+        b.n += 1
+        delta = value - b.mean
+        b.mean += delta / b.n
+        b.m2 += delta * (value - b.mean)
+        self._now = max(self._now, ts)
+
+    def expire(self, now: float) -> int:
+        """Drop buckets entirely older than now - window_s; returns how many points were dropped."""
+        self._now = max(self._now, now)
+        cutoff = now - self.window_s
+        dropped = 0
+        while self._buckets and self._buckets[0].start + self.bucket_s <= cutoff:
+            dropped += self._buckets.popleft().n
+        return dropped
+
+    def snapshot(self, window_s: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Count, mean, sample stddev, median and QUANTILES ('p5', 'p50', 'p95')
+        over the last `window_s` seconds (default: the whole window).
+        """
+        cutoff = self._now - (self.window_s if window_s is None else float(window_s))
+        buckets = [b for b in self._buckets if b.start + self.bucket_s > cutoff]
+        n = sum(b.n for b in buckets)
+        if n == 0:
+            return None
+
+        # Chan et al. parallel combination of the bucket moments
+        count, mean, m2 = 0, 0.0, 0.0
+        for b in buckets:
+            if b.n == 0:
+                continue
+            total = count + b.n
+            delta = b.mean - mean
+            mean += delta * b.n / total
+            m2 += b.m2 + delta * delta * count * b.n / total
+            count = total
+
+        sketch = merged((b.sketch for b in buckets), self.kind)
+        out: Dict[str, Any] = {
+            "count": n,
+            "mean": mean,
+            "stddev": math.sqrt(max(m2, 0.0) / (n - 1)) if n > 1 else None,
+        }
+        for p in self.QUANTILES:
+            out[f"p{p}"] = sketch.quantile(p / 100.0)
+        out["median"] = out["p50"]
+        return out
@@ -0,0 +1,203 @@
+"""
+Benchmark: MyMQTT publish throughput by QoS, serializer and logging policy.
+
+    python -m greenbox.utils.bench_mqtt [--messages 20000]
+
+Runs against a local broker stand-in (BrokerStandIn, a minimal MQTT 3.1.1
+server in this file), so the numbers include the real QoS 1/2 handshakes
+over TCP but not a real broker's routing and persistence. Logging goes to
+a temporary file at DEBUG, like setup_logger.
+"""
+import argparse
+import asyncio
+import logging
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from greenbox.utils.mqtt import MyMQTT
+from greenbox.utils.serializers import SERIALIZERS
+from greenbox.utils.topic_router import TopicRouter
+
+
+class BrokerStandIn:
+    """
+    Minimal MQTT 3.1.1 broker on an asyncio loop in one background thread:
+    acknowledges CONNECT/PUBLISH/PUBREL/SUBSCRIBE/UNSUBSCRIBE/PINGREQ, counts
+    PUBLISH packets and forwards them (QoS 0) to matching subscribers.
+    One thread whatever the number of connections.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.lock = threading.Lock()
+        self.received = 0
+        self.completed = 0
+        self.bytes = 0
+        self.connections = 0
+        self._router = TopicRouter()
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, host, port, backlog=4096))
+        self.server_address = self._server.sockets[0].getsockname()
+
+    def serve_forever(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def shutdown(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.received = self.completed = self.bytes = 0
+
+    def _forward(self, topic: str, body: bytes, topic_len: int, qos: int) -> None:
+        writers = self._router.match(topic)
+        if writers:
+            rest = body[:2 + topic_len] + body[2 + topic_len + (2 if qos else 0):]
+            packet = b"\x30" + _remaining_length(len(rest)) + rest
+            for write in writers:
+                write(packet)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        with self.lock:
+            self.connections += 1
+        subscribed: Dict[str, int] = {}
+        try:
+            while True:
+                header = (await reader.readexactly(1))[0]
+                length, shift = 0, 0
+                while True:
+                    b = (await reader.readexactly(1))[0]
+                    length |= (b & 0x7F) << shift
+                    shift += 7
+                    if not b & 0x80:
+                        break
+                body = await reader.readexactly(length) if length else b""
+                kind = header >> 4
+                if kind == 1:  # CONNECT
+                    writer.write(b"\x20\x02\x00\x00")
+                elif kind == 3:  # PUBLISH
+                    qos = (header >> 1) & 3
+                    (topic_len,) = struct.unpack("!H", body[:2])
+                    with self.lock:
+                        self.received += 1
+                        self.bytes += length
+                    if qos == 1:
+                        writer.write(b"\x40\x02" + body[2 + topic_len:4 + topic_len])
+                    elif qos == 2:
+                        writer.write(b"\x50\x02" + body[2 + topic_len:4 + topic_len])
+                    self._forward(body[2:2 + topic_len].decode(), body, topic_len, qos)
+                elif kind == 6:  # PUBREL
+                    writer.write(b"\x70\x02" + body[:2])
+                    with self.lock:
+                        self.completed += 1
+                elif kind in (8, 10):  # SUBSCRIBE / UNSUBSCRIBE
+                    i, granted = 2, b""
+                    while i < len(body):
+                        (n,) = struct.unpack("!H", body[i:i + 2])
+                        topic_filter = body[i + 2:i + 2 + n].decode()
+                        i += 2 + n
+                        if kind == 8:
+                            granted += body[i:i + 1]
+                            i += 1
+                            if topic_filter not in subscribed:
+                                subscribed[topic_filter] = self._router.add(topic_filter, writer.write)
+                        elif topic_filter in subscribed:
+                            self._router.remove(subscribed.pop(topic_filter))
+                    if kind == 8:
+                        writer.write(b"\x90" + _remaining_length(2 + len(granted)) + body[:2] + granted)
+                    else:
+                        writer.write(b"\xb0\x02" + body[:2])
+                elif kind == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif kind == 14:  # DISCONNECT
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            for token in subscribed.values():
+                self._router.remove(token)
+            with self.lock:
+                self.connections -= 1
+            writer.close()
+
+
+def _remaining_length(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n % 128
+        n //= 128
+        out.append(b | 0x80 if n else b)
+        if not n:
+            return bytes(out)
+
+
+def sensor_payload(i: int):
+    return {
+        "value": round(20 + (i % 100) / 10, 3),
+        "unit": "°C",
+        "sensor": "tthh_001",
+        "metric": "temperature",
+        "site": "greenhouse_0001",
+        "device": "raspberry_0001",
+    }
+
+
+def run(broker: BrokerStandIn, n: int, qos: int, serializer: str, log_every: int) -> dict:
+    broker.reset()
+    port = broker.server_address[1]
+    client = MyMQTT(
+        f"bench-{qos}-{serializer}-{log_every}", "127.0.0.1", port, notifier=None,
+        qos=qos, serializer=serializer, log_every=log_every, policies={},
+    )
+    client.start()
+    while not client._c.is_connected():
+        time.sleep(0.01)
+
+    payloads = [sensor_payload(i) for i in range(n)]
+    done = (lambda: broker.completed >= n) if qos == 2 else (lambda: broker.received >= n)
+    t0 = time.perf_counter()
+    for p in payloads:
+        client.MyPublish("/greenhouse_0001/raspberry_0001/sensors/tthh_001/temperature", p)
+    publish_s = time.perf_counter() - t0
+    while not done():
+        time.sleep(0.001)
+    total_s = time.perf_counter() - t0
+    client.stop()
+    return {
+        "publish_us": publish_s / n * 1e6,
+        "msgs_per_s": n / total_s,
+        "bytes_per_msg": broker.bytes / max(broker.received, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MyMQTT publish throughput benchmark.")
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    log_file = tempfile.NamedTemporaryFile(prefix="bench_mqtt_", suffix=".log", delete=False)
+    logging.basicConfig(filename=log_file.name, level=logging.DEBUG, force=True)
+
+    broker = BrokerStandIn()
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+
+    serializers = [name for name, (_, available) in SERIALIZERS.items() if available()]
+    print(f"messages={args.messages} serializers={serializers} log={log_file.name}")
+    print(f"{'qos':>3} {'serializer':>10} {'log_every':>9} {'publish us':>11} {'msgs/s':>9} {'bytes/msg':>9}")
+    configs = [(2, "json", 1)]
+    configs += [(qos, s, 100) for qos in (2, 1, 0) for s in serializers]
+    for qos, serializer, log_every in configs:
+        r = run(broker, args.messages, qos, serializer, log_every)
+        print(
+            f"{qos:>3} {serializer:>10} {log_every:>9} {r['publish_us']:>11.1f} "
+            f"{r['msgs_per_s']:>9.0f} {r['bytes_per_msg']:>9.1f}"
+        )
+    broker.shutdown()
+
+
+if __name__ == "__main__":
+    main()
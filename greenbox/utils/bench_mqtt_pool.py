@@ -0,0 +1,173 @@
+"""
+Benchmark: dedicated vs shared MQTT connections for many devices in one process.
+
+    python -m greenbox.utils.bench_mqtt_pool [--devices 1000 10000]
+
+Each device is a MyMQTT that starts and subscribes to its actuator command
+topic, like a simulated Raspberry. The broker stand-in of bench_mqtt runs in
+its own process and each configuration in a fresh one, so that only the
+client side is measured: threads, file descriptors, RSS and broker
+connections once every device is subscribed, then one command per device is
+published and the deliveries are counted.
+
+paho's network loop uses select(), which cannot watch descriptors above
+FD_SETSIZE (1024): with dedicated clients (socket + wakeup socketpair each)
+only the first ~340 devices of a process get connected; the others are
+reported in the 'connected' column.
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from greenbox.utils.mqtt import MyMQTT
+from greenbox.utils.mqtt_shared import SharedConnection
+
+
+def _serve(port_queue) -> None:
+    from greenbox.utils.bench_mqtt import BrokerStandIn
+
+    broker = BrokerStandIn()
+    port_queue.put(broker.server_address[1])
+    broker.serve_forever()
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.n = 0
+
+    def notify(self, topic, payload):
+        with self.lock:
+            self.n += 1
+
+
+def _wait(cond, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while not cond():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def run(port: int, devices: int, shared: bool, timeout: float = 30.0) -> dict:
+    # Connected first, so its socket stays below FD_SETSIZE
+    publisher = MyMQTT("bench-publisher", "127.0.0.1", port, None, qos=0, log_every=0, policies={}, shared=False)
+    publisher.start()
+    _wait(publisher._c.is_connected, timeout)
+
+    base = {"threads": threading.active_count(), "fds": _fds(), "rss": _rss_mb()}
+    counter = _Counter()
+    clients = []
+    t0 = time.perf_counter()
+    for i in range(devices):
+        c = MyMQTT(f"bench-rb-{i:05d}", "127.0.0.1", port, counter, shared=shared, log_every=0, policies={})
+        c.start()
+        clients.append(c)
+    if shared:
+        connected = lambda: devices if clients[0]._conn._c.is_connected() else 0
+    else:
+        connected = lambda: sum(c._c.is_connected() for c in clients)
+    _wait(lambda: connected() == devices, timeout)
+    for i, c in enumerate(clients):
+        c.MySubscribe(f"/greenhouse_0001/raspberry_{i:05d}/actuators/+/cmd", qos=0)
+    setup_s = time.perf_counter() - t0
+    time.sleep(0.5)  # SUBACKs
+
+    result = {
+        "threads": threading.active_count() - base["threads"],
+        "fds": _fds() - base["fds"],
+        "rss": _rss_mb() - base["rss"],
+        "connections": SharedConnection.connections() if shared else devices,
+        "connected": connected(),
+        "setup_s": setup_s,
+    }
+
+    t0 = time.perf_counter()
+    for i in range(devices):
+        publisher.MyPublish(f"/greenhouse_0001/raspberry_{i:05d}/actuators/fan/cmd", {"level": 50})
+    _wait(lambda: counter.n >= devices, timeout)
+    result["delivery_s"] = time.perf_counter() - t0
+    result["delivered"] = counter.n
+    publisher.stop()
+
+    # loop_stop waits up to a select timeout per client: stop them in parallel
+    with ThreadPoolExecutor(max_workers=64) as pool:
+        list(pool.map(lambda c: c.stop(), clients))
+    return result
+
+
+def _run_child(queue, port: int, devices: int, shared: bool) -> None:
+    try:
+        queue.put(run(port, devices, shared))
+    except OSError as e:  # e.g. EMFILE: 3 descriptors per dedicated client
+        queue.put({"error": str(e)})
+
+
+def _run_isolated(port: int, devices: int, shared: bool) -> dict:
+    """run() in a fresh process, so one configuration's sockets and threads don't skew the next."""
+    queue = mp.Queue()
+    proc = mp.Process(target=_run_child, args=(queue, port, devices, shared))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dedicated vs shared MQTT connection benchmark.")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument(
+        "--dedicated-max", type=int, default=2000,
+        help="Skip dedicated runs above this many devices (thousands of paho threads starve each other).",
+    )
+    args = parser.parse_args()
+
+    log_file = tempfile.NamedTemporaryFile(prefix="bench_mqtt_pool_", suffix=".log", delete=False)
+    logging.basicConfig(filename=log_file.name, level=logging.INFO, force=True)
+    # one socket per device in dedicated mode
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    queue = mp.Queue()
+    broker = mp.Process(target=_serve, args=(queue,), daemon=True)
+    broker.start()
+    port = queue.get(timeout=10)
+
+    print(f"pool_size={os.getenv('MQTT_POOL_SIZE', '1')} log={log_file.name}")
+    print(f"{'devices':>7} {'mode':>9} {'threads':>7} {'fds':>6} {'rss MB':>7} {'conns':>6} {'connected':>9} {'setup s':>8} {'deliver s':>9} {'delivered':>9}")
+    for devices in args.devices:
+        for shared in (True, False):
+            mode = "shared" if shared else "dedicated"
+            if not shared and devices > args.dedicated_max:
+                print(f"{devices:>7} {mode:>9} skipped (--dedicated-max {args.dedicated_max})")
+                continue
+            r = _run_isolated(port, devices, shared)
+            if "error" in r:
+                print(f"{devices:>7} {mode:>9} failed: {r['error']}")
+                continue
+            print(
+                f"{devices:>7} {mode:>9} {r['threads']:>7} {r['fds']:>6} "
+                f"{r['rss']:>7.1f} {r['connections']:>6} {r['connected']:>9} {r['setup_s']:>8.2f} {r['delivery_s']:>9.2f} {r['delivered']:>9}"
+            )
+    broker.terminate()
+
+
+if __name__ == "__main__":
+    main()
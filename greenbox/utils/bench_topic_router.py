@@ -0,0 +1,74 @@
+"""
+Benchmark: actuator topic dispatch, split/index parsing vs TopicRouter.
+
+    python -m greenbox.utils.bench_topic_router [--messages 200000] [--zones 1 100 10000]
+
+'split/index' is what SensorSim.notify used to do for every message:
+split the topic and look up 'actuators' to find the actuator id. 'router'
+routes the topic through a TopicRouter holding one named pattern per zone
+(as a SharedConnection does for many simulated Raspberries) and returns the
+captured segments. 'linear' checks every zone filter with paho's
+topic_matches_sub, i.e. dispatch without the trie.
+"""
+import argparse
+import time
+
+from paho.mqtt.client import topic_matches_sub
+
+from greenbox.utils.topic_router import TopicRouter, parse_pattern
+
+
+def zone_pattern(i: int) -> str:
+    return f"/greenhouse_{i // 100:04d}/raspberry_{i % 100:04d}/actuators/+system/+actuator_id/data"
+
+
+def topics(n: int, zones: int):
+    return [
+        f"/greenhouse_{(i % zones) // 100:04d}/raspberry_{(i % zones) % 100:04d}/actuators/ventilation/fan_{i % 7:03d}/data"
+        for i in range(n)
+    ]
+
+
+def split_index(topic: str) -> str:
+    parts = topic.strip("/").split("/")
+    i = parts.index("actuators")
+    return parts[i + 2]
+
+
+def bench(fn, items) -> float:
+    t0 = time.perf_counter()
+    for t in items:
+        fn(t)
+    return (time.perf_counter() - t0) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Topic dispatch microbenchmark.")
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--zones", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+
+    print(f"messages={args.messages}")
+    print(f"{'zones':>6} {'split/index us':>14} {'router us':>10} {'linear us':>10}")
+    for zones in args.zones:
+        items = topics(args.messages, zones)
+        router = TopicRouter()
+        filters = []
+        for i in range(zones):
+            router.add(zone_pattern(i), None)
+            filters.append(parse_pattern(zone_pattern(i))[0])
+
+        # same answer before timing
+        for t in items[:1000]:
+            ((_, segments),) = router.route(t)
+            assert segments["actuator_id"] == split_index(t)
+
+        split_us = bench(split_index, items)
+        router_us = bench(router.route, items)
+        linear_items = items[: max(1, args.messages // max(1, zones // 10))]
+        linear_us = bench(lambda t: [f for f in filters if topic_matches_sub(f, t)], linear_items)
+        print(f"{zones:>6} {split_us:>14.2f} {router_us:>10.2f} {linear_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,15 @@ import os
 import requests
 import json
 import csv
+import hashlib
+import io
+import threading
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Callable, Optional, Tuple
 
 from greenbox.sim.thresholds.thresholds import Threshold
+from greenbox.utils.clock import SYSTEM_CLOCK
 
 # --- Low-Level API Functions ---
 
@@ -82,82 +86,177 @@ def get_greenhouses(token: str) -> List[Dict[str, Any]]:
 # --- High-Level Service-Specific Functions ---
 
 
-def get_device_config(device_id: str) -> Dict[str, Any]:
-    """
-    (Used by: raspberry)
-    Retrieves the context configuration for a single device from the catalog.
-    """
+def _login_from_env() -> str:
     username = os.getenv("USER")
     password = os.getenv("PASSWORD")
     if not (username and password):
         raise ValueError("USER and PASSWORD are required for authentication.")
+    return login(username, password)
 
-    token = login(username, password)
-    broker_ip, broker_port = get_broker_info()
-    greenhouses_data = get_greenhouses(token)
-
-    for gh in greenhouses_data:
-        gh_id = gh.get("id")
-        if not gh_id:
-            continue
-
-        for device in gh.get("devices", []):
-            if device.get("type") == "raspberry" and device.get("id") == device_id:
-                return {
-                    "greenhouse_id": gh_id,
-                    "broker_ip": broker_ip,
-                    "broker_port": broker_port,
-                }
-
-    raise ValueError(
-        f"Device with ID '{device_id}' not found in any greenhouse for this user."
-    )
+
+def get_device_config(device_id: str) -> Dict[str, Any]:
+    """
+    (Used by: raspberry)
+    Retrieves the context configuration for a single device from the catalog's
+    topology view (greenhouse, kind and broker in one lookup).
+    """
+    token = _login_from_env()
+    r = requests.get(f"{catalog_url()}/topology/devices/{device_id}", headers={"token": token}, timeout=5)
+    found = r.status_code not in (403, 404)
+    if found:
+        r.raise_for_status()
+    j = r.json() if found else {}
+    # Only raspberries are looked up here, as with the full topology scan
+    if j.get("device_type") != "raspberry":
+        raise ValueError(
+            f"Device with ID '{device_id}' not found in any greenhouse for this user."
+        )
+    return {
+        "greenhouse_id": j["greenhouse_id"],
+        "broker_ip": j["broker_ip"],
+        "broker_port": j["broker_port"],
+    }
 
 
 def get_all_zones_with_measurements() -> Dict[str, Any]:
     """
     (Used by: statistics)
     Returns a dictionary containing broker info and a structured list of all zones
-    with their associated measurements.
+    with their associated measurements, from the catalog's topology view.
     """
-    username = os.getenv("USER")
-    password = os.getenv("PASSWORD")
-    if not (username and password):
-        raise ValueError("USER and PASSWORD are required for authentication.")
+    token = _login_from_env()
+    r = requests.get(f"{catalog_url()}/topology/zones", headers={"token": token}, timeout=5)
+    r.raise_for_status()
+    j = r.json()
+    return {
+        "broker_ip": j["broker_ip"],
+        "broker_port": j["broker_port"],
+        "greenhouses": [
+            {
+                "greenhouse_id": gh["greenhouse_id"],
+                "raspberries": gh.get("raspberries", []),
+                "measurements": gh.get("measurements", []),
+            }
+            for gh in j.get("greenhouses", [])
+        ],
+    }
 
-    token = login(username, password)
-    broker_ip, broker_port = get_broker_info()
-    greenhouses_data = get_greenhouses(token)
 
-    processed_greenhouses = []
-    for gh in greenhouses_data:
-        gh_id = gh.get("id")
-        if not gh_id:
-            continue
+# --- Per-greenhouse config cache ---
 
-        raspberries = [d for d in gh.get("devices", []) if d.get("type") == "raspberry"]
-        sensors = [d for d in gh.get("devices", []) if "sensor" in d.get("name", "")]
+THRESHOLDS_PATH = Path(__file__).parent.parent / "sim/thresholds/thresholds.csv"
+EFFECTS_PATH = Path(__file__).parent.parent / "sim/effects/effects.csv"
 
-        measurements = set()
-        for sensor in sensors:
-            for measurement in sensor.get("measurements", []):
-                m_type = measurement.get("type")
-                if m_type:
-                    measurements.add(m_type)
 
-        processed_greenhouses.append(
-            {
-                "greenhouse_id": gh_id,
-                "raspberries": [rb.get("id") for rb in raspberries if rb.get("id")],
-                "measurements": sorted(list(measurements)),
-            }
+class ConfigCache:
+    """
+    Process-wide cache of parsed configs, keyed by (greenhouse_id, source).
+
+    An entry is served as is for `ttl_s` seconds (CATALOG_CONFIG_TTL_S, 30;
+    0 revalidates on every call). After that its validator (the file's mtime
+    and size, where an HTTP source would use its ETag) is checked: the
+    source is read again only if it changed, and parsed again only if its
+    bytes did. Each entry carries a digest of those bytes, which changes
+    only when the content does (see config_version).
+    """
+
+    def __init__(self, ttl_s: Optional[float] = None, clock=None) -> None:
+        self.ttl_s = ttl_s
+        self.clock = clock or SYSTEM_CLOCK
+        self._entries: Dict[Tuple[str, str], list] = {}  # key -> [value, validator, digest, checked_at]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+
+    def _ttl(self) -> float:
+        return float(os.getenv("CATALOG_CONFIG_TTL_S", "30")) if self.ttl_s is None else self.ttl_s
+
+    def get(self, greenhouse_id: str, source: str, path: Path, parse: Callable[[bytes], Any]) -> Tuple[Any, str]:
+        """(parsed value, content digest) of `path` for this greenhouse/source."""
+        key = (greenhouse_id, source)
+        now = self.clock.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[3] < self._ttl():
+                self.hits += 1
+                return entry[0], entry[2]
+            st = path.stat()
+            validator = (st.st_mtime_ns, st.st_size)
+            if entry is not None and entry[1] == validator:
+                self.revalidations += 1
+                entry[3] = now
+                return entry[0], entry[2]
+            raw = path.read_bytes()
+            digest = hashlib.sha1(raw).hexdigest()
+            if entry is not None and entry[2] == digest:
+                # Touched, same content
+                self.revalidations += 1
+                entry[1], entry[3] = validator, now
+                return entry[0], entry[2]
+            value = parse(raw)
+            self.loads += 1
+            self._entries[key] = [value, validator, digest, now]
+            return value, digest
+
+    def invalidate(self, greenhouse_id: Optional[str] = None, source: Optional[str] = None) -> None:
+        """Drop the entries of a greenhouse and/or source (all of them by default)."""
+        with self._lock:
+            for key in list(self._entries):
+                if greenhouse_id in (None, key[0]) and source in (None, key[1]):
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "revalidations": self.revalidations, "loads": self.loads}
+
+
+_config_cache = ConfigCache()
+
+
+def _parse_thresholds(raw: bytes) -> Dict[str, Threshold]:
+    out: Dict[str, Threshold] = {}
+    for r in csv.DictReader(io.StringIO(raw.decode("utf-8"), newline="")):
+        rec = {
+            k.strip().lower(): (v if v != "" else None) for k, v in r.items()
+        }
+        name_raw = (rec.get("metric") or "").strip()
+        name = (
+            "pH"
+            if name_raw.lower().replace("-", "").replace("_", "") == "ph"
+            else name_raw
+        )
+        lo = rec.get("lower", rec.get("min"))
+        hi = rec.get("upper", rec.get("max"))
+        db = rec.get(
+            "deadband", rec.get("dead_band", rec.get("tolerance", 0.0))
         )
+        if lo is None or hi is None:
+            raise ValueError(f"Threshold missing bounds for metric '{name}'")
+        out[name] = Threshold(float(lo), float(hi), float(db or 0.0))
+    return out
 
-    return {
-        "broker_ip": broker_ip,
-        "broker_port": broker_port,
-        "greenhouses": processed_greenhouses,
-    }
+
+def _parse_effects(raw: bytes) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(raw))
+
+
+def _cached_thresholds(greenhouse_id: str) -> Tuple[Dict[str, Threshold], str]:
+    try:
+        return _config_cache.get(greenhouse_id, "thresholds", THRESHOLDS_PATH, _parse_thresholds)
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"CRITICAL: Thresholds configuration file not found at {THRESHOLDS_PATH}"
+        )
+
+
+def _cached_effects(greenhouse_id: str) -> Tuple[pd.DataFrame, str]:
+    try:
+        return _config_cache.get(greenhouse_id, "effects", EFFECTS_PATH, _parse_effects)
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"CRITICAL: Effects configuration file not found at {EFFECTS_PATH}"
+        )
 
 
 def get_thresholds_config(greenhouse_id: str) -> Dict[str, Threshold]:
@@ -165,49 +264,32 @@ def get_thresholds_config(greenhouse_id: str) -> Dict[str, Threshold]:
     (Used by: controller)
     Artifice: Loads threshold configuration from the local CSV file.
     In the future, this will query the MongoDB `crop_profiles` collection.
+    Served from the config cache (see ConfigCache).
     """
-    # This path is relative to the project root, assuming utils is in a package
-    thresholds_path = Path(__file__).parent.parent / "sim/thresholds/thresholds.csv"
-
-    out: Dict[str, Threshold] = {}
-    try:
-        with thresholds_path.open(newline="", encoding="utf-8") as f:
-            for r in csv.DictReader(f):
-                rec = {
-                    k.strip().lower(): (v if v != "" else None) for k, v in r.items()
-                }
-                name_raw = (rec.get("metric") or "").strip()
-                name = (
-                    "pH"
-                    if name_raw.lower().replace("-", "").replace("_", "") == "ph"
-                    else name_raw
-                )
-                lo = rec.get("lower", rec.get("min"))
-                hi = rec.get("upper", rec.get("max"))
-                db = rec.get(
-                    "deadband", rec.get("dead_band", rec.get("tolerance", 0.0))
-                )
-                if lo is None or hi is None:
-                    raise ValueError(f"Threshold missing bounds for metric '{name}'")
-                out[name] = Threshold(float(lo), float(hi), float(db or 0.0))
-    except FileNotFoundError:
-        raise RuntimeError(
-            f"CRITICAL: Thresholds configuration file not found at {thresholds_path}"
-        )
-    return out
+    thresholds, _ = _cached_thresholds(greenhouse_id)
+    return dict(thresholds)
 
 
 def get_effects_config(greenhouse_id: str) -> pd.DataFrame:
     """
-    (Used by: controller)
+    (Used by: controller, actuators)
     Artifice: Loads actuator effects configuration from the local CSV file.
     In the future, this will query the MongoDB `actuator_effects` collection.
+    Served from the config cache (see ConfigCache); the caller gets a copy.
     """
-    # This path is relative to the project root, assuming utils is in a package
-    effects_path = Path(__file__).parent.parent / "sim/effects/effects.csv"
-    try:
-        return pd.read_csv(effects_path)
-    except FileNotFoundError:
-        raise RuntimeError(
-            f"CRITICAL: Effects configuration file not found at {effects_path}"
-        )
+    effects, _ = _cached_effects(greenhouse_id)
+    return effects.copy()
+
+
+def config_version(greenhouse_id: str) -> Tuple[str, str]:
+    """Digests of the greenhouse's thresholds and effects; they change only when the content does."""
+    return _cached_thresholds(greenhouse_id)[1], _cached_effects(greenhouse_id)[1]
+
+
+def invalidate_config(greenhouse_id: Optional[str] = None, source: Optional[str] = None) -> None:
+    """Forget cached configs (of one greenhouse and/or source, e.g. 'effects'); the next call reloads them."""
+    _config_cache.invalidate(greenhouse_id, source)
+
+
+def config_cache_stats() -> Dict[str, int]:
+    return _config_cache.stats()
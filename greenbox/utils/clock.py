@@ -0,0 +1,47 @@
+"""
+Time sources.
+
+Components that keep time (sensor readings, actuator 'seconds since on',
+statistics windows, decision cache TTLs) take a clock: the wall clock by
+default, a VirtualClock when the simulation engine (sim.engine) runs them.
+"""
+import time
+from datetime import datetime, tzinfo
+from typing import Optional
+
+
+class SystemClock:
+    """Wall-clock time."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.now(tz)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class VirtualClock:
+    """Time that only moves when `advance` is called (epoch seconds)."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = float(start)
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.fromtimestamp(self._now, tz)
+
+    def advance(self, t: float) -> None:
+        if t < self._now:
+            raise ValueError(f"Virtual time cannot go backwards ({t} < {self._now})")
+        self._now = float(t)
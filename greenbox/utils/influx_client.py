@@ -1,3 +1,4 @@
+import logging
 import os
 from typing import Optional, List, Dict, Any
 
@@ -10,12 +11,22 @@ class InfluxInterfaceClient:
     Client HTTP per interagire con il server Influx Interface.
     """
 
-    def __init__(self, base_url: Optional[str] = None, timeout: float = 5.0):
+    def __init__(self, base_url: Optional[str] = None, timeout: float = 5.0, pool_size: int = 10):
         if base_url is None:
             base_url = os.getenv("INFLUX_INTERFACE_URL")
         self.base_url = base_url
         self.timeout = timeout
 
+        # Sessione condivisa: connessioni keep-alive riutilizzate (fino a pool_size in parallelo)
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, int(pool_size)))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """Chiude le connessioni del pool."""
+        self._session.close()
+
     def get_data(
         self,
         metric: str,
@@ -48,13 +59,88 @@ class InfluxInterfaceClient:
             params["site"] = site
 
         try:
-            response = requests.get(self.base_url, params=params, timeout=self.timeout)
+            response = self._session.get(self.base_url, params=params, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Errore durante la lettura: {e}")
             return []
 
+    def get_batch(
+        self,
+        metrics: List[str],
+        sites: Optional[List[str]] = None,
+        devices: Optional[List[str]] = None,
+        limit_per_series: int = 100,
+        time_range: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Dict[str, List[Dict[str, Any]]]]]:
+        """
+        Richiede piu' metriche/siti/dispositivi in una sola chiamata (GET /batch).
+        Ritorna {site: {device: {metric: [{"time", "value"}, ...]}}}.
+        """
+        params = {
+            "metrics": ",".join(metrics),
+            "limit_per_series": limit_per_series,
+        }
+
+        if sites:
+            params["sites"] = ",".join(sites)
+        if devices:
+            params["devices"] = ",".join(devices)
+        if time_range:
+            params["time_range"] = time_range
+        if start:
+            params["start"] = start
+        if end:
+            params["end"] = end
+
+        try:
+            response = self._session.get(f"{self.base_url.rstrip('/')}/batch", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json().get("series", {})
+        except requests.exceptions.RequestException:
+            logging.exception("[influx] Batch query failed for %s", params["metrics"])
+            return {}
+
+    def get_stats(
+        self,
+        metrics: List[str],
+        sites: Optional[List[str]] = None,
+        devices: Optional[List[str]] = None,
+        percentiles: Optional[List[float]] = None,
+        time_range: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]:
+        """
+        Richiede le statistiche calcolate lato InfluxDB (GET /stats): una riga per serie.
+        Ritorna {site: {device: {metric: {"count", "mean", "min", "max", "stddev", "median", "p5", ...}}}}.
+        """
+        params = {"metrics": ",".join(metrics)}
+
+        if sites:
+            params["sites"] = ",".join(sites)
+        if devices:
+            params["devices"] = ",".join(devices)
+        if percentiles is not None:
+            params["percentiles"] = ",".join(f"{float(p):g}" for p in percentiles)
+        if time_range:
+            params["time_range"] = time_range
+        if start:
+            params["start"] = start
+        if end:
+            params["end"] = end
+
+        try:
+            response = self._session.get(f"{self.base_url.rstrip('/')}/stats", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json().get("stats", {})
+        except requests.exceptions.RequestException:
+            logging.exception("[influx] Stats query failed for %s", params["metrics"])
+            return {}
+
 
 if __name__ == "__main__":
     load_dotenv()
@@ -1,18 +1,132 @@
+import asyncio
 import json
 import logging
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
 import paho.mqtt.client as mqtt
 
+from greenbox.utils.mqtt_asyncio import AsyncioLoopAdapter
+from greenbox.utils.mqtt_shared import SharedConnection
+from greenbox.utils.serializers import get_serializer
+from greenbox.utils.topic_router import Handler, Segments, TopicRouter, parse_pattern
+
+
+@dataclass(frozen=True)
+class TopicPolicy:
+    """Delivery settings for a class of topics."""
+
+    qos: int = 2
+    retain: bool = False
+    serializer: str = "json"
+
+    def __post_init__(self):
+        if self.qos not in (0, 1, 2):
+            raise ValueError(f"Unsupported qos '{self.qos}'")
+        get_serializer(self.serializer)
+
+
+# Last-known state is retained, so a (re)connecting subscriber gets it at once
+DEFAULT_POLICIES: Dict[str, Dict[str, object]] = {
+    "/+/+/actuators/+/cmd": {"retain": True},
+    "/+/+/statistics/state": {"retain": True},
+}
+
+
+def load_policies(default: TopicPolicy, overrides: Optional[Dict[str, Dict[str, object]]] = None) -> Dict[str, TopicPolicy]:
+    """
+    Build {topic filter: TopicPolicy} from DEFAULT_POLICIES, the MQTT_POLICIES
+    environment variable (JSON, e.g. {"/+/+/sensors/#": {"qos": 0}}) and
+    `overrides`, each layer updating the fields given on top of `default`.
+    """
+    layers = [DEFAULT_POLICIES, json.loads(os.getenv("MQTT_POLICIES") or "{}"), overrides or {}]
+    fields: Dict[str, Dict[str, object]] = {}
+    for layer in layers:
+        for pattern, values in layer.items():
+            fields.setdefault(pattern, {}).update(values)
+    return {pattern: replace(default, **values) for pattern, values in fields.items()}
+
 
 class MyMQTT:
-    """Minimal MQTT wrapper: connect, (re)subscribe, publish, notify."""
+    """
+    Minimal MQTT wrapper: connect, (re)subscribe, publish, notify.
+
+    Any number of topic patterns can be subscribed, each with its own
+    handler(topic, payload, segments) or, by default, notifier.notify(topic,
+    payload). Patterns may name their wildcards ('/+gh/+rb/actuators/+system/+id/data',
+    see TopicRouter) and the handler receives the captured segments.
 
-    def __init__(self, clientID, broker, port, notifier):
+    With shared=True (or MQTT_SHARED=1) the instance owns no paho client: it
+    attaches to the process-wide SharedConnection for its broker, so many
+    devices use one socket and one network thread. With loop=<asyncio loop>
+    the client has no network thread at all: its socket is served by that
+    loop, and every call must then be made from the loop's thread.
+    """
+
+    def __init__(
+        self,
+        clientID,
+        broker,
+        port,
+        notifier,
+        *,
+        qos: Optional[int] = None,
+        retain: bool = False,
+        serializer: Optional[str] = None,
+        policies: Optional[Dict[str, Dict[str, object]]] = None,
+        log_every: Optional[int] = None,
+        shared: Optional[bool] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        """
+        :param qos: Default QoS (MQTT_QOS, 2).
+        :param retain: Default retain flag.
+        :param serializer: Default serializer (MQTT_SERIALIZER, 'json'), see utils.serializers.
+        :param policies: Per topic filter overrides, e.g. {"/+/+/sensors/#": {"qos": 0}}.
+        :param log_every: Log one publish every N at INFO (MQTT_LOG_EVERY, 100);
+            1 logs every publish with its payload, 0 disables.
+        :param shared: Use the process-wide SharedConnection (MQTT_SHARED, off).
+        :param loop: Serve the connection from this asyncio loop (not with shared).
+        """
         self._clientID = clientID
         self.broker = broker
         self.port = port
         self.notifier = notifier
         self._topic = None
         self._connected_once = False
+        # pattern -> (router token, topic filter); filter -> broker QoS
+        self._subscriptions: Dict[str, tuple] = {}
+        self._filter_qos: Dict[str, int] = {}
+        self.router = TopicRouter()
+
+        self.default_policy = TopicPolicy(
+            qos=int(os.getenv("MQTT_QOS", "2")) if qos is None else qos,
+            retain=retain,
+            serializer=serializer or os.getenv("MQTT_SERIALIZER", "json"),
+        )
+        self.policies = load_policies(self.default_policy, policies)
+        # Most specific filters first: fewer '#', then fewer '+'
+        self._ordered = sorted(self.policies.items(), key=lambda kv: (kv[0].count("#"), kv[0].count("+")))
+        self._resolved: Dict[str, TopicPolicy] = {}
+        self._serializers = {
+            p.serializer: get_serializer(p.serializer)
+            for p in (self.default_policy, *self.policies.values())
+        }
+        self.log_every = int(os.getenv("MQTT_LOG_EVERY", "100")) if log_every is None else int(log_every)
+        self.published = 0
+
+        self.shared = os.getenv("MQTT_SHARED", "0") == "1" if shared is None else shared
+        if loop is not None:
+            if shared:
+                raise ValueError("A shared MQTT connection cannot be driven by an asyncio loop")
+            self.shared = False
+        self.loop = loop
+        self._aio: Optional[AsyncioLoopAdapter] = None
+        self._conn: Optional[SharedConnection] = None
+        if self.shared:
+            self._c = None
+            return
 
         self._c = mqtt.Client(
             mqtt.CallbackAPIVersion.VERSION1, client_id=clientID, clean_session=True
@@ -26,6 +140,20 @@ class MyMQTT:
         except Exception:
             pass
 
+    def policy_for(self, topic: str) -> TopicPolicy:
+        """Policy of the most specific matching topic filter (cached per topic), else the default."""
+        policy = self._resolved.get(topic)
+        if policy is None:
+            policy = self.policies.get(topic)
+            if policy is None:
+                policy = next(
+                    (p for pattern, p in self._ordered if mqtt.topic_matches_sub(pattern, topic)),
+                    self.default_policy,
+                )
+            if len(self._resolved) < 10_000:
+                self._resolved[topic] = policy
+        return policy
+
     # --- callbacks ---
 
     def _on_connect(self, client, userdata, flags, rc):
@@ -36,9 +164,10 @@ class MyMQTT:
             self.port,
             rc,
         )
-        if rc == 0 and self._connected_once and self._topic:
-            self._c.subscribe(self._topic, qos=2)
-            logging.info("[%s] Resubscribed to %s", self._clientID, self._topic)
+        if rc == 0 and self._connected_once and self._filter_qos:
+            # clean_session: the broker forgot them
+            self._c.subscribe(list(self._filter_qos.items()))
+            logging.info("[%s] Resubscribed to %s", self._clientID, ", ".join(self._filter_qos))
         self._connected_once = True
 
     def _on_disconnect(self, client, userdata, rc):
@@ -48,51 +177,119 @@ class MyMQTT:
             logging.info("[%s] Disconnected.", self._clientID)
 
     def _on_message(self, client, userdata, msg):
+        payload = msg.payload or b""
+        for handler, segments in self.router.route(msg.topic):
+            try:
+                handler(msg.topic, payload, segments)
+            except Exception:
+                logging.exception("[%s] handler error for %s", self._clientID, msg.topic)
+
+    def _notify(self, topic, payload, segments: Optional[Segments] = None):
         try:
-            self.notifier.notify(msg.topic, msg.payload or b"")
+            self.notifier.notify(topic, payload)
         except Exception:
             logging.exception("[%s] notifier.notify error", self._clientID)
 
+    def _connection(self) -> SharedConnection:
+        if self._conn is None:
+            self._conn = SharedConnection.acquire(self.broker, self.port, self._clientID)
+        return self._conn
+
     # --- api ---
 
     def start(self):
+        if self.shared:
+            self._connection()
+            logging.info("[%s] Attached to shared connection %s", self._clientID, self._conn.client_id)
+            return
         logging.info(
             "[%s] Connecting to %s:%s ...", self._clientID, self.broker, self.port
         )
+        if self.loop is not None:
+            self._aio = AsyncioLoopAdapter(self._c, self.loop, self._clientID)
+            self._c.connect(self.broker, self.port, keepalive=60)
+            return
         self._c.connect(self.broker, self.port, keepalive=60)
         self._c.loop_start()
 
-    def MySubscribe(self, topic):
+    def MySubscribe(self, topic, qos: Optional[int] = None, handler: Optional[Handler] = None):
+        """
+        Subscribe to a topic pattern; subscribing again to the same pattern
+        replaces its handler. Messages go to handler(topic, payload, segments)
+        if given, else to notifier.notify(topic, payload).
+        """
+        topic_filter, _ = parse_pattern(topic)
+        qos = self.policy_for(topic_filter).qos if qos is None else qos
+        handler = handler or self._notify
+        if topic in self._subscriptions:
+            self._drop(topic)
+        if self.shared:
+            token = self._connection().subscribe(topic, handler, qos)
+        else:
+            token = self.router.add(topic, handler)
+            current = self._filter_qos.get(topic_filter)
+            if current is None or qos > current:
+                self._filter_qos[topic_filter] = qos
+                self._c.subscribe(topic_filter, qos=qos)
+        self._subscriptions[topic] = (token, topic_filter)
         self._topic = topic
-        self._c.subscribe(topic, qos=2)
         logging.info("[%s] Subscribed to %s", self._clientID, topic)
 
+    def _drop(self, pattern):
+        token, topic_filter = self._subscriptions.pop(pattern)
+        if self.shared:
+            self._conn.unsubscribe(token)
+            return
+        self.router.remove(token)
+        if not self.router.has_filter(topic_filter):
+            self._filter_qos.pop(topic_filter, None)
+            self._c.unsubscribe(topic_filter)
+
     def MyPublish(self, topic, message):
+        policy = self.policy_for(topic)
         try:
-            payload = json.dumps(message, default=str)
+            payload = self._serializers[policy.serializer](message)
         except Exception:
-            logging.exception("[%s] json.dumps failed", self._clientID)
+            logging.exception("[%s] %s serialization failed", self._clientID, policy.serializer)
             return None
-        info = self._c.publish(topic, payload, qos=2, retain=False) # Hardcoded to False
+        client = self._connection() if self.shared else self._c
+        info = client.publish(topic, payload, qos=policy.qos, retain=policy.retain)
         rc = getattr(info, "rc", 0)
         if rc == 0:
-            logging.info("[%s] Published to %s: %s", self._clientID, topic, payload)
+            self.published += 1
+            if self.log_every == 1:
+                logging.info("[%s] Published to %s: %s", self._clientID, topic, payload)
+            elif self.log_every and self.published % self.log_every == 0:
+                logging.info("[%s] Published %d messages (last to %s)", self._clientID, self.published, topic)
         else:
             logging.warning(
                 "[%s] Publish failed to %s (rc=%s)", self._clientID, topic, rc
             )
         return info
 
-    def MyUnsubscribe(self):
-        if self._topic:
+    def MyUnsubscribe(self, topic=None):
+        """Unsubscribe from one pattern, or from all of them."""
+        for pattern in [topic] if topic else list(self._subscriptions):
+            if pattern not in self._subscriptions:
+                continue
             try:
-                self._c.unsubscribe(self._topic)
-                logging.info("[%s] Unsubscribed from %s", self._clientID, self._topic)
+                self._drop(pattern)
+                logging.info("[%s] Unsubscribed from %s", self._clientID, pattern)
             except Exception:
                 logging.exception("[%s] Unsubscribe error", self._clientID)
+        if not self._subscriptions:
+            self._topic = None
 
     def stop(self):
         self.MyUnsubscribe()
+        if self.shared:
+            if self._conn is not None:
+                self._conn.release()
+                self._conn = None
+            return
+        if self._aio is not None:
+            self._aio.close()
+            self._aio = None
         try:
             self._c.loop_stop()
         except Exception:
@@ -100,4 +297,4 @@ class MyMQTT:
         try:
             self._c.disconnect()
         except Exception:
-            logging.exception("[%s] disconnect error", self._clientID)
\ No newline at end of file
+            logging.exception("[%s] disconnect error", self._clientID)
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import Optional
+
+import paho.mqtt.client as mqtt
+
+
+class AsyncioLoopAdapter:
+    """
+    Drive a paho client from an asyncio event loop instead of its network
+    thread (paho's external loop API): the socket is watched with
+    add_reader/add_writer and keepalives run in a small task, so any number
+    of clients share the loop's single thread.
+
+    Socket callbacks may fire on another thread (e.g. a blocking connect run
+    in an executor); they are then handed over to the loop thread.
+    """
+
+    def __init__(self, client: mqtt.Client, loop: asyncio.AbstractEventLoop, name: str = "") -> None:
+        self.client = client
+        self.loop = loop
+        self.name = name
+        self._misc: Optional[asyncio.Task] = None
+        self._closing = False
+        client.on_socket_open = self._on_socket_open
+        client.on_socket_close = self._on_socket_close
+        client.on_socket_register_write = self._on_socket_register_write
+        client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def _call(self, fn, *args) -> None:
+        if self.loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    # By descriptor: the socket may be closed by the time the loop gets to it
+    def _on_socket_open(self, client, userdata, sock):
+        self._call(self._opened, sock.fileno())
+
+    def _opened(self, fd):
+        self.loop.add_reader(fd, self.client.loop_read)
+        if self._misc is None or self._misc.done():
+            self._misc = self.loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._call(self.loop.remove_reader, sock.fileno())
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._call(self.loop.add_writer, sock.fileno(), self.client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._call(self.loop.remove_writer, sock.fileno())
+
+    async def _misc_loop(self) -> None:
+        """Keepalives and retries; reconnects with backoff once the connection is lost."""
+        delay = 1
+        while not self._closing:
+            if self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+                delay = 1
+                await asyncio.sleep(1)
+                continue
+            await asyncio.sleep(delay)
+            if self._closing:
+                break
+            try:
+                await self.loop.run_in_executor(None, self.client.reconnect)
+                logging.info("[%s] Reconnected.", self.name)
+            except Exception as e:
+                logging.warning("[%s] Reconnect failed: %s", self.name, e)
+                delay = min(delay * 2, 30)
+
+    def close(self) -> None:
+        self._closing = True
+        if self._misc is not None:
+            self._call(self._misc.cancel)
@@ -0,0 +1,81 @@
+import logging
+from typing import Callable, Dict, Optional
+
+from greenbox.utils.serializers import get_serializer
+from greenbox.utils.topic_router import Handler, Segments, TopicRouter
+
+
+class LocalBroker:
+    """
+    In-process stand-in for the MQTT broker: what a client publishes is
+    routed through one TopicRouter to the handlers subscribed by the
+    others, without sockets or threads.
+
+    Deliveries go through `schedule(fn, *args)`, called right away when not
+    given; the simulation engine passes its event queue so that a message is
+    handled after the event that published it, as with a real broker.
+    """
+
+    def __init__(self, schedule: Optional[Callable[..., None]] = None) -> None:
+        self.router = TopicRouter()
+        self._schedule = schedule
+        self.published = 0
+        self.delivered = 0
+
+    def client(self, clientID, broker=None, port=None, notifier=None, **kwargs) -> "LocalMQTT":
+        """A client with MyMQTT's signature, usable wherever a MyMQTT factory is taken."""
+        return LocalMQTT(self, clientID, notifier, serializer=kwargs.get("serializer"))
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        self.published += 1
+        if self._schedule is None:
+            self._deliver(topic, payload)
+        else:
+            self._schedule(self._deliver, topic, payload)
+
+    def _deliver(self, topic: str, payload: bytes) -> None:
+        for handler, segments in self.router.route(topic):
+            self.delivered += 1
+            try:
+                handler(topic, payload, segments)
+            except Exception:
+                logging.exception("[local] handler error for %s", topic)
+
+
+class LocalMQTT:
+    """MyMQTT's API on a LocalBroker (payloads are still serialized)."""
+
+    def __init__(self, broker: LocalBroker, clientID, notifier, serializer: Optional[str] = None) -> None:
+        self._clientID = clientID
+        self.broker = broker
+        self.notifier = notifier
+        self._dumps = get_serializer(serializer or "auto")
+        self._subscriptions: Dict[str, int] = {}
+        self.published = 0
+
+    def _notify(self, topic, payload, segments: Optional[Segments] = None):
+        try:
+            self.notifier.notify(topic, payload)
+        except Exception:
+            logging.exception("[%s] notifier.notify error", self._clientID)
+
+    def start(self):
+        pass
+
+    def MySubscribe(self, topic, qos: Optional[int] = None, handler: Optional[Handler] = None):
+        if topic in self._subscriptions:
+            self.broker.router.remove(self._subscriptions.pop(topic))
+        self._subscriptions[topic] = self.broker.router.add(topic, handler or self._notify)
+
+    def MyPublish(self, topic, message):
+        self.broker.publish(topic, self._dumps(message))
+        self.published += 1
+
+    def MyUnsubscribe(self, topic=None):
+        for pattern in [topic] if topic else list(self._subscriptions):
+            token = self._subscriptions.pop(pattern, None)
+            if token is not None:
+                self.broker.router.remove(token)
+
+    def stop(self):
+        self.MyUnsubscribe()
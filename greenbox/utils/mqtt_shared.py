@@ -0,0 +1,151 @@
+import logging
+import os
+import socket
+import threading
+import zlib
+from typing import Dict, Tuple
+
+import paho.mqtt.client as mqtt
+
+from greenbox.utils.topic_router import Handler, TopicRouter, parse_pattern
+
+
+class SharedConnection:
+    """
+    One paho client (socket + network thread) shared by every MyMQTT of the
+    process that talks to the same broker.
+
+    Devices attach with `acquire` and detach with `release`; the connection
+    is opened by the first user and closed by the last. Subscriptions of all
+    users live in a TopicRouter: the broker subscription for a filter is
+    made once (at the highest QoS asked) and each incoming message is
+    dispatched to every handler whose filter matches, with its named
+    segments (see TopicRouter). MQTT_POOL_SIZE > 1 spreads devices over
+    that many connections (by client id hash).
+
+    Note: with overlapping filters some brokers deliver one copy per matching
+    subscription (mosquitto 2.x delivers one); handlers may then see a
+    message twice.
+    """
+
+    _registry: Dict[Tuple[str, int, int], "SharedConnection"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, broker: str, port: int, slot: int = 0) -> None:
+        self.broker = broker
+        self.port = port
+        self.slot = slot
+        self.client_id = f"greenbox-{socket.gethostname()}-{os.getpid()}-{slot}"
+        self.router = TopicRouter()
+        self._filter_qos: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._users = 0
+
+        self._c = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION1, client_id=self.client_id, clean_session=True
+        )
+        self._c.on_connect = self._on_connect
+        self._c.on_message = self._on_message
+        self._c.on_disconnect = self._on_disconnect
+        try:
+            self._c.reconnect_delay_set(min_delay=1, max_delay=30)
+        except Exception:
+            pass
+
+    # --- registry ---
+
+    @classmethod
+    def acquire(cls, broker: str, port: int, client_id: str) -> "SharedConnection":
+        pool_size = max(1, int(os.getenv("MQTT_POOL_SIZE", "1")))
+        slot = zlib.crc32(str(client_id).encode()) % pool_size
+        key = (broker, int(port), slot)
+        with cls._registry_lock:
+            conn = cls._registry.get(key)
+            if conn is None:
+                conn = cls(broker, int(port), slot)
+                cls._registry[key] = conn
+            conn._users += 1
+            if conn._users == 1:
+                logging.info("[%s] Connecting to %s:%s ...", conn.client_id, broker, port)
+                try:
+                    conn._c.connect(broker, int(port), keepalive=60)
+                    conn._c.loop_start()
+                except Exception:
+                    # don't leave a dead connection for the next acquire
+                    conn._users -= 1
+                    if conn._users == 0:
+                        cls._registry.pop(key, None)
+                    raise
+        return conn
+
+    def release(self) -> None:
+        with self._registry_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            self._registry.pop((self.broker, self.port, self.slot), None)
+        try:
+            self._c.loop_stop()
+            self._c.disconnect()
+        except Exception:
+            logging.exception("[%s] disconnect error", self.client_id)
+
+    @classmethod
+    def connections(cls) -> int:
+        with cls._registry_lock:
+            return len(cls._registry)
+
+    # --- api ---
+
+    def subscribe(self, pattern: str, handler: Handler, qos: int = 2) -> int:
+        """Route `pattern` (named wildcards allowed) to handler(topic, payload, segments)."""
+        topic_filter, _ = parse_pattern(pattern)
+        token = self.router.add(pattern, handler)
+        with self._lock:
+            current = self._filter_qos.get(topic_filter)
+            if current is None or qos > current:
+                self._filter_qos[topic_filter] = qos
+                self._c.subscribe(topic_filter, qos=qos)
+        return token
+
+    def unsubscribe(self, token: int) -> None:
+        topic_filter = self.router.remove(token)
+        if topic_filter is None:
+            return
+        with self._lock:
+            if not self.router.has_filter(topic_filter):
+                self._filter_qos.pop(topic_filter, None)
+                self._c.unsubscribe(topic_filter)
+
+    def publish(self, topic: str, payload, qos: int = 2, retain: bool = False):
+        return self._c.publish(topic, payload, qos=qos, retain=retain)
+
+    def stats(self) -> Dict[str, int]:
+        return {"users": self._users, "filters": len(self._filter_qos), "subscriptions": len(self.router)}
+
+    # --- callbacks ---
+
+    def _on_connect(self, client, userdata, flags, rc):
+        logging.info("[%s] Connected to %s:%s (rc=%s)", self.client_id, self.broker, self.port, rc)
+        if rc != 0:
+            return
+        with self._lock:
+            filters = list(self._filter_qos.items())
+        if filters:
+            # clean_session: the broker forgot them on reconnect
+            self._c.subscribe(filters)
+            logging.info("[%s] Resubscribed to %d filters", self.client_id, len(filters))
+
+    def _on_disconnect(self, client, userdata, rc):
+        if rc != 0:
+            logging.warning("[%s] Unexpected disconnect (rc=%s)", self.client_id, rc)
+        else:
+            logging.info("[%s] Disconnected.", self.client_id)
+
+    def _on_message(self, client, userdata, msg):
+        payload = msg.payload or b""
+        for handler, segments in self.router.route(msg.topic):
+            try:
+                handler(msg.topic, payload, segments)
+            except Exception:
+                logging.exception("[%s] handler error for %s", self.client_id, msg.topic)
@@ -0,0 +1,78 @@
+"""
+Sensor message formats shared by publishers and consumers.
+
+Per-measurement (default): one message per sensor and measurement on
+    /<gh>/<rb>/sensors/<sensor_id>/<metric>
+    {"value": 21.3, "unit": "°C", "sensor": "...", "metric": "...", "site": "...", "device": "..."}
+
+Batch (SENSOR_PUBLISH_MODE=batch): one message per Raspberry per tick on
+    /<gh>/<rb>/sensors/batch
+    {"site": "...", "device": "...", "timestamp": "<iso>",
+     "readings": [["<sensor_id>", "<metric>", 21.3, "°C"], ...]}
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from greenbox.utils.serializers import decode_payload
+
+BATCH_TOPIC = "batch"
+
+
+class Reading(NamedTuple):
+    site: str
+    device: str
+    sensor: str
+    metric: str
+    value: float
+    unit: Optional[str]
+    timestamp: Optional[str]
+
+
+def batch_topic(site: str, device: str) -> str:
+    return f"/{site}/{device}/sensors/{BATCH_TOPIC}"
+
+
+def build_batch(site: str, device: str, readings: Sequence[Sequence[Any]], timestamp: Optional[str] = None) -> Dict[str, Any]:
+    """Batch payload from [sensor_id, metric, value, unit] rows sharing one header."""
+    return {
+        "site": site,
+        "device": device,
+        "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
+        "readings": [list(r) for r in readings],
+    }
+
+
+def parse_sensor_message(topic: str, payload: Any) -> List[Reading]:
+    """
+    Readings of a sensor message in either format. Site and device come
+    from the topic. Raises ValueError on unknown topics or malformed payloads.
+    """
+    parts = topic.strip("/").split("/")
+    if len(parts) < 4 or parts[2] != "sensors":
+        raise ValueError(f"Unsupported topic '{topic}'")
+    data = decode_payload(payload)
+    if not isinstance(data, dict):
+        raise ValueError("Payload is not an object")
+    site, device = parts[0], parts[1]
+
+    if len(parts) == 5:
+        sensor, metric = parts[3], parts[4]
+        try:
+            value = float(data["value"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid sensor value: {e}") from e
+        return [Reading(site, device, sensor, metric, value, data.get("unit"), data.get("timestamp"))]
+
+    if len(parts) == 4 and parts[3] == BATCH_TOPIC:
+        timestamp = data.get("timestamp")
+        out = []
+        for row in data.get("readings") or []:
+            try:
+                sensor, metric, value = row[0], row[1], float(row[2])
+            except (IndexError, TypeError, ValueError):
+                continue
+            unit = row[3] if len(row) > 3 else None
+            out.append(Reading(site, device, str(sensor), str(metric), value, unit, timestamp))
+        return out
+
+    raise ValueError(f"Unsupported topic '{topic}'")
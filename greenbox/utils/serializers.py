@@ -0,0 +1,101 @@
+"""
+Payload serializers for MQTT messages.
+
+    json     - stdlib json (default, always available)
+    orjson   - same JSON on the wire, faster (optional)
+    msgpack  - MessagePack (optional)
+    cbor     - CBOR (optional)
+    auto     - orjson if installed, else json
+
+The optional codecs are listed in requirements-optional.txt
+(pip install -r requirements-optional.txt).
+
+Every payload in GreenBox is an object (map), and the first byte of a map
+tells the encodings apart, so `decode_payload` reads any of them without
+knowing which one the publisher used.
+"""
+import json
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional
+    cbor2 = None
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=str).encode()
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=str)
+
+
+def _msgpack_dumps(obj: Any) -> bytes:
+    return msgpack.packb(obj, default=str, use_bin_type=True)
+
+
+def _cbor_dumps(obj: Any) -> bytes:
+    return cbor2.dumps(obj, default=lambda encoder, value: encoder.encode(str(value)))
+
+
+SERIALIZERS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[], bool]]] = {
+    "json": (_json_dumps, lambda: True),
+    "orjson": (_orjson_dumps, lambda: orjson is not None),
+    "msgpack": (_msgpack_dumps, lambda: msgpack is not None),
+    "cbor": (_cbor_dumps, lambda: cbor2 is not None),
+}
+
+
+def get_serializer(name: str) -> Callable[[Any], bytes]:
+    """Return the dumps function for `name`; ValueError if unknown or not installed."""
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    try:
+        dumps, available = SERIALIZERS[name]
+    except KeyError as exc:
+        raise ValueError(f"Unsupported serializer '{name}'") from exc
+    if not available():
+        raise ValueError(f"Serializer '{name}' is not installed")
+    return dumps
+
+
+def decode_payload(payload: Any) -> Any:
+    """
+    Decode a payload produced by any serializer above (str or bytes).
+    Raises ValueError if it cannot be decoded.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if not payload:
+        raise ValueError("Empty payload")
+    first = payload[0]
+    try:
+        if 0x80 <= first <= 0x8F or first in (0xDE, 0xDF):
+            if msgpack is None:
+                raise ValueError("MessagePack payload but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        if 0xA0 <= first <= 0xBF:
+            if cbor2 is None:
+                raise ValueError("CBOR payload but cbor2 is not installed")
+            return cbor2.loads(payload)
+        if orjson is not None:
+            try:
+                return orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                pass  # NaN/Infinity, written by the stdlib encoder: json reads them
+        return json.loads(payload.decode())
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid payload: {e}") from e
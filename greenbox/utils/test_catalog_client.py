@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from greenbox.utils import catalog_client
+from greenbox.utils.catalog_client import ConfigCache
+from greenbox.utils.clock import VirtualClock
+
+
+class TestConfigCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "effects.csv"
+        self.path.write_text("system,level\nfan,0%\n")
+        self.clock = VirtualClock(100.0)
+        self.cache = ConfigCache(ttl_s=30, clock=self.clock)
+        self.parsed = 0
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def parse(self, raw):
+        self.parsed += 1
+        return raw.decode()
+
+    def get(self, greenhouse_id="gh01"):
+        return self.cache.get(greenhouse_id, "effects", self.path, self.parse)
+
+    def write(self, text, mtime):
+        self.path.write_text(text)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def test_parsed_once_per_greenhouse_within_ttl(self):
+        first = self.get()
+        for _ in range(500):
+            self.assertEqual(self.get(), first)
+        self.get("gh02")
+        self.assertEqual(self.parsed, 2)
+        self.assertEqual(self.cache.stats()["hits"], 500)
+
+    def test_revalidation_after_ttl(self):
+        self.write("system,level\nfan,0%\n", 10**18)
+        value, version = self.get()
+        # Expired but unchanged: no re-read
+        self.clock.advance(131)
+        self.assertEqual(self.get(), (value, version))
+        # Touched with the same content: same version, not parsed again
+        self.write("system,level\nfan,0%\n", 2 * 10**18)
+        self.clock.advance(162)
+        self.assertEqual(self.get(), (value, version))
+        self.assertEqual(self.parsed, 1)
+        # Changed, but only seen once the TTL runs out
+        self.write("system,level\nfan,0%\nfan,50%\n", 3 * 10**18)
+        self.assertEqual(self.get(), (value, version))
+        self.clock.advance(193)
+        new_value, new_version = self.get()
+        self.assertIn("50%", new_value)
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(self.cache.stats()["revalidations"], 2)
+
+    def test_invalidate(self):
+        self.get("gh01")
+        self.get("gh02")
+        self.cache.invalidate("gh01")
+        self.get("gh01")
+        self.get("gh02")
+        self.assertEqual(self.parsed, 3)
+        self.cache.invalidate(source="effects")
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+@patch.dict(os.environ, {"USER": "alice", "PASSWORD": "pw", "CATALOG_URL": "http://catalog"})
+@patch.object(catalog_client, "login", return_value="tok")
+class TestDeviceConfig(unittest.TestCase):
+
+    def _get(self, status, body=None):
+        response = MagicMock(status_code=status, ok=status < 400)
+        response.json.return_value = body or {}
+        return patch.object(catalog_client.requests, "get", return_value=response)
+
+    def test_raspberry_context(self, login):
+        body = {"device_id": "rb1", "device_type": "raspberry", "kind": "raspberry", "greenhouse_id": "gh1",
+                "broker_ip": "broker", "broker_port": 1883}
+        with self._get(200, body) as get:
+            self.assertEqual(catalog_client.get_device_config("rb1"),
+                             {"greenhouse_id": "gh1", "broker_ip": "broker", "broker_port": 1883})
+        self.assertTrue(get.call_args.args[0].endswith("/topology/devices/rb1"))
+
+    def test_only_raspberries(self, login):
+        body = {"device_id": "th1", "device_type": "dht11", "kind": "sensor", "greenhouse_id": "gh1",
+                "broker_ip": "broker", "broker_port": 1883}
+        for status, payload in ((200, body), (404, None), (403, None)):
+            with self._get(status, payload), self.assertRaises(ValueError):
+                catalog_client.get_device_config("th1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from greenbox.utils.influx_client import InfluxInterfaceClient
+
+
+def _response(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.url = "http://influx-interface/"
+    return response
+
+
+class TestInfluxInterfaceClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = InfluxInterfaceClient(base_url="http://influx-interface/")
+        self.addCleanup(self.client.close)
+
+    def test_batch(self):
+        series = {"gh01": {"rb_001": {"temperature": [{"time": "2025-01-01T00:00:00Z", "value": 21.5}]}}}
+        with patch.object(self.client._session, "get", return_value=_response(200, {"series": series})) as get:
+            self.assertEqual(self.client.get_batch(["temperature", "pH"], sites=["gh01"], start="2025-01-01"), series)
+        url, kwargs = get.call_args.args[0], get.call_args.kwargs
+        self.assertEqual(url, "http://influx-interface/batch")
+        self.assertEqual(kwargs["params"]["metrics"], "temperature,pH")
+
+        with patch.object(self.client._session, "get", side_effect=requests.ConnectionError("refused")), \
+                self.assertLogs(level="ERROR") as logs:
+            self.assertEqual(self.client.get_batch(["temperature"]), {})
+        self.assertIn("Batch query failed", logs.output[0])
+        self.assertIn("ConnectionError", logs.output[0])
+
+    def test_stats(self):
+        stats = {"gh01": {"rb_001": {"temperature": {"count": 12, "median": 21.0, "p95": 23.5}}}}
+        with patch.object(self.client._session, "get", return_value=_response(200, {"stats": stats})) as get:
+            self.assertEqual(self.client.get_stats(["temperature"], percentiles=[95]), stats)
+        self.assertEqual(get.call_args.kwargs["params"]["percentiles"], "95")
+
+        with patch.object(self.client._session, "get", return_value=_response(500, {"detail": "boom"})), \
+                self.assertLogs(level="ERROR") as logs:
+            self.assertEqual(self.client.get_stats(["temperature"]), {})
+        self.assertIn("Stats query failed", logs.output[0])
+        self.assertIn("500 Server Error", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
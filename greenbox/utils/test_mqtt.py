@@ -0,0 +1,252 @@
+import asyncio
+import json
+import math
+import os
+import socket
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from greenbox.utils import mqtt as mqtt_module
+from greenbox.utils import mqtt_shared
+from greenbox.utils import serializers
+from greenbox.utils.mqtt import MyMQTT, TopicPolicy
+from greenbox.utils.mqtt_asyncio import AsyncioLoopAdapter
+from greenbox.utils.mqtt_shared import SharedConnection
+from greenbox.utils.serializers import decode_payload, get_serializer
+
+PAYLOAD = {"value": 21.5, "unit": "°C", "readings": [["s1", "pH", 6.2, None]], "ok": True}
+
+
+class TestSerializers(unittest.TestCase):
+
+    def test_json_roundtrip(self):
+        for name in ("json", "auto"):
+            payload = get_serializer(name)({"value": 1.5, "unit": "°C"})
+            self.assertEqual(decode_payload(payload), {"value": 1.5, "unit": "°C"})
+        self.assertEqual(decode_payload('{"a": 1}'), {"a": 1})
+
+    @unittest.skipUnless(serializers.orjson, "orjson not installed")
+    def test_orjson_roundtrip(self):
+        payload = get_serializer("orjson")(PAYLOAD)
+        # same JSON on the wire
+        self.assertEqual(json.loads(payload), PAYLOAD)
+        self.assertEqual(decode_payload(payload), PAYLOAD)
+
+    @unittest.skipUnless(serializers.msgpack, "msgpack not installed")
+    def test_msgpack_roundtrip(self):
+        payload = get_serializer("msgpack")(PAYLOAD)
+        self.assertEqual(decode_payload(payload), PAYLOAD)
+        # small and large (map16) objects are both recognized
+        big = {f"k{i}": i for i in range(20)}
+        self.assertEqual(decode_payload(get_serializer("msgpack")(big)), big)
+        self.assertEqual(decode_payload(get_serializer("msgpack")({"t": object})), {"t": str(object)})
+
+    @unittest.skipUnless(serializers.cbor2, "cbor2 not installed")
+    def test_cbor_roundtrip(self):
+        payload = get_serializer("cbor")(PAYLOAD)
+        self.assertEqual(decode_payload(payload), PAYLOAD)
+        big = {f"k{i}": i for i in range(30)}
+        self.assertEqual(decode_payload(get_serializer("cbor")(big)), big)
+        self.assertEqual(decode_payload(get_serializer("cbor")({"t": object})), {"t": str(object)})
+
+    def test_non_finite_json(self):
+        # the stdlib encoder writes NaN/Infinity, which orjson refuses
+        payload = get_serializer("json")({"value": float("nan"), "max": float("inf")})
+        for codec in (serializers.orjson, None):
+            with patch.object(serializers, "orjson", codec):
+                decoded = decode_payload(payload)
+            self.assertTrue(math.isnan(decoded["value"]))
+            self.assertEqual(decoded["max"], math.inf)
+
+    def test_missing_codec(self):
+        with patch.object(serializers, "msgpack", None), patch.object(serializers, "cbor2", None):
+            with self.assertRaises(ValueError):
+                get_serializer("msgpack")
+            with self.assertRaises(ValueError):
+                decode_payload(b"\x81\xa1a\x01")
+            with self.assertRaises(ValueError):
+                decode_payload(b"\xa1aa\x01")
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            get_serializer("xml")
+        with self.assertRaises(ValueError):
+            decode_payload(b"not json")
+        with self.assertRaises(ValueError):
+            decode_payload(b"")
+
+
+@patch.object(mqtt_module.mqtt, "Client")
+class TestMyMQTTPolicies(unittest.TestCase):
+
+    def test_defaults_and_retained_state(self, client_cls):
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("MQTT_POLICIES", None)
+            os.environ.pop("MQTT_QOS", None)
+            c = MyMQTT("t", "localhost", 1883, None)
+        self.assertEqual(c.policy_for("/gh/rb/sensors/s/temperature"), TopicPolicy(qos=2))
+        self.assertEqual(c.policy_for("/gh/rb/actuators/ventilation/cmd"), TopicPolicy(qos=2, retain=True))
+
+        c.MyPublish("/gh/rb/statistics/state", {"a": 1})
+        client_cls.return_value.publish.assert_called_with("/gh/rb/statistics/state", b'{"a": 1}', qos=2, retain=True)
+
+    def test_overrides(self, client_cls):
+        env = {"MQTT_POLICIES": '{"/+/+/sensors/#": {"qos": 1}}', "MQTT_QOS": "2"}
+        with patch.dict(os.environ, env):
+            c = MyMQTT("t", "localhost", 1883, None, policies={"/+/+/sensors/batch": {"qos": 0}})
+        self.assertEqual(c.policy_for("/gh/rb/sensors/s/pH").qos, 1)
+        self.assertEqual(c.policy_for("/gh/rb/sensors/batch").qos, 0)
+
+        c.MySubscribe("/+/+/sensors/#")
+        client_cls.return_value.subscribe.assert_called_with("/+/+/sensors/#", qos=1)
+
+    def test_multiple_subscriptions(self, client_cls):
+        paho = client_cls.return_value
+        inbox, calls = _Inbox(), []
+        c = MyMQTT("t", "localhost", 1883, inbox, qos=1, policies={})
+        c.MySubscribe("/+/+/statistics/state")
+        c.MySubscribe("/gh/rb/actuators/+system/+id/data", handler=lambda *a: calls.append(a))
+        paho.subscribe.assert_called_with("/gh/rb/actuators/+/+/data", qos=1)
+
+        c._on_message(None, None, SimpleNamespace(topic="/gh/rb/actuators/ventilation/fan_1/data", payload=b"{}"))
+        c._on_message(None, None, SimpleNamespace(topic="/gh/rb/statistics/state", payload=b"1"))
+        self.assertEqual(calls, [("/gh/rb/actuators/ventilation/fan_1/data", b"{}", {"system": "ventilation", "id": "fan_1"})])
+        self.assertEqual(inbox.messages, [("/gh/rb/statistics/state", b"1")])
+
+        # Every subscription comes back after a reconnect
+        c._on_connect(None, None, {}, 0)
+        paho.subscribe.reset_mock()
+        c._on_connect(None, None, {}, 0)
+        paho.subscribe.assert_called_once_with([("/+/+/statistics/state", 1), ("/gh/rb/actuators/+/+/data", 1)])
+
+        c.MyUnsubscribe("/+/+/statistics/state")
+        paho.unsubscribe.assert_called_once_with("/+/+/statistics/state")
+        c.MyUnsubscribe()
+        self.assertEqual(c.router.filters(), [])
+
+    def test_invalid_policy(self, client_cls):
+        with self.assertRaises(ValueError):
+            MyMQTT("t", "localhost", 1883, None, qos=3)
+        with self.assertRaises(ValueError):
+            MyMQTT("t", "localhost", 1883, None, policies={"/#": {"serializer": "xml"}})
+
+
+class _Inbox:
+    def __init__(self):
+        self.messages = []
+
+    def notify(self, topic, payload):
+        self.messages.append((topic, payload))
+
+
+@patch.object(mqtt_shared.mqtt, "Client")
+class TestSharedConnection(unittest.TestCase):
+
+    def test_one_connection_many_devices(self, client_cls):
+        paho = client_cls.return_value
+        inboxes = [_Inbox(), _Inbox()]
+        devices = [MyMQTT(f"rb{i}", "localhost", 1883, inboxes[i], shared=True, policies={}) for i in range(2)]
+        for i, d in enumerate(devices):
+            d.start()
+            d.MySubscribe(f"/gh/rb{i}/actuators/+/cmd")
+        devices[0].MyPublish("/gh/rb0/sensors/s/pH", {"value": 7})
+
+        self.assertEqual(client_cls.call_count, 1)
+        self.assertEqual(SharedConnection.connections(), 1)
+        paho.connect.assert_called_once()
+        self.assertEqual(paho.subscribe.call_count, 2)
+        paho.publish.assert_called_with("/gh/rb0/sensors/s/pH", b'{"value": 7}', qos=2, retain=False)
+
+        conn = devices[0]._conn
+        conn._on_message(None, None, SimpleNamespace(topic="/gh/rb1/actuators/fan/cmd", payload=b"{}"))
+        self.assertEqual(inboxes[0].messages, [])
+        self.assertEqual(inboxes[1].messages, [("/gh/rb1/actuators/fan/cmd", b"{}")])
+
+        # Reconnect resubscribes every filter at once
+        paho.subscribe.reset_mock()
+        conn._on_connect(None, None, {}, 0)
+        paho.subscribe.assert_called_once_with([("/gh/rb0/actuators/+/cmd", 2), ("/gh/rb1/actuators/+/cmd", 2)])
+
+        devices[0].stop()
+        paho.unsubscribe.assert_called_once_with("/gh/rb0/actuators/+/cmd")
+        paho.disconnect.assert_not_called()
+        devices[1].stop()
+        paho.disconnect.assert_called_once()
+        self.assertEqual(SharedConnection.connections(), 0)
+
+    def test_same_filter_subscribed_once(self, client_cls):
+        paho = client_cls.return_value
+        a, b = _Inbox(), _Inbox()
+        devices = [MyMQTT(n, "localhost", 1883, inbox, shared=True) for n, inbox in (("a", a), ("b", b))]
+        for d in devices:
+            d.start()
+            d.MySubscribe("/+/+/sensors/#")
+        paho.subscribe.assert_called_once_with("/+/+/sensors/#", qos=2)
+
+        devices[0]._conn._on_message(None, None, SimpleNamespace(topic="/gh/rb/sensors/s/pH", payload=b"1"))
+        self.assertEqual(len(a.messages) + len(b.messages), 2)
+
+        devices[0].stop()
+        paho.unsubscribe.assert_not_called()
+        devices[1].stop()
+        paho.unsubscribe.assert_called_once_with("/+/+/sensors/#")
+
+    def test_failed_connect_not_reused(self, client_cls):
+        paho = client_cls.return_value
+        paho.connect.side_effect = ConnectionRefusedError
+        with self.assertRaises(ConnectionRefusedError):
+            SharedConnection.acquire("localhost", 1883, "rb0")
+        self.assertEqual(SharedConnection.connections(), 0)
+        paho.loop_start.assert_not_called()
+
+        paho.connect.side_effect = None
+        conn = SharedConnection.acquire("localhost", 1883, "rb0")
+        self.assertEqual(paho.connect.call_count, 2)
+        paho.loop_start.assert_called_once()
+        self.assertEqual(conn.stats()["users"], 1)
+        conn.release()
+        self.assertEqual(SharedConnection.connections(), 0)
+
+
+
+class TestAsyncioLoopAdapter(unittest.TestCase):
+
+    def test_socket_served_by_loop(self):
+        client = MagicMock()
+        client.loop_misc.return_value = mqtt_module.mqtt.MQTT_ERR_SUCCESS
+        sock, peer = socket.socketpair()
+        self.addCleanup(sock.close)
+        self.addCleanup(peer.close)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            adapter = AsyncioLoopAdapter(client, loop, "t")
+            self.assertEqual(client.on_socket_open, adapter._on_socket_open)
+            # paho opens the socket from the executor running the blocking connect
+            await loop.run_in_executor(None, adapter._on_socket_open, client, None, sock)
+            peer.send(b"x")
+            await asyncio.sleep(0.05)
+            self.assertTrue(client.loop_read.called)
+            client.loop_misc.assert_called()
+
+            await loop.run_in_executor(None, adapter._on_socket_register_write, client, None, sock)
+            await asyncio.sleep(0.05)
+            self.assertTrue(client.loop_write.called)
+            adapter._on_socket_unregister_write(client, None, sock)
+            adapter._on_socket_close(client, None, sock)
+            client.loop_read.reset_mock()
+            client.loop_write.reset_mock()
+            await asyncio.sleep(0.05)
+            client.loop_read.assert_not_called()
+            client.loop_write.assert_not_called()
+
+            adapter.close()
+            await asyncio.sleep(0)
+            self.assertTrue(adapter._misc.cancelled())
+
+        asyncio.run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import random
+import unittest
+
+from paho.mqtt.client import topic_matches_sub
+
+from greenbox.utils.topic_router import TopicRouter, parse_pattern
+
+
+class TestTopicRouter(unittest.TestCase):
+
+    def test_wildcards(self):
+        router = TopicRouter()
+        for f in ("/gh/rb/sensors/#", "/+/+/actuators/+/cmd", "/gh/rb/sensors/s1/pH", "#", "/gh/#"):
+            router.add(f, f)
+        self.assertCountEqual(
+            router.match("/gh/rb/sensors/s1/pH"),
+            ["/gh/rb/sensors/#", "/gh/rb/sensors/s1/pH", "#", "/gh/#"],
+        )
+        self.assertCountEqual(router.match("/gh/rb/sensors"), ["/gh/rb/sensors/#", "#", "/gh/#"])
+        self.assertCountEqual(router.match("/x/y/actuators/fan/cmd"), ["/+/+/actuators/+/cmd", "#"])
+        self.assertEqual(router.match("$SYS/broker/uptime"), [])
+
+    def test_same_as_paho(self):
+        rnd = random.Random(7)
+        levels = ["", "gh", "rb", "sensors", "+", "#"]
+        filters = set()
+        while len(filters) < 200:
+            parts = [rnd.choice(levels[:-1]) for _ in range(rnd.randint(1, 5))]
+            if rnd.random() < 0.3:
+                parts.append("#")
+            filters.add("/".join(parts))
+        router = TopicRouter()
+        for f in filters:
+            router.add(f, f)
+        for _ in range(500):
+            topic = "/".join(rnd.choice(levels[:4]) for _ in range(rnd.randint(1, 6)))
+            expected = sorted(f for f in filters if topic_matches_sub(f, topic))
+            self.assertEqual(sorted(router.match(topic)), expected, topic)
+
+    def test_remove(self):
+        router = TopicRouter()
+        t1 = router.add("/gh/+/cmd", "a")
+        t2 = router.add("/gh/+/cmd", "b")
+        self.assertEqual(router.remove(t1), "/gh/+/cmd")
+        self.assertTrue(router.has_filter("/gh/+/cmd"))
+        self.assertEqual(router.match("/gh/rb/cmd"), ["b"])
+        router.remove(t2)
+        self.assertIsNone(router.remove(t2))
+        self.assertEqual(router.filters(), [])
+        self.assertEqual(router._root.children, {})
+
+    def test_named_segments(self):
+        self.assertEqual(
+            parse_pattern("/+gh/+rb/actuators/+system/+id/data"),
+            ("/+/+/actuators/+/+/data", ((1, "gh", False), (2, "rb", False), (4, "system", False), (5, "id", False))),
+        )
+        router = TopicRouter()
+        router.add("/+gh/+rb/actuators/+system/+id/data", "data")
+        router.add("/gh1/#rest", "rest")
+        routes = dict(router.route("/gh1/rb2/actuators/ventilation/fan_001/data"))
+        self.assertEqual(routes["data"], {"gh": "gh1", "rb": "rb2", "system": "ventilation", "id": "fan_001"})
+        self.assertEqual(routes["rest"], {"rest": "rb2/actuators/ventilation/fan_001/data"})
+        # cached routes are dropped on change
+        router.add("/gh1/+rb/actuators/#", "any")
+        self.assertEqual(len(router.route("/gh1/rb2/actuators/ventilation/fan_001/data")), 3)
+
+    def test_invalid_filter(self):
+        router = TopicRouter()
+        for f in ("/gh/#/cmd", "/gh/rb+/cmd", "/gh/a#", "/gh/+1x/cmd"):
+            with self.assertRaises(ValueError):
+                router.add(f, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import itertools
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[..., Any]
+Segments = Dict[str, str]
+
+_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def parse_pattern(pattern: str) -> Tuple[str, Tuple[Tuple[int, str, bool], ...]]:
+    """
+    Split a topic pattern into its MQTT filter and its named wildcards.
+
+    A wildcard may carry a name ('+gh', '#rest'): '/+gh/+rb/actuators/+system/+id/data'
+    subscribes to '/+/+/actuators/+/+/data' and captures gh, rb, system and
+    id. Returns (filter, ((level index, name, multi-level), ...)).
+    """
+    levels = pattern.split("/")
+    names = []
+    for i, level in enumerate(levels):
+        if not level or level[0] not in "+#":
+            if "+" in level or "#" in level:
+                raise ValueError(f"Invalid topic filter '{pattern}': wildcards must fill a level")
+            continue
+        if level[0] == "#" and i != len(levels) - 1:
+            raise ValueError(f"Invalid topic filter '{pattern}': '#' must be last")
+        name = level[1:]
+        if name:
+            if not _NAME.fullmatch(name):
+                raise ValueError(f"Invalid topic filter '{pattern}': bad segment name '{name}'")
+            names.append((i, name, level[0] == "#"))
+        levels[i] = level[0]
+    return "/".join(levels), tuple(names)
+
+
+class _Node:
+    __slots__ = ("children", "handlers")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.handlers: Dict[int, Tuple[Handler, Tuple[Tuple[int, str, bool], ...]]] = {}
+
+
+class TopicRouter:
+    """
+    Trie of MQTT topic filters ('+' matches one level, '#' the rest) mapping
+    to handlers. `match` walks the trie once per topic level, so its cost
+    depends on the topic depth, not on the number of subscriptions.
+
+    Patterns may name their wildcards (see parse_pattern); `route` returns
+    the captured segments with each handler. Routes are cached per topic
+    (up to CACHE_SIZE topics, cleared on add/remove), so the segments dicts
+    are shared and must be treated as read-only.
+    """
+
+    CACHE_SIZE = 10_000
+
+    def __init__(self) -> None:
+        self._root = _Node()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscriptions: Dict[int, Tuple[str, Handler]] = {}
+        self._cache: Dict[str, List[Tuple[Handler, Segments]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def add(self, pattern: str, handler: Handler) -> int:
+        """Register a handler; returns a token for `remove`."""
+        topic_filter, names = parse_pattern(pattern)
+        with self._lock:
+            node = self._root
+            for level in topic_filter.split("/"):
+                node = node.children.setdefault(level, _Node())
+            token = next(self._ids)
+            node.handlers[token] = (handler, names)
+            self._subscriptions[token] = (topic_filter, handler)
+            self._cache = {}
+        return token
+
+    def remove(self, token: int) -> Optional[str]:
+        """Unregister a handler; returns its topic filter (None if unknown)."""
+        with self._lock:
+            entry = self._subscriptions.pop(token, None)
+            if entry is None:
+                return None
+            topic_filter = entry[0]
+            path = [self._root]
+            for level in topic_filter.split("/"):
+                path.append(path[-1].children[level])
+            path[-1].handlers.pop(token, None)
+            self._cache = {}
+            # Prune empty branches
+            for parent, level, node in zip(reversed(path[:-1]), reversed(topic_filter.split("/")), reversed(path[1:])):
+                if node.handlers or node.children:
+                    break
+                del parent.children[level]
+        return topic_filter
+
+    def filters(self) -> List[str]:
+        """Distinct registered topic filters."""
+        with self._lock:
+            return sorted({f for f, _ in self._subscriptions.values()})
+
+    def has_filter(self, topic_filter: str) -> bool:
+        with self._lock:
+            return any(f == topic_filter for f, _ in self._subscriptions.values())
+
+    def _entries(self, levels: List[str], system: bool) -> list:
+        out = []
+        stack = [(self._root, 0)]
+        with self._lock:
+            while stack:
+                node, i = stack.pop()
+                hash_node = node.children.get("#")
+                if hash_node is not None and not (system and i == 0):
+                    out.extend(hash_node.handlers.values())
+                if i == len(levels):
+                    out.extend(node.handlers.values())
+                    continue
+                child = node.children.get(levels[i])
+                if child is not None:
+                    stack.append((child, i + 1))
+                plus = node.children.get("+")
+                if plus is not None and not (system and i == 0):
+                    stack.append((plus, i + 1))
+        return out
+
+    def match(self, topic: str) -> List[Handler]:
+        """Handlers of every filter matching `topic`."""
+        return [h for h, _ in self.route(topic)]
+
+    def route(self, topic: str) -> List[Tuple[Handler, Segments]]:
+        """(handler, named segments) of every pattern matching `topic`."""
+        cache = self._cache  # taken first: a concurrent add/remove swaps in a new one
+        routes = cache.get(topic)
+        if routes is None:
+            levels = topic.split("/")
+            # Topics starting with '$' are not matched by leading wildcards
+            routes = [
+                (h, {name: "/".join(levels[i:]) if multi else levels[i] for i, name, multi in names})
+                for h, names in self._entries(levels, topic.startswith("$"))
+            ]
+            if len(cache) < self.CACHE_SIZE:
+                cache[topic] = routes
+        return routes